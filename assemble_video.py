@@ -16,10 +16,14 @@ from moviepy.editor import (
     ImageClip,
     AudioFileClip,
     concatenate_videoclips,
-    TextClip,
     CompositeVideoClip,
 )
 
+from core.generators import subtitle_generator
+from core.generators.subtitle_generator import SubtitleSettings
+from core.utils import config_loader, ffmpeg_utils, video_encoder
+from core.utils.clip_scope import ClipScope
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -35,18 +39,33 @@ logger = logging.getLogger(__name__)
 class VideoAssembler:
     """Assembles production video from chapter components."""
 
-    def __init__(self, fps: int = 30, output_dir: str = "."):
+    def __init__(
+        self,
+        fps: int = 30,
+        output_dir: str = ".",
+        encoder: str = video_encoder.DEFAULT_ENCODER,
+        subtitles: Optional[SubtitleSettings] = SubtitleSettings(),
+    ):
         """
         Initialize VideoAssembler.
         
         Args:
             fps: Frames per second
             output_dir: Output directory
+            encoder: Encoder backend ("moviepy" or "ffmpeg_pipe")
+            subtitles: Subtitle settings (`subtitles` config section), None to ignore subtitles.srt
         """
         self.fps = fps
         self.output_dir = Path(output_dir)
+        self.subtitles = subtitles
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        logger.info(f"✅ Initialized VideoAssembler (fps={fps})")
+        self.encoder_settings = video_encoder.EncoderSettings(
+            fps=fps,
+            preset="ultrafast",
+            threads=4,
+            encoder=encoder,
+        )
+        logger.info(f"✅ Initialized VideoAssembler (fps={fps}, encoder={encoder})")
 
     def load_images_as_clips(
         self,
@@ -83,9 +102,10 @@ class VideoAssembler:
         clips = []
         for img_file in image_files:
             try:
-                # Load image and create clip
-                img = Image.open(img_file)
-                logger.info(f"   Loading: {img_file.name} ({img.size[0]}x{img.size[1]})")
+                # Only the header is read here; ImageClip loads the pixels
+                with Image.open(img_file) as img:
+                    width, height = img.size
+                logger.info(f"   Loading: {img_file.name} ({width}x{height})")
                 
                 clip = ImageClip(str(img_file)).set_duration(duration_per_image)
                 clips.append(clip)
@@ -120,6 +140,7 @@ class VideoAssembler:
             logger.warning(f"⚠️  Audio file not found: {audio_file}")
             return None
         
+        audio = None
         try:
             audio = AudioFileClip(str(audio_path))
             logger.info(f"🔊 Loaded audio: {audio_path.name} ({audio.duration:.1f}s)")
@@ -127,11 +148,13 @@ class VideoAssembler:
             # Trim if needed
             if target_duration and audio.duration > target_duration:
                 logger.info(f"   Trimming audio from {audio.duration:.1f}s to {target_duration:.1f}s")
-                audio = audio.subclipped(0, target_duration)
+                audio = audio.subclip(0, target_duration)
             
             return audio
         except Exception as e:
             logger.error(f"❌ Failed to load audio: {e}")
+            if audio is not None:
+                audio.close()
             return None
 
     def load_subtitles(
@@ -169,6 +192,24 @@ class VideoAssembler:
             logger.error(f"❌ Failed to load subtitles: {e}")
             return None
 
+    def write_subtitles(self, srt_text: str, output_path: Path, width: int, height: int) -> Path:
+        """
+        Write `<output>.srt` and a styled `<output>.ass` next to the video.
+        
+        The ASS file carries the font/size/color/position settings, the same
+        way the renderer writes it; it is the one burned in.
+        
+        Returns:
+            Path to the .ass file
+        """
+        cues = subtitle_generator.parse_srt(srt_text)
+        srt_path = output_path.with_suffix(".srt")
+        ass_path = output_path.with_suffix(".ass")
+        srt_path.write_text(subtitle_generator.to_srt(cues), encoding="utf-8")
+        ass_path.write_text(subtitle_generator.to_ass(cues, self.subtitles, width, height), encoding="utf-8")
+        logger.info(f"💬 Subtitles: {len(cues)} cues ({self.subtitles.mode}) → {srt_path}")
+        return ass_path
+
     def assemble_from_chapter(
         self,
         chapter_dir: str,
@@ -205,76 +246,68 @@ class VideoAssembler:
         logger.info(f"   Chapter: {chapter_path.absolute()}")
         logger.info(f"")
         
-        # Load images
-        images_dir = chapter_path / "images"
-        clips = self.load_images_as_clips(str(images_dir), image_duration)
+        # Every reader opened below is closed when the scope ends, even on errors
+        with ClipScope("assemble") as scope:
+            # Load images
+            images_dir = chapter_path / "images"
+            clips = self.load_images_as_clips(str(images_dir), image_duration)
+        
+            # Concatenate clips
+            logger.info(f"\n⛓️  Concatenating {len(clips)} clips...")
+            video = scope.track(concatenate_videoclips(clips, method="chain"))
+            video_duration = video.duration
+            logger.info(f"✅ Video duration: {video_duration:.1f}s")
+        
+            # Load audio
+            logger.info(f"")
+            audio_candidates = [
+                chapter_path / "audio.wav",
+                chapter_path / "audio.mp3",
+                chapter_path / "audio.m4a",
+            ]
+            audio = None
+            for audio_file in audio_candidates:
+                if audio_file.exists():
+                    audio = scope.track(self.load_audio(str(audio_file), target_duration=video_duration))
+                    break
         
-        # Concatenate clips
-        logger.info(f"\n⛓️  Concatenating {len(clips)} clips...")
-        video = concatenate_videoclips(clips, method="chain")
-        video_duration = video.duration
-        logger.info(f"✅ Video duration: {video_duration:.1f}s")
-        
-        # Load audio
-        logger.info(f"")
-        audio_candidates = [
-            chapter_path / "audio.wav",
-            chapter_path / "audio.mp3",
-            chapter_path / "audio.m4a",
-        ]
-        audio = None
-        for audio_file in audio_candidates:
-            if audio_file.exists():
-                audio = self.load_audio(str(audio_file), target_duration=video_duration)
-                break
-        
-        if audio:
-            video = video.set_audio(audio)
+            if audio:
+                video = video.set_audio(audio)
+        
+            # Load subtitles (optional): sidecar files, or burned in by ffmpeg during the encode
+            logger.info(f"")
+            output_path = self.output_dir / output_file
+            encoder_settings = self.encoder_settings
+            subtitles = self.load_subtitles(str(chapter_path / "subtitles.srt")) if self.subtitles else None
+            if subtitles:
+                ass_path = self.write_subtitles(subtitles["data"], output_path, video.w, video.h)
+                if self.subtitles.mode == "burn":
+                    encoder_settings = encoder_settings.with_overrides(
+                        video_filter=ffmpeg_utils.subtitles_filter(ass_path)
+                    )
+        
+            # Load metadata (optional)
+            logger.info(f"")
+            metadata_file = chapter_path / "metadata.json"
+            if metadata_file.exists():
+                try:
+                    with open(metadata_file, 'r') as f:
+                        metadata = json.load(f)
+                    logger.info(f"📋 Metadata: {json.dumps(metadata, indent=2)}")
+                except Exception as e:
+                    logger.warning(f"⚠️  Failed to load metadata: {e}")
         
-        # Load subtitles (optional - just log)
-        logger.info(f"")
-        subtitles_file = chapter_path / "subtitles.srt"
-        subtitles = self.load_subtitles(str(subtitles_file))
+            # Write video
+            logger.info(f"\n💾 Writing video file...")
         
-        # Load metadata (optional)
-        logger.info(f"")
-        metadata_file = chapter_path / "metadata.json"
-        if metadata_file.exists():
             try:
-                with open(metadata_file, 'r') as f:
-                    metadata = json.load(f)
-                logger.info(f"📋 Metadata: {json.dumps(metadata, indent=2)}")
+                video_encoder.write_clip(video, output_path, encoder_settings)
+                logger.info(f"✅ Video created: {output_path}")
+                logger.info(f"   Size: {output_path.stat().st_size / (1024*1024):.1f} MB")
+                return str(output_path)
             except Exception as e:
-                logger.warning(f"⚠️  Failed to load metadata: {e}")
-        
-        # Write video
-        logger.info(f"\n💾 Writing video file...")
-        output_path = self.output_dir / output_file
-        
-        try:
-            video.write_videofile(
-                str(output_path),
-                fps=self.fps,
-                codec='libx264',
-                audio_codec='aac',
-                preset='ultrafast',
-                threads=4,
-                verbose=False,
-                logger=None,
-            )
-            logger.info(f"✅ Video created: {output_path}")
-            logger.info(f"   Size: {output_path.stat().st_size / (1024*1024):.1f} MB")
-            return str(output_path)
-        except Exception as e:
-            logger.error(f"❌ Failed to write video: {e}", exc_info=True)
-            raise
-        finally:
-            video.close()
-            if audio:
-                try:
-                    audio.close()
-                except:
-                    pass
+                logger.error(f"❌ Failed to write video: {e}", exc_info=True)
+                raise
 
 
 def find_chapter_directories() -> list:
@@ -318,8 +351,13 @@ def main():
         
         logger.info(f"\n📂 Found {len(chapters)} chapter(s)")
         
-        # Assemble each chapter
-        assembler = VideoAssembler(fps=30)
+        # Assemble each chapter with the shared encoder and subtitle settings
+        config = config_loader.load_shared()
+        assembler = VideoAssembler(
+            fps=30,
+            encoder=config.video.get("encoder", video_encoder.DEFAULT_ENCODER),
+            subtitles=subtitle_generator.settings_from_config(config),
+        )
         output_files = []
         
         for chapter_dir in chapters:
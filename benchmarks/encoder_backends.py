@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Encoder backend benchmark: MoviePy write_videofile vs ffmpeg pipe.
+
+Renders the same synthetic timeline (background, moving text, tone audio)
+with every registered encoder backend. Each backend runs in a fresh
+subprocess so peak RSS is measured independently for the Python process
+and for its ffmpeg children.
+
+Usage:
+    python benchmarks/encoder_backends.py
+    python benchmarks/encoder_backends.py --duration 20 --size 1080x1920 --json results.json
+"""
+
+import argparse
+import json
+import logging
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Add repo root to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.utils import video_encoder
+
+logger = logging.getLogger(__name__)
+
+
+def build_timeline(width: int, height: int, duration: float, fps: int):
+    """Synthetic non-static timeline: color background + sliding text + tone."""
+    from moviepy.editor import AudioClip, ColorClip, CompositeVideoClip, ImageClip
+
+    background = ColorClip((width, height), color=(20, 10, 40)).set_duration(duration)
+
+    text_img = Image.new("RGBA", (width, height // 6), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(text_img)
+    draw.text((20, 20), "Benchmark timeline", fill=(255, 255, 255, 255))
+    text = ImageClip(np.array(text_img)).set_duration(duration)
+    text = text.set_position(lambda t: (0, int((height - text_img.height) * t / duration)))
+
+    tone = AudioClip(
+        lambda t: np.sin(2 * np.pi * 440 * np.asarray(t)).reshape(-1, 1).repeat(2, axis=1) * 0.1,
+        duration=duration,
+        fps=44100,
+    )
+    return CompositeVideoClip([background, text], size=(width, height)).set_audio(tone).set_fps(fps)
+
+
+def run_backend(backend: str, width: int, height: int, duration: float, fps: int, output: Path) -> dict:
+    """Encode the timeline with one backend in this process and return metrics."""
+    clip = build_timeline(width, height, duration, fps)
+    settings = video_encoder.EncoderSettings(fps=fps, bitrate="5000k", encoder=backend, preset="veryfast")
+
+    start = time.perf_counter()
+    video_encoder.write_clip(clip, output, settings)
+    elapsed = time.perf_counter() - start
+    clip.close()
+
+    frames = int(np.ceil(duration * fps))
+    return {
+        "backend": backend,
+        "frames": frames,
+        "wall_sec": round(elapsed, 3),
+        "fps": round(frames / elapsed, 2) if elapsed else 0.0,
+        # ru_maxrss is reported in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_rss_children_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "output_bytes": output.stat().st_size,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare encoder backends on the same timeline")
+    parser.add_argument("--duration", type=float, default=10.0, help="Timeline length in seconds")
+    parser.add_argument("--size", default="1080x1920", help="WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--backends", default=",".join(video_encoder.list_encoders()))
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    parser.add_argument("--run-backend", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    if args.run_backend:
+        # Child process: encode once and print metrics as JSON
+        result = run_backend(args.run_backend, width, height, args.duration, args.fps, Path(args.output))
+        print(json.dumps(result))
+        return 0
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_encoders_") as tmp_dir:
+        for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+            cmd = [
+                sys.executable, __file__,
+                "--run-backend", backend,
+                "--output", str(Path(tmp_dir) / f"{backend}.mp4"),
+                "--duration", str(args.duration),
+                "--size", args.size,
+                "--fps", str(args.fps),
+            ]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"❌ {backend} failed:\n{proc.stderr[-1000:]}", file=sys.stderr)
+                return 1
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print(f"\nTimeline: {args.size} @ {args.fps} fps, {args.duration:.1f}s")
+    print(f"{'backend':<14}{'wall s':>10}{'fps':>10}{'RSS MB':>10}{'ffmpeg MB':>12}")
+    for r in results:
+        print(
+            f"{r['backend']:<14}{r['wall_sec']:>10.2f}{r['fps']:>10.1f}"
+            f"{r['peak_rss_mb']:>10.1f}{r['peak_rss_children_mb']:>12.1f}"
+        )
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Render benchmark suite: every render path on synthetic inputs.
+
+Renders shorts, long_form, ad, slides and `assemble_video` chapters from
+generated audio (tone WAVs of fixed lengths) and synthetic scripts, fully
+offline: no API keys, stock footage disabled, caches and incremental
+re-rendering off so every run does the full work. Each (case, length) runs
+in a fresh subprocess so peak RSS is measured independently for the Python
+process and for its ffmpeg children.
+
+Results (wall time, fps, peak RSS, output size, per-stage timings from
+core.utils.profiling) are written to a JSON file; `compare` flags
+regressions against a stored baseline and exits non-zero.
+
+Usage:
+    python benchmarks/render_suite.py run --json baseline.json          # on the reference machine
+    python benchmarks/render_suite.py run --json results.json
+    python benchmarks/render_suite.py compare results.json baseline.json --threshold 0.2
+    python benchmarks/render_suite.py run --cases shorts,ad --lengths 30 --preview
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+# Add repo root to path
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+CASES = ("shorts", "long_form", "ad", "slides", "assemble")
+DEFAULT_LENGTHS = (30, 180, 720)
+SAMPLE_RATE = 22050  # same as tts_generator output
+FPS = 30
+
+# Relative increase over the baseline that counts as a regression
+DEFAULT_THRESHOLD = 0.20
+DEFAULT_RSS_THRESHOLD = 0.20
+
+SENTENCES = [
+    "Сегодня звезды советуют не торопиться с важными решениями.",
+    "Вечер принесет приятные новости от старых друзей.",
+    "Финансовые вопросы лучше отложить до конца недели.",
+    "Прислушайтесь к своему телу и больше отдыхайте.",
+    "Неожиданная встреча может изменить ваши планы.",
+    "Удача на стороне тех, кто действует спокойно и уверенно.",
+]
+
+
+# ============ SYNTHETIC INPUTS ============
+
+def write_tone_wav(path: Path, seconds: float, freq: float = 220.0) -> Path:
+    """Mono 16-bit WAV with a slowly pulsing tone (non-silent, so AAC does real work)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(path), "w") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        chunk = SAMPLE_RATE * 10
+        total = int(round(seconds * SAMPLE_RATE))
+        for start in range(0, total, chunk):
+            t = np.arange(start, min(start + chunk, total)) / SAMPLE_RATE
+            signal = 0.2 * np.sin(2 * np.pi * freq * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 0.5 * t))
+            wav_file.writeframes((signal * 32767).astype("<i2").tobytes())
+    return path
+
+
+def synthetic_text(seconds: float, chars_per_second: float = 14.0) -> str:
+    """Narration-like text roughly as long as `seconds` of speech."""
+    sentences = []
+    while sum(len(s) + 1 for s in sentences) < seconds * chars_per_second:
+        sentences.append(SENTENCES[len(sentences) % len(SENTENCES)])
+    return " ".join(sentences)
+
+
+def synthetic_script(mode: str, seconds: float) -> dict:
+    """Script dict shaped like script_generator output for `mode`."""
+    if mode == "long_form":
+        third = seconds / 3
+        return {
+            "video_title": "Гороскоп на неделю",
+            "blocks": {name: synthetic_text(third) for name in ("love", "money", "health")},
+        }
+    if mode == "ad":
+        return {"product_id": "Специальное предложение", "narration_text": synthetic_text(seconds)}
+    return {"hook": "Гороскоп на сегодня", "script": synthetic_text(seconds)}
+
+
+def bench_config(work_dir: Path, still: bool, subtitles: bool, encoder: str | None):
+    """Offline ProjectConfig: no stock footage, no caches, no incremental reuse."""
+    from core.utils.config_loader import ProjectConfig
+
+    video = {"incremental_render": False, "still_fast_path": still}
+    if encoder:
+        video["encoder"] = encoder
+    return ProjectConfig({
+        "project": {"name": "benchmark"},
+        "video": video,
+        "caching": {"enabled": False, "dir": str(work_dir / "cache"), "stock_catalog": False},
+        "subtitles": {"enabled": subtitles, "mode": "burn"},
+    })
+
+
+# ============ CASES ============
+
+def run_renderer(mode: str, seconds: float, work_dir: Path, config, preview: bool) -> Path:
+    from core.generators import video_renderer
+
+    if mode == "long_form":
+        blocks = {
+            name: str(write_tone_wav(work_dir / "audio" / f"{name}.wav", seconds / 3, freq))
+            for name, freq in (("love", 220.0), ("money", 262.0), ("health", 330.0))
+        }
+    else:
+        blocks = {"main": str(write_tone_wav(work_dir / "audio" / "main.wav", seconds))}
+    audio_map = {"blocks": blocks, "total_duration_sec": seconds}
+    return video_renderer.render(config, synthetic_script(mode, seconds), audio_map, mode, preview=preview)
+
+
+def run_slides(seconds: float, work_dir: Path, preview: bool) -> Path:
+    from core.content_modes.slides_mode.mode import SlidesMode
+    from core.content_modes.slides_mode.slide_builder import SlideBuilder
+
+    scenario = synthetic_text(seconds)
+    slides = SlideBuilder().build_slides(scenario)
+    per_slide = seconds / len(slides)
+    audio_map = {
+        slide.text: str(write_tone_wav(work_dir / "audio" / f"slide_{slide.index:03d}.wav", per_slide))
+        for slide in slides
+    }
+    width, height = (540, 960) if preview else (1080, 1920)
+    design = {"width": width, "height": height, "fps": 15 if preview else FPS, "background_type": "gradient"}
+    result = asyncio.run(SlidesMode().generate(scenario, audio_map, design, output_dir=work_dir / "output"))
+    return Path(result.video_path)
+
+
+def run_assemble(seconds: float, work_dir: Path, preview: bool, subtitles: bool, encoder: str | None) -> Path:
+    from core.generators import subtitle_generator
+    from core.utils import backgrounds, video_encoder
+    from PIL import Image
+
+    chapter = work_dir / "chapters" / "chapter_01"
+    images_dir = chapter / "images"
+    images_dir.mkdir(parents=True, exist_ok=True)
+    image_duration = max(3.0, seconds / 20)
+    count = max(1, round(seconds / image_duration))
+    width, height = (540, 960) if preview else (1080, 1920)
+    for i in range(count):
+        spec = backgrounds.BackgroundSpec("linear", (40 + 8 * i % 200, 20, 80), (10, 10, 30), angle=30.0 * i)
+        Image.fromarray(backgrounds.render_frame(spec, width, height)).save(images_dir / f"{i:03d}.png")
+    write_tone_wav(chapter / "audio.wav", count * image_duration)
+    cues = subtitle_generator.timed_cues(synthetic_text(seconds), count * image_duration, 60)
+    (chapter / "subtitles.srt").write_text(subtitle_generator.to_srt(cues), encoding="utf-8")
+
+    import assemble_video
+
+    assembler = assemble_video.VideoAssembler(
+        fps=15 if preview else FPS,
+        output_dir=str(work_dir / "output"),
+        encoder=encoder or video_encoder.DEFAULT_ENCODER,
+        subtitles=subtitle_generator.SubtitleSettings(mode="burn") if subtitles else None,
+    )
+    return Path(assembler.assemble_from_chapter(str(chapter), image_duration=image_duration))
+
+
+def run_case(case: str, seconds: float, work_dir: Path, args) -> dict:
+    """Render one case in this process and return its metrics."""
+    from core.utils import profiling
+
+    # Never touch the network, whatever the caller's environment has
+    for key in ("PIXABAY_API_KEY", "GOOGLE_AI_API_KEY", "GEMINI_API_KEY"):
+        os.environ.pop(key, None)
+    os.chdir(work_dir)
+    profiler = profiling.reset_profiler()
+
+    start = time.perf_counter()
+    with profiler.stage(case):
+        if case in ("shorts", "long_form", "ad"):
+            config = bench_config(work_dir, not args.no_still, args.subtitles, args.encoder)
+            output = run_renderer(case, seconds, work_dir, config, args.preview)
+        elif case == "slides":
+            output = run_slides(seconds, work_dir, args.preview)
+        else:
+            output = run_assemble(seconds, work_dir, args.preview, args.subtitles, args.encoder)
+    elapsed = time.perf_counter() - start
+
+    # Long-form adds bumpers, slides add transitions: count the frames actually written
+    from moviepy.editor import VideoFileClip
+
+    clip = VideoFileClip(str(output), audio=False)
+    video_duration, fps = clip.duration, clip.fps
+    clip.close()
+    frames = int(round(video_duration * fps))
+    return {
+        "case": case,
+        "length_sec": seconds,
+        "preview": args.preview,
+        "video_duration_sec": round(video_duration, 3),
+        "frames": frames,
+        "wall_sec": round(elapsed, 3),
+        "fps": round(frames / elapsed, 2) if elapsed else 0.0,
+        # ru_maxrss is reported in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_rss_children_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "output_bytes": output.stat().st_size,
+        "stages": profiler.report()["stages"],
+    }
+
+
+# ============ RESULTS ============
+
+def result_key(result: dict) -> str:
+    return f"{result['case']}@{result['length_sec']:g}s{' preview' if result.get('preview') else ''}"
+
+
+def environment() -> dict:
+    from core.utils import ffmpeg_utils
+
+    try:
+        ffmpeg = subprocess.run(
+            [ffmpeg_utils.get_ffmpeg_exe(), "-version"], capture_output=True, text=True
+        ).stdout.splitlines()[0]
+    except Exception:
+        ffmpeg = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": ffmpeg,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, rss_threshold: float) -> list[dict]:
+    """
+    Rows for every benchmark present in both files.
+
+    A row is a regression when wall time or peak RSS (Python or ffmpeg)
+    grew by more than the threshold over the baseline.
+    """
+    base_by_key = {result_key(r): r for r in baseline.get("results", [])}
+    rows = []
+    for result in results.get("results", []):
+        key = result_key(result)
+        base = base_by_key.get(key)
+        if base is None:
+            continue
+        row = {"key": key, "regressions": []}
+        for metric, limit in (
+            ("wall_sec", threshold),
+            ("peak_rss_mb", rss_threshold),
+            ("peak_rss_children_mb", rss_threshold),
+            ("output_bytes", None),
+        ):
+            old, new = base.get(metric), result.get(metric)
+            change = (new - old) / old if old and new is not None else None
+            row[metric] = {"baseline": old, "current": new, "change": change}
+            if limit is not None and change is not None and change > limit:
+                row["regressions"].append(metric)
+        rows.append(row)
+    return rows
+
+
+def _run(args) -> int:
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        print(f"Unknown case(s): {', '.join(unknown)} (expected {', '.join(CASES)})", file=sys.stderr)
+        return 2
+    lengths = [float(v) for v in args.lengths.split(",") if v.strip()]
+
+    results = []
+    failed = False
+    for case in cases:
+        for seconds in lengths:
+            with tempfile.TemporaryDirectory(prefix=f"bench_{case}_") as tmp_dir:
+                cmd = [
+                    sys.executable, __file__, "run",
+                    "--run-case", case,
+                    "--length", str(seconds),
+                    "--work-dir", tmp_dir,
+                ]
+                cmd += ["--preview"] if args.preview else []
+                cmd += ["--no-still"] if args.no_still else []
+                cmd += ["--subtitles"] if args.subtitles else []
+                cmd += ["--encoder", args.encoder] if args.encoder else []
+                print(f"▶ {case} {seconds:g}s ...", flush=True)
+                proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"❌ {case} {seconds:g}s failed:\n{proc.stderr[-2000:]}", file=sys.stderr)
+                failed = True
+                continue
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print(f"\n{'benchmark':<26}{'wall s':>10}{'fps':>10}{'RSS MB':>10}{'ffmpeg MB':>12}{'size MB':>10}")
+    for r in results:
+        print(
+            f"{result_key(r):<26}{r['wall_sec']:>10.2f}{r['fps']:>10.1f}{r['peak_rss_mb']:>10.1f}"
+            f"{r['peak_rss_children_mb']:>12.1f}{r['output_bytes'] / 1e6:>10.2f}"
+        )
+
+    if args.json_path:
+        payload = {"environment": environment(), "results": results}
+        Path(args.json_path).write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nResults: {args.json_path}")
+    return 1 if failed else 0
+
+
+def _compare(args) -> int:
+    results = json.loads(Path(args.results).read_text(encoding="utf-8"))
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    rows = compare(results, baseline, args.threshold, args.rss_threshold)
+    if not rows:
+        print("No benchmarks in common with the baseline")
+        return 0
+
+    def pct(value):
+        return f"{value * 100:+.1f}%" if value is not None else "n/a"
+
+    print(f"{'benchmark':<26}{'wall':>10}{'RSS':>10}{'ffmpeg':>10}{'size':>10}")
+    for row in rows:
+        flag = "  ❌ " + ", ".join(row["regressions"]) if row["regressions"] else ""
+        print(
+            f"{row['key']:<26}{pct(row['wall_sec']['change']):>10}{pct(row['peak_rss_mb']['change']):>10}"
+            f"{pct(row['peak_rss_children_mb']['change']):>10}{pct(row['output_bytes']['change']):>10}{flag}"
+        )
+    regressions = [row for row in rows if row["regressions"]]
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) over the baseline")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Offline render benchmarks with baseline comparison")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run benchmarks")
+    run.add_argument("--cases", default=",".join(CASES), help=f"Comma-separated ({', '.join(CASES)})")
+    run.add_argument("--lengths", default=",".join(str(v) for v in DEFAULT_LENGTHS), help="Audio lengths in seconds")
+    run.add_argument("--preview", action="store_true", help="Draft renders (half size, 15 fps)")
+    run.add_argument("--no-still", action="store_true", help="Disable the still fast path (MoviePy compositing)")
+    run.add_argument("--subtitles", action="store_true", help="Burn in subtitles")
+    run.add_argument("--encoder", help="Encoder backend (video.encoder)")
+    run.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    run.add_argument("--run-case", help=argparse.SUPPRESS)
+    run.add_argument("--length", type=float, help=argparse.SUPPRESS)
+    run.add_argument("--work-dir", help=argparse.SUPPRESS)
+
+    cmp_parser = sub.add_parser("compare", help="Compare results against a baseline")
+    cmp_parser.add_argument("results")
+    cmp_parser.add_argument("baseline")
+    cmp_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed wall time increase")
+    cmp_parser.add_argument("--rss-threshold", type=float, default=DEFAULT_RSS_THRESHOLD, help="Allowed peak RSS increase")
+    return parser
+
+
+def main() -> int:
+    args = build_parser().parse_args()
+    if args.command == "compare":
+        return _compare(args)
+    if args.run_case:
+        # Child process: render once and print metrics as JSON
+        result = run_case(args.run_case, args.length, Path(args.work_dir), args)
+        print(json.dumps(result, ensure_ascii=False))
+        return 0
+    return _run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,6 +13,8 @@ from moviepy.editor import (
 )
 
 from core.content_modes.base import BaseContentMode, GenerationResult
+from core.utils import video_encoder
+from core.utils.clip_scope import ClipScope
 from core.content_modes.registry import register_mode
 from .slide_builder import SlideBuilder
 from .slide_renderer import SlideRenderer
@@ -76,6 +78,7 @@ class SlidesMode(BaseContentMode):
             output_dir = Path(tempfile.gettempdir()) / "content-factory"
         
         output_dir.mkdir(parents=True, exist_ok=True)
+        clips = ClipScope("slides")
         
         try:
             # 1. Build slides from text
@@ -101,14 +104,15 @@ class SlidesMode(BaseContentMode):
                 slide_images,
                 renderer.width,
                 renderer.height,
+                clips,
             )
             
             # 5. Combine clips with transitions
             logger.info("🔀 Combining clips with transitions...")
-            final_video = self._combine_clips(
+            final_video = clips.track(self._combine_clips(
                 video_clips,
                 config.get("transitions", {}),
-            )
+            ))
             
             # 6. Export video
             logger.info("💾 Exporting video...")
@@ -116,15 +120,8 @@ class SlidesMode(BaseContentMode):
             fps = config.get("fps", 30)
             bitrate = config.get("bitrate", "5000k")
             
-            final_video.write_videofile(
-                str(output_path),
-                fps=fps,
-                codec="libx264",
-                audio_codec="aac",
-                bitrate=bitrate,
-                verbose=False,
-                logger=None,
-            )
+            settings = video_encoder.settings_from_config(config, fps=fps, bitrate=bitrate)
+            video_encoder.write_clip(final_video, output_path, settings)
             
             duration = final_video.duration
             
@@ -132,9 +129,6 @@ class SlidesMode(BaseContentMode):
             logger.info(f"   Duration: {duration:.2f}s")
             logger.info(f"   Resolution: {renderer.width}x{renderer.height}")
             
-            # Cleanup
-            final_video.close()
-            
             return GenerationResult(
                 video_path=str(output_path),
                 duration=duration,
@@ -144,12 +138,17 @@ class SlidesMode(BaseContentMode):
                     "slides_count": len(slides),
                     "variant": self.variant,
                     "fps": fps,
+                    "encoder": settings.encoder,
                 },
             )
         
         except Exception as e:
             logger.error(f"❌ Error generating video: {e}", exc_info=True)
             raise
+        
+        finally:
+            # Audio readers of every slide and the final clip
+            clips.close()
     
     def _create_renderer(self, config: Dict[str, Any]) -> SlideRenderer:
         """Create a slide renderer from config."""
@@ -160,6 +159,8 @@ class SlidesMode(BaseContentMode):
             text_color=config.get("text_color", "white"),
             font_size=config.get("font_size", 70),
             font_family=config.get("font_family", "Arial"),
+            background_type=config.get("background_type", "solid"),
+            background_secondary=config.get("background_secondary"),
         )
     
     async def _render_slides(
@@ -204,9 +205,10 @@ class SlidesMode(BaseContentMode):
         slide_images: Dict[int, Path],
         width: int,
         height: int,
+        clips: ClipScope,
     ):
-        """Create video clips for each slide with audio."""
-        clips = []
+        """Create video clips for each slide with audio (audio readers are tracked in `clips`)."""
+        video_clips = []
         
         for slide in slides:
             # Create image clip
@@ -221,7 +223,7 @@ class SlidesMode(BaseContentMode):
             duration = slide.duration
             if slide.audio_path and Path(slide.audio_path).exists():
                 try:
-                    audio_clip = AudioFileClip(slide.audio_path)
+                    audio_clip = clips.track(AudioFileClip(slide.audio_path))
                     duration = max(duration, audio_clip.duration)
                     img_clip = img_clip.set_audio(audio_clip)
                 except Exception as e:
@@ -229,9 +231,9 @@ class SlidesMode(BaseContentMode):
             
             # Set duration
             img_clip = img_clip.set_duration(duration)
-            clips.append(img_clip)
+            video_clips.append(img_clip)
         
-        return clips
+        return video_clips
     
     def _combine_clips(
         self,
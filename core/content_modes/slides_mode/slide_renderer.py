@@ -5,6 +5,8 @@ from pathlib import Path
 from typing import Tuple, Dict, Any
 from PIL import Image, ImageDraw, ImageFont
 
+from core.utils import backgrounds, text_rendering
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,6 +21,8 @@ class SlideRenderer:
         text_color: str = "white",
         font_size: int = 70,
         font_family: str = "Arial",
+        background_type: str = "solid",
+        background_secondary: str | None = None,
     ):
         """
         Initialize slide renderer.
@@ -30,6 +34,10 @@ class SlideRenderer:
             text_color: Text color (hex or name)
             font_size: Font size in pixels
             font_family: Font family name
+            background_type: solid | gradient (linear) | radial | animated
+                (slides are stills, so animated uses its first frame)
+            background_secondary: Second gradient color (default: darker
+                shade of background_color)
         """
         self.width = width
         self.height = height
@@ -37,6 +45,11 @@ class SlideRenderer:
         self.text_color = self._parse_color(text_color)
         self.font_size = font_size
         self.font_family = font_family
+        self.background = backgrounds.spec_from_design(
+            {"background_type": background_type},
+            primary=self.background_color,
+            secondary=self._parse_color(background_secondary) if background_secondary else None,
+        )
     
     def render_slide(self, text: str, output_path: Path) -> Path:
         """
@@ -50,11 +63,7 @@ class SlideRenderer:
             Path to the generated image
         """
         # Create image with background
-        image = Image.new(
-            "RGB",
-            (self.width, self.height),
-            self.background_color
-        )
+        image = Image.fromarray(backgrounds.render_frame(self.background, self.width, self.height))
         
         # Draw text
         self._draw_text(image, text)
@@ -67,49 +76,26 @@ class SlideRenderer:
         return output_path
     
     def _draw_text(self, image: Image.Image, text: str) -> None:
-        """Draw text on image."""
-        draw = ImageDraw.Draw(image)
-        
-        # Load font
-        font = self._load_font()
-        
-        # Wrap text
-        wrapped_lines = self._wrap_text(text, draw, font)
-        
-        # Calculate vertical position
-        total_height = len(wrapped_lines) * self.font_size
-        y_start = (self.height - total_height) // 2
-        
-        # Draw each line
-        for i, line in enumerate(wrapped_lines):
-            bbox = draw.textbbox((0, 0), line, font=font)
-            line_width = bbox[2] - bbox[0]
-            x = (self.width - line_width) // 2
-            y = y_start + i * self.font_size
-            
-            # Draw with shadow for better readability
-            shadow_color = (0, 0, 0)
-            draw.text((x + 3, y + 3), line, fill=shadow_color, font=font)
-            draw.text((x, y), line, fill=self.text_color, font=font)
+        """Draw text on image (with shadow for better readability)."""
+        text_rendering.draw_text(
+            image,
+            text,
+            font_size=self.font_size,
+            color=self.text_color,
+            max_chars_per_line=self._max_chars_per_line(),
+            line_spacing=0,
+            shadow=(3, (0, 0, 0)),
+        )
     
     def _load_font(self) -> ImageFont.FreeTypeFont:
-        """Load the best available font."""
-        font_paths = [
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-            "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-            "/System/Library/Fonts/Arial.ttf",  # macOS
-            "C:\\Windows\\Fonts\\arial.ttf",  # Windows
-        ]
-        
-        for font_path in font_paths:
-            try:
-                return ImageFont.truetype(font_path, self.font_size)
-            except Exception:
-                continue
-        
-        # Fallback to default font
-        logger.warning("Could not load TrueType font, using default")
-        return ImageFont.load_default()
+        """Load the best available font (cached per size)."""
+        return text_rendering.get_font(None, self.font_size)
+    
+    def _max_chars_per_line(self) -> int:
+        """Estimate characters per line based on font size."""
+        avg_char_width = self.font_size * 0.6  # Rough estimate
+        max_width = self.width - 80  # 40px padding on each side
+        return max(1, int(max_width / avg_char_width))
     
     def _wrap_text(
         self,
@@ -118,29 +104,7 @@ class SlideRenderer:
         font: ImageFont.FreeTypeFont,
     ) -> list[str]:
         """Wrap text to fit within image width."""
-        # Estimate characters per line based on font size
-        avg_char_width = self.font_size * 0.6  # Rough estimate
-        max_width = self.width - 80  # 40px padding on each side
-        max_chars_per_line = int(max_width / avg_char_width)
-        
-        lines = []
-        words = text.split()
-        current_line = ""
-        
-        for word in words:
-            test_line = current_line + (" " if current_line else "") + word
-            
-            if len(test_line) <= max_chars_per_line:
-                current_line = test_line
-            else:
-                if current_line:
-                    lines.append(current_line)
-                current_line = word
-        
-        if current_line:
-            lines.append(current_line)
-        
-        return lines if lines else [text]
+        return text_rendering.wrap_text(text, self._max_chars_per_line())
     
     def _parse_color(
         self, color: str | tuple[int, int, int]
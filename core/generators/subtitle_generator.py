@@ -0,0 +1,309 @@
+"""core.generators.subtitle_generator
+
+Subtitles from the script text and TTS timings.
+
+- The narrated text of every audio block is split into short phrases, and
+  each phrase gets a share of the block's audio duration proportional to
+  its length (TTS does not return word timestamps).
+- Cues are written as SRT (sidecar for platforms that accept caption files)
+  and as ASS with the `subtitles` config section applied (font, size,
+  color, position).
+- Burn-in (`subtitles.mode: burn`, opt-in) happens inside the video encode
+  with ffmpeg's `subtitles` filter (libass), see
+  `ffmpeg_utils.subtitles_filter`, so captions never go through per-frame
+  compositing in Python. It still forces a video re-encode where the
+  renderer would otherwise stream-copy, so sidecar files are the default.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from PIL import ImageColor
+
+from core.utils.config_loader import ProjectConfig
+
+logger = logging.getLogger(__name__)
+
+SUBTITLE_MODES = ("burn", "sidecar")
+LONG_FORM_BLOCKS = ["love", "money", "health"]
+
+# ASS \an alignment (numpad layout) for `subtitles.position`
+ASS_ALIGNMENT = {"bottom": 2, "center": 5, "top": 8}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_SRT_TIMING = re.compile(
+    r"(\d+):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{3})"
+)
+
+
+@dataclass(frozen=True)
+class Cue:
+    """One subtitle line shown from `start` to `end` seconds."""
+
+    start: float
+    end: float
+    text: str
+
+
+@dataclass(frozen=True)
+class SubtitleSettings:
+    """Parsed `subtitles` config section."""
+
+    mode: str = "sidecar"
+    font: str = "Arial"
+    font_size: int = 48
+    color: str = "white"
+    position: str = "bottom"
+    max_chars: int = 80
+
+
+@dataclass
+class SubtitleFiles:
+    """Subtitle files written for one render."""
+
+    srt: Path
+    ass: Path
+    blocks: dict[str, Path]
+    burn: bool
+
+
+def settings_from_config(config: ProjectConfig) -> SubtitleSettings | None:
+    """SubtitleSettings from `subtitles`, or None unless `subtitles.enabled` is true."""
+    section = config.get("subtitles", {}) if hasattr(config, "get") else {}
+    if not hasattr(section, "get") or section.get("enabled") is not True:
+        return None
+
+    values: dict[str, Any] = {}
+    for key, cast in (("mode", str), ("font", str), ("color", str), ("position", str)):
+        value = section.get(key)
+        if isinstance(value, str) and value:
+            values[key] = cast(value)
+    for key in ("font_size", "max_chars"):
+        value = section.get(key)
+        if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+            values[key] = value
+
+    settings = SubtitleSettings(**values)
+    if settings.mode not in SUBTITLE_MODES:
+        raise ValueError(f"Unknown subtitles.mode: {settings.mode} (expected one of {SUBTITLE_MODES})")
+    if settings.position not in ASS_ALIGNMENT:
+        raise ValueError(f"Unknown subtitles.position: {settings.position} (expected one of {tuple(ASS_ALIGNMENT)})")
+    return settings
+
+
+def _clean_text(text: str) -> str:
+    """Strip markup and collapse whitespace (same text the TTS engine reads)."""
+    text = re.sub(r"<[^>]+>", "", text)
+    text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)
+    text = re.sub(r"\*(.*?)\*", r"\1", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def block_texts(script: dict[str, Any], mode: str) -> dict[str, str]:
+    """Narrated text per audio block, keyed like `audio_map["blocks"]`."""
+    if mode == "long_form":
+        blocks = script.get("blocks", {})
+        return {name: _clean_text(blocks.get(name, "")) for name in LONG_FORM_BLOCKS}
+    if mode == "shorts":
+        text = script.get("script") or script.get("narration_text") or script.get("hook", "")
+    else:
+        text = script.get("narration_text") or script.get("script", "")
+    return {"main": _clean_text(text)}
+
+
+def split_phrases(text: str, max_chars: int) -> list[str]:
+    """Sentences, with sentences longer than `max_chars` split between words."""
+    phrases: list[str] = []
+    for sentence in _SENTENCE_END.split(text):
+        current = ""
+        for word in sentence.split():
+            candidate = f"{current} {word}" if current else word
+            if len(candidate) <= max_chars or not current:
+                current = candidate
+            else:
+                phrases.append(current)
+                current = word
+        if current:
+            phrases.append(current)
+    return phrases
+
+
+def timed_cues(text: str, duration: float, max_chars: int, offset: float = 0.0) -> list[Cue]:
+    """Spread the phrases of `text` over `duration` seconds by character count."""
+    phrases = split_phrases(text, max_chars)
+    if not phrases or duration <= 0:
+        return []
+
+    total_chars = sum(len(phrase) for phrase in phrases)
+    cues = []
+    elapsed = 0
+    for phrase in phrases:
+        start = offset + duration * elapsed / total_chars
+        elapsed += len(phrase)
+        cues.append(Cue(round(start, 3), round(offset + duration * elapsed / total_chars, 3), phrase))
+    return cues
+
+
+def build_cues(
+    script: dict[str, Any],
+    mode: str,
+    block_durations: dict[str, float],
+    max_chars: int = SubtitleSettings.max_chars,
+) -> dict[str, list[Cue]]:
+    """Cues per audio block, timed relative to the start of each block."""
+    texts = block_texts(script, mode)
+    return {
+        name: timed_cues(texts.get(name, ""), duration, max_chars)
+        for name, duration in block_durations.items()
+    }
+
+
+def timeline_cues(
+    block_cues: dict[str, list[Cue]],
+    block_durations: dict[str, float],
+    lead_in: float = 0.0,
+) -> list[Cue]:
+    """All cues on the final video timeline (blocks back to back after `lead_in`)."""
+    cues = []
+    offset = lead_in
+    for name, duration in block_durations.items():
+        cues += [Cue(round(c.start + offset, 3), round(c.end + offset, 3), c.text) for c in block_cues.get(name, [])]
+        offset += duration
+    return cues
+
+
+def _srt_time(seconds: float) -> str:
+    ms = int(round(seconds * 1000))
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{ms:03d}"
+
+
+def _ass_time(seconds: float) -> str:
+    cs = int(round(seconds * 100))
+    hours, cs = divmod(cs, 360_000)
+    minutes, cs = divmod(cs, 6000)
+    secs, cs = divmod(cs, 100)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}.{cs:02d}"
+
+
+def _ass_color(color: str) -> str:
+    """CSS color name or #hex as ASS &HAABBGGRR."""
+    try:
+        r, g, b = ImageColor.getrgb(color)[:3]
+    except ValueError:
+        logger.warning(f"Unknown subtitle color '{color}', using white")
+        r, g, b = 255, 255, 255
+    return f"&H00{b:02X}{g:02X}{r:02X}"
+
+
+def to_srt(cues: list[Cue]) -> str:
+    """SubRip document."""
+    entries = [
+        f"{i}\n{_srt_time(cue.start)} --> {_srt_time(cue.end)}\n{cue.text}\n"
+        for i, cue in enumerate(cues, start=1)
+    ]
+    return "\n".join(entries)
+
+
+def parse_srt(text: str) -> list[Cue]:
+    """Cues of a SubRip document (entries without a timing line are skipped)."""
+    cues = []
+    text = text.lstrip("\ufeff").replace("\r\n", "\n").strip()
+    for entry in re.split(r"\n\s*\n", text):
+        lines = entry.split("\n")
+        for i, line in enumerate(lines):
+            match = _SRT_TIMING.match(line.strip())
+            if match is None:
+                continue
+            h1, m1, s1, ms1, h2, m2, s2, ms2 = (int(v) for v in match.groups())
+            body = "\n".join(part.strip() for part in lines[i + 1:]).strip()
+            if body:
+                cues.append(Cue(
+                    h1 * 3600 + m1 * 60 + s1 + ms1 / 1000,
+                    h2 * 3600 + m2 * 60 + s2 + ms2 / 1000,
+                    body,
+                ))
+            break
+    return cues
+
+
+def to_ass(cues: list[Cue], settings: SubtitleSettings, width: int, height: int) -> str:
+    """
+    Advanced SubStation document with one style built from `settings`.
+
+    PlayRes is the full-resolution frame size, so `font_size` is in pixels
+    at full resolution and libass scales it for previews.
+    """
+    margin_v = round(height * 0.08)
+    margin_h = round(width * 0.05)
+    header = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{settings.font},{settings.font_size},{_ass_color(settings.color)},&H000000FF,"
+        f"&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,{max(1, settings.font_size // 16)},0,"
+        f"{ASS_ALIGNMENT[settings.position]},{margin_h},{margin_h},{margin_v},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    events = []
+    for cue in cues:
+        text = cue.text.replace("\\", "\\\\").replace("{", "\\{").replace("}", "\\}").replace("\n", "\\N")
+        events.append(f"Dialogue: 0,{_ass_time(cue.start)},{_ass_time(cue.end)},Default,,0,0,0,,{text}")
+    return "\n".join(header + events) + "\n"
+
+
+def write_subtitles(
+    script: dict[str, Any],
+    mode: str,
+    block_durations: dict[str, float],
+    output_path: Path,
+    settings: SubtitleSettings,
+    width: int,
+    height: int,
+    lead_in: float = 0.0,
+) -> SubtitleFiles:
+    """
+    Write `<output>.srt` and `<output>.ass` for the whole video.
+
+    For long-form renders, which are assembled from per-block segments,
+    block-relative ASS files are also written to `.<stem>_subtitles/`
+    so each segment can burn in its own captions.
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    block_cues = build_cues(script, mode, block_durations, settings.max_chars)
+    cues = timeline_cues(block_cues, block_durations, lead_in)
+
+    srt_path = output_path.with_suffix(".srt")
+    ass_path = output_path.with_suffix(".ass")
+    srt_path.write_text(to_srt(cues), encoding="utf-8")
+    ass_path.write_text(to_ass(cues, settings, width, height), encoding="utf-8")
+
+    blocks: dict[str, Path] = {}
+    if mode == "long_form":
+        blocks_dir = output_path.parent / f".{output_path.stem}_subtitles"
+        blocks_dir.mkdir(parents=True, exist_ok=True)
+        for name, cues_in_block in block_cues.items():
+            blocks[name] = blocks_dir / f"{name}.ass"
+            blocks[name].write_text(to_ass(cues_in_block, settings, width, height), encoding="utf-8")
+    else:
+        blocks = {name: ass_path for name in block_cues}
+
+    logger.info(f"💬 Subtitles: {len(cues)} cues ({settings.mode}) → {srt_path}")
+    return SubtitleFiles(srt=srt_path, ass=ass_path, blocks=blocks, burn=settings.mode == "burn")
@@ -3,21 +3,39 @@ from __future__ import annotations
 import asyncio
 import re
 import io
+import os
+import shutil
+import tempfile
 from pathlib import Path
 from typing import Any
 import logging
 import wave
 import struct
+from dataclasses import dataclass, field, replace
 
 from google import genai
 from pydub import AudioSegment
+from core.utils import audio_mixer, genai_pool, profiling, rate_limiter
 from core.utils.config_loader import ProjectConfig
+from core.utils.disk_cache import DiskCache, make_key
 
 logger = logging.getLogger(__name__)
 
 # ============ CONSTANTS ============
 OUTPUT_SAMPLE_RATE = 22050
 OUTPUT_CHANNELS = 1
+TTS_MODEL = "gemini-2.5-flash"
+TTS_CACHE_MAX_MB = 512
+LONG_FORM_BLOCKS = ["love", "money", "health"]
+# TTS requests in flight at the same time (audio.tts_concurrency)
+DEFAULT_TTS_CONCURRENCY = 3
+# Longer texts are split at sentence boundaries (audio.tts_chunk_chars),
+# same limit as web_version/scripts/marathon_worker.js
+DEFAULT_TTS_CHUNK_CHARS = 600
+WAV_COPY_FRAMES = 1 << 16
+
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+_CLAUSE_END = re.compile(r'(?<=[,;:])\s+')
 
 # ============ HELPER FUNCTIONS ============
 
@@ -97,6 +115,79 @@ def _create_silent_wav(output_path: Path, duration_sec: float) -> float:
         raise
 
 
+def _split_text_chunks(text: str, max_chars: int) -> list[str]:
+    """
+    Split text into chunks of at most `max_chars`, at sentence boundaries.
+    
+    Sentences are packed greedily; a sentence longer than the limit is
+    split at clause punctuation, then at spaces.
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
+    
+    pieces = []
+    for sentence in _SENTENCE_END.split(text):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        for clause in _CLAUSE_END.split(sentence):
+            while len(clause) > max_chars:
+                cut = clause.rfind(" ", 0, max_chars + 1)
+                if cut <= 0:
+                    cut = max_chars
+                pieces.append(clause[:cut].strip())
+                clause = clause[cut:].strip()
+            if clause:
+                pieces.append(clause)
+    
+    chunks: list[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _stitch_wavs(chunk_paths: list[Path], output_path: Path) -> list[tuple[float, float]]:
+    """
+    Concatenate WAV chunks into one WAV by copying raw PCM frames.
+    
+    Nothing is decoded or re-encoded; all chunks must share sample rate,
+    channels and sample width (ValueError otherwise).
+    Returns (start_sec, duration_sec) of every chunk in the output.
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    offsets = []
+    written = 0
+    params = None
+    with wave.open(str(output_path), "wb") as out:
+        for chunk_path in chunk_paths:
+            with wave.open(str(chunk_path), "rb") as chunk:
+                chunk_params = (chunk.getnchannels(), chunk.getsampwidth(), chunk.getframerate())
+                if params is None:
+                    params = chunk_params
+                    out.setnchannels(params[0])
+                    out.setsampwidth(params[1])
+                    out.setframerate(params[2])
+                elif chunk_params != params:
+                    raise ValueError(f"WAV format mismatch in {chunk_path}: {chunk_params} != {params}")
+                frames = chunk.getnframes()
+                while True:
+                    data = chunk.readframes(WAV_COPY_FRAMES)
+                    if not data:
+                        break
+                    out.writeframes(data)
+            offsets.append((written / params[2], frames / params[2]))
+            written += frames
+    return offsets
+
+
 async def _synthesize_gemini_tts_async(
     api_key: str,
     text: str,
@@ -110,8 +201,8 @@ async def _synthesize_gemini_tts_async(
     Uses google-genai SDK with proper TTS configuration.
     """
     try:
-        # Create client with API key
-        client = genai.Client(api_key=api_key)
+        # Shared client per API key: keep-alive connections are reused across blocks and chunks
+        client = genai_pool.get_client_pool().client(api_key)
         
         # Create output directory
         output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -121,28 +212,39 @@ async def _synthesize_gemini_tts_async(
         # Call Gemini 2.5 Flash with text-to-speech
         # Using audio output from content generation
         max_retries = 3
+        limiter = rate_limiter.get_rate_limiter()
         for attempt in range(max_retries):
             try:
+                # Общий с другими процессами лимит на ключ и модель: ждём слот до запроса
+                await limiter.acquire_async(api_key, TTS_MODEL)
+                
                 # Try with audio modality (if supported)
-                response = client.models.generate_content(
-                    model="gemini-2.5-flash",
+                # Синхронный вызов SDK уходит в поток, чтобы не блокировать event loop
+                response = await asyncio.to_thread(
+                    client.models.generate_content,
+                    model=TTS_MODEL,
                     contents=text  # Can pass text directly
                 )
                 
                 # Check if response has audio attribute
                 if hasattr(response, 'audio') and response.audio:
                     audio_data = response.audio
-                    duration = _convert_mp3_to_wav(audio_data, output_path)
+                    duration = await asyncio.to_thread(_convert_mp3_to_wav, audio_data, output_path)
                     logger.info(f"✅ Gemini TTS synthesized: {len(text)} chars -> {output_path}")
                     return duration
             except Exception as e:
                 # Check for quota error (429)
-                error_msg = str(e).lower()
-                if "429" in error_msg or "quota" in error_msg or "resource_exhausted" in error_msg:
+                if rate_limiter.is_rate_limit_error(e):
                     if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 20  # 20s, 40s (increased wait time)
-                        logger.warning(f"⏳ Quota exceeded (429). Retrying in {wait_time}s... (Attempt {attempt+1}/{max_retries})")
-                        await asyncio.sleep(wait_time)
+                        # Retry-After от сервера; без подсказки прежние 20s, 40s
+                        retry_after = rate_limiter.retry_after_from_error(e)
+                        # Ожидание берёт на себя acquire следующей попытки, и его видят все процессы
+                        wait_time = await asyncio.to_thread(
+                            limiter.penalize, api_key, TTS_MODEL, retry_after, (attempt + 1) * 20
+                        )
+                        logger.warning(f"⏳ Quota exceeded (429). Retrying in {wait_time:.0f}s... (Attempt {attempt+1}/{max_retries})")
+                        if not limiter.active:
+                            await asyncio.sleep(wait_time)
                         continue
                 
                 logger.warning(f"⚠️ Audio generation attempt {attempt+1} failed: {e}")
@@ -175,7 +277,8 @@ async def _synthesize_gemini_tts_async(
 async def _synthesize_shorts_async(
     config: ProjectConfig,
     script: dict[str, Any],
-    api_key: str
+    api_key: str,
+    report: _SynthesisReport | None = None,
 ) -> tuple[str, float]:
     """
     Synthesize shorts script using Gemini TTS.
@@ -197,18 +300,231 @@ async def _synthesize_shorts_async(
     project_slug = str(config.project.get("name", "project")).replace(" ", "_")
     output_path = Path("output") / "audio" / project_slug / "shorts_main.wav"
     
-    duration = await _synthesize_gemini_tts_async(api_key, text, output_path, speed)
+    semaphore = asyncio.Semaphore(_tts_concurrency(config))
+    duration = await _synthesize_block(config, api_key, "main", text, output_path, speed, semaphore, report)
     return str(output_path), duration
 
 
+# ============ TTS AUDIO CACHE ============
+
+_tts_cache: DiskCache | None = None
+
+
+def get_tts_cache(config: ProjectConfig) -> DiskCache:
+    """
+    Process-wide cache of synthesized narration, configured from `caching`.
+    
+    Lives in `<caching.dir>/tts`; entries expire after `caching.ttl_days`
+    and LRU entries are evicted over `caching.tts_max_mb`. Disabled with
+    `caching.enabled: false` or `caching.tts_cache: false`.
+    """
+    global _tts_cache
+    if _tts_cache is None:
+        _tts_cache = _build_tts_cache(config)
+    return _tts_cache
+
+
+def _build_tts_cache(config: ProjectConfig) -> DiskCache:
+    caching = config.get("caching", {}) if hasattr(config, "get") else {}
+    caching = caching if hasattr(caching, "get") else {}
+    cache_dir = caching.get("dir", "cache")
+    ttl_days = caching.get("ttl_days", 7)
+    max_mb = caching.get("tts_max_mb", TTS_CACHE_MAX_MB)
+    return DiskCache(
+        Path(cache_dir if isinstance(cache_dir, (str, os.PathLike)) else "cache") / "tts",
+        ttl_days=ttl_days if isinstance(ttl_days, (int, float)) else 7,
+        max_bytes=int(max_mb * 1024 * 1024) if isinstance(max_mb, (int, float)) else None,
+        enabled=caching.get("enabled", True) is not False and caching.get("tts_cache", True) is not False,
+    )
+
+
+def reset_tts_cache(config: ProjectConfig | None = None) -> DiskCache | None:
+    """
+    Drop the process-wide TTS cache (config changes, tests).
+    
+    With `config` a fresh cache is built for the new run right away, like
+    `rate_limiter.reset_rate_limiter`.
+    """
+    global _tts_cache
+    _tts_cache = _build_tts_cache(config) if config is not None else None
+    return _tts_cache
+
+
+def get_tts_stats() -> dict[str, Any]:
+    """TTS statistics for run metadata."""
+    return {
+        "cache": _tts_cache.get_stats() if _tts_cache is not None else None,
+        "client_pool": genai_pool.get_pool_stats(),
+        "rate_limits": rate_limiter.get_rate_limit_stats(),
+    }
+
+
+def _tts_voice(config: ProjectConfig) -> str:
+    """Voice from `audio.tts_voice` ("default" when not set)."""
+    voice = config.audio.get("tts_voice")
+    return voice if isinstance(voice, str) and voice else "default"
+
+
+def _tts_cache_key(text: str, engine: str, voice: str, speed: float) -> str:
+    """Cache key of one narration: sanitized text, engine, voice, speed and output format."""
+    return make_key("tts", text, engine, voice, float(speed), OUTPUT_SAMPLE_RATE, OUTPUT_CHANNELS)
+
+
+def _is_silent(path: Path) -> bool:
+    """True for all-zero WAVs (the placeholders written when TTS fails)."""
+    try:
+        return not audio_mixer.read_wav(path).samples.any()
+    except (OSError, ValueError):
+        return True
+
+
+async def _synthesize_cached(
+    config: ProjectConfig,
+    api_key: str,
+    text: str,
+    output_path: Path,
+    speed: float = 1.0,
+) -> tuple[float, bool]:
+    """
+    `_synthesize_gemini_tts_async` behind the TTS cache.
+    
+    A hit copies the cached WAV to `output_path` and returns its stored
+    duration without calling the API. Silent placeholders are never cached.
+    Returns (duration_sec, cache_hit).
+    """
+    cache = get_tts_cache(config)
+    key = _tts_cache_key(text, TTS_MODEL, _tts_voice(config), speed)
+    
+    # Файловые операции уходят в поток, чтобы не блокировать остальные блоки
+    duration = await asyncio.to_thread(_copy_from_tts_cache, cache, key, output_path)
+    if duration is not None:
+        logger.info(f"♻️ TTS cache hit: {len(text)} chars -> {output_path}")
+        return duration, True
+    
+    duration = await _synthesize_gemini_tts_async(api_key, text, output_path, speed)
+    
+    if cache.enabled and output_path.exists() and not await asyncio.to_thread(_is_silent, output_path):
+        meta = {"duration_sec": duration, "chars": len(text), "voice": _tts_voice(config)}
+        await asyncio.to_thread(_store_in_tts_cache, cache, key, output_path, meta)
+    return duration, False
+
+
+def _copy_from_tts_cache(cache: DiskCache, key: str, output_path: Path) -> float | None:
+    """Copy a cached narration to `output_path`; its duration, or None on a miss."""
+    cached = cache.get(key)
+    duration = cache.get_meta(key).get("duration_sec") if cached is not None else None
+    if not isinstance(duration, (int, float)):
+        return None
+    try:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(cached, output_path)
+    except OSError as e:
+        # Запись могла быть вытеснена другим процессом между get и копированием
+        logger.debug(f"TTS cache entry vanished: {e}")
+        return None
+    return float(duration)
+
+
+def _store_in_tts_cache(cache: DiskCache, key: str, output_path: Path, meta: dict[str, Any]) -> None:
+    """Store a copy of a fresh narration (the original stays at `output_path`)."""
+    try:
+        fd, staged = tempfile.mkstemp(dir=output_path.parent, prefix=".tts_", suffix=".wav")
+        os.close(fd)
+        shutil.copyfile(output_path, staged)
+        cache.put(key, staged, ".wav", meta)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not cache TTS audio: {e}")
+
+
+@dataclass
+class _SynthesisReport:
+    """Per-run details collected while synthesizing blocks."""
+    
+    cache_hits: list[str] = field(default_factory=list)
+    chunks: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+
+
+def _tts_chunk_chars(config: ProjectConfig) -> int:
+    """Chunk size from `audio.tts_chunk_chars` (default 600, at least 100)."""
+    value = config.audio.get("tts_chunk_chars", DEFAULT_TTS_CHUNK_CHARS)
+    if isinstance(value, bool) or not isinstance(value, int):
+        return DEFAULT_TTS_CHUNK_CHARS
+    return max(100, value)
+
+
+async def _synthesize_block(
+    config: ProjectConfig,
+    api_key: str,
+    block_name: str,
+    text: str,
+    output_path: Path,
+    speed: float,
+    semaphore: asyncio.Semaphore,
+    report: _SynthesisReport | None = None,
+) -> float:
+    """
+    Synthesize one narration block, in sentence chunks when it is long.
+    
+    Chunks are synthesized concurrently (each one through the TTS cache,
+    at most `semaphore` requests at a time) and their PCM frames are
+    stitched into `output_path`. Chunk offsets go into `report.chunks`;
+    the block is a cache hit when every chunk was.
+    Returns duration in seconds.
+    """
+    chunks = _split_text_chunks(text, _tts_chunk_chars(config)) or [text]
+    
+    async def synthesize_chunk(chunk_text: str, chunk_path: Path) -> tuple[float, bool]:
+        async with semaphore:
+            return await _synthesize_cached(config, api_key, chunk_text, chunk_path, speed)
+    
+    if len(chunks) == 1:
+        duration, hit = await synthesize_chunk(chunks[0], output_path)
+        offsets = [(0.0, duration)]
+    else:
+        logger.info(f"✂️ Splitting {block_name} into {len(chunks)} chunks ({len(text)} chars)")
+        chunk_paths = [output_path.with_name(f"{output_path.stem}.chunk{i:03d}.wav") for i in range(len(chunks))]
+        try:
+            results = await asyncio.gather(
+                *(synthesize_chunk(chunk, path) for chunk, path in zip(chunks, chunk_paths))
+            )
+            offsets = await asyncio.to_thread(_stitch_wavs, chunk_paths, output_path)
+        finally:
+            for path in chunk_paths:
+                path.unlink(missing_ok=True)
+        duration = offsets[-1][0] + offsets[-1][1]
+        hit = all(chunk_hit for _, chunk_hit in results)
+    
+    if report is not None:
+        if hit:
+            report.cache_hits.append(block_name)
+        report.chunks[block_name] = [
+            {"index": i, "start_sec": round(start, 3), "duration_sec": round(length, 3), "chars": len(chunk)}
+            for i, (chunk, (start, length)) in enumerate(zip(chunks, offsets))
+        ]
+    return duration
+
+
+def _tts_concurrency(config: ProjectConfig) -> int:
+    """Parallel TTS requests from `audio.tts_concurrency` (default 3, at least 1)."""
+    value = config.audio.get("tts_concurrency", DEFAULT_TTS_CONCURRENCY)
+    if isinstance(value, bool) or not isinstance(value, int):
+        return DEFAULT_TTS_CONCURRENCY
+    return max(1, value)
+
+
 async def _synthesize_long_form_async(
     config: ProjectConfig,
     script: dict[str, Any],
-    api_key: str
+    api_key: str,
+    report: _SynthesisReport | None = None,
 ) -> tuple[dict[str, str], float]:
     """
     Synthesize long-form script (3 blocks: love, money, health).
     Returns (blocks_dict, total_duration_sec)
+    
+    Blocks (and their chunks) are synthesized concurrently, at most
+    `audio.tts_concurrency` requests at a time; the result keeps the love,
+    money, health order.
     """
     if not api_key:
         raise ValueError("GOOGLE_AI_API_KEY required for Gemini TTS")
@@ -217,27 +533,32 @@ async def _synthesize_long_form_async(
     
     project_slug = str(config.project.get("name", "project")).replace(" ", "_")
     blocks = script.get("blocks", {})
+    semaphore = asyncio.Semaphore(_tts_concurrency(config))
     
-    output_paths = {}
-    total_duration = 0.0
-    
-    for block_name in ["love", "money", "health"]:
+    async def synthesize_block(block_name: str) -> tuple[str, float]:
         text = blocks.get(block_name, f"Раздел {block_name}")
         text = _sanitize_text_for_tts(text)
         
         output_path = Path("output") / "audio" / project_slug / f"long_form_{block_name}.wav"
-        duration = await _synthesize_gemini_tts_async(api_key, text, output_path, speed)
-        
-        output_paths[block_name] = str(output_path)
-        total_duration += duration
+        # Семафор ограничивает запросы к TTS (чанки), а не блоки целиком
+        duration = await _synthesize_block(config, api_key, block_name, text, output_path, speed, semaphore, report)
+        return str(output_path), duration
+    
+    # gather возвращает результаты в порядке блоков, а не завершения
+    results = await asyncio.gather(*(synthesize_block(name) for name in LONG_FORM_BLOCKS))
+    if report is not None:
+        report.cache_hits.sort(key=LONG_FORM_BLOCKS.index)
     
+    output_paths = {name: path for name, (path, _) in zip(LONG_FORM_BLOCKS, results)}
+    total_duration = sum(duration for _, duration in results)
     return output_paths, total_duration
 
 
 async def _synthesize_ad_async(
     config: ProjectConfig,
     script: dict[str, Any],
-    api_key: str
+    api_key: str,
+    report: _SynthesisReport | None = None,
 ) -> tuple[str, float]:
     """
     Synthesize ad script using Gemini TTS.
@@ -257,10 +578,78 @@ async def _synthesize_ad_async(
     project_slug = str(config.project.get("name", "project")).replace(" ", "_")
     output_path = Path("output") / "audio" / project_slug / "ad_main.wav"
     
-    duration = await _synthesize_gemini_tts_async(api_key, text, output_path, speed)
+    semaphore = asyncio.Semaphore(_tts_concurrency(config))
+    duration = await _synthesize_block(config, api_key, "main", text, output_path, speed, semaphore, report)
     return str(output_path), duration
 
 
+def _mix_background_audio(
+    config: ProjectConfig,
+    blocks: dict[str, str],
+) -> tuple[dict[str, str], str | None, dict[str, list[dict[str, Any]]]]:
+    """
+    Mix background music and sound effects under the narration blocks.
+    
+    Settings: `audio.background_music_enabled` + `audio.background_music`
+    (path, levels, ducking, fades) and `audio.sound_effects.items`
+    ({path, at_sec, gain_db, block}; block defaults to the first one).
+    Blocks are mixed in order with one continuous music loop; the fade-in
+    is applied to the first block and the fade-out to the last.
+    
+    Returns (blocks with mixed paths, music path or None, effects per block).
+    """
+    music_path = None
+    if config.audio.get("background_music_enabled", False):
+        path = config.audio.get("background_music", {}).get("path")
+        if path and Path(path).is_file():
+            music_path = str(path)
+        else:
+            logger.warning(f"⚠️ Background music enabled but file not found: {path}")
+    
+    effects: dict[str, list[audio_mixer.SoundEffect]] = {}
+    sfx_cfg = config.audio.get("sound_effects", {})
+    if sfx_cfg.get("enabled", False):
+        for item in sfx_cfg.get("items") or []:
+            if not item.get("path"):
+                continue
+            path = Path(str(item.get("path")))
+            if not path.is_file():
+                logger.warning(f"⚠️ Sound effect not found: {path}")
+                continue
+            block = str(item.get("block") or next(iter(blocks)))
+            effects.setdefault(block, []).append(
+                audio_mixer.SoundEffect(path, float(item.get("at_sec", 0.0)), float(item.get("gain_db", 0.0)))
+            )
+    
+    if music_path is None and not effects:
+        return blocks, None, {}
+    
+    settings = audio_mixer.settings_from_config(config)
+    mixed = {}
+    music_offset = 0.0
+    with profiling.stage("audio_mix"):
+        for i, (name, path) in enumerate(blocks.items()):
+            voice_path = Path(path)
+            output_path = voice_path.with_name(f"{voice_path.stem}_mix.wav")
+            music_offset += audio_mixer.mix_to_wav(
+                voice_path,
+                output_path,
+                music_path,
+                replace(settings, effects=effects.get(name, [])),
+                music_offset_sec=music_offset,
+                fade_in=i == 0,
+                fade_out=i == len(blocks) - 1,
+            )
+            mixed[name] = str(output_path)
+    
+    applied = {
+        name: [{"path": str(e.path), "at_sec": e.at_sec, "gain_db": e.gain_db} for e in block_effects]
+        for name, block_effects in effects.items()
+        if name in blocks
+    }
+    return mixed, music_path, applied
+
+
 # ============ MAIN FUNCTION (SYNC WRAPPER) ============
 
 def synthesize(config: ProjectConfig, script: Any, mode: str, api_key: str = None) -> dict[str, Any]:
@@ -274,34 +663,48 @@ def synthesize(config: ProjectConfig, script: Any, mode: str, api_key: str = Non
         api_key: Google AI API key (required)
     
     Returns:
-        Dict with audio paths and metadata
+        Dict with audio paths and metadata; `cache_hits` lists the blocks
+        served from the TTS cache (see `get_tts_cache`), `chunks` has the
+        start/duration of every TTS chunk per block (for captions)
     """
     
     if not api_key:
         raise ValueError("GOOGLE_AI_API_KEY not provided. Set GOOGLE_AI_API_KEY environment variable.")
     
+    report = _SynthesisReport()
     try:
+        # Клиент создается один раз до параллельных запросов блоков и чанков
+        try:
+            genai_pool.get_client_pool().warm_up(api_key)
+        except Exception as e:
+            logger.warning(f"⚠️ TTS client warm-up failed: {e}")
+        
         # Run async synthesis
         if mode == "shorts":
-            audio_path, duration = asyncio.run(_synthesize_shorts_async(config, script, api_key))
+            audio_path, duration = asyncio.run(_synthesize_shorts_async(config, script, api_key, report))
             blocks = {"main": audio_path}
             total_duration = duration
         
         elif mode == "long_form":
-            blocks, total_duration = asyncio.run(_synthesize_long_form_async(config, script, api_key))
+            blocks, total_duration = asyncio.run(_synthesize_long_form_async(config, script, api_key, report))
         
         elif mode == "ad":
-            audio_path, duration = asyncio.run(_synthesize_ad_async(config, script, api_key))
+            audio_path, duration = asyncio.run(_synthesize_ad_async(config, script, api_key, report))
             blocks = {"main": audio_path}
             total_duration = duration
         
         else:
             raise ValueError(f"Unknown mode: {mode}")
         
+        mixed_blocks, music_path, sound_effects = _mix_background_audio(config, blocks)
+        
         return {
-            "blocks": blocks,
-            "background_music_path": None,  # Future: background music
-            "sound_effects": {},  # Future: sound effects
+            "blocks": mixed_blocks,
+            "narration_blocks": blocks,
+            "background_music_path": music_path,
+            "sound_effects": sound_effects,
+            "cache_hits": report.cache_hits,
+            "chunks": report.chunks,
             "engine_used": "gemini-2.5-flash-tts",
             "total_duration_sec": total_duration,
             "sample_rate": OUTPUT_SAMPLE_RATE,
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import os
+import shutil
+import uuid
+import wave
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 import random
 
 import requests
-import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 
 # Monkey patch for MoviePy compatibility with Pillow 10+
 if not hasattr(Image, 'ANTIALIAS'):
@@ -18,12 +23,17 @@ if not hasattr(Image, 'ANTIALIAS'):
 from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
 from moviepy.editor import (
     CompositeVideoClip, CompositeAudioClip,
-    TextClip, ImageClip, AudioFileClip,
+    AudioFileClip,
     VideoFileClip, VideoClip,
-    concatenate_videoclips, vfx
+    concatenate_videoclips
 )
 
+from core.generators import subtitle_generator
 from core.utils.config_loader import ProjectConfig
+from core.utils import backgrounds, downloader, ffmpeg_utils, profiling, text_rendering, video_encoder
+from core.utils.clip_scope import ClipScope
+from core.utils.disk_cache import DiskCache, make_key
+from core.utils.stock_catalog import StockCatalog, US_PER_SEC
 
 logger = logging.getLogger(__name__)
 
@@ -56,6 +66,53 @@ VIDEO_CONFIG = {
     },
 }
 
+# Publishing formats for multi-output renders (see render_formats)
+OUTPUT_FORMATS = {
+    "9:16": {"width": 1080, "height": 1920, "bitrate": "5000k"},
+    "16:9": {"width": 1920, "height": 1080, "bitrate": "8000k"},
+    "1:1": {"width": 1080, "height": 1080, "bitrate": "5000k"},
+}
+
+# Draft renders for QA: same timeline at half width and height (quarter of
+# the pixels), reduced fps and the fastest x264 preset
+PREVIEW_SCALE = 0.5
+PREVIEW_FPS = 15
+PREVIEW_PRESET = "ultrafast"
+
+BACKGROUND_COLORS = {
+    "mystical": (20, 10, 40),     # Deep purple
+    "intro": (30, 15, 50),        # Darker purple
+    "outro": (40, 20, 60),        # Medium purple
+    "love": (150, 30, 60),        # Red
+    "money": (50, 150, 50),       # Green
+    "health": (100, 150, 255),    # Blue
+    "ad": (40, 40, 60),           # Dark
+}
+
+# Preferred Pixabay renditions, best first
+PIXABAY_RENDITIONS = ["medium", "large", "small", "tiny"]
+
+STOCK_CACHE_MAX_MB = 2048
+
+# Pre-encoded bumpers and still units (see get_segment_library)
+SEGMENT_LIBRARY_MAX_MB = 512
+
+# Parallel byte ranges per large stock download
+STOCK_DOWNLOAD_PARALLEL = 4
+
+# Long-form bumpers around the narrated blocks
+LONG_FORM_INTRO_SEC = 3.0
+LONG_FORM_OUTRO_SEC = 2.0
+
+# Part of every segment hash: bump when segment rendering changes output
+RENDERER_VERSION = "1"
+
+# Stock clips shorter than the video by up to this much are looped
+STOCK_MIN_DURATION_SLACK_SEC = 5
+
+# Narration speed used to estimate video length before TTS has run
+NARRATION_CHARS_PER_SEC = 14.0
+
 KEYWORDS = {
     "shorts": ["horoscope", "astrology", "zodiac", "stars", "mystical"],
     "long_form": ["zodiac", "astrology", "universe", "stars", "cosmos"],
@@ -64,10 +121,12 @@ KEYWORDS = {
 
 # ============ HELPER FUNCTIONS ============
 
-def _get_pixabay_video(api_key: str, query: str, duration_sec: float) -> str | None:
+def _search_pixabay_video(api_key: str, query: str, duration_sec: float) -> dict[str, Any] | None:
     """
-    Get video from Pixabay API.
-    Returns download URL or None.
+    Search Pixabay for a stock video.
+    
+    Returns {"hit_id", "rendition", "url", "tags", "duration", "width", "height"}
+    for the first hit, or None.
     """
     try:
         params = {
@@ -75,83 +134,57 @@ def _get_pixabay_video(api_key: str, query: str, duration_sec: float) -> str | N
             "q": query,
             "per_page": 3,
             "order": "popular",
-            "min_duration": int(duration_sec) - 5,
+            "min_duration": int(duration_sec) - STOCK_MIN_DURATION_SLACK_SEC,
         }
         
         response = requests.get(PIXABAY_VIDEOS_API, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
         
-        if data["hits"]:
-            video = data["hits"]
-            # Выбрать качество 360p или выше
-            # video is a list of hits. Each hit has "videos" dict with sizes.
-            # But here `video` is assigned `data["hits"]` which is a list.
-            # The loop `for fmt in ...` expects a dict structure if `video` was a single hit.
-            # We should iterate over hits.
-            
-            # Fix: Take the first hit
-            first_hit = video[0]
-            videos_dict = first_hit.get("videos", {})
-            
-            for fmt in ["large", "medium", "small", "tiny"]: # Pixabay keys are usually these
-                 # But the ticket code had ["360", "720", "1080"]. Pixabay API usually has "large", "medium", "small", "tiny".
-                 # Actually Pixabay API response structure:
-                 # "videos": { "large": { "url": ... }, "medium": { ... }, ... }
-                 # Or sometimes specific resolutions.
-                 # Let's check what the ticket code assumed.
-                 pass
-
-            # Ticket code:
-            # for fmt in ["360", "720", "1080"]:
-            #    if fmt in video:
-            #        return video[fmt]["url"]
-            # return list(video.values())["url"]
-            
-            # This implies `video` is a dictionary of formats. But `data["hits"]` is a list.
-            # So the ticket code is slightly buggy or I am misunderstanding.
-            # Assuming `video = data["hits"][0]` was intended?
-            # Or `data["hits"]` is a dict? No, usually a list.
-            
-            # Let's fix this logic to be robust.
-            hit = data["hits"][0]
-            if "videos" in hit:
-                # Pixabay API `videos` structure: {"large": ..., "medium": ..., "small": ..., "tiny": ...}
-                # We want the best quality that is not too huge. "medium" is usually 720p/1080p.
-                
-                vids = hit["videos"]
-                if "medium" in vids:
-                    return vids["medium"]["url"]
-                if "large" in vids:
-                    return vids["large"]["url"]
-                if "small" in vids:
-                    return vids["small"]["url"]
-                
-                # Fallback to any
-                return list(vids.values())[0]["url"]
-            
-            return hit.get("pageURL") # Unlikely to be a direct video file
-            
-        logger.warning(f"No Pixabay video found for: {query}")
-        return None
+        if not data["hits"]:
+            logger.warning(f"No Pixabay video found for: {query}")
+            return None
+        
+        hit = data["hits"][0]
+        videos = hit.get("videos") or {}
+        if not videos:
+            # Unlikely to be a direct video file
+            return {"hit_id": hit.get("id"), "rendition": "page", "url": hit.get("pageURL")}
+        
+        # "medium" is usually 720p/1080p: best quality that is not too huge
+        rendition = next(
+            (name for name in PIXABAY_RENDITIONS if name in videos),
+            next(iter(videos)),
+        )
+        video = videos[rendition]
+        return {
+            "hit_id": hit.get("id"),
+            "rendition": rendition,
+            "url": video["url"],
+            "tags": hit.get("tags", ""),
+            "duration": hit.get("duration"),
+            "width": video.get("width"),
+            "height": video.get("height"),
+        }
     
     except Exception as e:
         logger.error(f"Pixabay API error: {e}")
         return None
 
 
+def _get_pixabay_video(api_key: str, query: str, duration_sec: float) -> str | None:
+    """
+    Get video from Pixabay API.
+    Returns download URL or None.
+    """
+    hit = _search_pixabay_video(api_key, query, duration_sec)
+    return hit["url"] if hit else None
+
+
 def _download_video(url: str, output_path: Path) -> bool:
-    """Download video file."""
+    """Download video file (pooled session, resumable, parallel ranges)."""
     try:
-        response = requests.get(url, stream=True, timeout=30)
-        response.raise_for_status()
-        
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-        
+        downloader.download(url, output_path, parallel=STOCK_DOWNLOAD_PARALLEL)
         logger.info(f"✅ Downloaded: {output_path}")
         return True
     
@@ -160,52 +193,412 @@ def _download_video(url: str, output_path: Path) -> bool:
         return False
 
 
+# ============ STOCK FOOTAGE CACHE ============
+
+_stock_cache: DiskCache | None = None
+_stock_cache_settings: tuple | None = None
+_stock_catalog: StockCatalog | None = None
+_segment_library: DiskCache | None = None
+_segment_stats: dict[str, Any] | None = None
+_subtitle_stats: dict[str, Any] | None = None
+_stock_prefetch: _StockPrefetch | None = None
+_prefetch_executor: ThreadPoolExecutor | None = None
+
+
+def _cache_root(config: ProjectConfig) -> Path:
+    """Root directory for persistent caches (`caching.dir`, default "cache")."""
+    cache_dir = _config_section(config, "caching").get("dir", "cache")
+    return Path(cache_dir) if isinstance(cache_dir, (str, os.PathLike)) else Path("cache")
+
+
+def get_stock_cache(config: ProjectConfig) -> DiskCache:
+    """
+    Process-wide stock footage cache configured from the `caching` section.
+    
+    Keys are (Pixabay hit id, rendition); entries expire after
+    `caching.ttl_days` and LRU entries are evicted over `caching.stock_max_mb`.
+    The cache (and the catalog next to it) is rebuilt whenever these
+    settings differ from the ones it was built with.
+    """
+    global _stock_cache, _stock_cache_settings, _stock_catalog
+    caching = _config_section(config, "caching")
+    ttl_days = caching.get("ttl_days", 7)
+    max_mb = caching.get("stock_max_mb", STOCK_CACHE_MAX_MB)
+    settings = (
+        _cache_root(config) / "stock",
+        ttl_days if isinstance(ttl_days, (int, float)) else 7,
+        int(max_mb * 1024 * 1024) if isinstance(max_mb, (int, float)) else None,
+        caching.get("enabled", True) is not False,
+    )
+    if _stock_cache is None or settings != _stock_cache_settings:
+        root, ttl_days, max_bytes, enabled = settings
+        _stock_cache = DiskCache(root, ttl_days=ttl_days, max_bytes=max_bytes, enabled=enabled)
+        _stock_cache_settings = settings
+        _stock_catalog = None
+    return _stock_cache
+
+
+def get_stock_catalog(config: ProjectConfig) -> StockCatalog | None:
+    """
+    Process-wide catalog of ingested stock clips, or None when disabled.
+    
+    Lives next to the stock cache and is only used while caching is enabled
+    (catalog entries point at cached files) and `caching.stock_catalog` is
+    not false.
+    """
+    global _stock_catalog
+    caching = _config_section(config, "caching")
+    if not get_stock_cache(config).enabled or caching.get("stock_catalog", True) is False:
+        return None
+    if _stock_catalog is None:
+        _stock_catalog = StockCatalog(_cache_root(config) / "stock_catalog.sqlite")
+    return _stock_catalog
+
+
+def reset_stock_cache() -> None:
+    """Drop the process-wide stock cache and catalog (config changes, tests)."""
+    global _stock_cache, _stock_cache_settings, _stock_catalog
+    discard_stock_prefetch()
+    _stock_cache = None
+    _stock_cache_settings = None
+    _stock_catalog = None
+
+
+def get_segment_library(config: ProjectConfig) -> DiskCache:
+    """
+    Process-wide library of pre-encoded segments, built lazily on first use.
+    
+    Holds silent bumpers (intro/outro cards) and one-second still units
+    (ad and shorts backgrounds), keyed by text, style and output profile.
+    All entries share the still-segment codec parameters, so they can be
+    stream-copied into any render. Size is capped by `caching.segments_max_mb`.
+    """
+    global _segment_library
+    if _segment_library is None:
+        caching = _config_section(config, "caching")
+        ttl_days = caching.get("ttl_days", 7)
+        max_mb = caching.get("segments_max_mb", SEGMENT_LIBRARY_MAX_MB)
+        _segment_library = DiskCache(
+            _cache_root(config) / "segments",
+            ttl_days=ttl_days if isinstance(ttl_days, (int, float)) else 7,
+            max_bytes=int(max_mb * 1024 * 1024) if isinstance(max_mb, (int, float)) else None,
+            enabled=caching.get("enabled", True) is not False,
+        )
+    return _segment_library
+
+
+def reset_segment_library() -> None:
+    """Drop the process-wide segment library (config changes, tests)."""
+    global _segment_library
+    _segment_library = None
+
+
+def _find_stock_hit(
+    config: ProjectConfig,
+    api_key: str | None,
+    query: str,
+    duration_sec: float,
+    catalog_keywords: list[str] | None = None,
+) -> tuple[dict[str, Any] | None, bool]:
+    """
+    Pick a stock clip: local catalog first, Pixabay search on a catalog miss.
+    
+    The catalog is queried with `catalog_keywords` (defaults to the words of
+    `query`). Returns (hit, from_catalog).
+    """
+    catalog = get_stock_catalog(config)
+    if catalog is not None:
+        min_duration_us = int(max(0.0, duration_sec - STOCK_MIN_DURATION_SLACK_SEC) * US_PER_SEC)
+        hit = catalog.pick(catalog_keywords or query.split(), min_duration_us)
+        if hit is not None:
+            logger.info(f"📚 Stock catalog hit: {hit['hit_id']} (used {hit['usage_count']}x)")
+            return hit, True
+    
+    if not api_key:
+        return None, False
+    hit = _search_pixabay_video(api_key, query, duration_sec)
+    if not hit or hit.get("rendition") == "page":
+        return None, False
+    return hit, False
+
+
+def _stock_staging_path(cache: DiskCache, name: str) -> Path:
+    """
+    File in temp/ that a stock download or proxy is written to.
+    
+    With the cache enabled the name is stable, so an interrupted download
+    resumes from its `.part` file; callers hold `cache.lock(key)` while
+    writing it. Without the cache the file is a per-render temporary and
+    gets a unique name, so parallel runs never write the same file.
+    """
+    if not cache.enabled:
+        name = f"{name}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+    return Path("temp") / f"{name}.mp4"
+
+
+def _fetch_stock_source(config: ProjectConfig, hit: dict[str, Any]) -> tuple[Path | None, bool]:
+    """
+    Return the original download for a Pixabay hit, from cache or network.
+    
+    Concurrent processes wanting the same clip download it once: the others
+    wait on the cache key's lock and then get the cached file.
+    
+    Returns (path, cached). Files that are not cached are temporary.
+    """
+    cache = get_stock_cache(config)
+    key = make_key("pixabay", hit["hit_id"], hit["rendition"])
+    with cache.lock(key):
+        cached_path = cache.get(key)
+        if cached_path is not None:
+            logger.info(f"♻️ Stock cache hit: {hit['hit_id']} ({hit['rendition']})")
+            return cached_path, True
+        
+        download_path = _stock_staging_path(cache, f"stock_{hit['hit_id']}_{hit['rendition']}")
+        if not _download_video(hit["url"], download_path):
+            return None, False
+        
+        if not cache.enabled:
+            return download_path, False
+        
+        meta = {k: v for k, v in hit.items() if k != "url"}
+        cached_path = cache.put(key, download_path, suffix=".mp4", meta=meta)
+    catalog = get_stock_catalog(config)
+    if catalog is not None:
+        catalog.add(hit)
+    return cached_path, True
+
+
+def _acquire_stock_proxy(
+    config: ProjectConfig,
+    api_key: str,
+    query: str,
+    duration_sec: float,
+    width: int,
+    height: int,
+    fps: int,
+    catalog_keywords: list[str] | None = None,
+) -> tuple[Path | None, list[Path]]:
+    """
+    Find a stock video for `query` as a render-ready proxy.
+    
+    The proxy is already `width`x`height` at `fps` (scaled to cover and
+    center-cropped once by ffmpeg), so the renderer does no per-frame
+    resize/crop. Proxies are cached next to the original downloads and are
+    built only once per (clip, rendition, geometry).
+    
+    The clip is picked from the local catalog when possible (see
+    `_find_stock_hit`); the Pixabay API is only searched on a catalog miss.
+    
+    Returns (proxy_path, temp_files); temp_files must be deleted by the caller.
+    """
+    with profiling.stage("stock_search"):
+        hit, from_catalog = _find_stock_hit(config, api_key, query, duration_sec, catalog_keywords)
+    if hit is None:
+        return None, []
+    
+    cache = get_stock_cache(config)
+    profile = f"proxy_{width}x{height}_{fps}"
+    key = make_key("pixabay", hit["hit_id"], hit["rendition"], profile)
+    with cache.lock(key):
+        proxy = _build_stock_proxy(config, cache, key, hit, profile, width, height, fps)
+    if proxy is None:
+        if from_catalog:
+            # Файл вытеснен из кэша и больше не скачивается: забыть клип и выбрать другой
+            get_stock_catalog(config).remove(hit["hit_id"], hit["rendition"])
+            return _acquire_stock_proxy(
+                config, api_key, query, duration_sec, width, height, fps, catalog_keywords
+            )
+        return None, []
+    if from_catalog and proxy[0] is not None:
+        # Использование засчитываем, только когда клип реально готов к рендеру
+        get_stock_catalog(config).record_use(hit["hit_id"], hit["rendition"])
+    return proxy
+
+
+def _build_stock_proxy(
+    config: ProjectConfig,
+    cache: DiskCache,
+    key: str,
+    hit: dict[str, Any],
+    profile: str,
+    width: int,
+    height: int,
+    fps: int,
+) -> tuple[Path | None, list[Path]] | None:
+    """
+    Cached proxy for `hit`, built from the original download if missing.
+    
+    Called with the proxy key locked. Returns None when the original cannot
+    be downloaded, else (proxy_path, temp_files).
+    """
+    cached_proxy = cache.get(key)
+    if cached_proxy is not None:
+        logger.info(f"♻️ Stock proxy cache hit: {hit['hit_id']} ({profile})")
+        return cached_proxy, []
+    
+    with profiling.stage("stock_download"):
+        source_path, source_cached = _fetch_stock_source(config, hit)
+    if source_path is None:
+        return None
+    temp_files = [] if source_cached else [source_path]
+    
+    proxy_path = _stock_staging_path(cache, f"stock_{hit['hit_id']}_{hit['rendition']}_{profile}")
+    try:
+        with profiling.stage("stock_proxy"):
+            ffmpeg_utils.transcode_proxy(source_path, proxy_path, width, height, fps)
+    except Exception as e:
+        logger.warning(f"Stock proxy transcode failed: {e}")
+        proxy_path.unlink(missing_ok=True)
+        return None, temp_files
+    logger.info(f"🎞️ Stock proxy built: {hit['hit_id']} ({profile})")
+    
+    if not cache.enabled:
+        return proxy_path, temp_files + [proxy_path]
+    
+    meta = {"hit_id": hit["hit_id"], "rendition": hit["rendition"], "profile": profile}
+    return cache.put(key, proxy_path, suffix=".mp4", meta=meta), temp_files
+
+
+def _stock_queries(script: dict[str, Any], mode: str) -> tuple[str, list[str]]:
+    """(Pixabay query, catalog keywords) for the stock background of `mode`."""
+    keywords = " ".join(random.sample(KEYWORDS[mode], 2))
+    return keywords, [*_visual_hints(script), *KEYWORDS[mode]]
+
+
+def _stock_available(config: ProjectConfig, api_key: str | None) -> bool:
+    """Whether a stock clip can be found at all (API key or a non-empty catalog)."""
+    catalog = get_stock_catalog(config)
+    return bool(api_key) or (catalog is not None and catalog.count() > 0)
+
+
+def estimate_duration(script: dict[str, Any], mode: str) -> float:
+    """Narration length in seconds guessed from the script text (before TTS)."""
+    texts = subtitle_generator.block_texts(script, mode)
+    return sum(len(text) for text in texts.values()) / NARRATION_CHARS_PER_SEC
+
+
+@dataclass
+class _StockPrefetch:
+    """Stock proxy being fetched in the background for an upcoming render."""
+
+    mode: str
+    geometry: tuple[int, int, int]  # width, height, fps
+    future: Future
+
+
+def _run_stock_prefetch(config, api_key, query, duration, width, height, fps, catalog_keywords):
+    with profiling.stage("stock_prefetch"):
+        return _acquire_stock_proxy(config, api_key, query, duration, width, height, fps, catalog_keywords)
+
+
+def prefetch_stock(
+    config: ProjectConfig,
+    script: dict[str, Any],
+    mode: str,
+    duration_sec: float | None = None,
+    preview: bool = False,
+) -> bool:
+    """
+    Start fetching the stock background for `mode` in a background thread.
+    
+    Called by the pipeline right after script generation, so the Pixabay
+    search, download and proxy transcode overlap with TTS. `duration_sec`
+    defaults to `estimate_duration`; the proxy is looped to the real audio
+    length at render time, so the estimate only steers the search.
+    The next `render` of the same mode and profile picks up the result.
+    
+    Disabled with `video.stock_prefetch: false`. Returns True when started.
+    """
+    global _stock_prefetch, _prefetch_executor
+    if mode != "shorts" or not _video_config(config).get("stock_prefetch", True):
+        return False
+    api_key = os.getenv("PIXABAY_API_KEY")
+    if not _stock_available(config, api_key):
+        return False
+    
+    discard_stock_prefetch()
+    profile = _render_profile(mode, preview)
+    duration = duration_sec if duration_sec is not None else estimate_duration(script, mode)
+    query, catalog_keywords = _stock_queries(script, mode)
+    if _prefetch_executor is None:
+        _prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stock-prefetch")
+    future = _prefetch_executor.submit(
+        _run_stock_prefetch,
+        config, api_key, query, duration, profile.width, profile.height, profile.fps, catalog_keywords,
+    )
+    _stock_prefetch = _StockPrefetch(mode, (profile.width, profile.height, profile.fps), future)
+    logger.info(f"📥 Prefetching stock footage for {mode} (~{duration:.0f}s): {query}")
+    return True
+
+
+def _cleanup_prefetch(future: Future) -> None:
+    """Delete the temporary files of a prefetch nobody is going to use."""
+    try:
+        _, temp_files = future.result()
+    except Exception:
+        return
+    for temp_file in temp_files:
+        temp_file.unlink(missing_ok=True)
+
+
+def discard_stock_prefetch() -> None:
+    """Forget a pending prefetch; its temporary files are removed once it finishes."""
+    global _stock_prefetch
+    if _stock_prefetch is not None:
+        _stock_prefetch.future.add_done_callback(_cleanup_prefetch)
+        _stock_prefetch = None
+
+
+def _take_stock_prefetch(mode: str, profile: RenderProfile) -> tuple[Path | None, list[Path]] | None:
+    """
+    Wait for the prefetched stock proxy of this render.
+    
+    Returns (proxy_path, temp_files) like `_acquire_stock_proxy`, or None when
+    nothing was prefetched for this mode/profile or the prefetch failed.
+    """
+    global _stock_prefetch
+    prefetch, _stock_prefetch = _stock_prefetch, None
+    if prefetch is None:
+        return None
+    if (prefetch.mode, prefetch.geometry) != (mode, (profile.width, profile.height, profile.fps)):
+        prefetch.future.add_done_callback(_cleanup_prefetch)
+        return None
+    try:
+        with profiling.stage("stock_wait"):
+            return prefetch.future.result()
+    except Exception as e:
+        logger.warning(f"Stock prefetch failed, fetching again: {e}")
+        return None
+
+
+def get_render_stats() -> dict[str, Any]:
+    """Renderer statistics for run metadata."""
+    return {
+        "stock_cache": _stock_cache.get_stats() if _stock_cache is not None else None,
+        "stock_catalog": _stock_catalog.get_stats() if _stock_catalog is not None else None,
+        "text_cache": text_rendering.get_cache_stats(),
+        "background_cache": backgrounds.get_cache_stats(),
+        "segment_library": _segment_library.get_stats() if _segment_library is not None else None,
+        "segments": _segment_stats,
+        "subtitles": _subtitle_stats,
+    }
+
+
 def _create_text_frame(
     text: str,
     width: int,
     height: int,
     font_size: int = 50,
     color: tuple = (255, 255, 255),
+    scale: float = 1.0,
 ) -> Image.Image:
     """
     Create PIL image with text (for overlaying on video).
-    """
-    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
     
-    # Попытка загрузить хороший шрифт
-    try:
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
-    except:
-        font = ImageFont.load_default()
-    
-    # Обтекание текста
-    max_chars_per_line = width // (font_size // 2)
-    lines = []
-    words = text.split()
-    current_line = ""
-    
-    for word in words:
-        if len(current_line) + len(word) > max_chars_per_line:
-            lines.append(current_line)
-            current_line = word
-        else:
-            current_line += (" " if current_line else "") + word
-    
-    if current_line:
-        lines.append(current_line)
-    
-    # Центрирование
-    y_offset = (height - len(lines) * font_size) // 2
-    for i, line in enumerate(lines):
-        bbox = draw.textbbox((0, 0), line, font=font)
-        line_width = bbox[2] - bbox[0]
-        x = (width - line_width) // 2
-        y = y_offset + i * (font_size + 10)
-        
-        draw.text((x, y), line, fill=color, font=font)
-    
-    return img
+    `font_size` is given at full resolution; with scale < 1 (preview) the
+    text is laid out at full size and downscaled, so line breaks match.
+    """
+    return text_rendering.render_text(text, width, height, font_size, color, scale=scale)
 
 
 def _create_background_clip(
@@ -214,131 +607,871 @@ def _create_background_clip(
     duration: float,
     fps: int,
     style: str = "mystical",
+    spec: backgrounds.BackgroundSpec | None = None,
 ) -> VideoClip:
     """
     Create gradient/color background video clip.
     Styles: "mystical", "intro", "outro", "ad"
+    
+    `spec` (see `_background_spec`) selects gradients and animation; without
+    it the style color is used as a flat background.
+    """
+    if spec is None:
+        spec = backgrounds.BackgroundSpec(primary=BACKGROUND_COLORS.get(style, BACKGROUND_COLORS["mystical"]))
+    return backgrounds.make_clip(spec, width, height, duration, fps)
+
+
+def _background_spec(config: ProjectConfig, style: str) -> backgrounds.BackgroundSpec:
+    """
+    Background for a style: gradient type from the `design` section.
+    
+    The main ("mystical") background uses the design colors when set; the
+    other styles keep their own color with a darker shade as the secondary.
+    Without `design.background_type` every style stays a flat color.
+    """
+    design = _config_section(config, "design")
+    if style == "mystical" and isinstance(design.get("background_color"), str):
+        return backgrounds.spec_from_design(design)
+    return backgrounds.spec_from_design(design, primary=BACKGROUND_COLORS.get(style, BACKGROUND_COLORS["mystical"]))
+
+
+def _config_section(config: ProjectConfig, name: str) -> Any:
+    """Config section by name (empty dict if missing)."""
+    section = config.get(name, {}) if hasattr(config, "get") else {}
+    return section if hasattr(section, "get") else {}
+
+
+def _video_config(config: ProjectConfig) -> Any:
+    """`video` section of the project config (empty dict if missing)."""
+    return _config_section(config, "video")
+
+
+def _text_engine(config: ProjectConfig) -> str:
+    """Text engine from `video.text_engine` (pil | imagemagick | auto, default pil)."""
+    engine = _video_config(config).get("text_engine", "pil")
+    return engine if engine in text_rendering.TEXT_ENGINES else "pil"
+
+
+def _still_fast_path_enabled(config: ProjectConfig) -> bool:
+    """
+    Static segments go through ffmpeg as a looped still unless disabled
+    (or the design background is animated).
+    """
+    if _background_spec(config, "mystical").animated:
+        return False
+    return bool(_video_config(config).get("still_fast_path", True))
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    """Output geometry and rate for one render (full quality or preview)."""
+    
+    width: int
+    height: int
+    fps: int
+    bitrate: str
+    scale: float = 1.0
+    preset: str | None = None
+    preview: bool = False
+    
+    def font_size(self, size: int) -> int:
+        """Font size scaled to the output resolution."""
+        return max(1, round(size * self.scale))
+
+
+def _render_profile(mode: str, preview: bool = False) -> RenderProfile:
+    """
+    Output parameters for `mode` from VIDEO_CONFIG.
+    
+    Preview profiles keep the aspect ratio and timeline but use PREVIEW_SCALE
+    (rounded to even dimensions for yuv420p), PREVIEW_FPS, PREVIEW_PRESET and
+    a bitrate scaled with the pixel count.
+    """
+    return _scaled_profile(VIDEO_CONFIG[mode], preview)
+
+
+def _scaled_profile(base: dict[str, Any], preview: bool) -> RenderProfile:
+    """RenderProfile from a width/height/fps/bitrate dict, optionally as preview."""
+    if not preview:
+        return RenderProfile(base["width"], base["height"], base["fps"], base["bitrate"])
+    
+    def even(value: float) -> int:
+        return max(2, int(round(value / 2)) * 2)
+    
+    kbps = int(str(base["bitrate"]).rstrip("k"))
+    return RenderProfile(
+        width=even(base["width"] * PREVIEW_SCALE),
+        height=even(base["height"] * PREVIEW_SCALE),
+        fps=min(PREVIEW_FPS, base["fps"]),
+        bitrate=f"{max(100, int(kbps * PREVIEW_SCALE ** 2))}k",
+        scale=PREVIEW_SCALE,
+        preset=PREVIEW_PRESET,
+        preview=True,
+    )
+
+
+def _output_path(output_dir: Path, mode: str, profile: RenderProfile) -> Path:
+    """Final video path; previews never overwrite full renders."""
+    return output_dir / (f"{mode}_preview.mp4" if profile.preview else f"{mode}.mp4")
+
+
+@dataclass(frozen=True)
+class _FormatOutput:
+    """Another aspect ratio encoded from the same frames as the render itself."""
+    
+    format: str
+    width: int
+    height: int
+    bitrate: str
+    fit: str = ffmpeg_utils.DEFAULT_FIT
+    
+    def path_for(self, path: Path) -> Path:
+        """This format's version of `path` (`shorts.mp4` -> `shorts_1x1.mp4`)."""
+        return path.with_name(f"{path.stem}_{self.format.replace(':', 'x')}{path.suffix}")
+    
+    def output(self, path: Path, video_filter: str | None = None) -> dict[str, Any]:
+        """`ffmpeg_utils` extra output writing this format's version of `path`."""
+        return {
+            "path": self.path_for(path),
+            "width": self.width,
+            "height": self.height,
+            "bitrate": self.bitrate,
+            "fit": self.fit,
+            "video_filter": video_filter,
+        }
+
+
+def _encoder_settings(
+    config: ProjectConfig,
+    mode: str,
+    profile: RenderProfile | None = None,
+) -> video_encoder.EncoderSettings:
+    """Encoder backend and codec parameters for a render mode."""
+    profile = profile or _render_profile(mode)
+    settings = video_encoder.settings_from_config(
+        _video_config(config),
+        fps=profile.fps,
+        bitrate=profile.bitrate,
+    )
+    return settings.with_overrides(preset=profile.preset)
+
+
+def _audio_duration(audio_path: str | Path) -> float:
+    """Get audio duration in seconds (WAV header first, MoviePy as fallback)."""
+    try:
+        with wave.open(str(audio_path), "rb") as wav_file:
+            return wav_file.getnframes() / float(wav_file.getframerate())
+    except (wave.Error, EOFError):
+        audio_clip = AudioFileClip(str(audio_path))
+        try:
+            return audio_clip.duration
+        finally:
+            audio_clip.close()
+
+
+def _compose_still_frame(
+    width: int,
+    height: int,
+    style: str,
+    text: str,
+    font_size: int,
+    color: tuple = (255, 255, 255),
+    scale: float = 1.0,
+    background: backgrounds.BackgroundSpec | None = None,
+) -> Image.Image:
+    """
+    Flatten background and text overlay into a single RGB frame.
+    
+    `font_size` is given at full resolution; see `_create_text_frame`.
+    `background` defaults to the flat style color.
+    """
+    if background is None:
+        background = backgrounds.BackgroundSpec(primary=BACKGROUND_COLORS.get(style, BACKGROUND_COLORS["mystical"]))
+    frame = Image.fromarray(backgrounds.render_frame(background, width, height)).convert("RGBA")
+    if text:
+        frame.alpha_composite(_create_text_frame(text, width, height, font_size, color, scale))
+    return frame.convert("RGB")
+
+
+def _render_still_segment(
+    frame: Image.Image,
+    output_path: Path,
+    duration: float,
+    fps: int,
+    bitrate: str,
+    audio_path: str | None = None,
+    preset: str | None = None,
+    video_filter: str | None = None,
+    extra_outputs: list[dict[str, Any]] | None = None,
+) -> Path:
+    """
+    Encode a static segment: one frame looped by ffmpeg and muxed with audio.
+    
+    `video_filter` (burned-in subtitles) is applied in the same encode, and
+    `extra_outputs` (other formats) come from the same frame.
+    """
+    frame_path = output_path.with_suffix(".frame.png")
+    frame.save(str(frame_path))
+    try:
+        ffmpeg_utils.encode_still(
+            frame_path,
+            output_path,
+            duration=duration,
+            fps=fps,
+            bitrate=bitrate,
+            audio_path=audio_path,
+            **({"preset": preset} if preset else {}),
+            **({"video_filter": video_filter} if video_filter else {}),
+            **({"extra_outputs": extra_outputs} if extra_outputs else {}),
+        )
+    finally:
+        frame_path.unlink(missing_ok=True)
+    return output_path
+
+
+def _render_library_still(
+    config: ProjectConfig,
+    frame_key: tuple,
+    make_frame: Callable[[], Image.Image],
+    output_path: Path,
+    duration: float,
+    profile: RenderProfile,
+    audio_path: str | None = None,
+    video_filter: str | None = None,
+    extra_outputs: list[dict[str, Any]] | None = None,
+) -> Path:
+    """
+    Static segment whose encoded frame comes from the segment library.
+    
+    `frame_key` identifies what `make_frame` draws (style, text, size,
+    color). On a library hit the frame is neither drawn nor encoded: the
+    cached one-second unit is looped and muxed with the audio by stream copy
+    (or re-encoded once through `video_filter`, e.g. burned-in subtitles).
+    Every format in `extra_outputs` has a unit of its own; missing units are
+    encoded together from one drawn frame and all outputs are muxed in one
+    ffmpeg process.
+    """
+    library = get_segment_library(config)
+    extras = list(extra_outputs or [])
+    base_key = (
+        "still_unit", RENDERER_VERSION, *frame_key,
+        profile.width, profile.height, profile.fps, profile.bitrate, profile.scale, profile.preset,
+    )
+    keys = [make_key(*base_key)] + [
+        make_key(*base_key, extra["width"], extra["height"], extra["fit"], extra["bitrate"])
+        for extra in extras
+    ]
+    unit_paths = [library.get(key) for key in keys]
+    if any(path is None for path in unit_paths):
+        frame_path = output_path.with_suffix(".frame.png")
+        unit_paths = [output_path.with_suffix(".unit.mp4")] + [
+            Path(extra["path"]).with_suffix(".unit.mp4") for extra in extras
+        ]
+        make_frame().save(str(frame_path))
+        try:
+            ffmpeg_utils.encode_still_unit(
+                frame_path, unit_paths[0], profile.fps, profile.bitrate,
+                **({"preset": profile.preset} if profile.preset else {}),
+                **({"extra_outputs": [
+                    {**extra, "path": unit, "video_filter": None} for extra, unit in zip(extras, unit_paths[1:])
+                ]} if extras else {}),
+            )
+        finally:
+            frame_path.unlink(missing_ok=True)
+        unit_paths = [
+            library.put(key, unit, suffix=".mp4", meta={"kind": "still_unit"})
+            for key, unit in zip(keys, unit_paths)
+        ]
+    else:
+        logger.info(f"📼 Still unit from library: {frame_key[0]}")
+    
+    try:
+        ffmpeg_utils.mux_still_unit(
+            unit_paths[0], output_path, duration, audio_path, video_filter,
+            fps=profile.fps, bitrate=profile.bitrate,
+            **({"preset": profile.preset} if profile.preset else {}),
+            **({"extra_outputs": [
+                {**extra, "unit_path": unit} for extra, unit in zip(extras, unit_paths[1:])
+            ]} if extras else {}),
+        )
+    finally:
+        if not library.enabled:
+            for unit in unit_paths:
+                unit.unlink(missing_ok=True)
+    return output_path
+
+
+def _prepare_subtitles(
+    config: ProjectConfig,
+    script: dict[str, Any],
+    mode: str,
+    block_durations: dict[str, float],
+    output_path: Path,
+    lead_in: float = 0.0,
+) -> subtitle_generator.SubtitleFiles | None:
+    """
+    Write the SRT/ASS files for a render, or None when subtitles are disabled.
+    
+    Cues are laid out for the full-resolution frame of `mode`; burn-in on
+    preview renders is scaled by libass.
     """
+    global _subtitle_stats
+    settings = subtitle_generator.settings_from_config(config)
+    if settings is None:
+        _subtitle_stats = None
+        return None
+    base = VIDEO_CONFIG[mode]
+    files = subtitle_generator.write_subtitles(
+        script, mode, block_durations, output_path, settings, base["width"], base["height"], lead_in
+    )
+    _subtitle_stats = {"srt": str(files.srt), "ass": str(files.ass), "burned": files.burn}
+    return files
+
+
+def _subtitle_filter(subtitles: subtitle_generator.SubtitleFiles | None) -> str | None:
+    """ffmpeg filter burning the whole-video ASS file, if subtitles are burned in."""
+    if subtitles is None or not subtitles.burn:
+        return None
+    return ffmpeg_utils.subtitles_filter(subtitles.ass)
+
+
+def _extra_outputs(
+    config: ProjectConfig,
+    script: dict[str, Any],
+    mode: str,
+    block_durations: dict[str, float],
+    output_path: Path,
+    formats: tuple[_FormatOutput, ...],
+    lead_in: float = 0.0,
+) -> tuple[list[dict[str, Any]], dict[str, subtitle_generator.SubtitleFiles]]:
+    """
+    `ffmpeg_utils` extra outputs for `formats` and their subtitle files.
+    
+    Subtitles are written per format with that format's frame as PlayRes
+    and burned after fitting, so captions keep their size and stay inside
+    the picture whatever the framing.
+    """
+    settings = subtitle_generator.settings_from_config(config) if formats else None
+    subtitles: dict[str, subtitle_generator.SubtitleFiles] = {}
+    if settings is not None:
+        for fmt in formats:
+            base = OUTPUT_FORMATS[fmt.format]
+            subtitles[fmt.format] = subtitle_generator.write_subtitles(
+                script, mode, block_durations, fmt.path_for(output_path), settings,
+                base["width"], base["height"], lead_in,
+            )
+    outputs = [fmt.output(output_path, _subtitle_filter(subtitles.get(fmt.format))) for fmt in formats]
+    return outputs, subtitles
+
+
+def _visual_hints(script: dict[str, Any]) -> list[str]:
+    """`visual_hints` from the script as a list (LLMs sometimes return a string)."""
+    hints = script.get("visual_hints") or []
+    if isinstance(hints, str):
+        hints = hints.split(",")
+    return [str(h).strip() for h in hints if str(h).strip()]
+
+
+def _block_title(script: dict[str, Any], block_name: str) -> str:
+    """First line of the block text, or the block name if it is too long."""
+    block_title = script.get("blocks", {}).get(block_name, "").split('\n')[0]
+    if len(block_title) > 50 or not block_title:
+        block_title = block_name.capitalize()
+    return block_title
+
+
+@dataclass(frozen=True)
+class _SegmentJob:
+    """Everything needed to encode one static segment in a worker process."""
+    
+    name: str
+    style: str
+    text: str
+    font_size: int
+    duration: float
+    audio_path: str | None
+    output_path: Path
+    width: int
+    height: int
+    fps: int
+    bitrate: str
+    scale: float = 1.0
+    preset: str | None = None
+    subtitles_path: str | None = None
+    background: backgrounds.BackgroundSpec | None = None
+    # Другие форматы того же сегмента и их субтитры (по одному на формат)
+    formats: tuple[_FormatOutput, ...] = ()
+    format_subtitles: tuple[str | None, ...] = ()
+    
+    def output_paths(self) -> list[Path]:
+        """The segment file, then one per extra format."""
+        return [self.output_path, *(fmt.path_for(self.output_path) for fmt in self.formats)]
+
+
+def _render_segment_job(job: _SegmentJob) -> Path:
+    """Encode one static segment (runs in a worker process)."""
+    frame = _compose_still_frame(
+        job.width, job.height, job.style, job.text, job.font_size, scale=job.scale, background=job.background
+    )
+    return _render_still_segment(
+        frame,
+        job.output_path,
+        duration=job.duration,
+        fps=job.fps,
+        bitrate=job.bitrate,
+        audio_path=job.audio_path,
+        preset=job.preset,
+        video_filter=ffmpeg_utils.subtitles_filter(job.subtitles_path) if job.subtitles_path else None,
+        extra_outputs=[
+            fmt.output(job.output_path, ffmpeg_utils.subtitles_filter(path) if path else None)
+            for fmt, path in zip(job.formats, job.format_subtitles)
+        ],
+    )
+
+
+def _segment_workers(config: ProjectConfig, num_jobs: int) -> int:
+    """Worker processes for segment rendering (0/unset = one per CPU core)."""
+    workers = _video_config(config).get("segment_workers", 0)
+    if not isinstance(workers, int) or isinstance(workers, bool) or workers <= 0:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, num_jobs))
+
+
+def _incremental_render_enabled(config: ProjectConfig) -> bool:
+    """Keep long-form segments and re-encode only changed ones unless disabled."""
+    return bool(_video_config(config).get("incremental_render", True))
+
+
+def _segment_retries(config: ProjectConfig) -> int:
+    """How many times a failed segment is re-rendered before giving up."""
+    retries = _video_config(config).get("segment_retries", 2)
+    if not isinstance(retries, int) or isinstance(retries, bool):
+        return 2
+    return max(0, retries)
+
+
+def _render_segments(jobs: list[_SegmentJob], workers: int, retries: int) -> list[Path]:
+    """
+    Render segments in a process pool, retrying each failed segment on its own.
+    
+    Returns segment paths in the order of `jobs`.
+    """
+    attempts = {job.name: 0 for job in jobs}
+    done: dict[str, Path] = {}
+    pending = list(jobs)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    
+    try:
+        while pending:
+            if executor is not None:
+                submitted = [(job, executor.submit(_render_segment_job, job)) for job in pending]
+            else:
+                submitted = [(job, None) for job in pending]
+            pending = []
+            
+            for job, future in submitted:
+                attempts[job.name] += 1
+                try:
+                    done[job.name] = future.result() if future is not None else _render_segment_job(job)
+                except Exception as e:
+                    if attempts[job.name] > retries:
+                        raise RuntimeError(
+                            f"Segment '{job.name}' failed after {attempts[job.name]} attempts: {e}"
+                        ) from e
+                    logger.warning(
+                        f"⚠️ Segment '{job.name}' failed (attempt {attempts[job.name]}): {e}. Retrying..."
+                    )
+                    pending.append(job)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    
+    return [done[job.name] for job in jobs]
+
+
+# ============ SEGMENT MANIFEST ============
+
+SEGMENT_MANIFEST = "manifest.json"
+
+
+def _file_digest(path: str | Path) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _segment_hash(job: _SegmentJob) -> str:
+    """Hash of everything that affects an encoded segment (not its file name)."""
+    return make_key(
+        RENDERER_VERSION,
+        job.name,
+        job.style,
+        job.text,
+        job.font_size,
+        f"{job.duration:.3f}",
+        _file_digest(job.audio_path) if job.audio_path else "",
+        job.width,
+        job.height,
+        job.fps,
+        job.bitrate,
+        job.scale,
+        job.preset,
+        *([_file_digest(job.subtitles_path)] if job.subtitles_path else []),
+        *([repr(job.background)] if job.background is not None else []),
+        *[repr(fmt) for fmt in job.formats],
+        *[_file_digest(path) for path in job.format_subtitles if path],
+    )
+
+
+def _load_manifest(path: Path) -> dict[str, Any]:
+    """Segment manifest ({} if missing or unreadable)."""
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(path: Path, manifest: dict[str, Any]) -> None:
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _render_long_form_still(
+    config: ProjectConfig,
+    script: dict[str, Any],
+    blocks: dict[str, str],
+    output_path: Path,
+    profile: RenderProfile | None = None,
+    formats: tuple[_FormatOutput, ...] = (),
+) -> Path:
+    """
+    Render long-form as independent still segments joined by stream copy.
+    
+    Intro, blocks and outro are encoded in parallel worker processes with
+    identical codec parameters, then joined with the concat demuxer. Each
+    segment job also encodes its `formats` versions from the same frame,
+    and every format is joined separately.
     
-    color_map = {
-        "mystical": (20, 10, 40),     # Deep purple
-        "intro": (30, 15, 50),        # Darker purple
-        "outro": (40, 20, 60),        # Medium purple
-        "love": (150, 30, 60),        # Red
-        "money": (50, 150, 50),       # Green
-        "health": (100, 150, 255),    # Blue
-        "ad": (40, 40, 60),           # Dark
+    The silent intro/outro bumpers come from the segment library: each is
+    encoded once per (text, style, profile) and then reused by every render.
+    
+    With `video.incremental_render` (default) the encoded block segments are
+    kept next to the output with a manifest of their input hashes, and later
+    renders only re-encode segments whose text, audio, style or
+    RENDERER_VERSION changed.
+    """
+    global _segment_stats
+    profile = profile or _render_profile("long_form")
+    segments_dir = output_path.parent / f".{output_path.stem}_segments"
+    segments_dir.mkdir(parents=True, exist_ok=True)
+    
+    block_durations = {
+        block_name: _audio_duration(blocks[block_name])
+        for block_name in ["love", "money", "health"]
+        if block_name in blocks
+    }
+    subtitles = _prepare_subtitles(
+        config, script, "long_form", block_durations, output_path, lead_in=LONG_FORM_INTRO_SEC
+    )
+    _, format_subtitles = _extra_outputs(
+        config, script, "long_form", block_durations, output_path, formats, lead_in=LONG_FORM_INTRO_SEC
+    )
+    
+    def block_subtitles(files: subtitle_generator.SubtitleFiles | None, name: str) -> str | None:
+        path = files.blocks.get(name) if files is not None and files.burn else None
+        return str(path) if path else None
+    
+    def job(name: str, style: str, text: str, font_size: int, duration: float, audio_path: str | None):
+        return _SegmentJob(
+            name=name,
+            style=style,
+            text=text,
+            font_size=font_size,
+            duration=duration,
+            audio_path=audio_path,
+            output_path=segments_dir / f"{name}.mp4",
+            width=profile.width,
+            height=profile.height,
+            fps=profile.fps,
+            bitrate=profile.bitrate,
+            scale=profile.scale,
+            preset=profile.preset,
+            subtitles_path=block_subtitles(subtitles, name),
+            background=_background_spec(config, style),
+            formats=formats,
+            format_subtitles=tuple(block_subtitles(format_subtitles.get(fmt.format), name) for fmt in formats),
+        )
+    
+    jobs = [job("intro", "intro", script.get("video_title", "Гороскоп"), 80, LONG_FORM_INTRO_SEC, None)]
+    for block_name, duration in block_durations.items():
+        jobs.append(job(
+            block_name,
+            block_name,
+            _block_title(script, block_name),
+            60,
+            duration,
+            blocks[block_name],
+        ))
+    jobs.append(job("outro", "outro", "Спасибо за просмотр!", 60, LONG_FORM_OUTRO_SEC, None))
+    
+    incremental = _incremental_render_enabled(config)
+    manifest_path = segments_dir / SEGMENT_MANIFEST
+    manifest = _load_manifest(manifest_path) if incremental else {}
+    
+    # Файл сегмента назван по хэшу входных данных: старый файл не затирается,
+    # пока новый не готов
+    hashes = {}
+    for i, segment_job in enumerate(jobs):
+        digest = _segment_hash(segment_job)
+        hashes[segment_job.name] = digest
+        jobs[i] = replace(segment_job, output_path=segments_dir / f"{segment_job.name}_{digest[:16]}.mp4")
+    
+    # Бамперы (intro/outro без звука) берём из библиотеки сегментов
+    library = get_segment_library(config)
+    bumper_keys = {
+        segment_job.name: [make_key("bumper", hashes[segment_job.name])] + [
+            make_key("bumper", hashes[segment_job.name], fmt.format) for fmt in formats
+        ]
+        for segment_job in jobs
+        if segment_job.audio_path is None and library.enabled
+    }
+    from_library = {}
+    for name, keys in bumper_keys.items():
+        cached = [library.get(key) for key in keys]
+        if all(path is not None for path in cached):
+            from_library[name] = cached
+    
+    stale = [
+        segment_job for segment_job in jobs
+        if segment_job.name not in from_library
+        and (
+            segment_job.name in bumper_keys
+            or manifest.get(segment_job.name, {}).get("hash") != hashes[segment_job.name]
+            or not all(path.exists() for path in segment_job.output_paths())
+        )
+    ]
+    _segment_stats = {
+        "rebuilt": [segment_job.name for segment_job in stale],
+        "reused": [segment_job.name for segment_job in jobs if segment_job not in stale],
+        "from_library": sorted(from_library),
     }
     
-    color = color_map.get(style, (20, 10, 40))
+    workers = _segment_workers(config, len(stale))
+    if stale:
+        logger.info(f"🧩 Rendering {len(stale)}/{len(jobs)} segments with {workers} worker(s)")
+    else:
+        logger.info(f"♻️ All {len(jobs)} segments unchanged")
     
-    # Создать простой кадр цвета
-    frame = Image.new("RGB", (width, height), color)
-    frame_array = np.array(frame)
+    try:
+        with profiling.stage("segments") as segments_stage:
+            segments_stage.frames = sum(round(segment_job.duration * segment_job.fps) for segment_job in stale)
+            _render_segments(stale, workers, _segment_retries(config))
+        for segment_job in stale:
+            if segment_job.name in bumper_keys:
+                from_library[segment_job.name] = [
+                    library.put(key, path, suffix=".mp4", meta={"kind": "bumper", "name": segment_job.name})
+                    for key, path in zip(bumper_keys[segment_job.name], segment_job.output_paths())
+                ]
+        
+        segment_paths = [
+            from_library.get(segment_job.name, segment_job.output_paths()) for segment_job in jobs
+        ]
+        # Каждый формат склеивается отдельно, потоковым копированием
+        with profiling.stage("concat"):
+            for i, path in enumerate([output_path, *(fmt.path_for(output_path) for fmt in formats)]):
+                ffmpeg_utils.concat_segments([paths[i] for paths in segment_paths], path)
+        
+        if incremental:
+            _write_manifest(manifest_path, {
+                segment_job.name: {"hash": hashes[segment_job.name], "file": segment_job.output_path.name}
+                for segment_job in jobs
+                if segment_job.name not in bumper_keys
+            })
+            # Сегменты прошлых версий больше не нужны
+            keep = {path for segment_job in jobs for path in segment_job.output_paths()}
+            for path in segments_dir.iterdir():
+                if path.name != SEGMENT_MANIFEST and path not in keep:
+                    path.unlink(missing_ok=True)
+    finally:
+        if not incremental:
+            shutil.rmtree(segments_dir, ignore_errors=True)
     
-    # Тянуть кадр на нужную длительность
-    clip = ImageClip(frame_array).set_duration(duration)
-    return clip
+    logger.info(f"✅ Long-form video created (still): {output_path}")
+    return output_path
+
+
+def _render_stock_overlay(
+    config: ProjectConfig,
+    proxy_path: Path,
+    text: str,
+    output_path: Path,
+    duration: float,
+    profile: RenderProfile,
+    audio_path: str | Path,
+    video_filter: str | None,
+    temp_files: list[Path],
+    extra_outputs: list[dict[str, Any]] | None = None,
+) -> Path:
+    """
+    Hook text over a stock proxy in a single ffmpeg pass.
+
+    The proxy is looped/trimmed on the ffmpeg input side (see
+    `ffmpeg_utils.overlay_on_video`), so every background frame is decoded
+    once at output size and no frames pass through Python. `extra_outputs`
+    are split from the composited frames in the same pass.
+    """
+    overlay_path = Path("temp") / f"hook_{output_path.stem}.png"
+    overlay_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_files.append(overlay_path)
+    _create_text_frame(text, profile.width, profile.height, 60, scale=profile.scale).save(overlay_path)
+
+    settings = _encoder_settings(config, "shorts", profile)
+    with profiling.stage("encode", frames=round(duration * profile.fps)):
+        ffmpeg_utils.overlay_on_video(
+            proxy_path,
+            output_path,
+            duration,
+            profile.fps,
+            overlay_path=overlay_path,
+            audio_path=audio_path,
+            video_filter=video_filter,
+            codec=settings.codec,
+            preset=settings.preset,
+            bitrate=settings.bitrate,
+            pix_fmt=settings.pix_fmt,
+            threads=settings.threads,
+            **({"extra_outputs": extra_outputs} if extra_outputs else {}),
+        )
+    return output_path
 
 
 def _render_shorts(
     config: ProjectConfig,
     script: dict[str, Any],
     audio_map: dict[str, Any],
+    preview: bool = False,
+    formats: tuple[_FormatOutput, ...] = (),
 ) -> Path:
     """
-    Render vertical shorts video (9:16).
+    Render vertical shorts video (9:16), plus `formats` from the same frames.
     """
     project_slug = str(config.project.get("name", "project")).replace(" ", "_")
     output_dir = Path("output") / "videos" / project_slug
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    output_path = output_dir / "shorts.mp4"
+    profile = _render_profile("shorts", preview)
+    output_path = _output_path(output_dir, "shorts", profile)
+    temp_files: list[Path] = []
+    clips = ClipScope("shorts")
     
     try:
         # Параметры видео
-        width, height = VIDEO_CONFIG["shorts"]["width"], VIDEO_CONFIG["shorts"]["height"]
-        fps = VIDEO_CONFIG["shorts"]["fps"]
+        width, height = profile.width, profile.height
+        fps = profile.fps
         duration = audio_map["total_duration_sec"]
         
         # Получить Pixabay видео или создать на основе картинок
         api_key = os.getenv("PIXABAY_API_KEY")
         base_clip = None
+        proxy_path = None
         
-        if api_key:
-            keywords = " ".join(random.sample(KEYWORDS["shorts"], 2))
-            video_url = _get_pixabay_video(api_key, keywords, duration)
+        # Клип, скачанный заранее во время TTS (prefetch_stock), иначе ищем сейчас
+        stock = _take_stock_prefetch("shorts", profile)
+        if stock is None and _stock_available(config, api_key):
+            keywords, catalog_keywords = _stock_queries(script, "shorts")
+            stock = _acquire_stock_proxy(
+                config, api_key, keywords, duration, width, height, fps, catalog_keywords
+            )
+        if stock is not None:
+            proxy_path, stock_temp_files = stock
+            temp_files.extend(stock_temp_files)
             
-            if video_url:
-                stock_path = Path("temp") / f"stock_{random.randint(1000,9999)}.mp4"
-                if _download_video(video_url, stock_path):
-                    # Использовать stock видео
-                    try:
-                        base_clip = VideoFileClip(str(stock_path))
-                        # Loop if too short
-                        if base_clip.duration < duration:
-                            base_clip = vfx.loop(base_clip, duration=duration)
-                        else:
-                            base_clip = base_clip.subclip(0, duration)
-                        
-                        # Resize to cover
-                        # moviepy resize expects (width, height)
-                        # We want to fill the screen (1080x1920)
-                        # Usually stock video is 16:9 (horizontal). We need to crop to 9:16.
-                        
-                        # Resize height to 1920
-                        base_clip = base_clip.resize(height=1920)
-                        # Center crop width to 1080
-                        base_clip = base_clip.crop(x1=base_clip.w/2 - 540, width=1080)
-                        
-                    except Exception as e:
-                        logger.warning(f"Failed to process stock video: {e}")
-                        base_clip = None
-                else:
-                    logger.warning("Failed to download video")
-        
-        if base_clip is None:
-            # Fallback на картинку
-            base_clip = _create_background_clip(width, height, duration, fps, "mystical")
+            if proxy_path is None:
+                logger.warning("No stock video available")
         
         # Добавить текст (hook)
         hook_text = script.get("hook", "Гороскоп на сегодня")
+        subtitles = _prepare_subtitles(config, script, "shorts", {"main": duration}, output_path)
+        extra_outputs, _ = _extra_outputs(config, script, "shorts", {"main": duration}, output_path, formats)
         
-        try:
-            # Try TextClip with imagemagick
-            txt_clip = TextClip(
-                hook_text,
-                fontsize=60,
-                color="white",
-                font="Arial-Bold",
-                method="caption",
-                size=(width - 40, None),
+        if proxy_path is not None and _text_engine(config) == "pil":
+            # Stock видео: прокси уже 9:16 и нужного fps. ffmpeg зацикливает/обрезает
+            # его на входе и накладывает текст за один проход, без MoviePy
+            try:
+                _render_stock_overlay(
+                    config, proxy_path, hook_text, output_path, duration, profile,
+                    audio_map["blocks"]["main"], _subtitle_filter(subtitles), temp_files, extra_outputs,
+                )
+                logger.info(f"✅ Shorts video created (stock): {output_path}")
+                return output_path
+            except Exception as e:
+                logger.warning(f"Failed to process stock video: {e}")
+                proxy_path = None
+        
+        if proxy_path is not None:
+            # TextClip (ImageMagick) компонуется в MoviePy: фон зацикливаем
+            # потоковым копированием без перекодирования
+            try:
+                background_path = Path("temp") / f"stock_bg_{project_slug}_{output_path.stem}.mp4"
+                temp_files.append(background_path)
+                with profiling.stage("stock_loop"):
+                    ffmpeg_utils.loop_to_duration(proxy_path, background_path, duration)
+                base_clip = clips.track(VideoFileClip(str(background_path), audio=False))
+            except Exception as e:
+                logger.warning(f"Failed to process stock video: {e}")
+                base_clip = None
+        
+        if base_clip is None and _still_fast_path_enabled(config):
+            # Статичный фон: один кадр, ffmpeg зацикливает его сам
+            background = _background_spec(config, "mystical")
+            with profiling.stage("encode", frames=round(duration * fps)):
+                _render_library_still(
+                    config,
+                    ("mystical", hook_text, 60, background),
+                    lambda: _compose_still_frame(
+                        width, height, "mystical", hook_text, 60, scale=profile.scale, background=background
+                    ),
+                    output_path,
+                    duration,
+                    profile,
+                    audio_map["blocks"]["main"],
+                    _subtitle_filter(subtitles),
+                    extra_outputs,
+                )
+            logger.info(f"✅ Shorts video created (still): {output_path}")
+            return output_path
+        
+        if base_clip is None:
+            # Fallback на картинку
+            base_clip = _create_background_clip(
+                width, height, duration, fps, "mystical", _background_spec(config, "mystical")
             )
-            txt_clip = txt_clip.set_position("center").set_duration(duration)
-        except Exception as e:
-            logger.warning(f"TextClip failed, falling back to PIL: {e}")
-            # Fallback to PIL
-            txt_img = _create_text_frame(hook_text, width, height, 60)
-            txt_clip = ImageClip(np.array(txt_img)).set_duration(duration)
+        
+        txt_clip = text_rendering.make_text_clip(
+            hook_text, width, height, 60, duration,
+            engine=_text_engine(config), scale=profile.scale,
+        )
         
         # Добавить аудио
         audio_path = audio_map["blocks"]["main"]
-        audio_clip = AudioFileClip(audio_path)
+        audio_clip = clips.track(AudioFileClip(audio_path))
         
         # Компоновка
-        final_clip = CompositeVideoClip([base_clip, txt_clip])
+        final_clip = clips.track(CompositeVideoClip([base_clip, txt_clip]))
         final_clip = final_clip.set_audio(audio_clip)
         
         # Экспорт
-        final_clip.write_videofile(
-            str(output_path),
-            fps=fps,
-            codec="libx264",
-            audio_codec="aac",
-            bitrate=VIDEO_CONFIG["shorts"]["bitrate"],
-            verbose=False,
-            logger=None,
-        )
+        settings = _encoder_settings(config, "shorts", profile)
+        # Декодирование, компоновка и x264 идут кадр за кадром внутри одного прохода
+        with profiling.stage("encode", frames=round(duration * fps)):
+            video_encoder.write_clip(
+                final_clip, output_path, settings.with_overrides(video_filter=_subtitle_filter(subtitles)),
+                **({"extra_outputs": extra_outputs} if extra_outputs else {}),
+            )
         
         logger.info(f"✅ Shorts video created: {output_path}")
         return output_path
@@ -346,175 +1479,197 @@ def _render_shorts(
     except Exception as e:
         logger.error(f"❌ Shorts rendering failed: {e}")
         raise
+    
+    finally:
+        # Сначала закрыть ридеры ffmpeg, потом удалять их файлы
+        clips.close()
+        # Некэшированные загрузки удаляем после рендера
+        for temp_file in temp_files:
+            temp_file.unlink(missing_ok=True)
 
 
 def _render_long_form(
     config: ProjectConfig,
     script: dict[str, Any],
     audio_map: dict[str, Any],
+    preview: bool = False,
+    formats: tuple[_FormatOutput, ...] = (),
 ) -> Path:
     """
-    Render horizontal long-form video (16:9) с 3 блоками.
+    Render horizontal long-form video (16:9) с 3 блоками, plus `formats`.
     Структура: intro + love block + money block + health block + outro
     """
     project_slug = str(config.project.get("name", "project")).replace(" ", "_")
     output_dir = Path("output") / "videos" / project_slug
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    output_path = output_dir / "long_form.mp4"
+    profile = _render_profile("long_form", preview)
+    output_path = _output_path(output_dir, "long_form", profile)
+    clips = ClipScope("long_form")
     
     try:
-        width, height = VIDEO_CONFIG["long_form"]["width"], VIDEO_CONFIG["long_form"]["height"]
-        fps = VIDEO_CONFIG["long_form"]["fps"]
+        width, height = profile.width, profile.height
+        fps = profile.fps
         
         video_title = script.get("video_title", "Гороскоп")
         blocks = audio_map["blocks"]  # {"love": path, "money": path, "health": path}
         
-        clips = []
+        if _still_fast_path_enabled(config):
+            return _render_long_form_still(config, script, blocks, output_path, profile, formats)
+        
+        segment_clips = []
         
         # Intro (3 сек с заголовком)
-        intro_clip = _create_background_clip(width, height, 3, fps, "intro")
-        try:
-            title_txt = TextClip(
-                video_title,
-                fontsize=80,
-                color="white",
-                font="Arial-Bold",
-            ).set_position("center").set_duration(3)
-        except:
-             txt_img = _create_text_frame(video_title, width, height, 80)
-             title_txt = ImageClip(np.array(txt_img)).set_duration(3)
+        intro_clip = _create_background_clip(
+            width, height, LONG_FORM_INTRO_SEC, fps, "intro", _background_spec(config, "intro")
+        )
+        text_engine = _text_engine(config)
+        title_txt = text_rendering.make_text_clip(
+            video_title, width, height, 80, LONG_FORM_INTRO_SEC, engine=text_engine, scale=profile.scale
+        )
 
         intro_clip = CompositeVideoClip([intro_clip, title_txt])
-        clips.append(intro_clip)
+        segment_clips.append(intro_clip)
         
         # Три блока (love, money, health)
+        block_durations = {}
         for block_name in ["love", "money", "health"]:
             if block_name not in blocks:
                 continue
             
             audio_path = blocks[block_name]
-            audio_clip = AudioFileClip(audio_path)
+            audio_clip = clips.track(AudioFileClip(audio_path))
             duration = audio_clip.duration
+            block_durations[block_name] = duration
             
             # Фоновое видео
-            bg_clip = _create_background_clip(width, height, duration, fps, block_name)
+            bg_clip = _create_background_clip(
+                width, height, duration, fps, block_name, _background_spec(config, block_name)
+            )
             
             # Текст блока
-            block_title = script.get("blocks", {}).get(block_name, "").split('\n')[0]
-            if len(block_title) > 50:
-                 block_title = block_name.capitalize()
-            if not block_title:
-                block_title = block_name.capitalize()
+            block_title = _block_title(script, block_name)
             
-            try:
-                txt_clip = TextClip(
-                    block_title,
-                    fontsize=60,
-                    color="white",
-                    font="Arial-Bold",
-                ).set_position("center").set_duration(duration)
-            except:
-                txt_img = _create_text_frame(block_title, width, height, 60)
-                txt_clip = ImageClip(np.array(txt_img)).set_duration(duration)
+            txt_clip = text_rendering.make_text_clip(
+                block_title, width, height, 60, duration, engine=text_engine, scale=profile.scale
+            )
             
             # Скомпоновать
             block_clip = CompositeVideoClip([bg_clip, txt_clip])
             block_clip = block_clip.set_audio(audio_clip)
-            clips.append(block_clip)
+            segment_clips.append(block_clip)
         
         # Outro (2 сек)
-        outro_clip = _create_background_clip(width, height, 2, fps, "outro")
-        try:
-            outro_txt = TextClip(
-                "Спасибо за просмотр!",
-                fontsize=60,
-                color="white",
-                font="Arial-Bold",
-            ).set_position("center").set_duration(2)
-        except:
-             txt_img = _create_text_frame("Спасибо за просмотр!", width, height, 60)
-             outro_txt = ImageClip(np.array(txt_img)).set_duration(2)
-             
+        outro_clip = _create_background_clip(
+            width, height, LONG_FORM_OUTRO_SEC, fps, "outro", _background_spec(config, "outro")
+        )
+        outro_txt = text_rendering.make_text_clip(
+            "Спасибо за просмотр!", width, height, 60, LONG_FORM_OUTRO_SEC, engine=text_engine, scale=profile.scale
+        )
+        
         outro_clip = CompositeVideoClip([outro_clip, outro_txt])
-        clips.append(outro_clip)
+        segment_clips.append(outro_clip)
         
         # Объединить все клипы
-        final_clip = concatenate_videoclips(clips)
+        final_clip = clips.track(concatenate_videoclips(segment_clips))
         
-        # Экспорт
-        final_clip.write_videofile(
-            str(output_path),
-            fps=fps,
-            codec="libx264",
-            audio_codec="aac",
-            bitrate=VIDEO_CONFIG["long_form"]["bitrate"],
-            verbose=False,
-            logger=None,
+        subtitles = _prepare_subtitles(
+            config, script, "long_form", block_durations, output_path, lead_in=LONG_FORM_INTRO_SEC
+        )
+        extra_outputs, _ = _extra_outputs(
+            config, script, "long_form", block_durations, output_path, formats, lead_in=LONG_FORM_INTRO_SEC
         )
         
+        # Экспорт
+        settings = _encoder_settings(config, "long_form", profile)
+        total_duration = LONG_FORM_INTRO_SEC + sum(block_durations.values()) + LONG_FORM_OUTRO_SEC
+        with profiling.stage("encode", frames=round(total_duration * fps)):
+            video_encoder.write_clip(
+                final_clip, output_path, settings.with_overrides(video_filter=_subtitle_filter(subtitles)),
+                **({"extra_outputs": extra_outputs} if extra_outputs else {}),
+            )
+        
         logger.info(f"✅ Long-form video created: {output_path}")
         return output_path
     
     except Exception as e:
         logger.error(f"❌ Long-form rendering failed: {e}")
         raise
+    
+    finally:
+        clips.close()
 
 
 def _render_ad(
     config: ProjectConfig,
     script: dict[str, Any],
     audio_map: dict[str, Any],
+    preview: bool = False,
+    formats: tuple[_FormatOutput, ...] = (),
 ) -> Path:
     """
-    Render ad video (9:16 vertical, 15-30 сек).
+    Render ad video (9:16 vertical, 15-30 сек), plus `formats`.
     """
     project_slug = str(config.project.get("name", "project")).replace(" ", "_")
     output_dir = Path("output") / "videos" / project_slug
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    output_path = output_dir / "ad.mp4"
+    profile = _render_profile("ad", preview)
+    output_path = _output_path(output_dir, "ad", profile)
+    clips = ClipScope("ad")
     
     try:
-        width, height = VIDEO_CONFIG["ad"]["width"], VIDEO_CONFIG["ad"]["height"]
-        fps = VIDEO_CONFIG["ad"]["fps"]
+        width, height = profile.width, profile.height
+        fps = profile.fps
         duration = audio_map["total_duration_sec"]
         
-        # Фоновое видео
-        bg_clip = _create_background_clip(width, height, duration, fps, "ad")
-        
         # Текст продукта
         product_id = script.get("product_id", "Специальное предложение")
+        subtitles = _prepare_subtitles(config, script, "ad", {"main": duration}, output_path)
+        extra_outputs, _ = _extra_outputs(config, script, "ad", {"main": duration}, output_path, formats)
         
-        try:
-            txt_clip = TextClip(
-                product_id,
-                fontsize=70,
-                color="yellow",
-                font="Arial-Bold",
-            ).set_position("center").set_duration(duration)
-        except:
-            txt_img = _create_text_frame(product_id, width, height, 70, (255, 255, 0))
-            txt_clip = ImageClip(np.array(txt_img)).set_duration(duration)
+        if _still_fast_path_enabled(config):
+            background = _background_spec(config, "ad")
+            with profiling.stage("encode", frames=round(duration * fps)):
+                _render_library_still(
+                    config,
+                    ("ad", product_id, 70, (255, 255, 0), background),
+                    lambda: _compose_still_frame(
+                        width, height, "ad", product_id, 70, (255, 255, 0), scale=profile.scale, background=background
+                    ),
+                    output_path,
+                    duration,
+                    profile,
+                    audio_map["blocks"]["main"],
+                    _subtitle_filter(subtitles),
+                    extra_outputs,
+                )
+            logger.info(f"✅ Ad video created (still): {output_path}")
+            return output_path
+        
+        # Фоновое видео
+        bg_clip = _create_background_clip(width, height, duration, fps, "ad", _background_spec(config, "ad"))
+        
+        txt_clip = text_rendering.make_text_clip(
+            product_id, width, height, 70, duration, (255, 255, 0),
+            engine=_text_engine(config), scale=profile.scale,
+        )
         
         # Аудио
         audio_path = audio_map["blocks"]["main"]
-        audio_clip = AudioFileClip(audio_path)
+        audio_clip = clips.track(AudioFileClip(audio_path))
         
         # Компоновка
-        final_clip = CompositeVideoClip([bg_clip, txt_clip])
+        final_clip = clips.track(CompositeVideoClip([bg_clip, txt_clip]))
         final_clip = final_clip.set_audio(audio_clip)
         
         # Экспорт
-        final_clip.write_videofile(
-            str(output_path),
-            fps=fps,
-            codec="libx264",
-            audio_codec="aac",
-            bitrate=VIDEO_CONFIG["ad"]["bitrate"],
-            verbose=False,
-            logger=None,
-        )
+        settings = _encoder_settings(config, "ad", profile)
+        with profiling.stage("encode", frames=round(duration * fps)):
+            video_encoder.write_clip(
+                final_clip, output_path, settings.with_overrides(video_filter=_subtitle_filter(subtitles)),
+                **({"extra_outputs": extra_outputs} if extra_outputs else {}),
+            )
         
         logger.info(f"✅ Ad video created: {output_path}")
         return output_path
@@ -522,6 +1677,9 @@ def _render_ad(
     except Exception as e:
         logger.error(f"❌ Ad rendering failed: {e}")
         raise
+    
+    finally:
+        clips.close()
 
 
 # ============ MAIN FUNCTION ============
@@ -531,6 +1689,7 @@ def render(
     script: Any,
     audio_map: Any,
     mode: str,
+    preview: bool = False,
 ) -> Path:
     """
     Main entry point for video rendering.
@@ -540,24 +1699,104 @@ def render(
         script: Generated script dict
         audio_map: Output from tts_generator.synthesize()
         mode: "shorts" | "long_form" | "ad"
+        preview: Draft render for QA (quarter resolution, PREVIEW_FPS,
+            ultrafast preset) written to `<mode>_preview.mp4`
     
     Returns:
         Path to generated MP4 file
     """
+    return _render(config, script, audio_map, mode, preview)
+
+
+def _render(
+    config: ProjectConfig,
+    script: Any,
+    audio_map: Any,
+    mode: str,
+    preview: bool = False,
+    formats: list[str] | None = None,
+) -> Path:
+    """Render `mode`, encoding `formats` other than its own aspect in the same pass."""
+    global _segment_stats
+    # Статистика сегментов есть только у still long-form: прошлый рендер не должен просвечивать
+    _segment_stats = None
     
     try:
+        if mode not in VIDEO_CONFIG:
+            raise ValueError(f"Unknown mode: {mode}")
+        extra_formats = _format_outputs(config, mode, formats or [], preview)
+        
         if mode == "shorts":
-            return _render_shorts(config, script, audio_map)
+            return _render_shorts(config, script, audio_map, preview=preview, formats=extra_formats)
         
         elif mode == "long_form":
-            return _render_long_form(config, script, audio_map)
-        
-        elif mode == "ad":
-            return _render_ad(config, script, audio_map)
+            return _render_long_form(config, script, audio_map, preview=preview, formats=extra_formats)
         
         else:
-            raise ValueError(f"Unknown mode: {mode}")
+            return _render_ad(config, script, audio_map, preview=preview, formats=extra_formats)
     
     except Exception as e:
         logger.error(f"❌ Video rendering failed: {e}")
         raise RuntimeError(f"Video rendering error: {e}") from e
+
+
+def _output_formats(config: ProjectConfig, formats: list[str] | None) -> list[str]:
+    """Requested formats, else `video.output_formats`, else all OUTPUT_FORMATS."""
+    if not formats:
+        formats = _video_config(config).get("output_formats") or list(OUTPUT_FORMATS)
+    if isinstance(formats, str):
+        formats = formats.split(",")
+    formats = list(dict.fromkeys(str(f).strip() for f in formats if str(f).strip()))
+    unknown = [f for f in formats if f not in OUTPUT_FORMATS]
+    if unknown:
+        raise RuntimeError(f"Unknown output format(s): {', '.join(unknown)} (expected {', '.join(OUTPUT_FORMATS)})")
+    return formats
+
+
+def _format_outputs(
+    config: ProjectConfig, mode: str, formats: list[str], preview: bool = False
+) -> tuple[_FormatOutput, ...]:
+    """`formats` other than the mode's own aspect, scaled like its render profile."""
+    formats = [fmt for fmt in formats if fmt != VIDEO_CONFIG[mode]["aspect"]]
+    if not formats:
+        return ()
+    fit = _video_config(config).get("output_fit") or ffmpeg_utils.DEFAULT_FIT
+    if fit not in ffmpeg_utils.FIT_MODES:
+        raise RuntimeError(f"Unknown video.output_fit: {fit} (expected one of {', '.join(ffmpeg_utils.FIT_MODES)})")
+    profile = _render_profile(mode, preview)
+    outputs = []
+    for fmt in formats:
+        target = _scaled_profile({**OUTPUT_FORMATS[fmt], "fps": profile.fps}, preview)
+        outputs.append(_FormatOutput(fmt, target.width, target.height, target.bitrate, fit))
+    return tuple(outputs)
+
+
+def render_formats(
+    config: ProjectConfig,
+    script: Any,
+    audio_map: Any,
+    mode: str,
+    formats: list[str] | None = None,
+    preview: bool = False,
+) -> dict[str, Path]:
+    """
+    Render once and publish the result in several aspect ratios.
+    
+    The frames are produced a single time in the mode's own aspect, and the
+    ffmpeg process that encodes them splits them into one branch per format
+    (scale + center-crop, or scale + pad with `video.output_fit: pad`), each
+    with its own bitrate from OUTPUT_FORMATS and its own burned-in
+    subtitles. Every output, the native one included, is encoded exactly
+    once; no finished video is decoded again.
+    
+    Returns:
+        {format: path} in the order of `formats`, e.g. {"9:16": ..., "1:1": ...}
+    """
+    formats = _output_formats(config, formats)
+    if len(formats) > 1:
+        logger.info(f"🪟 Rendering {mode} in {len(formats)} formats in one pass: {', '.join(formats)}")
+    output_path = _render(config, script, audio_map, mode, preview, formats)
+    
+    outputs = {fmt.format: fmt.path_for(output_path) for fmt in _format_outputs(config, mode, formats, preview)}
+    outputs[VIDEO_CONFIG[mode]["aspect"]] = output_path
+    return {fmt: outputs[fmt] for fmt in formats}
@@ -8,7 +8,7 @@ from collections.abc import Mapping
 from pathlib import Path
 from typing import Any
 
-from core.utils import config_loader, logging_utils
+from core.utils import config_loader, logging_utils, profiling, rate_limiter
 
 
 def _get_platforms(config: config_loader.ProjectConfig, platforms_arg: str | None) -> list[str]:
@@ -49,6 +49,12 @@ def main(args: argparse.Namespace) -> int:
         logging_utils.log_error(f"Config validation failed: {e}", e)
         return 1
 
+    # Namespaces built by other entry points may not carry the flag
+    preview = bool(getattr(args, "preview", False))
+    formats = getattr(args, "formats", None)
+    profiler = profiling.reset_profiler(config, getattr(args, "profile", None))
+    rate_limiter.reset_rate_limiter(config)
+
     # Get API key for script generation
     api_key = os.getenv("GOOGLE_AI_API_KEY")
     if not api_key:
@@ -68,16 +74,17 @@ def main(args: argparse.Namespace) -> int:
         logging_utils.log_info("="*70 + "\n")
 
         logging_utils.log_info("📝 Step 1: Generating script...")
-        if args.mode == "shorts":
-            script: Any = script_generator.generate_short(config, target_date=args.date, api_key=api_key)
-        elif args.mode == "long_form":
-            script = script_generator.generate_long_form(config, target_date=args.date, api_key=api_key)
-        elif args.mode == "ad":
-            if not args.product_id:
-                raise ValueError("--product-id is required for mode=ad")
-            script = script_generator.generate_ad(config, product_id=args.product_id, target_date=args.date, api_key=api_key)
-        else:
-            raise ValueError(f"Unknown mode: {args.mode}")
+        with profiler.stage("script"):
+            if args.mode == "shorts":
+                script: Any = script_generator.generate_short(config, target_date=args.date, api_key=api_key)
+            elif args.mode == "long_form":
+                script = script_generator.generate_long_form(config, target_date=args.date, api_key=api_key)
+            elif args.mode == "ad":
+                if not args.product_id:
+                    raise ValueError("--product-id is required for mode=ad")
+                script = script_generator.generate_ad(config, product_id=args.product_id, target_date=args.date, api_key=api_key)
+            else:
+                raise ValueError(f"Unknown mode: {args.mode}")
 
         # Log ModelRouter statistics
         router = get_router(api_key)
@@ -95,14 +102,27 @@ def main(args: argparse.Namespace) -> int:
             logging_utils.send_telegram_alert(config, f"❌ Script generation failed: {str(e)}")
         return 1
 
+    # Stock footage only depends on the script: fetch it while TTS runs
+    video_renderer = None
+    try:
+        from core.generators import video_renderer
+
+        video_renderer.prefetch_stock(config, script, args.mode, preview=preview)
+    except Exception as e:
+        logging_utils.log_info(f"⚠️ Stock prefetch not started: {e}")
+
     try:
         from core.generators import tts_generator
 
+        tts_generator.reset_tts_cache(config)
         logging_utils.log_info("🎤 Step 2: Generating audio...")
-        audio_map = tts_generator.synthesize(config, script, args.mode, api_key=api_key)
+        with profiler.stage("tts"):
+            audio_map = tts_generator.synthesize(config, script, args.mode, api_key=api_key)
         logging_utils.log_info(f"✅ Generated {len(audio_map) if isinstance(audio_map, (list, dict)) else 'N/A'} audio blocks\n")
     except Exception as e:
         logging_utils.log_error(f"TTS synthesis failed: {e}", e)
+        if video_renderer is not None:
+            video_renderer.discard_stock_prefetch()
         if config.monitoring.telegram_notifications:
             logging_utils.send_telegram_alert(config, f"❌ TTS failed: {str(e)}")
         return 1
@@ -111,8 +131,19 @@ def main(args: argparse.Namespace) -> int:
         from core.generators import video_renderer
         from core.utils.model_router import get_router
 
-        logging_utils.log_info("🎬 Step 3: Rendering video...")
-        video_path = video_renderer.render(config, script, audio_map, args.mode)
+        logging_utils.log_info("🎬 Step 3: Rendering video..." + (" (preview)" if preview else ""))
+        outputs = None
+        with profiler.stage("render"):
+            if formats:
+                outputs = video_renderer.render_formats(
+                    config, script, audio_map, args.mode, formats.split(","), preview=preview
+                )
+                video_path = outputs.get(video_renderer.VIDEO_CONFIG[args.mode]["aspect"]) or next(iter(outputs.values()))
+            else:
+                video_path = video_renderer.render(config, script, audio_map, args.mode, preview=preview)
+        if outputs:
+            for fmt, path in outputs.items():
+                logging_utils.log_info(f"   {fmt}: {path}")
         logging_utils.log_info(f"✅ Video created: {video_path}\n")
     except Exception as e:
         logging_utils.log_error(f"Video rendering failed: {e}", e)
@@ -131,17 +162,24 @@ def main(args: argparse.Namespace) -> int:
             "date": args.date,
             "mode": args.mode,
             "project": args.project,
+            "preview": preview,
             "video_path": str(video_path),
+            "outputs": {fmt: str(path) for fmt, path in outputs.items()} if outputs else None,
             "script_path": script.get("_script_path", ""),
             "script_length": len(script.get("script", "")),
             "audio_blocks": len(audio_map) if isinstance(audio_map, (list, dict)) else 0,
             "generation_stats": stats,
+            "render_stats": video_renderer.get_render_stats(),
+            "tts_stats": tts_generator.get_tts_stats(),
+            "tts_cache_hits": audio_map.get("cache_hits", []) if isinstance(audio_map, dict) else [],
+            "rate_limit_stats": rate_limiter.get_rate_limit_stats(),
+            "profile": profiler.report(),
             "generated_at": datetime.datetime.now().isoformat(),
         }
         
         metadata_dir = Path("output") / "metadata"
         metadata_dir.mkdir(parents=True, exist_ok=True)
-        metadata_path = metadata_dir / f"{args.date}_{args.mode}.json"
+        metadata_path = metadata_dir / f"{args.date}_{args.mode}{'_preview' if preview else ''}.json"
         
         with open(metadata_path, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, indent=2, ensure_ascii=False)
@@ -164,7 +202,9 @@ def main(args: argparse.Namespace) -> int:
 
     logging_utils.log_success(f"Video created: {video_path}")
 
-    if not args.dry_run and args.upload:
+    if preview and args.upload:
+        logging_utils.log_info("Preview render: upload skipped")
+    elif not args.dry_run and args.upload:
         platforms = _get_platforms(config, args.platforms)
         for platform in platforms:
             try:
@@ -203,6 +243,20 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--dry-run", action="store_true", dest="dry_run")
     parser.add_argument("--upload", action="store_true")
     parser.add_argument("--product-id", dest="product_id", help="For ad mode")
+    parser.add_argument(
+        "--preview",
+        action="store_true",
+        help="Fast draft render for QA (quarter resolution, 15 fps, never uploaded)",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=list(profiling.PROFILERS),
+        help="Dump a cProfile/pyinstrument profile per pipeline stage to output/profiles",
+    )
+    parser.add_argument(
+        "--formats",
+        help="Comma-separated aspect ratios to publish from one render (9:16,16:9,1:1)",
+    )
     return parser
 
 
@@ -0,0 +1,343 @@
+"""core.utils.audio_mixer
+
+Background music and sound effects under the narration, mixed with NumPy.
+
+The narration, music and effect WAVs are memory-mapped (16-bit PCM or
+32-bit float), never decoded as a whole and never round-tripped through
+pydub. Mixing runs in fixed-size blocks:
+
+1. one pass over the narration computes a windowed RMS envelope (one value
+   per `window_sec`, a few thousand floats for a long video);
+2. the envelope becomes a ducking gain curve: music drops by `duck_db`
+   wherever the voice is above `threshold_db`, a little before the voice
+   starts (the mix is offline, so we can look ahead) and smoothly after it
+   stops;
+3. for every output block the music is looped (and resampled/downmixed to
+   the narration layout) by index arithmetic, multiplied by the ducking,
+   fade and gain curves, effects are added, and the clipped int16 block is
+   written out.
+
+Memory is bounded by the block size plus the envelope, whatever the length.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import struct
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+from core.utils.config_loader import ProjectConfig
+
+logger = logging.getLogger(__name__)
+
+BLOCK_FRAMES = 1 << 16
+
+_FORMAT_PCM = 1
+_FORMAT_FLOAT = 3
+_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass
+class WavData:
+    """Memory-mapped WAV samples, shape (frames, channels)."""
+
+    path: Path
+    sample_rate: int
+    channels: int
+    samples: np.ndarray
+
+    @property
+    def frames(self) -> int:
+        return self.samples.shape[0]
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate
+
+    def block(self, start: int, stop: int) -> np.ndarray:
+        """Frames [start, stop) as float32 in [-1, 1]."""
+        return _to_float(self.samples[start:stop])
+
+    def take(self, indices: np.ndarray) -> np.ndarray:
+        """Frames at `indices` as float32 in [-1, 1]."""
+        return _to_float(self.samples[indices])
+
+
+@dataclass
+class SoundEffect:
+    """A WAV placed at `at_sec` on the narration timeline."""
+
+    path: Path
+    at_sec: float = 0.0
+    gain_db: float = 0.0
+
+
+@dataclass
+class MixSettings:
+    """Music level, ducking and fades (levels in dB, times in seconds)."""
+
+    music_gain_db: float = -18.0
+    duck_db: float = -12.0
+    threshold_db: float = -40.0
+    window_sec: float = 0.05
+    attack_sec: float = 0.15
+    release_sec: float = 0.4
+    fade_in_sec: float = 1.0
+    fade_out_sec: float = 2.0
+    effects: list[SoundEffect] = field(default_factory=list)
+
+
+def _to_float(samples: np.ndarray) -> np.ndarray:
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) * (1.0 / 32768.0)
+    return np.array(samples, dtype=np.float32)  # copy: memmaps are read-only
+
+
+def _db_to_gain(db: float) -> float:
+    return float(10.0 ** (db / 20.0))
+
+
+def read_wav(path: str | Path) -> WavData:
+    """
+    Memory-map a 16-bit PCM or 32-bit float WAV.
+
+    Raises ValueError for other sample formats or malformed files.
+    """
+    path = Path(path)
+    size = path.stat().st_size
+    fmt = None
+    with open(path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"Not a WAV file: {path}")
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"No data chunk in {path}")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", f.read(16))
+                f.seek(chunk_size - 16 + (chunk_size & 1), 1)
+            elif chunk_id == b"data":
+                offset = f.tell()
+                break
+            else:
+                f.seek(chunk_size + (chunk_size & 1), 1)
+
+    if fmt is None:
+        raise ValueError(f"No fmt chunk in {path}")
+    format_tag, channels, sample_rate, _, _, bits = fmt
+    if format_tag == _FORMAT_EXTENSIBLE:
+        format_tag = _FORMAT_FLOAT if bits == 32 else _FORMAT_PCM
+    if format_tag == _FORMAT_PCM and bits == 16:
+        dtype = np.dtype("<i2")
+    elif format_tag == _FORMAT_FLOAT and bits == 32:
+        dtype = np.dtype("<f4")
+    else:
+        raise ValueError(f"Unsupported WAV format in {path}: tag {format_tag}, {bits} bit")
+
+    # Streaming writers leave 0 / 0xFFFFFFFF in the header: trust the file size
+    data_size = min(chunk_size, size - offset) if chunk_size else size - offset
+    frames = data_size // (dtype.itemsize * channels)
+    if frames == 0:
+        samples = np.zeros((0, channels), dtype=dtype)
+    else:
+        samples = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(frames, channels))
+    return WavData(path, sample_rate, channels, samples)
+
+
+def _blocks(frames: int, block_frames: int) -> Iterator[tuple[int, int]]:
+    for start in range(0, frames, block_frames):
+        yield start, min(start + block_frames, frames)
+
+
+def rms_envelope(voice: WavData, window_sec: float = 0.05, block_frames: int = BLOCK_FRAMES) -> np.ndarray:
+    """RMS level in dBFS of every `window_sec` window of `voice` (channels averaged)."""
+    window = max(1, round(voice.sample_rate * window_sec))
+    block_frames = max(window, block_frames // window * window)
+    levels = []
+    for start, stop in _blocks(voice.frames, block_frames):
+        block = voice.block(start, stop)
+        block = block[:, 0] if voice.channels == 1 else block.mean(axis=1)
+        pad = -len(block) % window
+        if pad:
+            block = np.pad(block, (0, pad))
+        power = np.mean(block.reshape(-1, window) ** 2, axis=1)
+        levels.append(10.0 * np.log10(power + 1e-12))
+    if not levels:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(levels).astype(np.float32)
+
+
+def ducking_curve(envelope: np.ndarray, settings: MixSettings) -> np.ndarray:
+    """
+    Music gain per envelope window (1.0 = full level).
+
+    Windows with voice get `duck_db`; the ducked region is widened by
+    `attack_sec` on both sides (a moving minimum) and then smoothed over
+    `release_sec` (a moving average), so the music dips just before speech
+    and recovers gradually after it.
+    """
+    if envelope.size == 0:
+        return np.ones(0, dtype=np.float32)
+    duck = _db_to_gain(settings.duck_db)
+    gain = np.where(envelope > settings.threshold_db, duck, 1.0).astype(np.float32)
+
+    hold = max(1, round(settings.attack_sec / settings.window_sec))
+    if hold > 1:
+        padded = np.pad(gain, (hold // 2, hold - 1 - hold // 2), mode="edge")
+        gain = np.lib.stride_tricks.sliding_window_view(padded, hold).min(axis=1)
+
+    smooth = max(1, round(settings.release_sec / settings.window_sec))
+    if smooth > 1:
+        padded = np.pad(gain, (smooth // 2, smooth - 1 - smooth // 2), mode="edge")
+        gain = np.convolve(padded, np.full(smooth, 1.0 / smooth, dtype=np.float32), mode="valid")
+    return gain.astype(np.float32)
+
+
+def _fit_channels(block: np.ndarray, channels: int) -> np.ndarray:
+    if block.shape[1] == channels:
+        return block
+    # matmul instead of mean(axis=1): a strided reduce is several times slower
+    mono = block @ np.full((block.shape[1], 1), 1.0 / block.shape[1], dtype=np.float32)
+    return mono if channels == 1 else np.repeat(mono, channels, axis=1)
+
+
+def _looped_frames(music: WavData, start: int, count: int) -> np.ndarray:
+    """`count` music frames from `start`, wrapping around the end, as float32."""
+    parts = []
+    start %= music.frames
+    while count > 0:
+        stop = min(music.frames, start + count)
+        parts.append(music.samples[start:stop])
+        count -= stop - start
+        start = 0
+    return _to_float(parts[0] if len(parts) == 1 else np.concatenate(parts))
+
+
+def _music_block(
+    music: WavData, out_rate: int, channels: int, start: int, stop: int, offset_sec: float
+) -> np.ndarray:
+    """
+    Looped music for output frames [start, stop) in the output layout.
+
+    Only the contiguous source span the block needs is read; it is
+    downmixed first and then resampled linearly (or decimated/copied when
+    the rates line up).
+    """
+    frames = stop - start
+    step = music.sample_rate / out_rate
+    first = start * step + offset_sec * music.sample_rate
+    base = math.floor(first)
+    count = math.ceil((frames - 1) * step + first - base) + 2
+    source = _fit_channels(_looped_frames(music, base, count), channels)
+    if step.is_integer() and first == base:
+        return source[: frames * int(step) : int(step)]
+    position = np.arange(frames) * step + (first - base)
+    grid = np.arange(count)
+    return np.stack(
+        [np.interp(position, grid, source[:, c]) for c in range(channels)], axis=1
+    ).astype(np.float32)
+
+
+def _fade_curve(times: np.ndarray, total: float, fade_in: float, fade_out: float) -> np.ndarray:
+    gain = np.ones(len(times), dtype=np.float32)
+    if fade_in > 0:
+        gain *= np.clip(times / fade_in, 0.0, 1.0)
+    if fade_out > 0:
+        gain *= np.clip((total - times) / fade_out, 0.0, 1.0)
+    return gain
+
+
+def mix_to_wav(
+    voice_path: str | Path,
+    output_path: str | Path,
+    music_path: str | Path | None = None,
+    settings: MixSettings | None = None,
+    music_offset_sec: float = 0.0,
+    fade_in: bool = True,
+    fade_out: bool = True,
+    block_frames: int = BLOCK_FRAMES,
+) -> float:
+    """
+    Mix `music_path` (looped, ducked, faded) and `settings.effects` under
+    the narration at `voice_path` and write a 16-bit WAV with the
+    narration's sample rate, channels and length.
+
+    `music_offset_sec` starts the music loop mid-track, so consecutive
+    blocks of one video (long_form) continue the same music; `fade_in` /
+    `fade_out` select which ends of this file get the music fades.
+    Returns the duration in seconds.
+    """
+    settings = settings or MixSettings()
+    voice = read_wav(voice_path)
+    music = read_wav(music_path) if music_path else None
+    if music is not None and music.frames == 0:
+        music = None
+    effects = []
+    for effect in settings.effects:
+        data = read_wav(effect.path)
+        if data.sample_rate != voice.sample_rate:
+            logger.warning(f"Sound effect {data.path.name} is {data.sample_rate} Hz, expected {voice.sample_rate} Hz")
+        if data.frames:
+            start = round(effect.at_sec * voice.sample_rate)
+            effects.append((data, start, _db_to_gain(effect.gain_db)))
+
+    rate, channels = voice.sample_rate, voice.channels
+    curve = None
+    if music is not None:
+        curve = ducking_curve(rms_envelope(voice, settings.window_sec, block_frames), settings)
+        window = max(1, round(rate * settings.window_sec))
+        centers = (np.arange(len(curve), dtype=np.float64) + 0.5) * window
+    music_gain = _db_to_gain(settings.music_gain_db)
+    fade_in_sec = settings.fade_in_sec if fade_in else 0.0
+    fade_out_sec = settings.fade_out_sec if fade_out else 0.0
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(output_path), "wb") as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        for start, stop in _blocks(voice.frames, block_frames):
+            mix = voice.block(start, stop)
+            if music is not None:
+                frames = np.arange(start, stop, dtype=np.float64)
+                gain = np.interp(frames, centers, curve).astype(np.float32)
+                if start < fade_in_sec * rate or stop > (voice.duration - fade_out_sec) * rate:
+                    gain *= _fade_curve(frames / rate, voice.duration, fade_in_sec, fade_out_sec)
+                bed = _music_block(music, rate, channels, start, stop, music_offset_sec)
+                mix += bed * (gain * music_gain)[:, None]
+            for data, at, effect_gain in effects:
+                lo, hi = max(start, at), min(stop, at + data.frames)
+                if lo >= hi:
+                    continue
+                mix[lo - start:hi - start] += _fit_channels(data.block(lo - at, hi - at), channels) * effect_gain
+            np.clip(mix, -1.0, 1.0, out=mix)
+            out.writeframes((mix * 32767.0).astype("<i2").tobytes())
+
+    logger.info(f"🎵 Mixed audio: {output_path} ({voice.duration:.1f}s)")
+    return voice.duration
+
+
+def settings_from_config(config: ProjectConfig) -> MixSettings:
+    """MixSettings from `audio.background_music`; keys that are not set keep their defaults."""
+    section = config.audio.get("background_music", {})
+    values: dict[str, float] = {}
+    for key in (
+        "music_gain_db", "duck_db", "threshold_db", "window_sec",
+        "attack_sec", "release_sec", "fade_in_sec", "fade_out_sec",
+    ):
+        value = section.get(key)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"audio.background_music.{key} must be a number, got {value!r}")
+        values[key] = float(value)
+    return MixSettings(**values)
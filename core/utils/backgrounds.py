@@ -0,0 +1,251 @@
+"""core.utils.backgrounds
+
+NumPy background engine shared by the video renderer and SlideRenderer.
+
+- Backgrounds are described by a `BackgroundSpec`: solid, linear or radial
+  gradient between two colors, or an animated gradient whose colors drift
+  slowly and repeat every `period` seconds.
+- The gradient geometry is computed once per (size, kind, angle) with
+  broadcasting and stored as a uint8 index map. A frame is then a single
+  color lookup (256-entry table) written into a preallocated buffer, so no
+  per-pixel float math happens per frame.
+- Animated backgrounds are periodic: their frames are rendered once as a
+  fixed loop and replayed. When the gradient runs along an axis (the
+  default top-to-bottom drift) every row or column of a frame is the same,
+  so the loop keeps a single column or row per frame and frames are
+  read-only broadcast views of it: a 1080x1920 loop of 8 s at 30 fps takes
+  1.4 MB instead of 1.5 GB. Full-frame loops are cached only while all
+  cached loops fit in LOOP_CACHE_MAX_BYTES; larger ones are rendered on
+  the fly into one reused buffer.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Mapping
+
+import numpy as np
+from PIL import ImageColor
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_TYPES = ("solid", "linear", "radial", "animated")
+# Config aliases (projects/*/config.yaml uses "gradient")
+_TYPE_ALIASES = {"gradient": "linear", "linear_gradient": "linear", "radial_gradient": "radial"}
+
+DEFAULT_PERIOD_SEC = 8.0
+# Budget for all cached loops together (LOOP_CACHE_SIZE of them at most)
+LOOP_CACHE_MAX_BYTES = 256 * 1024 * 1024
+LOOP_CACHE_SIZE = 2
+
+
+@dataclass(frozen=True)
+class BackgroundSpec:
+    """What to draw; hashable, so it can key caches and segment hashes."""
+
+    kind: str = "solid"
+    primary: tuple[int, int, int] = (20, 10, 40)
+    secondary: tuple[int, int, int] | None = None
+    angle: float = 90.0  # linear/animated direction in degrees, 90 = top to bottom
+    period: float = DEFAULT_PERIOD_SEC  # animated: seconds until the drift repeats
+
+    @property
+    def animated(self) -> bool:
+        return self.kind == "animated"
+
+
+def parse_color(color: Any, default: tuple[int, int, int] = (255, 255, 255)) -> tuple[int, int, int]:
+    """RGB tuple from a tuple, #hex or CSS color name."""
+    if isinstance(color, (tuple, list)) and len(color) >= 3:
+        return tuple(int(c) for c in color[:3])
+    try:
+        return ImageColor.getrgb(str(color))[:3]
+    except ValueError:
+        logger.warning(f"Unknown color '{color}', using {default}")
+        return default
+
+
+def shade(color: tuple[int, int, int], factor: float) -> tuple[int, int, int]:
+    """Color scaled towards black (factor < 1) or brighter (factor > 1)."""
+    return tuple(int(max(0, min(255, round(c * factor)))) for c in color)
+
+
+def spec_from_design(
+    design: Mapping[str, Any] | None,
+    primary: tuple[int, int, int] | None = None,
+    secondary: tuple[int, int, int] | None = None,
+) -> BackgroundSpec:
+    """
+    BackgroundSpec from a `design` config section.
+
+    Reads `background_type` (solid | gradient/linear | radial | animated),
+    `background_color`, `background_secondary`, `background_angle` and
+    `background_period`. Explicit `primary`/`secondary` override the design
+    colors (e.g. per-block styles); a missing secondary is a darker shade.
+    """
+    design = design if hasattr(design, "get") else {}
+
+    def setting(key: str, types: tuple) -> Any:
+        value = design.get(key)
+        return value if isinstance(value, types) and not isinstance(value, bool) else None
+
+    kind = (setting("background_type", (str,)) or "solid").lower()
+    kind = _TYPE_ALIASES.get(kind, kind)
+    if kind not in BACKGROUND_TYPES:
+        logger.warning(f"Unknown background_type '{kind}', using solid")
+        kind = "solid"
+
+    if primary is None:
+        primary = parse_color(setting("background_color", (str, tuple, list)) or "#2B1B3D")
+    if secondary is None and kind != "solid":
+        color = setting("background_secondary", (str, tuple, list))
+        secondary = parse_color(color) if color else shade(primary, 0.45)
+
+    angle = setting("background_angle", (int, float))
+    period = setting("background_period", (int, float))
+    return BackgroundSpec(
+        kind=kind,
+        primary=primary,
+        secondary=secondary if kind != "solid" else None,
+        angle=float(angle) if angle is not None else 90.0,
+        period=float(period) if period and period > 0 else DEFAULT_PERIOD_SEC,
+    )
+
+
+@lru_cache(maxsize=16)
+def _index_map(width: int, height: int, kind: str, angle: float) -> np.ndarray:
+    """Gradient position of every pixel as uint8 0..255 (read-only, cached)."""
+    ys = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None]
+    xs = np.linspace(0.0, 1.0, width, dtype=np.float32)[None, :]
+    if kind == "radial":
+        # Distance from the center, 1.0 at the corners
+        aspect = width / height
+        dist = np.sqrt(((xs - 0.5) * aspect) ** 2 + (ys - 0.5) ** 2)
+        weights = dist / dist.max()
+    else:
+        rad = math.radians(angle)
+        dx, dy = math.cos(rad), math.sin(rad)
+        proj = xs * dx + ys * dy
+        lo, hi = min(0.0, dx) + min(0.0, dy), max(0.0, dx) + max(0.0, dy)
+        weights = (proj - lo) / ((hi - lo) or 1.0)
+    index = np.rint(weights * 255).astype(np.uint8)
+    index.flags.writeable = False
+    return index
+
+
+def _palette(spec: BackgroundSpec, t: float) -> np.ndarray:
+    """256x3 uint8 color table for gradient positions 0..255 at time `t`."""
+    primary = np.asarray(spec.primary, dtype=np.float32)
+    secondary = np.asarray(spec.secondary or spec.primary, dtype=np.float32)
+    pos = np.linspace(0.0, 1.0, 256, dtype=np.float32)
+    if spec.animated:
+        # Band of colors sliding across the frame, back where it started after `period`
+        pos = 0.5 - 0.5 * np.cos(2 * np.pi * (pos + t / spec.period))
+    colors = primary + (secondary - primary) * pos[:, None]
+    return np.rint(colors).astype(np.uint8)
+
+
+def render_frame(
+    spec: BackgroundSpec,
+    width: int,
+    height: int,
+    t: float = 0.0,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Background frame at time `t` as an (height, width, 3) uint8 array.
+
+    Pass `out` to reuse a preallocated buffer.
+    """
+    if out is None:
+        out = np.empty((height, width, 3), dtype=np.uint8)
+    if spec.kind == "solid" or spec.secondary is None:
+        out[...] = spec.primary
+        return out
+    kind = "linear" if spec.animated else spec.kind
+    np.take(_palette(spec, t), _index_map(width, height, kind, spec.angle), axis=0, out=out)
+    return out
+
+
+def loop_frame_count(spec: BackgroundSpec, fps: int) -> int:
+    """Frames in one animation period (at least 1)."""
+    return max(1, round(spec.period * fps))
+
+
+def _loop_shape(spec: BackgroundSpec, width: int, height: int) -> tuple[int, int]:
+    """
+    (height, width) of one stored loop frame.
+
+    A single column when every row of the gradient is the same color, a
+    single row when every column is, else the full frame.
+    """
+    index = _index_map(width, height, "linear", spec.angle)
+    if (index == index[:, :1]).all():
+        return height, 1
+    if (index == index[:1, :]).all():
+        return 1, width
+    return height, width
+
+
+@lru_cache(maxsize=LOOP_CACHE_SIZE)
+def _frame_loop(spec: BackgroundSpec, width: int, height: int, fps: int) -> np.ndarray:
+    """All (`_loop_shape`) frames of one animation period in one array (read-only)."""
+    count = loop_frame_count(spec, fps)
+    loop_height, loop_width = _loop_shape(spec, width, height)
+    index = _index_map(width, height, "linear", spec.angle)[:loop_height, :loop_width]
+    frames = np.empty((count, loop_height, loop_width, 3), dtype=np.uint8)
+    for i in range(count):
+        np.take(_palette(spec, i / fps), index, axis=0, out=frames[i])
+    frames.flags.writeable = False
+    logger.debug(f"Background loop cached: {count} frames {loop_width}x{loop_height} for {width}x{height}")
+    return frames
+
+
+def frame_source(spec: BackgroundSpec, width: int, height: int, fps: int):
+    """
+    `t -> frame` function for animated backgrounds.
+
+    Frames come from the cached loop when it fits in its share of
+    LOOP_CACHE_MAX_BYTES (axis-aligned gradients always do), otherwise they
+    are rendered into one reused buffer. Returned frames must not be
+    modified.
+    """
+    count = loop_frame_count(spec, fps)
+    loop_height, loop_width = _loop_shape(spec, width, height)
+    if count * loop_height * loop_width * 3 <= LOOP_CACHE_MAX_BYTES // LOOP_CACHE_SIZE:
+        frames = _frame_loop(spec, width, height, fps)
+        if (loop_height, loop_width) != (height, width):
+            return lambda t: np.broadcast_to(frames[int(round(t * fps)) % count], (height, width, 3))
+        return lambda t: frames[int(round(t * fps)) % count]
+
+    buffer = np.empty((height, width, 3), dtype=np.uint8)
+    return lambda t: render_frame(spec, width, height, (int(round(t * fps)) % count) / fps, out=buffer)
+
+
+def make_clip(spec: BackgroundSpec, width: int, height: int, duration: float, fps: int):
+    """MoviePy clip: an ImageClip for static backgrounds, a looping VideoClip when animated."""
+    from moviepy.editor import ImageClip, VideoClip
+
+    if not spec.animated:
+        return ImageClip(render_frame(spec, width, height)).set_duration(duration)
+    clip = VideoClip(frame_source(spec, width, height, fps), duration=duration)
+    return clip.set_fps(fps)
+
+
+def get_cache_stats() -> dict[str, Any]:
+    """Index-map and frame-loop cache counters."""
+    maps = _index_map.cache_info()
+    loops = _frame_loop.cache_info()
+    return {
+        "index_maps": {"hits": maps.hits, "misses": maps.misses, "size": maps.currsize},
+        "frame_loops": {"hits": loops.hits, "misses": loops.misses, "size": loops.currsize},
+    }
+
+
+def clear_caches() -> None:
+    """Drop cached index maps and frame loops."""
+    _index_map.cache_clear()
+    _frame_loop.cache_clear()
@@ -0,0 +1,88 @@
+"""core.utils.clip_scope
+
+Deterministic cleanup of MoviePy clips and readers.
+
+`VideoFileClip` and `AudioFileClip` each keep an ffmpeg reader subprocess
+and its pipes open until `close()` is called; nothing closes them when a
+render function returns, so long batch runs pile up ffmpeg processes, file
+descriptors and frame buffers. A `ClipScope` owns everything opened or
+composed during one render and closes it in reverse order on exit, even
+when the render fails:
+
+    with ClipScope() as clips:
+        audio = clips.audio(path)
+        video = clips.track(CompositeVideoClip([...]).set_audio(audio))
+        video_encoder.write_clip(video, output_path, settings)
+
+Clips derived with `set_audio`/`subclip`/`set_duration` are shallow copies
+that share the reader, so tracking the clip that opened the reader is
+enough; tracking copies as well is harmless (closing twice is a no-op).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+_open_count = 0
+
+
+def open_count() -> int:
+    """Resources tracked by scopes that have not been closed yet (all threads)."""
+    return _open_count
+
+
+class ClipScope:
+    """Closes every tracked clip/reader when the scope ends."""
+
+    def __init__(self, name: str = "render") -> None:
+        self.name = name
+        self._resources: list[Any] = []
+
+    def __enter__(self) -> ClipScope:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._resources)
+
+    def track(self, resource: T) -> T:
+        """Close `resource` (anything with `close()`) when the scope ends; returns it."""
+        global _open_count
+        if resource is not None and all(resource is not r for r in self._resources):
+            self._resources.append(resource)
+            with _lock:
+                _open_count += 1
+        return resource
+
+    def video(self, path: Any, **kwargs: Any):
+        """Tracked `VideoFileClip`."""
+        from moviepy.editor import VideoFileClip
+
+        return self.track(VideoFileClip(str(path), **kwargs))
+
+    def audio(self, path: Any, **kwargs: Any):
+        """Tracked `AudioFileClip`."""
+        from moviepy.editor import AudioFileClip
+
+        return self.track(AudioFileClip(str(path), **kwargs))
+
+    def close(self) -> None:
+        """Close everything tracked, newest first; errors are logged, not raised."""
+        global _open_count
+        resources, self._resources = self._resources, []
+        for resource in reversed(resources):
+            try:
+                resource.close()
+            except Exception as e:
+                logger.debug(f"Closing {type(resource).__name__} in {self.name} failed: {e}")
+        with _lock:
+            _open_count -= len(resources)
@@ -241,6 +241,22 @@ def load(project_name: str) -> ProjectConfig:
     )
 
 
+def load_shared() -> ProjectConfig:
+    """Load `config/shared.yaml` alone (tools that run outside a project)."""
+
+    path = _repo_root() / "config" / "shared.yaml"
+    if not path.exists():
+        return ProjectConfig({})
+    if yaml is None:
+        raise ModuleNotFoundError(
+            "PyYAML is required to load shared.yaml. Install with: pip install pyyaml"
+        )
+    raw = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    if not isinstance(raw, dict):
+        raise ValueError("Config root must be a mapping")
+    return ProjectConfig(raw)
+
+
 def load_content_plan(project_name: str) -> dict[str, Any]:
     """Load `projects/<project_name>/content_plan.json` if present."""
 
@@ -0,0 +1,279 @@
+"""core.utils.disk_cache
+
+Persistent content-addressed file cache with TTL and LRU size eviction.
+
+Layout (one directory per cache namespace):
+
+    <root>/<key[:2]>/<key><suffix>        cached file
+    <root>/<key[:2]>/<key>.json           sidecar: created_at, size, meta
+
+- Keys are SHA-256 hashes of the identifying parts (see `make_key`).
+- Entries expire `ttl_days` after they were stored.
+- The data file's mtime is bumped on every hit and used as the LRU clock.
+- Writes go to a temp file in the same directory and are published with
+  `os.replace`, so readers in other processes never see partial files.
+  Room for a new entry is made before it is published, under the same
+  advisory file lock that serializes eviction across processes, so `put`
+  never returns a path that eviction has already removed.
+- `lock(key)` lets one process build an entry while others wait for it;
+  the `<key>.lock` file goes away with the entry.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def make_key(*parts: Any) -> str:
+    """Stable SHA-256 key from identifying parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """File cache keyed by content hash, with TTL expiry and LRU eviction."""
+
+    def __init__(
+        self,
+        root: str | Path,
+        ttl_days: float | None = 7,
+        max_bytes: int | None = None,
+        enabled: bool = True,
+    ):
+        self.root = Path(root)
+        self.ttl_sec = ttl_days * SECONDS_PER_DAY if ttl_days else None
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evictions": 0}
+
+    # ---------- paths ----------
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.root / key[:2]
+
+    def _meta_path(self, key: str) -> Path:
+        return self._entry_dir(key) / f"{key}.json"
+
+    def _read_meta(self, key: str) -> Dict[str, Any] | None:
+        try:
+            return json.loads(self._meta_path(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    # ---------- public API ----------
+
+    def get(self, key: str) -> Path | None:
+        """Return cached file path, or None on miss/expiry."""
+        if not self.enabled:
+            return None
+
+        meta = self._read_meta(key)
+        path = self._entry_dir(key) / meta["file"] if meta else None
+        if meta is None or not path.exists():
+            self.stats["misses"] += 1
+            return None
+
+        if self.ttl_sec is not None and time.time() - meta.get("created_at", 0) > self.ttl_sec:
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            # The caller may be a producer holding lock(key): keep its lock file
+            self._remove(key, path, drop_lock=False)
+            return None
+
+        with contextlib.suppress(OSError):
+            os.utime(path)  # LRU clock
+        self.stats["hits"] += 1
+        return path
+
+    def get_meta(self, key: str) -> Dict[str, Any]:
+        """User metadata stored with an entry (empty dict if missing)."""
+        meta = self._read_meta(key) or {}
+        return dict(meta.get("meta", {}))
+
+    def put(self, key: str, src_path: str | Path, suffix: str = "", meta: Dict[str, Any] | None = None) -> Path:
+        """
+        Move `src_path` into the cache under `key` and return the cached path.
+
+        Older entries are evicted to make room first; an entry larger than
+        `max_bytes` is still stored (and becomes the first to go next time).
+        When the cache is disabled the source path is returned unchanged.
+        """
+        src_path = Path(src_path)
+        if not self.enabled:
+            return src_path
+
+        entry_dir = self._entry_dir(key)
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        path = entry_dir / f"{key}{suffix}"
+
+        # Stage next to the destination so os.replace stays atomic
+        fd, tmp_name = tempfile.mkstemp(dir=entry_dir, prefix=".tmp_")
+        os.close(fd)
+        shutil.move(str(src_path), tmp_name)
+        size = os.path.getsize(tmp_name)
+
+        with self._lock():
+            removed = self._evict_locked(reserve=size, protect=key)
+            os.replace(tmp_name, path)
+            # shutil.move keeps the source mtime, but a new entry is the most recently used one
+            os.utime(path)
+            sidecar = {
+                "file": path.name,
+                "size": size,
+                "created_at": time.time(),
+                "meta": meta or {},
+            }
+            self._write_json_atomic(self._meta_path(key), sidecar)
+        self.stats["stores"] += 1
+
+        if removed:
+            logger.info(f"🧹 Cache {self.root}: removed {removed} entries")
+        return path
+
+    @contextlib.contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """
+        Hold an advisory inter-process lock on `key` (no-op when disabled).
+
+        Producers check `get` again under the lock, so concurrent processes
+        build an entry once instead of racing on the same staging files.
+        """
+        if not self.enabled or fcntl is None:
+            yield
+            return
+        entry_dir = self._entry_dir(key)
+        lock_path = entry_dir / f"{key}.lock"
+        while True:
+            entry_dir.mkdir(parents=True, exist_ok=True)
+            lock_file = open(lock_path, "w")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # The lock file is deleted with its entry; if that happened while
+            # we waited, we hold a lock nobody else can see - take a fresh one
+            try:
+                if os.stat(lock_path).st_ino == os.fstat(lock_file.fileno()).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones over `max_bytes`."""
+        if not self.enabled or not self.root.exists():
+            return 0
+
+        with self._lock():
+            removed = self._evict_locked()
+
+        if removed:
+            logger.info(f"🧹 Cache {self.root}: removed {removed} entries")
+        return removed
+
+    def size_bytes(self) -> int:
+        """Total size of cached files."""
+        total = 0
+        for meta_path in self.root.glob("*/*.json"):
+            meta = self._read_meta(meta_path.stem)
+            if meta:
+                with contextlib.suppress(OSError):
+                    total += (meta_path.parent / meta["file"]).stat().st_size
+        return total
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for run metadata."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "hit_rate": f"{self.stats['hits'] / lookups * 100:.1f}%" if lookups else "n/a",
+        }
+
+    # ---------- internals ----------
+
+    def _evict_locked(self, reserve: int = 0, protect: str | None = None) -> int:
+        """Eviction pass (caller holds `_lock`), leaving `reserve` bytes of room and `protect` alone."""
+        removed = 0
+        entries = []
+        now = time.time()
+        for meta_path in self.root.glob("*/*.json"):
+            key = meta_path.stem
+            if key == protect:
+                continue
+            meta = self._read_meta(key)
+            if meta is None:
+                continue
+            path = meta_path.parent / meta["file"]
+            try:
+                stat = path.stat()
+            except OSError:
+                meta_path.unlink(missing_ok=True)
+                continue
+            if self.ttl_sec is not None and now - meta.get("created_at", 0) > self.ttl_sec:
+                self._remove(key, path)
+                self.stats["expired"] += 1
+                removed += 1
+                continue
+            entries.append((stat.st_mtime, stat.st_size, key, path))
+
+        if self.max_bytes is not None:
+            total = sum(size for _, size, _, _ in entries) + reserve
+            for _, size, key, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(key, path)
+                total -= size
+                self.stats["evictions"] += 1
+                removed += 1
+        return removed
+
+    def _remove(self, key: str, path: Path, drop_lock: bool = True) -> None:
+        path.unlink(missing_ok=True)
+        self._meta_path(key).unlink(missing_ok=True)
+        if drop_lock:
+            (self._entry_dir(key) / f"{key}.lock").unlink(missing_ok=True)
+
+    @staticmethod
+    def _write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp_", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_name, path)
+
+    @contextlib.contextmanager
+    def _lock(self) -> Iterator[None]:
+        """Advisory inter-process lock (no-op where fcntl is unavailable)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self.root / ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,278 @@
+"""core.utils.downloader
+
+Resumable HTTP downloads for large media files (stock footage).
+
+- One pooled `requests.Session` is shared by the process (keep-alive,
+  connection reuse, retries on 429/5xx for idempotent requests).
+- Data is streamed into a file with a large write buffer.
+- Partial data is kept in `<output>.part` and resumed with an HTTP Range
+  request (guarded by `If-Range`, so a changed resource restarts cleanly).
+- Large files on servers that accept ranges can be fetched as N parallel
+  ranges, each resumable on its own (`<output>.part.<i>`).
+- The result is checked against Content-Length and, when the ETag is a
+  plain MD5 digest, against the content hash, then published with an
+  atomic `os.replace`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Small network reads (a read that fails mid-way loses its data) behind a
+# large write buffer, so disk writes stay big
+READ_CHUNK_SIZE = 64 * 1024
+WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024
+# Parallel ranges only pay off for big files
+MIN_PARALLEL_SIZE = 16 * 1024 * 1024
+DEFAULT_TIMEOUT = (10, 60)  # (connect, read) seconds
+
+_MD5_ETAG = re.compile(r'^"?([0-9a-fA-F]{32})"?$')
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+class DownloadError(RuntimeError):
+    """Download failed after all attempts or failed verification."""
+
+
+@dataclass
+class RemoteInfo:
+    """What the server told us about a resource."""
+
+    size: int | None = None
+    etag: str | None = None
+    accept_ranges: bool = False
+
+
+def get_session() -> requests.Session:
+    """Process-wide pooled session."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["HEAD", "GET"],
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def reset_session() -> None:
+    """Close and drop the shared session (tests, fork safety)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def probe(url: str, timeout: tuple[float, float] = DEFAULT_TIMEOUT) -> RemoteInfo:
+    """HEAD the resource; unknown fields stay None/False if the server does not say."""
+    try:
+        response = get_session().head(url, allow_redirects=True, timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logger.debug(f"HEAD {url} failed: {e}")
+        return RemoteInfo()
+
+    length = response.headers.get("Content-Length")
+    return RemoteInfo(
+        size=int(length) if length and length.isdigit() else None,
+        etag=response.headers.get("ETag"),
+        accept_ranges=response.headers.get("Accept-Ranges", "").lower() == "bytes",
+    )
+
+
+def download(
+    url: str,
+    output_path: str | Path,
+    parallel: int = 1,
+    max_attempts: int = 5,
+    expected_size: int | None = None,
+    timeout: tuple[float, float] = DEFAULT_TIMEOUT,
+) -> Path:
+    """
+    Download `url` to `output_path`, resuming interrupted transfers.
+
+    `parallel` > 1 fetches large files as that many concurrent byte ranges
+    when the server supports them. Raises DownloadError on failure; partial
+    data is kept for the next call to resume from.
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    part_path = output_path.with_name(output_path.name + ".part")
+
+    info = probe(url, timeout)
+    if expected_size is not None and info.size is not None and info.size != expected_size:
+        raise DownloadError(f"Size mismatch for {url}: server {info.size}, expected {expected_size}")
+    size = expected_size if expected_size is not None else info.size
+
+    start = time.perf_counter()
+    if parallel > 1 and info.accept_ranges and size is not None and size >= MIN_PARALLEL_SIZE:
+        _download_ranges(url, part_path, size, info.etag, parallel, max_attempts, timeout)
+    else:
+        _download_stream(url, part_path, size, info, max_attempts, timeout)
+
+    _verify(part_path, size, info.etag)
+    os.replace(part_path, output_path)
+
+    elapsed = time.perf_counter() - start
+    mb = output_path.stat().st_size / (1024 * 1024)
+    logger.debug(f"Downloaded {mb:.1f} MB in {elapsed:.1f}s ({mb / elapsed if elapsed else 0:.1f} MB/s)")
+    return output_path
+
+
+def _download_stream(
+    url: str,
+    part_path: Path,
+    size: int | None,
+    info: RemoteInfo,
+    max_attempts: int,
+    timeout: tuple[float, float],
+) -> None:
+    """Single connection, resumed from the current `.part` size after every failure."""
+    for attempt in range(1, max_attempts + 1):
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        if size is not None and offset == size:
+            return
+        if size is not None and offset > size:
+            part_path.unlink()
+            offset = 0
+
+        try:
+            _fetch_into(url, part_path, offset, None, info.etag if info.accept_ranges else None, timeout)
+        except (requests.RequestException, OSError) as e:
+            logger.warning(f"Download interrupted ({attempt}/{max_attempts}): {e}")
+            time.sleep(min(2 ** (attempt - 1) * 0.5, 8))
+            continue
+
+        done = part_path.stat().st_size
+        if size is None or done == size:
+            return
+        # Server closed the connection early: resume on the next attempt
+        logger.warning(f"Short read {done}/{size} bytes ({attempt}/{max_attempts}), resuming")
+
+    raise DownloadError(f"Download failed after {max_attempts} attempts: {url}")
+
+
+def _download_ranges(
+    url: str,
+    part_path: Path,
+    size: int,
+    etag: str | None,
+    parallel: int,
+    max_attempts: int,
+    timeout: tuple[float, float],
+) -> None:
+    """Fetch `parallel` byte ranges concurrently, then join them into `part_path`."""
+    step = -(-size // parallel)
+    ranges = [(i, i * step, min(size, (i + 1) * step) - 1) for i in range(parallel) if i * step < size]
+
+    def fetch_range(index: int, first: int, last: int) -> Path:
+        piece_path = part_path.with_name(f"{part_path.name}.{index}")
+        length = last - first + 1
+        for attempt in range(1, max_attempts + 1):
+            done = piece_path.stat().st_size if piece_path.exists() else 0
+            if done == length:
+                return piece_path
+            if done > length:
+                piece_path.unlink()
+                done = 0
+            try:
+                _fetch_into(url, piece_path, first + done, last, etag, timeout, require_partial=True)
+            except (requests.RequestException, OSError) as e:
+                logger.warning(f"Range {index} interrupted ({attempt}/{max_attempts}): {e}")
+                time.sleep(min(2 ** (attempt - 1) * 0.5, 8))
+        if piece_path.exists() and piece_path.stat().st_size == length:
+            return piece_path
+        raise DownloadError(f"Range {first}-{last} failed after {max_attempts} attempts: {url}")
+
+    with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="download") as pool:
+        futures = [pool.submit(fetch_range, *r) for r in ranges]
+        pieces = [future.result() for future in futures]
+
+    with open(part_path, "wb", buffering=WRITE_BUFFER_SIZE) as out:
+        for piece in pieces:
+            with open(piece, "rb") as src:
+                shutil.copyfileobj(src, out, COPY_CHUNK_SIZE)
+    for piece in pieces:
+        piece.unlink()
+
+
+def _fetch_into(
+    url: str,
+    path: Path,
+    first: int,
+    last: int | None,
+    etag: str | None,
+    timeout: tuple[float, float],
+    require_partial: bool = False,
+) -> None:
+    """GET bytes `first`..`last` (inclusive, None = to the end) and append them to `path`."""
+    headers = {}
+    if first > 0 or last is not None:
+        headers["Range"] = f"bytes={first}-" + (str(last) if last is not None else "")
+        if etag and not etag.startswith("W/"):
+            # Only strong validators are allowed in If-Range
+            headers["If-Range"] = etag
+
+    with get_session().get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 416:
+            # Nothing left to send
+            return
+        response.raise_for_status()
+
+        if response.status_code == 206:
+            mode = "ab"
+        elif require_partial and headers:
+            raise DownloadError(f"Server ignored Range request for {url}")
+        else:
+            # Full body (no Range support or the resource changed): start over
+            mode = "wb"
+
+        with open(path, mode, buffering=WRITE_BUFFER_SIZE) as f:
+            for chunk in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+                if chunk:
+                    f.write(chunk)
+
+
+def _verify(path: Path, size: int | None, etag: str | None) -> None:
+    """Check size and, for MD5-style ETags, the content hash. Bad data is discarded."""
+    actual = path.stat().st_size
+    if size is not None and actual != size:
+        path.unlink(missing_ok=True)
+        raise DownloadError(f"Size mismatch: got {actual} bytes, expected {size}")
+
+    match = _MD5_ETAG.match(etag or "")
+    if match:
+        digest = hashlib.md5()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+                digest.update(block)
+        if digest.hexdigest() != match.group(1).lower():
+            path.unlink(missing_ok=True)
+            raise DownloadError("ETag checksum mismatch")
@@ -0,0 +1,426 @@
+"""core.utils.ffmpeg_utils
+
+Thin helpers around the ffmpeg binary used by the video renderers.
+
+MoviePy already ships ffmpeg through `imageio-ffmpeg`, so we reuse that binary
+instead of requiring a system-wide install. All helpers raise RuntimeError with
+the tail of ffmpeg's stderr when the command fails.
+
+Encoding helpers accept `extra_outputs`: other framings (aspect ratios) of
+the same video. They are produced in the same ffmpeg process by a `split`
+of the decoded frames, so the frame source is read once and every output,
+the main one included, is encoded exactly once. Each extra output is a dict
+with `path`, `width`, `height`, `bitrate`, optional `fit` ("crop" by
+default, or "pad") and optional `video_filter` (e.g. burned-in subtitles
+laid out for that frame size), applied after fitting.
+"""
+
+from __future__ import annotations
+
+import logging
+import shutil
+import subprocess
+from functools import lru_cache
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Every segment we produce uses the same audio layout so that segments can be
+# joined with the concat demuxer without re-encoding.
+AUDIO_SAMPLE_RATE = 44100
+AUDIO_CHANNELS = 2
+
+
+@lru_cache(maxsize=1)
+def get_ffmpeg_exe() -> str:
+    """Return path to the ffmpeg binary (imageio-ffmpeg first, then PATH)."""
+    try:
+        import imageio_ffmpeg
+
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        exe = shutil.which("ffmpeg")
+        if exe:
+            return exe
+    raise RuntimeError("ffmpeg binary not found. Install imageio-ffmpeg or ffmpeg.")
+
+
+def run_ffmpeg(args: list[str]) -> None:
+    """Run ffmpeg with the given arguments (overwrite enabled, quiet output)."""
+    cmd = [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y", *args]
+    logger.debug(f"ffmpeg {' '.join(args)}")
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        stderr = result.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"ffmpeg failed ({result.returncode}): {stderr[-1000:]}")
+
+
+FIT_MODES = ("crop", "pad")
+DEFAULT_FIT = "crop"
+PAD_COLOR = "black"
+
+
+def _fit_filter(width: int, height: int, fit: str, pad_color: str = PAD_COLOR) -> str:
+    """Scale into `width`x`height`: fill and center-crop, or fit inside and pad."""
+    if fit == "crop":
+        return f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height},setsar=1"
+    if fit == "pad":
+        return (
+            f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color={pad_color},setsar=1"
+        )
+    raise ValueError(f"Unknown fit mode: {fit} (expected one of {FIT_MODES})")
+
+
+def output_branches(source: str, outputs: list[dict]) -> tuple[list[str], list[str]]:
+    """
+    Filtergraph chains fanning the `source` pad out to one branch per output.
+
+    Outputs with `width`/`height` are fitted to that size (`fit`), then get
+    their own `video_filter`; the main output has neither and passes through.
+    Returns (chains, output labels) in the order of `outputs`.
+    """
+    inputs = [source]
+    chains = []
+    if len(outputs) > 1:
+        inputs = [f"[s{i}]" for i in range(len(outputs))]
+        chains.append(f"{source}split={len(outputs)}{''.join(inputs)}")
+    labels = []
+    for i, (label, output) in enumerate(zip(inputs, outputs)):
+        filters = []
+        if output.get("width") and output.get("height"):
+            filters.append(_fit_filter(output["width"], output["height"], output.get("fit") or DEFAULT_FIT))
+        if output.get("video_filter"):
+            filters.append(output["video_filter"])
+        chains.append(f"{label}{','.join(filters) or 'null'}[o{i}]")
+        labels.append(f"[o{i}]")
+    return chains, labels
+
+
+def _audio_output_args() -> list[str]:
+    return [
+        "-af", "apad",
+        "-c:a", "aac",
+        "-ar", str(AUDIO_SAMPLE_RATE),
+        "-ac", str(AUDIO_CHANNELS),
+    ]
+
+
+def encode_still_unit(
+    image_path: Path,
+    unit_path: Path,
+    fps: int,
+    bitrate: str,
+    preset: str = "veryfast",
+    extra_outputs: list[dict] | None = None,
+) -> Path:
+    """
+    Encode one second of a still frame as a single closed GOP.
+
+    The unit is the reusable part of a still segment: `mux_still_unit`
+    loops it to any length with stream copy. `extra_outputs` get units of
+    their own framing from the same decoded frame (their `path` is the
+    unit path).
+    """
+    outputs = [{"path": unit_path, "bitrate": bitrate}, *(extra_outputs or [])]
+    args = [
+        "-loop", "1",
+        "-framerate", str(fps),
+        "-i", str(image_path),
+    ]
+    if len(outputs) > 1:
+        chains, labels = output_branches("[0:v]", outputs)
+        args += ["-filter_complex", ";".join(chains)]
+    else:
+        labels = [None]
+    for label, output in zip(labels, outputs):
+        Path(output["path"]).parent.mkdir(parents=True, exist_ok=True)
+        if label is not None:
+            args += ["-map", label]
+        args += [
+            "-frames:v", str(fps),
+            "-c:v", "libx264",
+            "-tune", "stillimage",
+            "-preset", preset,
+            "-pix_fmt", "yuv420p",
+            "-g", str(fps),
+            "-maxrate", output["bitrate"],
+            "-bufsize", output["bitrate"],
+            str(output["path"]),
+        ]
+    run_ffmpeg(args)
+    return unit_path
+
+
+def subtitles_filter(subtitles_path: str | Path) -> str:
+    """
+    `subtitles` (libass) filter that burns a subtitle file into the video.
+
+    The path is escaped for both the option and the filtergraph level, so
+    any file name works.
+    """
+    value = str(Path(subtitles_path).resolve())
+    for char in ("\\", "'", ":"):
+        value = value.replace(char, "\\" + char)
+    for char in ("\\", "'", "[", "]", ",", ";"):
+        value = value.replace(char, "\\" + char)
+    return f"subtitles=filename={value}"
+
+
+def mux_still_unit(
+    unit_path: Path,
+    output_path: Path,
+    duration: float,
+    audio_path: str | Path | None = None,
+    video_filter: str | None = None,
+    fps: int = 30,
+    bitrate: str | None = None,
+    preset: str = "veryfast",
+    extra_outputs: list[dict] | None = None,
+) -> Path:
+    """
+    Loop a still unit to `duration` seconds and add audio.
+
+    Video is stream-copied; audio is padded with silence up to `duration`,
+    and without `audio_path` a silent track is generated. With
+    `video_filter` (e.g. burned-in subtitles) the video is re-encoded with
+    the same still-segment parameters as `encode_still_unit`.
+
+    Each of `extra_outputs` loops its own `unit_path` (see
+    `encode_still_unit`) into its `path` in the same ffmpeg process, with
+    its own `video_filter` and `bitrate`.
+    """
+    outputs = [
+        {"unit_path": unit_path, "path": output_path, "video_filter": video_filter, "bitrate": bitrate},
+        *(extra_outputs or []),
+    ]
+    args = []
+    for output in outputs:
+        args += ["-stream_loop", "-1", "-i", str(output["unit_path"])]
+    audio_input = len(outputs)
+    if audio_path:
+        args += ["-i", str(audio_path)]
+    else:
+        args += ["-f", "lavfi", "-i", f"anullsrc=r={AUDIO_SAMPLE_RATE}:cl=stereo"]
+
+    for index, output in enumerate(outputs):
+        Path(output["path"]).parent.mkdir(parents=True, exist_ok=True)
+        args += [
+            "-map", f"{index}:v", "-map", f"{audio_input}:a",
+            "-t", f"{duration:.3f}",
+        ]
+        if output.get("video_filter"):
+            args += [
+                "-vf", output["video_filter"],
+                "-c:v", "libx264",
+                "-tune", "stillimage",
+                "-preset", preset,
+                "-pix_fmt", "yuv420p",
+                "-g", str(fps),
+            ]
+            if output.get("bitrate"):
+                args += ["-maxrate", output["bitrate"], "-bufsize", output["bitrate"]]
+        else:
+            args += ["-c:v", "copy"]
+        args += [*_audio_output_args(), "-movflags", "+faststart", str(output["path"])]
+    run_ffmpeg(args)
+    return output_path
+
+
+def encode_still(
+    image_path: Path,
+    output_path: Path,
+    duration: float,
+    fps: int,
+    bitrate: str,
+    audio_path: str | Path | None = None,
+    preset: str = "veryfast",
+    video_filter: str | None = None,
+    extra_outputs: list[dict] | None = None,
+) -> Path:
+    """
+    Encode a single still frame shown for `duration` seconds.
+
+    Only one second of video (a single closed GOP, `stillimage` tuning) is
+    actually encoded; it is then repeated with `-stream_loop` and stream copy,
+    so the cost does not depend on the video length. Audio is padded with
+    silence up to `duration`; without `audio_path` a silent track is generated.
+    `extra_outputs` get their own framing of the same frame.
+    """
+    extras = list(extra_outputs or [])
+    unit_path = output_path.with_suffix(".unit.mp4")
+    # Субтитры накладываются при муксе, в секундный юнит они не попадают
+    extra_units = [
+        {**output, "path": Path(output["path"]).with_suffix(".unit.mp4"), "video_filter": None}
+        for output in extras
+    ]
+    try:
+        encode_still_unit(image_path, unit_path, fps, bitrate, preset, extra_units)
+        mux_still_unit(
+            unit_path, output_path, duration, audio_path, video_filter, fps, bitrate, preset,
+            [{**output, "unit_path": unit["path"]} for output, unit in zip(extras, extra_units)],
+        )
+    finally:
+        for path in [unit_path, *(unit["path"] for unit in extra_units)]:
+            path.unlink(missing_ok=True)
+    return output_path
+
+
+def concat_segments(segment_paths: list[Path], output_path: Path) -> Path:
+    """
+    Join encoded segments with the concat demuxer using stream copy.
+
+    All segments must share codec parameters (see `encode_still`).
+    """
+    if not segment_paths:
+        raise ValueError("No segments to concatenate")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    list_path = output_path.with_suffix(".concat.txt")
+    lines = []
+    for path in segment_paths:
+        escaped = str(Path(path).resolve()).replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+    list_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    try:
+        run_ffmpeg([
+            "-f", "concat",
+            "-safe", "0",
+            "-i", str(list_path),
+            "-c", "copy",
+            "-movflags", "+faststart",
+            str(output_path),
+        ])
+    finally:
+        list_path.unlink(missing_ok=True)
+
+    return output_path
+
+
+def transcode_proxy(
+    src_path: Path,
+    output_path: Path,
+    width: int,
+    height: int,
+    fps: int,
+    preset: str = "veryfast",
+    crf: int = 18,
+) -> Path:
+    """
+    Transcode a source clip into a render-ready proxy.
+
+    The source is scaled to cover `width`x`height`, center-cropped, resampled
+    to `fps` and stripped of audio. Keyframes every second keep the proxy
+    cheap to loop and trim with stream copy.
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    video_filter = (
+        f"scale={width}:{height}:force_original_aspect_ratio=increase,"
+        f"crop={width}:{height},fps={fps},setsar=1"
+    )
+    run_ffmpeg([
+        "-i", str(src_path),
+        "-an",
+        "-vf", video_filter,
+        "-c:v", "libx264",
+        "-preset", preset,
+        "-crf", str(crf),
+        "-pix_fmt", "yuv420p",
+        "-g", str(fps),
+        "-movflags", "+faststart",
+        str(output_path),
+    ])
+    return output_path
+
+
+def loop_to_duration(src_path: Path, output_path: Path, duration: float) -> Path:
+    """
+    Repeat (or trim) a video to exactly `duration` seconds without re-encoding.
+
+    Uses `-stream_loop` on the input and stream copy on the output.
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    run_ffmpeg([
+        "-stream_loop", "-1",
+        "-i", str(src_path),
+        "-t", f"{duration:.3f}",
+        "-c", "copy",
+        "-movflags", "+faststart",
+        str(output_path),
+    ])
+    return output_path
+
+
+def overlay_on_video(
+    background_path: Path,
+    output_path: Path,
+    duration: float,
+    fps: int,
+    overlay_path: Path | None = None,
+    audio_path: str | Path | None = None,
+    start: float = 0.0,
+    video_filter: str | None = None,
+    codec: str = "libx264",
+    preset: str = "veryfast",
+    bitrate: str | None = None,
+    pix_fmt: str = "yuv420p",
+    threads: int | None = None,
+    extra_outputs: list[dict] | None = None,
+) -> Path:
+    """
+    Encode `duration` seconds of a background video with a still overlay and audio.
+
+    The background is shaped on the input side: `-stream_loop -1` repeats
+    short clips and `-ss`/`-t` before `-i` trim long ones, so the demuxer
+    hands the decoder only the packets that end up in the output, each
+    frame is decoded once and never seeked backwards. The background must
+    already be at output size (see `transcode_proxy`; its one-second GOPs
+    make whole-second `start` values land on keyframes). `overlay_path` is
+    a full-frame RGBA image (e.g. the hook text) composited with the
+    `overlay` filter, then `video_filter` (e.g. burned-in subtitles) is
+    applied. Audio is padded with silence up to `duration`; without
+    `audio_path` a silent track is generated. The composited frames are
+    split into `extra_outputs` in the same pass.
+    """
+    args = ["-stream_loop", "-1"]
+    if start > 0:
+        args += ["-ss", f"{start:.3f}"]
+    args += ["-t", f"{duration:.3f}", "-i", str(background_path)]
+
+    source = "[0:v]"
+    chains = []
+    if overlay_path is not None:
+        args += ["-i", str(overlay_path)]
+        chains.append("[0:v][1:v]overlay=0:0[base]")
+        source = "[base]"
+    audio_input = 2 if overlay_path is not None else 1
+    if audio_path:
+        args += ["-i", str(audio_path)]
+    else:
+        args += ["-f", "lavfi", "-i", f"anullsrc=r={AUDIO_SAMPLE_RATE}:cl=stereo"]
+
+    outputs = [
+        {"path": output_path, "bitrate": bitrate, "video_filter": video_filter},
+        *(extra_outputs or []),
+    ]
+    branches, labels = output_branches(source, outputs)
+    args += ["-filter_complex", ";".join(chains + branches)]
+    for label, output in zip(labels, outputs):
+        Path(output["path"]).parent.mkdir(parents=True, exist_ok=True)
+        args += [
+            "-map", label, "-map", f"{audio_input}:a",
+            "-t", f"{duration:.3f}",
+            "-r", str(fps),
+            "-c:v", codec,
+            "-preset", preset,
+            "-pix_fmt", pix_fmt,
+            "-g", str(fps),
+        ]
+        if output.get("bitrate"):
+            args += ["-b:v", output["bitrate"], "-maxrate", output["bitrate"], "-bufsize", output["bitrate"]]
+        if threads:
+            args += ["-threads", str(threads)]
+        args += [*_audio_output_args(), "-movflags", "+faststart", str(output["path"])]
+    run_ffmpeg(args)
+    return output_path
@@ -0,0 +1,191 @@
+"""core.utils.genai_pool
+
+Process-wide pool of google-genai clients.
+
+Building a `genai.Client` creates an httpx client (and its SSL context),
+and every new client opens fresh TCP/TLS connections. Creating one per TTS
+request meant every block and chunk paid that setup again. The pool keeps
+one client per API key (LRU, at most `max_clients`) with keep-alive
+connections held for `keepalive_sec` between requests, and hands the same
+client to every caller:
+
+    client = get_client_pool().client(api_key)        # sync SDK calls
+    aclient = get_client_pool().async_client(api_key)  # client.aio
+
+`warm_up(api_key)` builds the client ahead of the first request. Counters
+(clients created, requests served by an existing client, warm-up time) are
+reported by `get_stats()` for run metadata. API keys are only kept as a
+short hash.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CLIENTS = 8
+DEFAULT_KEEPALIVE_SEC = 60.0
+DEFAULT_MAX_CONNECTIONS = 10
+
+
+def _key_id(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class _PooledClient:
+    client: Any
+    created_at: float = field(default_factory=time.time)
+    requests: int = 0
+
+
+class GenAIClientPool:
+    """Keyed, thread-safe pool of `genai.Client` instances."""
+
+    def __init__(
+        self,
+        max_clients: int = DEFAULT_MAX_CLIENTS,
+        keepalive_sec: float = DEFAULT_KEEPALIVE_SEC,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    ) -> None:
+        self.max_clients = max(1, max_clients)
+        self.keepalive_sec = keepalive_sec
+        self.max_connections = max_connections
+        self._clients: OrderedDict[str, _PooledClient] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "clients_created": 0,
+            "requests": 0,
+            "reused": 0,
+            "warm_ups": 0,
+            "warm_up_sec": 0.0,
+            "evictions": 0,
+        }
+
+    def _http_options(self) -> Any:
+        import httpx
+        from google.genai import types
+
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+            keepalive_expiry=self.keepalive_sec,
+        )
+        return types.HttpOptions(client_args={"limits": limits}, async_client_args={"limits": limits})
+
+    def _create(self, api_key: str) -> Any:
+        from google import genai
+
+        try:
+            return genai.Client(api_key=api_key, http_options=self._http_options())
+        except TypeError:
+            # Старые версии SDK без http_options
+            return genai.Client(api_key=api_key)
+
+    def _entry(self, api_key: str) -> tuple[_PooledClient, bool]:
+        """Pooled client for `api_key` and whether it was created by this call."""
+        key = _key_id(api_key)
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                self._clients.move_to_end(key)
+                return entry, False
+
+            started = time.perf_counter()
+            entry = _PooledClient(self._create(api_key))
+            elapsed = time.perf_counter() - started
+            self._clients[key] = entry
+            self.stats["clients_created"] += 1
+            self.stats["warm_up_sec"] += elapsed
+            logger.debug(f"🔌 genai client for key {key} created in {elapsed * 1000:.0f} ms")
+
+            while len(self._clients) > self.max_clients:
+                _, evicted = self._clients.popitem(last=False)
+                self.stats["evictions"] += 1
+                _close(evicted.client)
+            return entry, True
+
+    def client(self, api_key: str) -> Any:
+        """Shared `genai.Client` for `api_key` (counts as one request)."""
+        entry, created = self._entry(api_key)
+        with self._lock:
+            entry.requests += 1
+            self.stats["requests"] += 1
+            if not created:
+                self.stats["reused"] += 1
+        return entry.client
+
+    def async_client(self, api_key: str) -> Any:
+        """Async interface (`client.aio`) of the shared client for `api_key`."""
+        return self.client(api_key).aio
+
+    def warm_up(self, api_key: str) -> None:
+        """Build the client for `api_key` before the first request."""
+        _, created = self._entry(api_key)
+        if created:
+            with self._lock:
+                self.stats["warm_ups"] += 1
+
+    def close(self) -> None:
+        """Close every pooled client and its connections."""
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), OrderedDict()
+        for entry in clients:
+            _close(entry.client)
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool counters for run metadata."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["clients"] = len(self._clients)
+        stats["warm_up_sec"] = round(stats["warm_up_sec"], 3)
+        stats["reuse_rate"] = (
+            f"{stats['reused'] / stats['requests'] * 100:.1f}%" if stats["requests"] else "n/a"
+        )
+        return stats
+
+
+def _close(client: Any) -> None:
+    try:
+        close = getattr(client, "close", None)
+        if callable(close):
+            close()
+    except Exception as e:
+        logger.debug(f"Closing genai client failed: {e}")
+
+
+_pool: GenAIClientPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> GenAIClientPool:
+    """Process-wide client pool (created on first use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = GenAIClientPool()
+        return _pool
+
+
+def reset_client_pool() -> None:
+    """Close and drop the process-wide pool (tests, key rotation)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def get_pool_stats() -> Dict[str, Any] | None:
+    """Stats of the process-wide pool, or None if it was never used."""
+    return _pool.get_stats() if _pool is not None else None
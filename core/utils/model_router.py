@@ -5,6 +5,8 @@ Based on proven patterns from youtube_podcast.
 Features:
   - Primary model (fast) → Fallback model (powerful)
   - Exponential backoff retries (2s, 4s, 8s)
+  - Gemini calls paced by the shared per-key/model rate limiter;
+    429s honor Retry-After for every process on the host
   - Detailed logging for audit trail
   - Automatic JSON error recovery
 """
@@ -15,6 +17,8 @@ import time
 from typing import Callable, Any, Optional, Dict
 import google.generativeai as genai
 
+from core.utils import rate_limiter
+
 logger = logging.getLogger(__name__)
 
 # Model configuration
@@ -139,6 +143,8 @@ class ModelRouter:
                 
                 # Call the appropriate API
                 if is_gemini:
+                    # Квота общая для всех процессов с этим ключом: ждём слот заранее
+                    rate_limiter.get_rate_limiter().acquire(self.api_key, model_name)
                     response = self._call_gemini_api(model_name, prompt, **kwargs)
                 else:
                     # Assuming Qwen or other local model via Ollama
@@ -157,7 +163,18 @@ class ModelRouter:
                 error_str = str(e)[:100]  # First 100 chars
                 logger.warning(f"   ❌ Attempt {attempt} failed: {error_str}")
                 
-                if attempt < MAX_RETRIES:
+                limiter = rate_limiter.get_rate_limiter()
+                if is_gemini and limiter.active and rate_limiter.is_rate_limit_error(e):
+                    # 429: Retry-After (или обычный backoff) ждёт acquire следующей попытки
+                    limiter.penalize(
+                        self.api_key,
+                        model_name,
+                        rate_limiter.retry_after_from_error(e),
+                        fallback_sec=min(BASE_RETRY_DELAY * (2 ** (attempt - 1)), MAX_RETRY_DELAY),
+                    )
+                    if attempt >= MAX_RETRIES:
+                        logger.error(f"   💩 Model {model_name} exhausted all {MAX_RETRIES} retries")
+                elif attempt < MAX_RETRIES:
                     wait_time = min(BASE_RETRY_DELAY * (2 ** (attempt - 1)), MAX_RETRY_DELAY)
                     logger.info(f"   ⏳ Waiting {wait_time}s before retry...")
                     time.sleep(wait_time)
@@ -0,0 +1,264 @@
+"""core.utils.profiling
+
+Per-stage instrumentation for renders, written into run metadata.
+
+- `stage(name)` wraps one pipeline step and records wall time, CPU time
+  (this process, plus reaped child processes such as ffmpeg and segment
+  workers), the process peak RSS reached so far and, when the stage encodes
+  video, frames and frames per second.
+- Stages nest: a "stock_download" inside "render" is reported as
+  "render/stock_download". Each thread keeps its own stage stack.
+- Profiler dumps are opt-in (`profiling.profiler: cprofile | pyinstrument`
+  or `--profile`): every outermost stage (or only `profiling.stages`) is
+  profiled and dumped to `profiling.dump_dir` as `<stage>.prof` (cProfile,
+  open with snakeviz/pstats) or `<stage>.html` (pyinstrument). pyinstrument
+  is optional; without it cProfile is used.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ("cprofile", "pyinstrument")
+DEFAULT_DUMP_DIR = Path("output") / "profiles"
+
+
+@dataclass
+class StageRecord:
+    """Measurements of one finished (or running) stage."""
+
+    name: str
+    wall_sec: float = 0.0
+    cpu_sec: float = 0.0
+    child_cpu_sec: float = 0.0
+    peak_rss_mb: float | None = None
+    child_peak_rss_mb: float | None = None
+    frames: int | None = None
+    profile_path: str | None = None
+    extra: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def fps(self) -> float | None:
+        if not self.frames or self.wall_sec <= 0:
+            return None
+        return self.frames / self.wall_sec
+
+    def to_dict(self) -> dict[str, Any]:
+        data = {
+            "name": self.name,
+            "wall_sec": round(self.wall_sec, 3),
+            "cpu_sec": round(self.cpu_sec, 3),
+            "child_cpu_sec": round(self.child_cpu_sec, 3),
+            "peak_rss_mb": self.peak_rss_mb,
+            "child_peak_rss_mb": self.child_peak_rss_mb,
+        }
+        if self.frames is not None:
+            data["frames"] = self.frames
+            data["fps"] = round(self.fps, 2) if self.fps is not None else None
+        if self.profile_path:
+            data["profile_path"] = self.profile_path
+        data.update(self.extra)
+        return data
+
+
+def _rusage_mb(maxrss: int) -> float:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(maxrss / divisor, 1)
+
+
+def _usage() -> tuple[float, float, float | None, float | None]:
+    """(process cpu, children cpu, process peak RSS MB, largest child peak RSS MB)."""
+    cpu = time.process_time()
+    if resource is None:
+        return cpu, 0.0, None, None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (
+        cpu,
+        children.ru_utime + children.ru_stime,
+        _rusage_mb(own.ru_maxrss),
+        _rusage_mb(children.ru_maxrss) if children.ru_maxrss else None,
+    )
+
+
+class StageProfiler:
+    """Collects StageRecords for one pipeline run."""
+
+    def __init__(
+        self,
+        profiler: str | None = None,
+        dump_dir: str | Path = DEFAULT_DUMP_DIR,
+        stages: list[str] | None = None,
+    ) -> None:
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler: {profiler} (expected one of {PROFILERS})")
+        self.profiler = profiler
+        self.dump_dir = Path(dump_dir)
+        self.profiled_stages = set(stages) if stages else None
+        self.records: list[StageRecord] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiling = False  # one profiler at a time (they hook the interpreter)
+        self._started = time.perf_counter()
+
+    def _stack(self) -> list[str]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def stage(self, name: str, frames: int | None = None) -> Iterator[StageRecord]:
+        """
+        Measure the block as stage `name`.
+
+        Yields the StageRecord, so `frames` (or `extra` fields) can be filled
+        in once they are known inside the block.
+        """
+        stack = self._stack()
+        stack.append(name)
+        record = StageRecord(name="/".join(stack), frames=frames)
+        dump = self._start_profile(name)
+
+        cpu, child_cpu, _, _ = _usage()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.wall_sec = time.perf_counter() - started
+            end_cpu, end_child_cpu, record.peak_rss_mb, record.child_peak_rss_mb = _usage()
+            record.cpu_sec = end_cpu - cpu
+            record.child_cpu_sec = end_child_cpu - child_cpu
+            if dump is not None:
+                record.profile_path = self._stop_profile(dump, record.name)
+            stack.pop()
+            with self._lock:
+                self.records.append(record)
+            logger.debug(
+                f"⏱️ {record.name}: {record.wall_sec:.2f}s wall, {record.cpu_sec:.2f}s cpu"
+                + (f", {record.fps:.1f} fps" if record.fps else "")
+            )
+
+    def _start_profile(self, name: str) -> Any:
+        if self.profiler is None:
+            return None
+        if self.profiled_stages is not None and name not in self.profiled_stages:
+            return None
+        with self._lock:
+            if self._profiling:
+                return None
+            self._profiling = True
+
+        if self.profiler == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+
+                profiler = Profiler()
+                profiler.start()
+                return profiler
+            except ImportError:
+                logger.warning("pyinstrument is not installed, using cProfile")
+                self.profiler = "cprofile"
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop_profile(self, profiler: Any, stage_name: str) -> str | None:
+        stem = stage_name.replace("/", "__")
+        try:
+            self.dump_dir.mkdir(parents=True, exist_ok=True)
+            if isinstance(profiler, cProfile.Profile):
+                profiler.disable()
+                path = self.dump_dir / f"{stem}.prof"
+                profiler.dump_stats(str(path))
+            else:
+                profiler.stop()
+                path = self.dump_dir / f"{stem}.html"
+                path.write_text(profiler.output_html(), encoding="utf-8")
+            logger.info(f"🔬 Profile for {stage_name}: {path}")
+            return str(path)
+        except Exception as e:
+            logger.warning(f"Could not write profile for {stage_name}: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._profiling = False
+
+    def report(self) -> dict[str, Any]:
+        """Stage records in completion order, plus run totals, for run metadata."""
+        _, _, peak_rss_mb, child_peak_rss_mb = _usage()
+        with self._lock:
+            stages = [record.to_dict() for record in self.records]
+        return {
+            "wall_sec": round(time.perf_counter() - self._started, 3),
+            "peak_rss_mb": peak_rss_mb,
+            "child_peak_rss_mb": child_peak_rss_mb,
+            "profiler": self.profiler,
+            "stages": stages,
+        }
+
+
+_profiler: StageProfiler | None = None
+
+
+def _settings(config: Any) -> dict[str, Any]:
+    section = config.get("profiling", {}) if hasattr(config, "get") else {}
+    if not hasattr(section, "get"):
+        return {}
+    settings: dict[str, Any] = {}
+    profiler = section.get("profiler")
+    if isinstance(profiler, str) and profiler:
+        if profiler in PROFILERS:
+            settings["profiler"] = profiler
+        else:
+            logger.warning(f"Unknown profiling.profiler '{profiler}', profiles disabled")
+    dump_dir = section.get("dump_dir")
+    if isinstance(dump_dir, str) and dump_dir:
+        settings["dump_dir"] = dump_dir
+    stages = section.get("stages")
+    if isinstance(stages, list):
+        settings["stages"] = [str(s) for s in stages]
+    return settings
+
+
+def get_profiler() -> StageProfiler:
+    """Process-wide StageProfiler (created without dumps on first use)."""
+    global _profiler
+    if _profiler is None:
+        _profiler = StageProfiler()
+    return _profiler
+
+
+def reset_profiler(config: Any = None, profiler: str | None = None) -> StageProfiler:
+    """
+    Start a fresh StageProfiler for a new run.
+
+    Settings come from the `profiling` config section; `profiler` (the
+    `--profile` flag) overrides `profiling.profiler`.
+    """
+    global _profiler
+    settings = _settings(config)
+    if profiler:
+        settings["profiler"] = profiler
+    _profiler = StageProfiler(**settings)
+    return _profiler
+
+
+def stage(name: str, frames: int | None = None):
+    """`get_profiler().stage(...)`: measure a block as a stage of the current run."""
+    return get_profiler().stage(name, frames)
@@ -0,0 +1,379 @@
+"""core.utils.rate_limiter
+
+Token-bucket rate limiter for Gemini requests, shared between processes.
+
+Several pipelines on one host often use the same API key. Each of them used
+to find out about the quota from a 429 and then back off on its own fixed
+schedule, so they kept hitting the limit together. The limiter keeps one
+bucket per (API key, model) in a local SQLite store (`<caching.dir>/
+rate_limits.sqlite`), so every process draws from the same bucket:
+
+    limiter = get_rate_limiter()
+    limiter.acquire(api_key, model)              # sync callers (ModelRouter)
+    await limiter.acquire_async(api_key, model)  # asyncio callers (TTS)
+
+`acquire` reserves a token in one `BEGIN IMMEDIATE` transaction and sleeps
+until the token is due: a bucket holds at most `burst` tokens and refills
+at `requests_per_minute`. Tokens may go negative, which queues callers in
+reservation order without polling the store.
+
+When a request is rejected anyway, `penalize(api_key, model, retry_after)`
+puts the bucket into debt so that the next token is due after the server's
+Retry-After hint (`retry_after_from_error`) for every process at once.
+Queue wait time and throttling counters are reported by `get_stats()` for
+run metadata. API keys are only stored as a short hash.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Без конфига: мягкие лимиты, реальные квоты моделей задаются в shared.yaml (rate_limits)
+DEFAULT_REQUESTS_PER_MINUTE = 60.0
+DEFAULT_BURST = 10
+# Retry-After длиннее этого (например, суточная квота) не ждём целиком
+DEFAULT_MAX_RETRY_AFTER_SEC = 120.0
+STORE_NAME = "rate_limits.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key_id     TEXT NOT NULL,
+    model      TEXT NOT NULL,
+    tokens     REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (key_id, model)
+);
+"""
+
+_RETRY_AFTER_PATTERNS = [
+    # google-genai: 'retryDelay': '17s'
+    re.compile(r"retry_?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", re.IGNORECASE),
+    # google.generativeai / api_core: retry_delay { seconds: 17 }
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE),
+    # "Please retry in 17.5s", "Retry-After: 17", "retry after 17 seconds"
+    re.compile(r"retry(?:[ _-]after| in)\s*:?\s*(\d+(?:\.\d+)?)", re.IGNORECASE),
+]
+
+
+def _key_id(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Bucket size and refill rate for one model."""
+
+    requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE
+    burst: int = DEFAULT_BURST
+
+    @property
+    def per_sec(self) -> float:
+        return self.requests_per_minute / 60.0
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True for quota / 429 errors from either Gemini SDK."""
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error).lower()
+    return (
+        "429" in message
+        or "quota" in message
+        or "resource_exhausted" in message
+        or "resource exhausted" in message
+    )
+
+
+def retry_after_from_error(error: BaseException) -> float | None:
+    """
+    Seconds the server asked us to wait, or None without a hint.
+
+    Looks at a Retry-After response header first, then at the retry delay
+    the Gemini SDKs put into the error message.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None and hasattr(headers, "get"):
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        try:
+            if value is not None:
+                return max(float(value), 0.0)
+        except (TypeError, ValueError):
+            pass  # HTTP-date: формат не используется Gemini API
+
+    message = str(error)
+    for pattern in _RETRY_AFTER_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class RateLimiter:
+    """Token buckets per (API key, model) in a SQLite store shared by processes."""
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        default: RateLimit | None = None,
+        models: Dict[str, RateLimit] | None = None,
+        max_retry_after_sec: float = DEFAULT_MAX_RETRY_AFTER_SEC,
+        enabled: bool = True,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.default = default or RateLimit()
+        self.models = dict(models or {})
+        self.max_retry_after_sec = max_retry_after_sec
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._store_failed = False
+        self.stats = {
+            "acquires": 0,
+            "waited": 0,
+            "wait_sec": 0.0,
+            "max_wait_sec": 0.0,
+            "throttled": 0,
+            "retry_after_hints": 0,
+        }
+        self._model_stats: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def active(self) -> bool:
+        """Whether waits are coordinated through the store (enabled and reachable)."""
+        return self.enabled and not self._store_failed
+
+    def limit_for(self, model: str) -> RateLimit:
+        return self.models.get(model, self.default)
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.executescript(_SCHEMA)
+            yield conn
+        finally:
+            conn.close()
+
+    def _update(self, api_key: str, model: str, change) -> float:
+        """
+        Refill the bucket to now, apply `change(tokens, limit)` and store it.
+
+        Runs in one write transaction so concurrent processes see each
+        other's reservations. `change` returns (tokens, result).
+        """
+        limit = self.limit_for(model)
+        key = _key_id(api_key)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE key_id = ? AND model = ?",
+                    (key, model),
+                ).fetchone()
+                tokens = float(limit.burst)
+                if row is not None:
+                    elapsed = max(now - row[1], 0.0)
+                    tokens = min(float(limit.burst), row[0] + elapsed * limit.per_sec)
+                tokens, result = change(tokens, limit)
+                conn.execute(
+                    """
+                    INSERT INTO buckets (key_id, model, tokens, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (key_id, model) DO UPDATE SET
+                        tokens = excluded.tokens,
+                        updated_at = excluded.updated_at
+                    """,
+                    (key, model, tokens, now),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def reserve(self, api_key: str, model: str) -> float:
+        """Take a token and return how many seconds until it is due (no sleeping)."""
+        if not self.active:
+            return 0.0
+
+        def take(tokens: float, limit: RateLimit) -> tuple[float, float]:
+            tokens -= 1.0
+            wait = -tokens / limit.per_sec if tokens < 0 and limit.per_sec > 0 else 0.0
+            return tokens, wait
+
+        try:
+            return self._update(api_key, model, take)
+        except (sqlite3.Error, OSError) as e:
+            # Без общего хранилища не блокируем пайплайн: остаются ретраи на 429
+            self._store_failed = True
+            logger.warning(f"⚠️ Rate limit store unavailable ({e}), pacing disabled")
+            return 0.0
+
+    def acquire(self, api_key: str, model: str) -> float:
+        """Block until a request to `model` may be sent. Returns the wait in seconds."""
+        wait = self.reserve(api_key, model)
+        if wait > 0:
+            logger.info(f"⏳ Rate limit {model}: waiting {wait:.1f}s for a request slot")
+            time.sleep(wait)
+        self._record(model, wait)
+        return wait
+
+    async def acquire_async(self, api_key: str, model: str) -> float:
+        """`acquire` for asyncio code: the store is used from a thread, waiting does not block the loop."""
+        wait = await asyncio.to_thread(self.reserve, api_key, model)
+        if wait > 0:
+            logger.info(f"⏳ Rate limit {model}: waiting {wait:.1f}s for a request slot")
+            await asyncio.sleep(wait)
+        self._record(model, wait)
+        return wait
+
+    def penalize(
+        self,
+        api_key: str,
+        model: str,
+        retry_after: float | None = None,
+        fallback_sec: float = 0.0,
+    ) -> float:
+        """
+        Report a rejected (429) request.
+
+        `retry_after` is the server's hint as parsed (None when the response
+        had none); `fallback_sec` is the caller's own backoff used without a
+        hint. The next token for (api_key, model) becomes due after that
+        delay in every process; requests after it are paced at the normal
+        rate instead of bursting. Returns the applied delay (capped at
+        `max_retry_after_sec`).
+        """
+        requested = retry_after if retry_after is not None else fallback_sec
+        delay = min(max(requested, 0.0), self.max_retry_after_sec)
+        with self._lock:
+            self.stats["throttled"] += 1
+            if retry_after is not None:
+                self.stats["retry_after_hints"] += 1
+        if not self.active or delay <= 0:
+            return delay
+
+        def block(tokens: float, limit: RateLimit) -> tuple[float, float]:
+            # Долг в токенах: следующий токен появится ровно через delay
+            return min(tokens, 1.0 - delay * limit.per_sec), delay
+
+        try:
+            self._update(api_key, model, block)
+            logger.warning(f"🚦 Rate limited on {model}: next request in {delay:.1f}s")
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"⚠️ Could not record rate limit for {model}: {e}")
+        return delay
+
+    def _record(self, model: str, wait: float) -> None:
+        with self._lock:
+            self.stats["acquires"] += 1
+            per_model = self._model_stats.setdefault(model, {"acquires": 0, "wait_sec": 0.0})
+            per_model["acquires"] += 1
+            if wait > 0:
+                self.stats["waited"] += 1
+                self.stats["wait_sec"] += wait
+                self.stats["max_wait_sec"] = max(self.stats["max_wait_sec"], wait)
+                per_model["wait_sec"] += wait
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue wait and throttling counters for run metadata."""
+        with self._lock:
+            stats = dict(self.stats)
+            models = {
+                model: {**values, "wait_sec": round(values["wait_sec"], 3)}
+                for model, values in self._model_stats.items()
+            }
+        stats["wait_sec"] = round(stats["wait_sec"], 3)
+        stats["max_wait_sec"] = round(stats["max_wait_sec"], 3)
+        stats["avg_wait_sec"] = round(stats["wait_sec"] / stats["acquires"], 3) if stats["acquires"] else 0.0
+        stats["enabled"] = self.enabled
+        stats["models"] = models
+        return stats
+
+
+def _rate_limit(section: Any, fallback: RateLimit) -> RateLimit:
+    if not hasattr(section, "get"):
+        return fallback
+    rpm = section.get("requests_per_minute")
+    burst = section.get("burst")
+    return RateLimit(
+        requests_per_minute=float(rpm) if isinstance(rpm, (int, float)) and not isinstance(rpm, bool) and rpm > 0
+        else fallback.requests_per_minute,
+        burst=int(burst) if isinstance(burst, int) and not isinstance(burst, bool) and burst > 0 else fallback.burst,
+    )
+
+
+def _settings(config: Any) -> dict[str, Any]:
+    """RateLimiter arguments from the `rate_limits` and `caching` config sections."""
+    settings: dict[str, Any] = {"db_path": Path("cache") / STORE_NAME}
+    if not hasattr(config, "get"):
+        return settings
+
+    caching = config.get("caching", {})
+    cache_dir = caching.get("dir") if hasattr(caching, "get") else None
+    if isinstance(cache_dir, str) and cache_dir:
+        settings["db_path"] = Path(cache_dir) / STORE_NAME
+
+    section = config.get("rate_limits", {})
+    if not hasattr(section, "get"):
+        return settings
+    db_path = section.get("db_path")
+    if isinstance(db_path, str) and db_path:
+        settings["db_path"] = Path(db_path)
+    settings["enabled"] = section.get("enabled", True) is not False
+    default = _rate_limit(section, RateLimit())
+    settings["default"] = default
+    models = section.get("models")
+    if hasattr(models, "items"):
+        settings["models"] = {str(name): _rate_limit(limit, default) for name, limit in models.items()}
+    max_retry_after = section.get("max_retry_after_sec")
+    if isinstance(max_retry_after, (int, float)) and not isinstance(max_retry_after, bool):
+        settings["max_retry_after_sec"] = float(max_retry_after)
+    return settings
+
+
+_limiter: RateLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide RateLimiter (default limits, `cache/` store on first use)."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(**_settings(None))
+        return _limiter
+
+
+def reset_rate_limiter(config: Any = None, db_path: str | Path | None = None) -> RateLimiter:
+    """
+    Start a fresh process-wide RateLimiter for a new run.
+
+    Settings come from the `rate_limits` config section; `db_path`
+    overrides where the shared store lives.
+    """
+    global _limiter
+    settings = _settings(config)
+    if db_path is not None:
+        settings["db_path"] = Path(db_path)
+    with _limiter_lock:
+        _limiter = RateLimiter(**settings)
+        return _limiter
+
+
+def get_rate_limit_stats() -> Dict[str, Any] | None:
+    """Stats of the process-wide limiter, or None if it was never used."""
+    return _limiter.get_stats() if _limiter is not None else None
@@ -0,0 +1,189 @@
+"""core.utils.stock_catalog
+
+Local SQLite index of every stock clip we have ingested.
+
+Each row describes one (hit id, rendition) with its tags, duration,
+resolution and how often it has been used. Renderers query the catalog by
+keywords and a minimum duration before calling the stock API; picks go to
+the least used matching clip so renders spread evenly over the library.
+
+A pick is only a query: the caller records the use with `record_use` once
+the clip is actually usable (downloaded and transcoded), so clips that
+fail to fetch do not pile up usage they never had.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+US_PER_SEC = 1_000_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    source       TEXT    NOT NULL,
+    hit_id       TEXT    NOT NULL,
+    rendition    TEXT    NOT NULL,
+    url          TEXT,
+    tags         TEXT    NOT NULL DEFAULT '',
+    duration_us  INTEGER NOT NULL DEFAULT 0,
+    width        INTEGER,
+    height       INTEGER,
+    usage_count  INTEGER NOT NULL DEFAULT 0,
+    last_used_at REAL    NOT NULL DEFAULT 0,
+    added_at     REAL    NOT NULL,
+    PRIMARY KEY (source, hit_id, rendition)
+);
+CREATE INDEX IF NOT EXISTS clips_usage ON clips (usage_count, last_used_at);
+"""
+
+
+def _normalize_tags(tags: str | Iterable[str] | None) -> str:
+    """Store tags as ',tag one,tag two,' so whole tags can be matched with instr()."""
+    if not tags:
+        return ""
+    items = tags.split(",") if isinstance(tags, str) else tags
+    cleaned = [str(t).strip().lower() for t in items if str(t).strip()]
+    return "," + ",".join(cleaned) + "," if cleaned else ""
+
+
+class StockCatalog:
+    """SQLite catalog of ingested stock clips."""
+
+    def __init__(self, db_path: str | Path, source: str = "pixabay"):
+        self.db_path = Path(db_path)
+        self.source = source
+        self.stats = {"hits": 0, "misses": 0, "added": 0}
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.executescript(_SCHEMA)
+            yield conn
+        finally:
+            conn.close()
+
+    def add(self, hit: Dict[str, Any]) -> None:
+        """
+        Insert or refresh a clip from a stock search hit.
+
+        `hit` uses the renderer's hit format: hit_id, rendition, url, tags,
+        duration (seconds), width, height. Usage counters are preserved.
+        """
+        duration_us = int(float(hit.get("duration") or 0) * US_PER_SEC)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO clips (source, hit_id, rendition, url, tags, duration_us, width, height, added_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (source, hit_id, rendition) DO UPDATE SET
+                    url = excluded.url,
+                    tags = excluded.tags,
+                    duration_us = excluded.duration_us,
+                    width = excluded.width,
+                    height = excluded.height
+                """,
+                (
+                    self.source,
+                    str(hit["hit_id"]),
+                    hit["rendition"],
+                    hit.get("url"),
+                    _normalize_tags(hit.get("tags")),
+                    duration_us,
+                    hit.get("width"),
+                    hit.get("height"),
+                    time.time(),
+                ),
+            )
+        self.stats["added"] += 1
+
+    def pick(self, keywords: Iterable[str], min_duration_us: int = 0) -> Dict[str, Any] | None:
+        """
+        Least used clip matching any keyword and at least `min_duration_us` long.
+
+        Ties are broken by keyword overlap, then by least recent use. The pick
+        is not counted as a use (see `record_use`). Returns a hit dict or None.
+        """
+        terms = sorted({str(k).strip().lower() for k in keywords if str(k).strip()})
+        if not terms or not self.db_path.exists():
+            self.stats["misses"] += 1
+            return None
+
+        score_sql = " + ".join(["(instr(tags, ?) > 0)"] * len(terms))
+        params = [f",{term}," for term in terms]
+        with self._connect() as conn:
+            row = conn.execute(
+                f"""
+                SELECT * FROM (
+                    SELECT *, ({score_sql}) AS score FROM clips
+                    WHERE source = ? AND duration_us >= ?
+                )
+                WHERE score > 0
+                ORDER BY usage_count ASC, score DESC, last_used_at ASC
+                LIMIT 1
+                """,
+                (*params, self.source, int(min_duration_us)),
+            ).fetchone()
+
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return self._row_to_hit(row)
+
+    def record_use(self, hit_id: Any, rendition: str) -> None:
+        """Count one use of a clip that made it into a render."""
+        if not self.db_path.exists():
+            return
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE clips SET usage_count = usage_count + 1, last_used_at = ?
+                WHERE source = ? AND hit_id = ? AND rendition = ?
+                """,
+                (time.time(), self.source, str(hit_id), rendition),
+            )
+
+    def remove(self, hit_id: Any, rendition: str) -> None:
+        """Forget a clip (e.g. its file can no longer be fetched)."""
+        if not self.db_path.exists():
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM clips WHERE source = ? AND hit_id = ? AND rendition = ?",
+                (self.source, str(hit_id), rendition),
+            )
+
+    def count(self) -> int:
+        """Number of clips in the catalog."""
+        if not self.db_path.exists():
+            return 0
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM clips WHERE source = ?", (self.source,)).fetchone()[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for run metadata."""
+        return {**self.stats, "clips": self.count()}
+
+    @staticmethod
+    def _row_to_hit(row: sqlite3.Row) -> Dict[str, Any]:
+        hit_id = row["hit_id"]
+        return {
+            "hit_id": int(hit_id) if hit_id.isdigit() else hit_id,
+            "rendition": row["rendition"],
+            "url": row["url"],
+            "tags": ", ".join(t for t in row["tags"].split(",") if t),
+            "duration": row["duration_us"] / US_PER_SEC,
+            "width": row["width"],
+            "height": row["height"],
+            "usage_count": row["usage_count"],
+        }
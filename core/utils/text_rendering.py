@@ -0,0 +1,235 @@
+"""core.utils.text_rendering
+
+Text rasterization shared by all renderers.
+
+- Fonts are resolved once and cached per (path, size).
+- Rendered text is memoized per (text, font, size, color, box, layout) as a
+  tightly cropped RGBA sprite plus its offset, so repeated titles, slides and
+  preview/full renders of the same text cost one paste.
+- PIL is the default (fast) engine. ImageMagick `TextClip` is only used when
+  asked for, and its availability is probed once per process instead of
+  failing (and spawning a subprocess) for every clip.
+"""
+
+from __future__ import annotations
+
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger(__name__)
+
+# Bold sans fonts, best first
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "/System/Library/Fonts/Arial.ttf",  # macOS
+    "C:\\Windows\\Fonts\\arial.ttf",  # Windows
+]
+
+TEXT_ENGINES = ("pil", "imagemagick", "auto")
+
+FONT_CACHE_SIZE = 64
+SPRITE_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=1)
+def default_font_path() -> str | None:
+    """First installed font from FONT_CANDIDATES (None = PIL built-in font)."""
+    for font_path in FONT_CANDIDATES:
+        if Path(font_path).exists():
+            return font_path
+    logger.warning("Could not find a TrueType font, using PIL default")
+    return None
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(font_path: str | None, size: int) -> ImageFont.ImageFont:
+    """Load a font once per (path, size); None means the default font."""
+    font_path = font_path or default_font_path()
+    if font_path:
+        try:
+            return ImageFont.truetype(font_path, size)
+        except OSError as e:
+            logger.warning(f"Could not load font {font_path}: {e}")
+    return ImageFont.load_default()
+
+
+@lru_cache(maxsize=1)
+def imagemagick_available() -> bool:
+    """Whether MoviePy `TextClip` works here (probed once per process)."""
+    try:
+        from moviepy.editor import TextClip
+
+        TextClip("probe", fontsize=10, color="white").close()
+        return True
+    except Exception as e:
+        logger.info(f"ImageMagick TextClip unavailable, using PIL text: {e}")
+        return False
+
+
+def wrap_text(text: str, max_chars_per_line: int) -> list[str]:
+    """Greedy word wrap by character count."""
+    lines: list[str] = []
+    current_line = ""
+    for word in text.split():
+        test_line = current_line + (" " if current_line else "") + word
+        if len(test_line) <= max_chars_per_line or not current_line:
+            current_line = test_line
+        else:
+            lines.append(current_line)
+            current_line = word
+    if current_line:
+        lines.append(current_line)
+    return lines or [text]
+
+
+@lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def _render_sprite(
+    text: str,
+    box: tuple[int, int],
+    font_path: str | None,
+    font_size: int,
+    color: tuple,
+    max_chars_per_line: int,
+    line_spacing: int,
+    shadow: tuple[int, tuple] | None,
+    scale: float,
+) -> tuple[Image.Image | None, tuple[int, int]]:
+    """Centered text block in `box`, cropped to its bounding box: (sprite, offset)."""
+    # Layout always happens at full resolution; previews scale the result
+    full_box = (round(box[0] / scale), round(box[1] / scale))
+    canvas = Image.new("RGBA", full_box, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(canvas)
+    font = get_font(font_path, font_size)
+
+    lines = wrap_text(text, max_chars_per_line)
+    block_height = len(lines) * font_size + (len(lines) - 1) * line_spacing
+    y_offset = (full_box[1] - block_height) // 2
+    fill = tuple(color) + (255,) if len(color) == 3 else tuple(color)
+
+    for i, line in enumerate(lines):
+        bbox = draw.textbbox((0, 0), line, font=font)
+        x = (full_box[0] - (bbox[2] - bbox[0])) // 2
+        y = y_offset + i * (font_size + line_spacing)
+        if shadow is not None:
+            offset, shadow_color = shadow
+            draw.text((x + offset, y + offset), line, fill=tuple(shadow_color) + (255,), font=font)
+        draw.text((x, y), line, fill=fill, font=font)
+
+    if scale != 1.0:
+        canvas = canvas.resize(box, Image.LANCZOS)
+
+    bbox = canvas.getbbox()
+    if bbox is None:
+        return None, (0, 0)
+    return canvas.crop(bbox), (bbox[0], bbox[1])
+
+
+def render_text(
+    text: str,
+    width: int,
+    height: int,
+    font_size: int,
+    color: tuple = (255, 255, 255),
+    max_chars_per_line: int | None = None,
+    line_spacing: int = 10,
+    shadow: tuple[int, tuple] | None = None,
+    font_path: str | None = None,
+    scale: float = 1.0,
+) -> Image.Image:
+    """
+    Transparent `width`x`height` RGBA image with `text` centered on it.
+
+    `font_size`, `max_chars_per_line`, `line_spacing` and `shadow`
+    (offset, color) are given at full resolution; with `scale` < 1 the
+    text is laid out at full size and downscaled, so previews keep the same
+    line breaks. The default wrap width is `width // (font_size // 2)`
+    characters at full resolution.
+    """
+    if max_chars_per_line is None:
+        max_chars_per_line = round(width / scale) // max(1, font_size // 2)
+    sprite, offset = _render_sprite(
+        text,
+        (width, height),
+        font_path,
+        font_size,
+        tuple(color),
+        max(1, max_chars_per_line),
+        line_spacing,
+        shadow,
+        scale,
+    )
+    image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    if sprite is not None:
+        image.paste(sprite, offset)
+    return image
+
+
+def draw_text(image: Image.Image, text: str, **kwargs: Any) -> Image.Image:
+    """Composite `render_text` output onto `image` in place (RGB or RGBA)."""
+    overlay = render_text(text, image.width, image.height, **kwargs)
+    if image.mode == "RGBA":
+        image.alpha_composite(overlay)
+    else:
+        image.paste(overlay, (0, 0), overlay)
+    return image
+
+
+def make_text_clip(
+    text: str,
+    width: int,
+    height: int,
+    font_size: int,
+    duration: float,
+    color: tuple = (255, 255, 255),
+    engine: str = "pil",
+    scale: float = 1.0,
+    **kwargs: Any,
+):
+    """
+    Full-frame text clip for MoviePy compositing.
+
+    engine: "pil" (default, no subprocess), "imagemagick" or "auto"
+    (ImageMagick when the one-time probe succeeded). ImageMagick clips are
+    text-sized and centered; any ImageMagick failure falls back to PIL.
+    """
+    import numpy as np
+    from moviepy.editor import ImageClip, TextClip
+
+    if engine in ("imagemagick", "auto") and imagemagick_available():
+        try:
+            return TextClip(
+                text,
+                fontsize=max(1, round(font_size * scale)),
+                color="rgb({},{},{})".format(*color[:3]),
+                font="Arial-Bold",
+                method="caption",
+                size=(width - max(1, round(40 * scale)), None),
+            ).set_position("center").set_duration(duration)
+        except Exception as e:
+            logger.warning(f"TextClip failed, falling back to PIL: {e}")
+
+    overlay = render_text(text, width, height, font_size, color, scale=scale, **kwargs)
+    return ImageClip(np.array(overlay)).set_duration(duration)
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Font and rendered-text cache counters for run metadata."""
+    fonts = get_font.cache_info()
+    sprites = _render_sprite.cache_info()
+    return {
+        "fonts": {"hits": fonts.hits, "misses": fonts.misses, "size": fonts.currsize},
+        "text": {"hits": sprites.hits, "misses": sprites.misses, "size": sprites.currsize},
+    }
+
+
+def clear_caches() -> None:
+    """Drop all cached fonts and rendered text (tests, font changes)."""
+    default_font_path.cache_clear()
+    get_font.cache_clear()
+    _render_sprite.cache_clear()
+    imagemagick_available.cache_clear()
@@ -0,0 +1,302 @@
+"""core.utils.video_encoder
+
+Pluggable encoder backends for MoviePy timelines.
+
+The backend is selected with `video.encoder` in the project config:
+
+- "moviepy": MoviePy `write_videofile` (historical behaviour)
+- "ffmpeg_pipe": frames are copied into one preallocated, reused uint8
+  buffer and streamed straight into an ffmpeg stdin pipe
+
+Both backends take the same `EncoderSettings`, so switching is a config
+change only. Renders with extra framings (`extra_outputs`, see
+`ffmpeg_utils`) always go through "ffmpeg_pipe": the frames are generated
+once and split inside ffmpeg into every output.
+"""
+
+from __future__ import annotations
+
+import logging
+import subprocess
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, Type
+
+import numpy as np
+
+from core.utils import ffmpeg_utils
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODER = "moviepy"
+
+
+@dataclass
+class EncoderSettings:
+    """Codec parameters shared by all encoder backends."""
+
+    fps: int = 30
+    codec: str = "libx264"
+    audio_codec: str = "aac"
+    bitrate: str | None = None
+    preset: str = "medium"
+    threads: int | None = None
+    pix_fmt: str = "yuv420p"
+    encoder: str = DEFAULT_ENCODER
+    # ffmpeg -vf applied while encoding (e.g. burned-in subtitles)
+    video_filter: str | None = None
+
+    def with_overrides(self, **overrides: Any) -> "EncoderSettings":
+        """Copy with non-None overrides applied."""
+        return replace(self, **{k: v for k, v in overrides.items() if v is not None})
+
+
+def settings_from_config(video_cfg: Any, **defaults: Any) -> EncoderSettings:
+    """
+    Build EncoderSettings from a `video` config section.
+
+    `defaults` (e.g. per-mode fps/bitrate) are used when the config does not
+    set a value. Unknown or mock-like configs fall back to defaults.
+    """
+    settings = EncoderSettings().with_overrides(**defaults)
+    if not hasattr(video_cfg, "get"):
+        return settings
+
+    overrides: Dict[str, Any] = {}
+    for key, cast in (
+        ("encoder", str),
+        ("codec", str),
+        ("audio_codec", str),
+        ("preset", str),
+        ("pix_fmt", str),
+        ("threads", int),
+    ):
+        value = video_cfg.get(key)
+        if isinstance(value, (str, int)) and not isinstance(value, bool):
+            overrides[key] = cast(value)
+
+    # threads: 0 means "let ffmpeg decide"
+    if overrides.get("threads") == 0:
+        overrides.pop("threads")
+    return settings.with_overrides(**overrides)
+
+
+class BaseEncoder(ABC):
+    """Writes a MoviePy clip to a video file."""
+
+    name: str = ""
+    # Can encode `extra_outputs` from the same frames
+    multi_output: bool = False
+
+    @abstractmethod
+    def write(
+        self,
+        clip: Any,
+        output_path: Path,
+        settings: EncoderSettings,
+        extra_outputs: list[dict] | None = None,
+    ) -> Path:
+        """Encode `clip` to `output_path` (and `extra_outputs`) and return the path."""
+
+
+_ENCODERS: Dict[str, Type[BaseEncoder]] = {}
+
+
+def register_encoder(name: str):
+    """Decorator to register an encoder backend."""
+    def decorator(cls: Type[BaseEncoder]):
+        cls.name = name
+        _ENCODERS[name] = cls
+        return cls
+    return decorator
+
+
+def get_encoder(name: str) -> BaseEncoder:
+    """Get an encoder backend instance by name."""
+    if name not in _ENCODERS:
+        available = ", ".join(_ENCODERS.keys())
+        raise ValueError(f"Encoder '{name}' not found. Available encoders: {available}")
+    return _ENCODERS[name]()
+
+
+def list_encoders() -> list[str]:
+    """Names of all registered encoder backends."""
+    return list(_ENCODERS.keys())
+
+
+@register_encoder("moviepy")
+class MoviePyEncoder(BaseEncoder):
+    """MoviePy `write_videofile`."""
+
+    def write(
+        self,
+        clip: Any,
+        output_path: Path,
+        settings: EncoderSettings,
+        extra_outputs: list[dict] | None = None,
+    ) -> Path:
+        if extra_outputs:
+            raise ValueError("moviepy encoder writes a single output; use ffmpeg_pipe for extra outputs")
+        clip.write_videofile(
+            str(output_path),
+            fps=settings.fps,
+            codec=settings.codec,
+            audio_codec=settings.audio_codec,
+            bitrate=settings.bitrate,
+            preset=settings.preset,
+            threads=settings.threads,
+            ffmpeg_params=["-pix_fmt", settings.pix_fmt]
+            + (["-vf", settings.video_filter] if settings.video_filter else []),
+            verbose=False,
+            logger=None,
+        )
+        return output_path
+
+
+@register_encoder("ffmpeg_pipe")
+class FFmpegPipeEncoder(BaseEncoder):
+    """
+    Stream raw RGB frames into ffmpeg stdin.
+
+    Every frame is copied into the same preallocated buffer (no per-frame
+    astype/tobytes allocations) and written through a memoryview. With
+    `extra_outputs` the piped frames are split inside ffmpeg, so every
+    framing is encoded from the same frames in one process.
+    """
+
+    multi_output = True
+
+    def write(
+        self,
+        clip: Any,
+        output_path: Path,
+        settings: EncoderSettings,
+        extra_outputs: list[dict] | None = None,
+    ) -> Path:
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        width, height = (int(v) for v in clip.size)
+
+        with tempfile.TemporaryDirectory(prefix="encode_", dir=output_path.parent) as tmp_dir:
+            audio_path = None
+            if getattr(clip, "audio", None) is not None:
+                audio_path = Path(tmp_dir) / "audio.wav"
+                clip.audio.write_audiofile(
+                    str(audio_path),
+                    fps=ffmpeg_utils.AUDIO_SAMPLE_RATE,
+                    nbytes=2,
+                    codec="pcm_s16le",
+                    verbose=False,
+                    logger=None,
+                )
+
+            cmd = self._build_command(width, height, output_path, settings, audio_path, extra_outputs)
+            with tempfile.TemporaryFile() as stderr_file:
+                proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=stderr_file)
+                try:
+                    self._stream_frames(clip, proc, width, height, settings.fps)
+                except BrokenPipeError:
+                    # ffmpeg exited early; the real error is in its stderr
+                    pass
+                finally:
+                    try:
+                        proc.stdin.close()
+                    except BrokenPipeError:
+                        pass
+                    returncode = proc.wait()
+
+                if returncode != 0:
+                    stderr_file.seek(0)
+                    stderr = stderr_file.read().decode("utf-8", errors="replace").strip()
+                    raise RuntimeError(f"ffmpeg failed ({returncode}): {stderr[-1000:]}")
+
+        return output_path
+
+    @staticmethod
+    def _build_command(
+        width: int,
+        height: int,
+        output_path: Path,
+        settings: EncoderSettings,
+        audio_path: Path | None,
+        extra_outputs: list[dict] | None = None,
+    ) -> list[str]:
+        cmd = [
+            ffmpeg_utils.get_ffmpeg_exe(),
+            "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "rawvideo",
+            "-pix_fmt", "rgb24",
+            "-s", f"{width}x{height}",
+            "-r", str(settings.fps),
+            "-i", "pipe:0",
+        ]
+        if audio_path is not None:
+            cmd += ["-i", str(audio_path)]
+
+        outputs = [
+            {"path": output_path, "bitrate": settings.bitrate, "video_filter": settings.video_filter},
+            *(extra_outputs or []),
+        ]
+        if len(outputs) > 1:
+            chains, labels = ffmpeg_utils.output_branches("[0:v]", outputs)
+            cmd += ["-filter_complex", ";".join(chains)]
+        else:
+            labels = ["0:v"]
+        for label, output in zip(labels, outputs):
+            Path(output["path"]).parent.mkdir(parents=True, exist_ok=True)
+            cmd += ["-map", label]
+            if audio_path is not None:
+                cmd += ["-map", "1:a"]
+            if len(outputs) == 1 and output["video_filter"]:
+                cmd += ["-vf", output["video_filter"]]
+            cmd += [
+                "-c:v", settings.codec,
+                "-preset", settings.preset,
+                "-pix_fmt", settings.pix_fmt,
+            ]
+            if output.get("bitrate"):
+                cmd += ["-b:v", output["bitrate"]]
+            if settings.threads:
+                cmd += ["-threads", str(settings.threads)]
+            if audio_path is not None:
+                cmd += [
+                    "-c:a", settings.audio_codec,
+                    "-ar", str(ffmpeg_utils.AUDIO_SAMPLE_RATE),
+                    "-ac", str(ffmpeg_utils.AUDIO_CHANNELS),
+                ]
+            cmd += ["-movflags", "+faststart", str(output["path"])]
+        return cmd
+
+    @staticmethod
+    def _stream_frames(clip: Any, proc: subprocess.Popen, width: int, height: int, fps: int) -> None:
+        buffer = np.empty((height, width, 3), dtype=np.uint8)
+        view = memoryview(buffer).cast("B")
+        for t in np.arange(0, clip.duration, 1.0 / fps):
+            frame = clip.get_frame(t)
+            np.copyto(buffer, frame[:, :, :3], casting="unsafe")
+            proc.stdin.write(view)
+
+
+def write_clip(
+    clip: Any,
+    output_path: Path,
+    settings: EncoderSettings,
+    extra_outputs: list[dict] | None = None,
+) -> Path:
+    """
+    Encode `clip` with the backend named in `settings.encoder`.
+
+    `extra_outputs` (other framings, see `ffmpeg_utils`) need a
+    multi-output backend; single-output backends are replaced by
+    "ffmpeg_pipe" for such renders.
+    """
+    encoder = get_encoder(settings.encoder)
+    if extra_outputs and not encoder.multi_output:
+        logger.info(f"🪟 {encoder.name} writes one output; using ffmpeg_pipe for {len(extra_outputs) + 1} framings")
+        encoder = get_encoder("ffmpeg_pipe")
+    logger.debug(f"Encoding {output_path} with {encoder.name}")
+    if extra_outputs:
+        return encoder.write(clip, Path(output_path), settings, extra_outputs)
+    return encoder.write(clip, Path(output_path), settings)
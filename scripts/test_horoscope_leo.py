@@ -67,6 +67,8 @@ def extract_design_config(config: dict) -> dict:
         'font_family': design.get('font_family', 'Arial'),
         'fps': output.get('fps', 30),
         'bitrate': output.get('bitrate', '5000k'),
+        'encoder': output.get('encoder', 'moviepy'),
+        'preset': output.get('preset', 'medium'),
         'transitions': transitions,
     }
 
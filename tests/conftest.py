@@ -21,6 +21,25 @@ import pytest
 import core.utils
 # core.utils.model_router = sys.modules['core.utils.model_router']
 
+@pytest.fixture(autouse=True)
+def _reset_genai_client_pool():
+    """Pooled genai clients must not leak (mocked or real) between tests."""
+    from core.utils import genai_pool
+
+    genai_pool.reset_client_pool()
+    yield
+    genai_pool.reset_client_pool()
+
+
+@pytest.fixture(autouse=True)
+def _isolated_rate_limiter(tmp_path):
+    """Each test gets its own rate-limit store, so buckets do not drain across tests."""
+    from core.utils import rate_limiter
+
+    rate_limiter.reset_rate_limiter(db_path=tmp_path / "rate_limits.sqlite")
+    yield
+
+
 @pytest.fixture(scope="session")
 def test_output_dir():
     """Temporary directory for test outputs."""
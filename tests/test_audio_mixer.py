@@ -0,0 +1,173 @@
+"""Tests for the NumPy audio mixer."""
+from __future__ import annotations
+
+import time
+import wave
+
+import numpy as np
+import pytest
+
+from core.utils import audio_mixer
+from core.utils.audio_mixer import MixSettings, SoundEffect
+from core.utils.config_loader import ProjectConfig
+
+RATE = 22050
+
+
+def _write_wav(path, samples, rate=RATE, sampwidth=2):
+    """Write float samples in [-1, 1], shape (frames,) or (frames, channels)."""
+    samples = np.asarray(samples, dtype=np.float32)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(samples.shape[1])
+        f.setsampwidth(sampwidth)
+        f.setframerate(rate)
+        if sampwidth == 2:
+            f.writeframes((samples * 32767).astype("<i2").tobytes())
+        else:
+            f.writeframes((samples * 127 + 128).astype(np.uint8).tobytes())
+    return path
+
+
+def _tone(seconds, freq=440.0, level=0.5, rate=RATE):
+    t = np.arange(round(seconds * rate)) / rate
+    return level * np.sin(2 * np.pi * freq * t)
+
+
+def _rms(samples):
+    return float(np.sqrt(np.mean(np.asarray(samples, dtype=np.float64) ** 2)))
+
+
+class TestReadWav:
+    """Test memory-mapped WAV access."""
+
+    def test_int16_is_memory_mapped(self, tmp_path):
+        """16-bit PCM is mapped, not loaded, and read back as float32."""
+        path = _write_wav(tmp_path / "a.wav", _tone(0.5))
+
+        data = audio_mixer.read_wav(path)
+
+        assert isinstance(data.samples, np.memmap)
+        assert (data.sample_rate, data.channels, data.frames) == (RATE, 1, RATE // 2)
+        block = data.block(0, 100)
+        assert block.dtype == np.float32
+        assert np.abs(block[:, 0] - _tone(0.5)[:100]).max() < 1e-3
+
+    def test_unsupported_format(self, tmp_path):
+        """8-bit WAVs are rejected with ValueError."""
+        path = _write_wav(tmp_path / "a.wav", _tone(0.1), sampwidth=1)
+
+        with pytest.raises(ValueError, match="Unsupported WAV format"):
+            audio_mixer.read_wav(path)
+
+
+class TestMix:
+    """Test looping, ducking, fades and effects."""
+
+    def _voice(self, tmp_path):
+        """1s silence, 2s speech, 1s silence."""
+        voice = np.concatenate([np.zeros(RATE), _tone(2.0, 200.0, 0.3), np.zeros(RATE)])
+        return _write_wav(tmp_path / "voice.wav", voice)
+
+    def test_music_is_looped_and_ducked(self, tmp_path):
+        """Short music fills the narration and drops by duck_db under the voice."""
+        voice_path = self._voice(tmp_path)
+        music_path = _write_wav(tmp_path / "music.wav", _tone(0.7, 1000.0))
+        settings = MixSettings(music_gain_db=0.0, duck_db=-20.0, fade_in_sec=0.0, fade_out_sec=0.0)
+
+        duration = audio_mixer.mix_to_wav(voice_path, tmp_path / "mix.wav", music_path, settings)
+
+        mix = audio_mixer.read_wav(tmp_path / "mix.wav").block(0, 4 * RATE)[:, 0]
+        assert duration == pytest.approx(4.0)
+        assert len(mix) == 4 * RATE
+        music_only = _rms(mix[int(0.2 * RATE):int(0.6 * RATE)])
+        tail = _rms(mix[int(3.5 * RATE):])  # looped several times by now
+        assert music_only == pytest.approx(0.5 / np.sqrt(2), rel=0.05)
+        assert tail == pytest.approx(music_only, rel=0.05)
+        # Under the voice only 1/10 of the music is left: strip the voice to measure it
+        voice = audio_mixer.read_wav(voice_path).block(0, 4 * RATE)[:, 0]
+        ducked = _rms((mix - voice)[int(1.8 * RATE):int(2.2 * RATE)])
+        assert ducked == pytest.approx(music_only / 10, rel=0.1)
+
+    def test_fades_and_music_offset(self, tmp_path):
+        """Fades shape the ends; the offset continues the music loop."""
+        voice_path = _write_wav(tmp_path / "voice.wav", np.zeros(2 * RATE))
+        music = _tone(1.0, 5.0, 0.5)  # slow ramp, position is easy to read
+        music_path = _write_wav(tmp_path / "music.wav", music)
+        settings = MixSettings(music_gain_db=0.0, fade_in_sec=1.0, fade_out_sec=0.5)
+
+        audio_mixer.mix_to_wav(voice_path, tmp_path / "faded.wav", music_path, settings)
+        audio_mixer.mix_to_wav(
+            voice_path, tmp_path / "offset.wav", music_path, settings,
+            music_offset_sec=0.25, fade_in=False, fade_out=False,
+        )
+
+        faded = audio_mixer.read_wav(tmp_path / "faded.wav").block(0, 2 * RATE)[:, 0]
+        assert abs(faded[100]) < 0.01
+        assert abs(faded[-10]) < 0.01
+        offset = audio_mixer.read_wav(tmp_path / "offset.wav").block(0, 2 * RATE)[:, 0]
+        assert offset[0] == pytest.approx(music[RATE // 4], abs=2e-3)
+
+    def test_resamples_and_downmixes_music(self, tmp_path):
+        """44.1 kHz stereo music is mixed into 22.05 kHz mono narration."""
+        voice_path = _write_wav(tmp_path / "voice.wav", np.zeros(RATE))
+        stereo = np.stack([_tone(0.5, 300.0, 0.4, 44100), _tone(0.5, 300.0, 0.2, 44100)], axis=1)
+        music_path = _write_wav(tmp_path / "music.wav", stereo, rate=44100)
+        settings = MixSettings(music_gain_db=0.0, fade_in_sec=0.0, fade_out_sec=0.0)
+
+        audio_mixer.mix_to_wav(voice_path, tmp_path / "mix.wav", music_path, settings)
+
+        mix = audio_mixer.read_wav(tmp_path / "mix.wav")
+        assert (mix.sample_rate, mix.channels, mix.frames) == (RATE, 1, RATE)
+        expected = _tone(1.0, 300.0, 0.3)
+        assert np.abs(mix.block(0, RATE)[:, 0] - expected).max() < 0.01
+
+    def test_sound_effect_placed(self, tmp_path):
+        """Effects are added at `at_sec` with their gain, without music."""
+        voice_path = _write_wav(tmp_path / "voice.wav", np.zeros(RATE))
+        chime_path = _write_wav(tmp_path / "chime.wav", np.full(RATE // 10, 0.5))
+        settings = MixSettings(effects=[SoundEffect(chime_path, at_sec=0.5, gain_db=-6.0)])
+
+        audio_mixer.mix_to_wav(voice_path, tmp_path / "mix.wav", None, settings)
+
+        mix = audio_mixer.read_wav(tmp_path / "mix.wav").block(0, RATE)[:, 0]
+        assert np.abs(mix[: RATE // 2]).max() == 0
+        assert mix[RATE // 2 + 10] == pytest.approx(0.25, abs=0.01)
+        assert np.abs(mix[RATE // 2 + RATE // 10:]).max() == 0
+
+    def test_settings_from_config(self):
+        """Configured values override defaults; keys that are not set keep them."""
+        config = ProjectConfig({"audio": {"background_music": {"path": None, "duck_db": -6, "fade_in_sec": 0.5}}})
+        settings = audio_mixer.settings_from_config(config)
+
+        assert settings.duck_db == -6.0
+        assert settings.fade_in_sec == 0.5
+        assert settings.release_sec == MixSettings().release_sec
+        assert audio_mixer.settings_from_config(ProjectConfig({})) == MixSettings()
+
+    def test_settings_from_config_rejects_non_numbers(self):
+        """A typo in the config is an error, not a silent default."""
+        config = ProjectConfig({"audio": {"background_music": {"release_sec": "slow"}}})
+
+        with pytest.raises(ValueError, match="release_sec"):
+            audio_mixer.settings_from_config(config)
+
+
+@pytest.mark.slow
+class TestMixPerformance:
+    """A long mix stays fast and is written block by block."""
+
+    def test_twelve_minute_mix(self, tmp_path):
+        voice = np.tile(np.concatenate([_tone(2.5, 200.0, 0.3), np.zeros(RATE * 3 // 2)]), 180)
+        voice_path = _write_wav(tmp_path / "voice.wav", voice)
+        music_path = _write_wav(tmp_path / "music.wav", np.stack([_tone(30.0, 440.0, 0.5, 44100)] * 2, axis=1), 44100)
+        del voice
+
+        started = time.perf_counter()
+        duration = audio_mixer.mix_to_wav(voice_path, tmp_path / "mix.wav", music_path)
+        elapsed = time.perf_counter() - started
+
+        assert duration == pytest.approx(720.0)
+        assert audio_mixer.read_wav(tmp_path / "mix.wav").frames == 720 * RATE
+        assert elapsed < 3.0  # ~0.4s here; generous for slow CI machines
@@ -0,0 +1,158 @@
+"""Tests for the NumPy background engine."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from core.utils import backgrounds
+
+
+@pytest.fixture(autouse=True)
+def _clear_background_caches():
+    backgrounds.clear_caches()
+    yield
+    backgrounds.clear_caches()
+
+
+class TestSpecFromDesign:
+    """Test parsing the `design` config section."""
+
+    def test_gradient_alias_and_colors(self):
+        """`gradient` is a linear gradient between the two design colors."""
+        spec = backgrounds.spec_from_design({
+            "background_type": "gradient",
+            "background_color": "#2B1B3D",
+            "background_secondary": "#1a0f2e",
+        })
+
+        assert spec.kind == "linear"
+        assert spec.primary == (43, 27, 61)
+        assert spec.secondary == (26, 15, 46)
+
+    def test_defaults(self):
+        """Missing or unknown settings fall back to a solid background."""
+        assert backgrounds.spec_from_design({}, primary=(1, 2, 3)) == backgrounds.BackgroundSpec(primary=(1, 2, 3))
+        assert backgrounds.spec_from_design({"background_type": "plasma"}).kind == "solid"
+
+    def test_secondary_defaults_to_shade(self):
+        """Gradients without a secondary color use a darker shade of the primary."""
+        spec = backgrounds.spec_from_design({"background_type": "radial"}, primary=(200, 100, 0))
+        assert spec.secondary == backgrounds.shade((200, 100, 0), 0.45)
+
+
+class TestRenderFrame:
+    """Test gradient frames."""
+
+    def test_solid(self):
+        """Solid backgrounds fill the buffer with one color."""
+        frame = backgrounds.render_frame(backgrounds.BackgroundSpec(primary=(10, 20, 30)), 8, 4)
+        assert frame.shape == (4, 8, 3)
+        assert (frame == (10, 20, 30)).all()
+
+    def test_linear_matches_float_reference(self):
+        """Vertical gradient equals per-row linear interpolation."""
+        spec = backgrounds.BackgroundSpec("linear", (255, 0, 0), (0, 0, 255))
+
+        frame = backgrounds.render_frame(spec, 16, 256)
+
+        weights = np.linspace(0, 1, 256)[:, None]
+        expected = np.array([255, 0, 0]) + (np.array([0, 0, 255]) - np.array([255, 0, 0])) * weights
+        assert np.abs(frame[:, 0].astype(int) - expected).max() <= 2
+        assert (frame[:, 0] == frame[:, -1]).all()
+
+    def test_horizontal_angle(self):
+        """angle=0 runs left to right."""
+        spec = backgrounds.BackgroundSpec("linear", (0, 0, 0), (255, 255, 255), angle=0.0)
+        frame = backgrounds.render_frame(spec, 64, 8)
+        assert tuple(frame[0, 0]) == (0, 0, 0)
+        assert tuple(frame[0, -1]) == (255, 255, 255)
+        assert (frame[0] == frame[-1]).all()
+
+    def test_radial(self):
+        """Radial gradients are primary in the center and secondary in the corners."""
+        spec = backgrounds.BackgroundSpec("radial", (200, 0, 0), (0, 0, 0))
+        frame = backgrounds.render_frame(spec, 101, 101)
+        assert frame[50, 50, 0] > 195
+        assert tuple(frame[0, 0]) == (0, 0, 0)
+
+    def test_reuses_output_buffer(self):
+        """Frames are written into the buffer passed as `out`."""
+        spec = backgrounds.BackgroundSpec("linear", (0, 0, 0), (255, 255, 255))
+        out = np.zeros((20, 10, 3), dtype=np.uint8)
+
+        assert backgrounds.render_frame(spec, 10, 20, out=out) is out
+        backgrounds.render_frame(spec, 10, 20, out=out)
+        assert backgrounds.get_cache_stats()["index_maps"]["hits"] == 1
+
+
+class TestAnimatedBackgrounds:
+    """Test periodic animation and the frame loop cache."""
+
+    SPEC = backgrounds.BackgroundSpec("animated", (0, 0, 0), (200, 100, 50), period=1.0)
+
+    def test_animation_is_periodic(self):
+        """Colors drift over time and repeat after `period`."""
+        start = backgrounds.render_frame(self.SPEC, 8, 16, t=0.0)
+        middle = backgrounds.render_frame(self.SPEC, 8, 16, t=0.5)
+        end = backgrounds.render_frame(self.SPEC, 8, 16, t=1.0)
+
+        assert not (start == middle).all()
+        assert np.abs(start.astype(int) - end.astype(int)).max() <= 1
+
+    def test_frame_loop_cached(self):
+        """One period is rendered once and replayed for every later frame."""
+        source = backgrounds.frame_source(self.SPEC, 8, 16, fps=10)
+        first = source(0.3)
+        again = source(1.3)
+
+        assert again is not first
+        assert (again == first).all()
+        assert not first.flags.writeable
+        stats = backgrounds.get_cache_stats()["frame_loops"]
+        assert stats["misses"] == 1 and stats["size"] == 1
+
+    def test_production_loop_cached_as_strip(self):
+        """A 1080x1920 loop of 8 s at 30 fps is cached as one column per frame."""
+        spec = backgrounds.BackgroundSpec("animated", (0, 0, 0), (200, 100, 50))
+        source = backgrounds.frame_source(spec, 1080, 1920, fps=30)
+        frame = source(2.0)
+
+        assert frame.shape == (1920, 1080, 3)
+        assert (frame == backgrounds.render_frame(spec, 1080, 1920, t=2.0)).all()
+        assert (source(10.0) == frame).all()
+        assert backgrounds._frame_loop(spec, 1080, 1920, 30).nbytes == 240 * 1920 * 3
+        stats = backgrounds.get_cache_stats()["frame_loops"]
+        assert stats["misses"] == 1 and stats["size"] == 1
+
+    def test_horizontal_loop_cached_as_row(self):
+        """Left-to-right gradients keep one row per frame."""
+        spec = backgrounds.BackgroundSpec("animated", (0, 0, 0), (200, 100, 50), angle=0.0, period=1.0)
+        frame = backgrounds.frame_source(spec, 32, 16, fps=10)(0.3)
+
+        assert (frame == backgrounds.render_frame(spec, 32, 16, t=0.3)).all()
+        assert backgrounds._frame_loop(spec, 32, 16, 10).shape == (10, 1, 32, 3)
+
+    def test_large_loops_render_on_the_fly(self, monkeypatch):
+        """Loops over the memory budget reuse one buffer instead of caching frames."""
+        monkeypatch.setattr(backgrounds, "LOOP_CACHE_MAX_BYTES", 100)
+        source = backgrounds.frame_source(self.SPEC, 8, 16, fps=10)
+
+        assert source(0.0) is source(0.5)
+        assert backgrounds.get_cache_stats()["frame_loops"]["size"] == 0
+
+    def test_diagonal_production_loop_renders_on_the_fly(self):
+        """A full-frame 1080x1920 loop is over budget and not pinned in memory."""
+        spec = backgrounds.BackgroundSpec("animated", (0, 0, 0), (200, 100, 50), angle=45.0)
+        source = backgrounds.frame_source(spec, 1080, 1920, fps=30)
+
+        assert source(0.0) is source(0.5)
+        assert backgrounds.get_cache_stats()["frame_loops"]["size"] == 0
+
+    def test_make_clip(self):
+        """Animated clips are VideoClips; static ones are single images."""
+        clip = backgrounds.make_clip(self.SPEC, 8, 16, duration=2.0, fps=10)
+        still = backgrounds.make_clip(backgrounds.BackgroundSpec(), 8, 16, duration=2.0, fps=10)
+
+        assert clip.duration == 2.0 and clip.size == (8, 16)
+        assert (clip.get_frame(0.2) == clip.get_frame(1.2)).all()
+        assert still.duration == 2.0 and still.size == (8, 16)
@@ -0,0 +1,120 @@
+"""Tests for deterministic clip/reader cleanup."""
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.generators import tts_generator, video_renderer
+from core.utils import clip_scope
+from core.utils.clip_scope import ClipScope
+
+
+def _open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+def _child_processes() -> int:
+    """Direct children of this process, including zombies nobody waited for."""
+    me = str(os.getpid())
+    count = 0
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            stat = Path(f"/proc/{pid}/stat").read_text()
+        except OSError:
+            continue
+        if stat.rsplit(")", 1)[1].split()[1] == me:
+            count += 1
+    return count
+
+
+class TestClipScope:
+    """Test tracking and closing."""
+
+    def test_closes_in_reverse_order(self):
+        """Resources are closed newest first, once, and the scope is emptied."""
+        closed = []
+        first, second = MagicMock(), MagicMock()
+        first.close.side_effect = lambda: closed.append("first")
+        second.close.side_effect = lambda: closed.append("second")
+
+        with ClipScope() as clips:
+            assert clips.track(first) is first
+            clips.track(second)
+            clips.track(first)
+            clips.track(None)
+            assert len(clips) == 2
+            assert clip_scope.open_count() == 2
+
+        assert closed == ["second", "first"]
+        assert len(clips) == 0
+        assert clip_scope.open_count() == 0
+
+    def test_close_errors_do_not_stop_cleanup(self):
+        """A failing close is logged and the rest are still closed."""
+        broken, ok = MagicMock(), MagicMock()
+        broken.close.side_effect = OSError("pipe gone")
+
+        with pytest.raises(ValueError):
+            with ClipScope() as clips:
+                clips.track(ok)
+                clips.track(broken)
+                raise ValueError("render failed")
+
+        ok.close.assert_called_once()
+        assert clip_scope.open_count() == 0
+
+    def test_audio_reader_process_closed(self, tmp_path):
+        """Tracked AudioFileClip readers are terminated when the scope ends."""
+        audio_path = tmp_path / "a.wav"
+        tts_generator._create_silent_wav(audio_path, 0.5)
+
+        with ClipScope() as clips:
+            audio = clips.audio(audio_path)
+            trimmed = audio.subclip(0, 0.25)
+            proc = audio.reader.proc
+            assert proc.poll() is None
+
+        assert audio.reader is None
+        assert proc.poll() is not None
+        trimmed.close()  # shallow copy: closing again is a no-op
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="counts /proc entries")
+class TestRenderSoak:
+    """Repeated renders must not accumulate open files or ffmpeg processes."""
+
+    RENDERS = 100
+    PROFILE = video_renderer.RenderProfile(width=64, height=64, fps=10, bitrate="100k", preset="ultrafast")
+
+    def test_fds_and_processes_stay_flat(self, tmp_path, monkeypatch):
+        from core.utils.config_loader import ProjectConfig
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("PIXABAY_API_KEY", raising=False)
+        config = ProjectConfig({
+            "project": {"name": "soak"},
+            "video": {"still_fast_path": False},
+            "caching": {"enabled": False, "dir": str(tmp_path / "cache")},
+        })
+        audio_path = tmp_path / "main.wav"
+        tts_generator._create_silent_wav(audio_path, 0.5)
+        audio_map = {"blocks": {"main": str(audio_path)}, "total_duration_sec": 0.5}
+
+        with patch.object(video_renderer, "_render_profile", return_value=self.PROFILE):
+            video_renderer.render(config, {"product_id": "Тест"}, audio_map, "ad")
+            fds, children = _open_fds(), _child_processes()
+
+            for i in range(self.RENDERS):
+                mode = ("ad", "shorts")[i % 2]
+                video_renderer.render(config, {"product_id": "Тест", "hook": "Тест"}, audio_map, mode)
+
+        assert _open_fds() <= fds
+        assert _child_processes() <= children
+        assert clip_scope.open_count() == 0
@@ -15,6 +15,7 @@ from core.utils.config_loader import (
     ProjectConfig,
     _deep_merge,
     load,
+    load_shared,
 )
 
 
@@ -262,6 +263,21 @@ generation:
         with pytest.raises(FileNotFoundError, match="Project config not found"):
             load("nonexistent_project")
 
+    def test_load_shared(self, tmp_path, monkeypatch):
+        """shared.yaml loads on its own, without a project name."""
+        if yaml is None:
+            pytest.skip("PyYAML not installed")
+
+        import core.utils.config_loader
+
+        monkeypatch.setattr(core.utils.config_loader, "_repo_root", lambda: tmp_path)
+        assert load_shared() == {}
+
+        (tmp_path / "config").mkdir()
+        (tmp_path / "config" / "shared.yaml").write_text("subtitles:\n  mode: burn\n")
+
+        assert load_shared().subtitles.mode == "burn"
+
 
 class TestBackwardCompatibility:
     """Tests for backward compatibility with old code patterns."""
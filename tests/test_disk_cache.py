@@ -0,0 +1,157 @@
+"""Tests for the persistent disk cache."""
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import time
+
+from core.utils.disk_cache import DiskCache, make_key
+
+
+def _write(path, size):
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def _produce_once(root, log_path):
+    """Worker process: build the entry under its lock unless it is already cached."""
+    cache = DiskCache(root)
+    key = make_key("shared")
+    with cache.lock(key):
+        if cache.get(key) is None:
+            with open(log_path, "a") as log:
+                log.write(f"{os.getpid()}\n")
+            time.sleep(0.2)
+            staging = root.parent / f"staging_{os.getpid()}.mp4"
+            cache.put(key, _write(staging, 10), suffix=".mp4")
+
+
+class TestDiskCache:
+    """Test put/get, TTL expiry and LRU eviction."""
+
+    def test_make_key_stable(self):
+        """Same parts give the same key, different parts a different one."""
+        assert make_key("pixabay", 1, "medium") == make_key("pixabay", 1, "medium")
+        assert make_key("pixabay", 1, "medium") != make_key("pixabay", 1, "large")
+
+    def test_put_and_get(self, tmp_path):
+        """Stored file is moved into the cache and found again."""
+        cache = DiskCache(tmp_path / "cache")
+        src = _write(tmp_path / "video.mp4", 100)
+        key = make_key("a")
+
+        cached = cache.put(key, src, suffix=".mp4", meta={"hit_id": 1})
+
+        assert not src.exists()
+        assert cache.get(key) == cached
+        assert cached.read_bytes() == b"x" * 100
+        assert cache.get_meta(key) == {"hit_id": 1}
+        assert cache.get_stats()["hits"] == 1
+        assert cache.get_stats()["stores"] == 1
+
+    def test_miss(self, tmp_path):
+        """Unknown keys are counted as misses."""
+        cache = DiskCache(tmp_path / "cache")
+
+        assert cache.get(make_key("missing")) is None
+        assert cache.get_stats()["misses"] == 1
+
+    def test_ttl_expiry(self, tmp_path):
+        """Entries older than ttl_days are dropped on lookup."""
+        cache = DiskCache(tmp_path / "cache", ttl_days=1)
+        key = make_key("old")
+        cached = cache.put(key, _write(tmp_path / "old.mp4", 10), suffix=".mp4")
+
+        meta_path = cache._meta_path(key)
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        meta["created_at"] = time.time() - 2 * 24 * 60 * 60
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+
+        assert cache.get(key) is None
+        assert not cached.exists()
+        assert cache.get_stats()["expired"] == 1
+
+    def test_lru_eviction(self, tmp_path):
+        """Least recently used entries are evicted over max_bytes."""
+        cache = DiskCache(tmp_path / "cache", max_bytes=250)
+        keys = [make_key(i) for i in range(3)]
+        paths = []
+        for i, key in enumerate(keys[:2]):
+            paths.append(cache.put(key, _write(tmp_path / f"{i}.bin", 100)))
+            past = time.time() - 100 + i
+            os.utime(paths[-1], (past, past))
+
+        # Touch the first entry so the second one becomes LRU
+        cache.get(keys[0])
+        cache.put(keys[2], _write(tmp_path / "2.bin", 100))
+
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[2]) is not None
+        assert cache.get_stats()["evictions"] == 1
+        assert cache.size_bytes() == 200
+
+    def test_put_survives_budget_smaller_than_entry(self, tmp_path):
+        """An entry larger than max_bytes is still returned as an existing file."""
+        cache = DiskCache(tmp_path / "cache", max_bytes=50)
+        old = cache.put(make_key("old"), _write(tmp_path / "old.bin", 40))
+
+        cached = cache.put(make_key("big"), _write(tmp_path / "big.bin", 100))
+
+        assert cached.exists()
+        assert cache.get(make_key("big")) == cached
+        assert not old.exists()
+
+    def test_put_keeps_entry_with_old_source_mtime(self, tmp_path):
+        """A moved-in file with an old mtime is still the most recently used entry."""
+        cache = DiskCache(tmp_path / "cache", max_bytes=150)
+        fresh = cache.put(make_key("fresh"), _write(tmp_path / "fresh.bin", 100))
+        src = _write(tmp_path / "stale.bin", 100)
+        past = time.time() - 1000
+        os.utime(src, (past, past))
+
+        cached = cache.put(make_key("stale"), src)
+
+        assert cached.exists()
+        assert cached.stat().st_mtime > past + 500
+        assert not fresh.exists()
+
+    def test_eviction_removes_lock_files(self, tmp_path):
+        """Evicted entries do not leave their lock files behind."""
+        cache = DiskCache(tmp_path / "cache", max_bytes=100)
+        key = make_key("locked")
+        with cache.lock(key):
+            cache.put(key, _write(tmp_path / "a.bin", 100))
+        lock_path = cache._entry_dir(key) / f"{key}.lock"
+        assert lock_path.exists()
+
+        cache.put(make_key("next"), _write(tmp_path / "b.bin", 100))
+
+        assert not lock_path.exists()
+        assert list((tmp_path / "cache").glob("*/*.lock")) == []
+
+    def test_disabled_cache(self, tmp_path):
+        """Disabled cache never stores and always misses."""
+        cache = DiskCache(tmp_path / "cache", enabled=False)
+        src = _write(tmp_path / "video.mp4", 10)
+
+        assert cache.put(make_key("a"), src) == src
+        assert src.exists()
+        assert cache.get(make_key("a")) is None
+        assert not (tmp_path / "cache").exists()
+
+    def test_lock_serializes_producers(self, tmp_path):
+        """Processes racing for one key build it once; the rest wait and hit."""
+        log_path = tmp_path / "producers.log"
+        context = multiprocessing.get_context("fork")
+        workers = [
+            context.Process(target=_produce_once, args=(tmp_path / "cache", log_path)) for _ in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+
+        assert len(log_path.read_text().split()) == 1
+        assert DiskCache(tmp_path / "cache").get(make_key("shared")) is not None
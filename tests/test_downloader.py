@@ -0,0 +1,209 @@
+"""Tests for the resumable downloader against a local HTTP server."""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from core.utils import downloader
+
+
+class _StockServerHandler(BaseHTTPRequestHandler):
+    """Serves `server.payload` with Range/ETag support and fault injection."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_headers(self, status, length, first=None, last=None):
+        server = self.server
+        self.send_response(status)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(length))
+        if server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if server.etag:
+            self.send_header("ETag", server.etag)
+        if first is not None:
+            self.send_header("Content-Range", f"bytes {first}-{last}/{len(server.payload)}")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._send_headers(200, len(self.server.payload))
+
+    def do_GET(self):
+        server = self.server
+        payload = server.payload
+        first, last = 0, len(payload) - 1
+        status = 200
+
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        with server.lock:
+            server.requests.append(range_header)
+        if range_header and server.ranges and (if_range is None or if_range == server.etag):
+            start, _, end = range_header.removeprefix("bytes=").partition("-")
+            first = int(start)
+            last = int(end) if end else len(payload) - 1
+            if first >= len(payload):
+                self._send_headers(416, 0)
+                return
+            status = 206
+
+        body = payload[first:last + 1]
+        self._send_headers(status, len(body), *((first, last) if status == 206 else ()))
+
+        with server.lock:
+            drop = server.drops > 0
+            if drop:
+                server.drops -= 1
+        if drop:
+            # Send part of the body, then hang up
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stock_server():
+    """Local HTTP server; tweak `payload`, `etag`, `ranges` and `drops` per test."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StockServerHandler)
+    server.payload = os.urandom(256 * 1024)
+    server.etag = '"v1"'
+    server.ranges = True
+    server.drops = 0
+    server.requests = []
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    downloader.reset_session()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        downloader.reset_session()
+
+
+def _url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/clip.mp4"
+
+
+class TestDownloader:
+    """Test downloads, resume, parallel ranges and verification."""
+
+    def test_download_basic(self, stock_server, tmp_path):
+        """File is written atomically with no .part left behind."""
+        output_path = tmp_path / "clip.mp4"
+
+        result = downloader.download(_url(stock_server), output_path)
+
+        assert result == output_path
+        assert output_path.read_bytes() == stock_server.payload
+        assert not (tmp_path / "clip.mp4.part").exists()
+
+    def test_resume_after_dropped_connection(self, stock_server, tmp_path):
+        """An interrupted transfer continues with a Range request."""
+        stock_server.drops = 1
+        output_path = tmp_path / "clip.mp4"
+
+        with patch.object(downloader.time, "sleep"):
+            downloader.download(_url(stock_server), output_path)
+
+        assert output_path.read_bytes() == stock_server.payload
+        assert len(stock_server.requests) == 2
+        resumed_at = int(stock_server.requests[1].removeprefix("bytes=").rstrip("-"))
+        assert 0 < resumed_at <= len(stock_server.payload) // 2
+
+    def test_resume_from_existing_part(self, stock_server, tmp_path):
+        """Partial data from an earlier run is reused."""
+        output_path = tmp_path / "clip.mp4"
+        (tmp_path / "clip.mp4.part").write_bytes(stock_server.payload[:1000])
+
+        downloader.download(_url(stock_server), output_path)
+
+        assert output_path.read_bytes() == stock_server.payload
+        assert stock_server.requests == ["bytes=1000-"]
+
+    def test_changed_resource_restarts(self, stock_server, tmp_path):
+        """If-Range mismatch makes the server send the full body, which replaces the stale part."""
+        output_path = tmp_path / "clip.mp4"
+        (tmp_path / "clip.mp4.part").write_bytes(b"stale" * 100)
+        stock_server.etag = '"v2"'
+
+        with patch.object(downloader, "probe", return_value=downloader.RemoteInfo(
+            size=len(stock_server.payload), etag='"v1"', accept_ranges=True,
+        )):
+            downloader.download(_url(stock_server), output_path)
+
+        assert output_path.read_bytes() == stock_server.payload
+
+    def test_parallel_ranges(self, stock_server, tmp_path):
+        """Large files are fetched as concurrent byte ranges and joined in order."""
+        output_path = tmp_path / "clip.mp4"
+
+        with patch.object(downloader, "MIN_PARALLEL_SIZE", 1024):
+            downloader.download(_url(stock_server), output_path, parallel=4)
+
+        assert output_path.read_bytes() == stock_server.payload
+        assert len(stock_server.requests) == 4
+        assert all(r.startswith("bytes=") for r in stock_server.requests)
+        assert not list(tmp_path.glob("clip.mp4.part*"))
+
+    def test_parallel_range_resumes(self, stock_server, tmp_path):
+        """A dropped range is resumed on its own."""
+        stock_server.drops = 1
+        output_path = tmp_path / "clip.mp4"
+
+        with patch.object(downloader, "MIN_PARALLEL_SIZE", 1024), patch.object(downloader.time, "sleep"):
+            downloader.download(_url(stock_server), output_path, parallel=2)
+
+        assert output_path.read_bytes() == stock_server.payload
+        assert len(stock_server.requests) == 3
+
+    def test_no_range_support(self, stock_server, tmp_path):
+        """Without Accept-Ranges a dropped download starts over."""
+        stock_server.ranges = False
+        stock_server.drops = 1
+        output_path = tmp_path / "clip.mp4"
+
+        with patch.object(downloader.time, "sleep"):
+            downloader.download(_url(stock_server), output_path, parallel=4)
+
+        assert output_path.read_bytes() == stock_server.payload
+        assert len(stock_server.requests) == 2
+
+    def test_md5_etag_verified(self, stock_server, tmp_path):
+        """MD5-style ETags are checked against the content."""
+        stock_server.etag = f'"{hashlib.md5(stock_server.payload).hexdigest()}"'
+        downloader.download(_url(stock_server), tmp_path / "ok.mp4")
+
+        stock_server.etag = f'"{hashlib.md5(b"other").hexdigest()}"'
+        with pytest.raises(downloader.DownloadError, match="checksum"):
+            downloader.download(_url(stock_server), tmp_path / "bad.mp4")
+        assert not (tmp_path / "bad.mp4").exists()
+        assert not (tmp_path / "bad.mp4.part").exists()
+
+    def test_expected_size_mismatch(self, stock_server, tmp_path):
+        """A size different from the expected one is rejected before downloading."""
+        with pytest.raises(downloader.DownloadError, match="Size mismatch"):
+            downloader.download(_url(stock_server), tmp_path / "clip.mp4", expected_size=10)
+        assert stock_server.requests == []
+
+    def test_gives_up_after_attempts(self, stock_server, tmp_path):
+        """Persistent failures raise DownloadError and keep partial data."""
+        stock_server.drops = 10
+        output_path = tmp_path / "clip.mp4"
+
+        with patch.object(downloader.time, "sleep"), pytest.raises(downloader.DownloadError):
+            downloader.download(_url(stock_server), output_path, max_attempts=2)
+
+        assert not output_path.exists()
+        assert (tmp_path / "clip.mp4.part").exists()
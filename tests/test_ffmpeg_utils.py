@@ -0,0 +1,263 @@
+"""Tests for ffmpeg helper functions."""
+from __future__ import annotations
+
+import pytest
+from PIL import Image
+from moviepy.editor import VideoFileClip
+
+from core.utils import ffmpeg_utils
+
+
+@pytest.fixture
+def still_image(tmp_path):
+    """Small solid-color frame."""
+    path = tmp_path / "frame.png"
+    Image.new("RGB", (160, 90), (20, 10, 40)).save(path)
+    return path
+
+
+class TestEncodeStill:
+    """Test looped still encoding."""
+
+    def test_encode_still_silent(self, still_image, tmp_path):
+        """Without audio a silent track of the requested length is added."""
+        output_path = tmp_path / "still.mp4"
+
+        ffmpeg_utils.encode_still(still_image, output_path, duration=2.5, fps=30, bitrate="500k")
+
+        clip = VideoFileClip(str(output_path))
+        try:
+            assert clip.size == [160, 90]
+            assert abs(clip.duration - 2.5) < 0.1
+            assert clip.audio is not None
+        finally:
+            clip.close()
+        assert not output_path.with_suffix(".unit.mp4").exists()
+
+    def test_run_ffmpeg_error(self, tmp_path):
+        """ffmpeg failures surface as RuntimeError."""
+        with pytest.raises(RuntimeError, match="ffmpeg failed"):
+            ffmpeg_utils.run_ffmpeg(["-i", str(tmp_path / "missing.mp4"), str(tmp_path / "out.mp4")])
+
+
+    def test_burn_subtitles(self, still_image, tmp_path):
+        """Subtitles are burned in while the still is encoded, whatever the file name."""
+        subs_dir = tmp_path / "subs: it's [odd]"
+        subs_dir.mkdir()
+        ass_path = subs_dir / "captions.ass"
+        ass_path.write_text(
+            "[Script Info]\nPlayResX: 160\nPlayResY: 90\n\n[V4+ Styles]\n"
+            "Format: Name, Fontsize, PrimaryColour, Alignment, MarginV\n"
+            "Style: Default,30,&H00FFFFFF,2,5\n\n[Events]\n"
+            "Format: Layer, Start, End, Style, Text\n"
+            "Dialogue: 0,0:00:00.00,0:00:02.00,Default,HELLO\n",
+            encoding="utf-8",
+        )
+        output_path = tmp_path / "subbed.mp4"
+
+        ffmpeg_utils.encode_still(
+            still_image, output_path, duration=1.0, fps=30, bitrate="500k",
+            video_filter=ffmpeg_utils.subtitles_filter(ass_path),
+        )
+
+        clip = VideoFileClip(str(output_path))
+        try:
+            frame = clip.get_frame(0.5)
+        finally:
+            clip.close()
+        assert frame[60:, :].max() > 200  # caption at the bottom
+        assert frame[:20, :].max() < 80  # untouched background
+
+class TestConcatSegments:
+    """Test stream-copy concatenation."""
+
+    def test_concat_segments(self, still_image, tmp_path):
+        """Segments are joined back to back without re-encoding."""
+        first = ffmpeg_utils.encode_still(still_image, tmp_path / "a.mp4", duration=1.0, fps=30, bitrate="500k")
+        second = ffmpeg_utils.encode_still(still_image, tmp_path / "b.mp4", duration=2.0, fps=30, bitrate="500k")
+        output_path = tmp_path / "joined.mp4"
+
+        ffmpeg_utils.concat_segments([first, second], output_path)
+
+        clip = VideoFileClip(str(output_path))
+        try:
+            assert abs(clip.duration - 3.0) < 0.15
+        finally:
+            clip.close()
+        assert not output_path.with_suffix(".concat.txt").exists()
+
+    def test_concat_segments_empty(self, tmp_path):
+        """Empty segment list is rejected."""
+        with pytest.raises(ValueError):
+            ffmpeg_utils.concat_segments([], tmp_path / "out.mp4")
+
+
+class TestStockProxy:
+    """Test proxy transcoding and stream-copy looping."""
+
+    def test_transcode_proxy_geometry(self, still_image, tmp_path):
+        """Landscape source is scaled to cover and center-cropped to portrait."""
+        source = ffmpeg_utils.encode_still(still_image, tmp_path / "src.mp4", duration=1.0, fps=25, bitrate="500k")
+        output_path = tmp_path / "proxy.mp4"
+
+        ffmpeg_utils.transcode_proxy(source, output_path, width=90, height=160, fps=30)
+
+        clip = VideoFileClip(str(output_path))
+        try:
+            assert clip.size == [90, 160]
+            assert round(clip.fps) == 30
+            assert clip.audio is None
+        finally:
+            clip.close()
+
+    def test_loop_to_duration(self, still_image, tmp_path):
+        """Short proxies are repeated up to the requested length."""
+        source = ffmpeg_utils.encode_still(still_image, tmp_path / "src.mp4", duration=1.0, fps=30, bitrate="500k")
+        proxy = ffmpeg_utils.transcode_proxy(source, tmp_path / "proxy.mp4", width=90, height=160, fps=30)
+        output_path = tmp_path / "looped.mp4"
+
+        ffmpeg_utils.loop_to_duration(proxy, output_path, 3.5)
+
+        clip = VideoFileClip(str(output_path))
+        try:
+            assert clip.size == [90, 160]
+            assert abs(clip.duration - 3.5) < 0.15
+        finally:
+            clip.close()
+
+    def _proxy(self, tmp_path, duration):
+        """Portrait proxy whose brightness steps up every second (frame = time)."""
+        parts = []
+        for second in range(round(duration)):
+            frame_path = tmp_path / f"frame_{second}.png"
+            Image.new("RGB", (90, 160), (40 * second,) * 3).save(frame_path)
+            parts.append(ffmpeg_utils.encode_still(
+                frame_path, tmp_path / f"part_{second}.mp4", duration=1.0, fps=30, bitrate="500k"
+            ))
+        source = ffmpeg_utils.concat_segments(parts, tmp_path / "src.mp4")
+        return ffmpeg_utils.transcode_proxy(source, tmp_path / "proxy.mp4", width=90, height=160, fps=30)
+
+    def test_overlay_on_video_loops_short_background(self, tmp_path):
+        """A 2s background is repeated on the input side to fill 5s, with the overlay on top."""
+        proxy = self._proxy(tmp_path, 2)
+        overlay_path = tmp_path / "overlay.png"
+        overlay = Image.new("RGBA", (90, 160), (0, 0, 0, 0))
+        overlay.paste((255, 0, 0, 255), (0, 0, 90, 20))
+        overlay.save(overlay_path)
+        output_path = tmp_path / "looped.mp4"
+
+        ffmpeg_utils.overlay_on_video(proxy, output_path, 5.0, fps=30, overlay_path=overlay_path, bitrate="500k")
+
+        clip = VideoFileClip(str(output_path))
+        try:
+            assert clip.size == [90, 160]
+            assert abs(clip.duration - 5.0) < 0.15
+            assert clip.audio is not None
+            first, looped = clip.get_frame(0.5), clip.get_frame(2.5)
+        finally:
+            clip.close()
+        assert abs(int(first[100:, :].mean()) - int(looped[100:, :].mean())) < 8
+        assert looped[5, 45, 0] > 200 and looped[5, 45, 1] < 60
+
+    def test_overlay_on_video_trims_long_background(self, tmp_path):
+        """`start`/`duration` select a window of a longer background before decoding."""
+        proxy = self._proxy(tmp_path, 4)
+        output_path = tmp_path / "trimmed.mp4"
+
+        ffmpeg_utils.overlay_on_video(proxy, output_path, 1.5, fps=30, start=2.0, bitrate="500k")
+
+        clip = VideoFileClip(str(output_path))
+        try:
+            assert abs(clip.duration - 1.5) < 0.15
+            frame = clip.get_frame(0.2)
+        finally:
+            clip.close()
+        assert abs(frame.mean() - 80) < 10  # third second of the source
+
+
+def _counting(run_ffmpeg, calls):
+    """Wrap run_ffmpeg to record every ffmpeg invocation."""
+    def run(args):
+        calls.append(args)
+        return run_ffmpeg(args)
+    return run
+
+
+class TestExtraOutputs:
+    """Test several framings encoded from the same frames in one process."""
+
+    def test_encode_still_geometry(self, still_image, tmp_path, monkeypatch):
+        """Every output gets its own frame size; audio and duration are kept."""
+        calls = []
+        monkeypatch.setattr(ffmpeg_utils, "run_ffmpeg", _counting(ffmpeg_utils.run_ffmpeg, calls))
+        extras = [
+            {"path": tmp_path / "square.mp4", "width": 90, "height": 90, "bitrate": "300k"},
+            {"path": tmp_path / "tall.mp4", "width": 90, "height": 160, "bitrate": "300k", "fit": "pad"},
+        ]
+
+        ffmpeg_utils.encode_still(
+            still_image, tmp_path / "wide.mp4", duration=1.5, fps=30, bitrate="500k", extra_outputs=extras
+        )
+
+        # Один процесс кодирует юниты, второй муксит все выходы
+        assert len(calls) == 2
+        for name, size in (("wide", [160, 90]), ("square", [90, 90]), ("tall", [90, 160])):
+            clip = VideoFileClip(str(tmp_path / f"{name}.mp4"))
+            try:
+                assert clip.size == size
+                assert abs(clip.duration - 1.5) < 0.15
+                assert clip.audio is not None
+            finally:
+                clip.close()
+        assert not list(tmp_path.glob("*.unit.mp4"))
+
+    def test_crop_by_default_pad_on_request(self, tmp_path):
+        """crop fills the frame; pad letterboxes the whole picture."""
+        frame_path = tmp_path / "white.png"
+        Image.new("RGB", (160, 90), (255, 255, 255)).save(frame_path)
+        extras = [
+            {"path": tmp_path / "crop.mp4", "width": 160, "height": 160, "bitrate": "300k"},
+            {"path": tmp_path / "pad.mp4", "width": 160, "height": 160, "bitrate": "300k", "fit": "pad"},
+        ]
+
+        ffmpeg_utils.encode_still(
+            frame_path, tmp_path / "src.mp4", duration=1.0, fps=30, bitrate="500k", extra_outputs=extras
+        )
+
+        frames = {}
+        for name in ("crop", "pad"):
+            clip = VideoFileClip(str(tmp_path / f"{name}.mp4"))
+            try:
+                frames[name] = clip.get_frame(0.5)
+            finally:
+                clip.close()
+        assert frames["crop"][5, 80].min() > 220  # picture up to the edge
+        assert frames["pad"][5, 80].max() < 30  # black bar
+        assert frames["pad"][80, 80].min() > 220  # picture
+
+    def test_overlay_single_process(self, still_image, tmp_path, monkeypatch):
+        """The composited stock frames are split into every output in one ffmpeg run."""
+        background = ffmpeg_utils.encode_still(still_image, tmp_path / "bg.mp4", duration=1.0, fps=30, bitrate="500k")
+        calls = []
+        monkeypatch.setattr(ffmpeg_utils, "run_ffmpeg", _counting(ffmpeg_utils.run_ffmpeg, calls))
+
+        ffmpeg_utils.overlay_on_video(
+            background, tmp_path / "out.mp4", 1.0, 30,
+            extra_outputs=[{"path": tmp_path / "square.mp4", "width": 90, "height": 90, "bitrate": "300k"}],
+        )
+
+        assert len(calls) == 1
+        assert "split=2" in " ".join(calls[0])
+        clip = VideoFileClip(str(tmp_path / "square.mp4"))
+        try:
+            assert clip.size == [90, 90]
+        finally:
+            clip.close()
+
+    def test_unknown_fit(self, still_image, tmp_path):
+        """Unsupported fit modes are rejected before ffmpeg runs."""
+        with pytest.raises(ValueError, match="fit mode"):
+            ffmpeg_utils.encode_still_unit(
+                still_image, tmp_path / "unit.mp4", 30, "500k",
+                extra_outputs=[{"path": tmp_path / "x.mp4", "width": 10, "height": 10, "bitrate": "1k", "fit": "zoom"}],
+            )
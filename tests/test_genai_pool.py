@@ -0,0 +1,109 @@
+"""Tests for the shared genai client pool."""
+from __future__ import annotations
+
+import asyncio
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.generators import tts_generator
+from core.utils import genai_pool
+from core.utils.genai_pool import GenAIClientPool
+
+
+@pytest.fixture
+def mock_client_class():
+    with patch("google.genai.Client", side_effect=lambda **kwargs: MagicMock(name="Client")) as mock_class:
+        yield mock_class
+
+
+class TestClientPool:
+    """Test client reuse, eviction and stats."""
+
+    def test_client_reused_per_key(self, mock_client_class):
+        """One client per API key; repeat requests reuse it."""
+        pool = GenAIClientPool()
+
+        first = pool.client("key-a")
+        assert pool.client("key-a") is first
+        assert pool.client("key-b") is not first
+
+        stats = pool.get_stats()
+        assert mock_client_class.call_count == 2
+        assert (stats["clients"], stats["requests"], stats["reused"]) == (2, 3, 1)
+        assert stats["reuse_rate"] == "33.3%"
+        assert "key-a" not in str(stats)
+
+    def test_keepalive_limits(self, mock_client_class):
+        """Clients are built with keep-alive connection limits for sync and async use."""
+        GenAIClientPool(keepalive_sec=30, max_connections=4).client("key")
+
+        options = mock_client_class.call_args.kwargs["http_options"]
+        for args in (options.client_args, options.async_client_args):
+            assert args["limits"].keepalive_expiry == 30
+            assert args["limits"].max_keepalive_connections == 4
+
+    def test_lru_eviction_closes_client(self, mock_client_class):
+        """Over `max_clients` the least recently used client is closed and dropped."""
+        pool = GenAIClientPool(max_clients=2)
+        first = pool.client("a")
+        second = pool.client("b")
+        pool.client("a")
+
+        pool.client("c")
+
+        assert len(pool) == 2
+        assert pool.get_stats()["evictions"] == 1
+        second.close.assert_called_once()
+        assert pool.client("a") is first
+        first.close.assert_not_called()
+
+    def test_warm_up_then_reuse(self, mock_client_class):
+        """A warmed-up client serves the first request without construction."""
+        pool = GenAIClientPool()
+
+        pool.warm_up("key")
+        pool.warm_up("key")
+        client = pool.client("key")
+
+        assert mock_client_class.call_count == 1
+        stats = pool.get_stats()
+        assert (stats["warm_ups"], stats["requests"], stats["reused"]) == (1, 1, 1)
+        assert pool.async_client("key") is client.aio
+
+    def test_concurrent_first_use_creates_one_client(self, mock_client_class):
+        """Threads racing for the same key share one client."""
+        pool = GenAIClientPool()
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(pool.client("key"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert mock_client_class.call_count == 1
+        assert all(client is clients[0] for client in clients)
+
+    def test_reset_closes_clients(self, mock_client_class):
+        """Resetting the process-wide pool closes its clients."""
+        client = genai_pool.get_client_pool().client("key")
+
+        genai_pool.reset_client_pool()
+
+        client.close.assert_called_once()
+        assert genai_pool.get_pool_stats() is None
+
+
+class TestTTSUsesPool:
+    """TTS requests share pooled clients."""
+
+    def test_blocks_share_one_client(self, mock_client_class, tmp_path):
+        """Several TTS requests construct a single client."""
+        for name in ("a", "b", "c"):
+            asyncio.run(tts_generator._synthesize_gemini_tts_async("key", "текст", tmp_path / f"{name}.wav"))
+
+        assert mock_client_class.call_count == 1
+        stats = tts_generator.get_tts_stats()["client_pool"]
+        assert stats["clients_created"] == 1
+        assert stats["reused"] == 2
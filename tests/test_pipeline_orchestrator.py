@@ -140,12 +140,13 @@ class TestPipelineExecution:
     """Test pipeline execution."""
     
     @patch.dict('os.environ', {'GOOGLE_AI_API_KEY': 'test_api_key'})
+    @patch('core.generators.tts_generator.reset_tts_cache')
     @patch('core.orchestrators.pipeline_orchestrator.config_loader.load')
     @patch('core.generators.script_generator.generate_short')
     @patch('core.generators.tts_generator.synthesize')
     @patch('core.generators.video_renderer.render')
     @patch('core.utils.model_router.get_router')
-    def test_main_shorts_success(self, mock_router, mock_render, mock_tts, mock_script, mock_load):
+    def test_main_shorts_success(self, mock_router, mock_render, mock_tts, mock_script, mock_load, mock_reset_tts):
         """Test successful shorts pipeline execution."""
         # Setup mocks
         mock_config = MagicMock()
@@ -185,7 +186,87 @@ class TestPipelineExecution:
         assert result == 0
         mock_script.assert_called_once()
         mock_tts.assert_called_once()
+        mock_reset_tts.assert_called_once_with(mock_config)
         mock_render.assert_called_once()
+        assert mock_render.call_args.kwargs == {"preview": False}
+    
+    @patch.dict('os.environ', {'GOOGLE_AI_API_KEY': 'test_api_key'})
+    @patch('core.orchestrators.pipeline_orchestrator.config_loader.load')
+    @patch('core.generators.script_generator.generate_short')
+    @patch('core.generators.tts_generator.synthesize')
+    @patch('core.generators.video_renderer.render')
+    @patch('core.utils.model_router.get_router')
+    def test_main_preview_skips_upload(self, mock_router, mock_render, mock_tts, mock_script, mock_load):
+        """--preview renders a draft and never uploads it."""
+        mock_config = MagicMock()
+        mock_config.monitoring.telegram_notifications = False
+        mock_load.return_value = mock_config
+        mock_router.return_value.get_stats.return_value = {
+            "total_attempts": 1,
+            "successful": 1,
+            "failed": 0,
+            "success_rate": "100%",
+            "model_usage": {"gemini-2.5-flash": 1}
+        }
+        mock_script.return_value = {"hook": "Test", "script": "Test script"}
+        mock_tts.return_value = {"blocks": {"main": "/tmp/audio.wav"}, "total_duration_sec": 15.0}
+        mock_render.return_value = Path("/tmp/shorts_preview.mp4")
+        
+        args = pipeline_orchestrator.build_parser().parse_args([
+            "--project", "test_project", "--mode", "shorts", "--date", "2025-01-15",
+            "--upload", "--preview",
+        ])
+        
+        with patch('core.uploaders.youtube_uploader.upload') as mock_upload:
+            result = pipeline_orchestrator.main(args)
+        
+        assert result == 0
+        assert mock_render.call_args.kwargs["preview"] is True
+        mock_upload.assert_not_called()
+    
+    @patch.dict('os.environ', {'GOOGLE_AI_API_KEY': 'test_api_key'})
+    @patch('core.orchestrators.pipeline_orchestrator.config_loader.load')
+    @patch('core.generators.script_generator.generate_short')
+    @patch('core.generators.tts_generator.synthesize')
+    @patch('core.generators.video_renderer.render_formats')
+    @patch('core.utils.model_router.get_router')
+    def test_main_multi_format(self, mock_router, mock_render_formats, mock_tts, mock_script, mock_load):
+        """--formats publishes several aspect ratios from one render."""
+        mock_config = MagicMock()
+        mock_config.monitoring.telegram_notifications = False
+        mock_load.return_value = mock_config
+        mock_router.return_value.get_stats.return_value = {
+            "total_attempts": 1,
+            "successful": 1,
+            "failed": 0,
+            "success_rate": "100%",
+            "model_usage": {"gemini-2.5-flash": 1}
+        }
+        mock_script.return_value = {"hook": "Test", "script": "Test script"}
+        mock_tts.return_value = {"blocks": {"main": "/tmp/audio.wav"}, "total_duration_sec": 15.0}
+        mock_render_formats.return_value = {
+            "1:1": Path("/tmp/shorts_1x1.mp4"),
+            "9:16": Path("/tmp/shorts.mp4"),
+        }
+        
+        args = pipeline_orchestrator.build_parser().parse_args([
+            "--project", "test_project", "--mode", "shorts", "--date", "2025-01-15",
+            "--formats", "1:1,9:16",
+        ])
+        
+        with patch('core.orchestrators.pipeline_orchestrator.json.dump') as mock_dump:
+            result = pipeline_orchestrator.main(args)
+        
+        assert result == 0
+        assert mock_render_formats.call_args.args[4] == ["1:1", "9:16"]
+        assert mock_render_formats.call_args.kwargs == {"preview": False}
+        metadata = mock_dump.call_args.args[0]
+        assert metadata["video_path"] == "/tmp/shorts.mp4"
+        assert metadata["outputs"] == {"1:1": "/tmp/shorts_1x1.mp4", "9:16": "/tmp/shorts.mp4"}
+        assert [s["name"] for s in metadata["profile"]["stages"]] == ["script", "tts", "render"]
+        assert metadata["tts_cache_hits"] == []
+        assert "cache" in metadata["tts_stats"]
+        assert metadata["rate_limit_stats"]["acquires"] == 0
     
     @patch.dict('os.environ', {'GOOGLE_AI_API_KEY': 'test_api_key'})
     @patch('core.orchestrators.pipeline_orchestrator.config_loader.load')
@@ -243,6 +324,7 @@ class TestPipelineExecution:
         mock_script.assert_called_once()
         mock_tts.assert_called_once()
         mock_render.assert_called_once()
+        assert mock_render.call_args.kwargs == {"preview": False}
     
     @patch('core.orchestrators.pipeline_orchestrator.config_loader.load')
     def test_main_config_not_found(self, mock_load):
@@ -287,9 +369,11 @@ class TestPipelineExecution:
         
         assert result == 1  # Error exit code
     
+    @patch.dict('os.environ', {'GOOGLE_AI_API_KEY': 'test_api_key'})
     @patch('core.orchestrators.pipeline_orchestrator.config_loader.load')
     @patch('core.generators.script_generator.generate_short')
     @patch('core.generators.tts_generator.synthesize')
+    @patch('core.utils.model_router.get_router', MagicMock())
     def test_main_tts_failure(self, mock_tts, mock_script, mock_load):
         """Test pipeline when TTS fails."""
         mock_config = MagicMock()
@@ -309,9 +393,47 @@ class TestPipelineExecution:
             product_id=None
         )
         
-        result = pipeline_orchestrator.main(args)
+        with patch('core.generators.video_renderer.prefetch_stock') as mock_prefetch, \
+                patch('core.generators.video_renderer.discard_stock_prefetch') as mock_discard:
+            result = pipeline_orchestrator.main(args)
         
         assert result == 1  # Error exit code
+        mock_prefetch.assert_called_once_with(mock_config, mock_script.return_value, "shorts", preview=False)
+        mock_discard.assert_called_once()
+    
+    @patch.dict('os.environ', {'GOOGLE_AI_API_KEY': 'test_api_key'})
+    @patch('core.orchestrators.pipeline_orchestrator.config_loader.load')
+    @patch('core.generators.script_generator.generate_short')
+    @patch('core.generators.tts_generator.synthesize')
+    @patch('core.utils.model_router.get_router', MagicMock())
+    def test_main_tts_failure_without_renderer(self, mock_tts, mock_script, mock_load, monkeypatch):
+        """TTS failure still exits with 1 and alerts when the renderer could not be imported."""
+        import sys
+        import core.generators
+
+        mock_config = MagicMock()
+        mock_config.monitoring.telegram_notifications = True
+        mock_load.return_value = mock_config
+        mock_script.return_value = {"id": "test_123", "hook": "Test"}
+        mock_tts.side_effect = Exception("TTS error")
+        monkeypatch.delattr(core.generators, "video_renderer", raising=False)
+        monkeypatch.setitem(sys.modules, "core.generators.video_renderer", None)
+        
+        args = argparse.Namespace(
+            project="test_project",
+            mode="shorts",
+            date="2025-01-15",
+            dry_run=False,
+            upload=False,
+            platforms=None,
+            product_id=None
+        )
+        
+        with patch('core.orchestrators.pipeline_orchestrator.logging_utils.send_telegram_alert') as mock_alert:
+            result = pipeline_orchestrator.main(args)
+        
+        assert result == 1
+        assert "TTS failed" in mock_alert.call_args.args[1]
     
     @patch('core.orchestrators.pipeline_orchestrator.config_loader.load')
     @patch('core.generators.script_generator.generate_short')
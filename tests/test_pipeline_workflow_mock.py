@@ -329,7 +329,9 @@ class TestVideoRendererSignature:
         mock_render_shorts.assert_called_once_with(
             mock_config,
             mock_script,
-            mock_audio_map
+            mock_audio_map,
+            preview=False,
+            formats=(),
         )
     
     def test_render_without_config_raises_error(self):
@@ -522,9 +524,7 @@ class TestPipelineOrchestratorIntegration:
         call_args = mock_video_render.call_args
         assert call_args is not None, "render() should have been called"
         
-        # Check that config was passed as keyword argument
-        if call_args.kwargs:
-            assert "config" in call_args.kwargs, "config should be in keyword arguments"
-        else:
-            # Check positional arguments (config should be first)
+        # Config goes first (positionally) or as a keyword argument
+        if "config" not in call_args.kwargs:
             assert len(call_args.args) >= 1, "render() should have at least 1 positional argument"
+        assert call_args.kwargs["preview"] is False
@@ -0,0 +1,124 @@
+"""Tests for per-stage render profiling."""
+from __future__ import annotations
+
+import pstats
+import subprocess
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.utils import profiling
+
+
+@pytest.fixture(autouse=True)
+def _reset_profiler():
+    profiling.reset_profiler()
+    yield
+    profiling.reset_profiler()
+
+
+class TestStageProfiler:
+    """Test stage timings, nesting and the metadata report."""
+
+    def test_stage_records_timings(self):
+        """Wall and CPU time, peak RSS and fps are recorded per stage."""
+        profiler = profiling.StageProfiler()
+
+        with profiler.stage("encode", frames=30):
+            sum(i * i for i in range(200_000))
+
+        (record,) = profiler.records
+        assert record.name == "encode"
+        assert record.wall_sec > 0
+        assert record.cpu_sec > 0
+        assert record.peak_rss_mb > 0
+        assert record.fps == pytest.approx(30 / record.wall_sec)
+
+    def test_nested_stages(self):
+        """Inner stages are named after their parents; frames can be set later."""
+        profiler = profiling.StageProfiler()
+
+        with profiler.stage("render"):
+            with profiler.stage("segments") as stage:
+                stage.frames = 90
+
+        report = profiler.report()
+        assert [s["name"] for s in report["stages"]] == ["render/segments", "render"]
+        assert report["stages"][0]["frames"] == 90
+        assert "frames" not in report["stages"][1]
+        assert report["peak_rss_mb"] > 0
+
+    def test_child_process_cpu(self):
+        """CPU time of finished child processes (ffmpeg) is counted separately."""
+        profiler = profiling.StageProfiler()
+
+        with profiler.stage("encode"):
+            subprocess.run([sys.executable, "-c", "sum(i * i for i in range(2_000_000))"], check=True)
+
+        record = profiler.records[0]
+        assert record.child_cpu_sec > record.cpu_sec
+
+    def test_failed_stage_is_recorded(self):
+        """A stage that raises is still measured."""
+        profiler = profiling.StageProfiler()
+
+        with pytest.raises(RuntimeError):
+            with profiler.stage("stock_download"):
+                raise RuntimeError("boom")
+
+        assert [r.name for r in profiler.records] == ["stock_download"]
+
+    def test_module_stage_uses_current_profiler(self):
+        """`profiling.stage` records into the profiler of the current run."""
+        profiler = profiling.reset_profiler()
+
+        with profiling.stage("tts"):
+            pass
+
+        assert profiling.get_profiler() is profiler
+        assert [r.name for r in profiler.records] == ["tts"]
+
+
+class TestProfileDumps:
+    """Test opt-in cProfile/pyinstrument dumps."""
+
+    def test_cprofile_dump_per_outer_stage(self, tmp_path):
+        """Outermost stages are dumped; nested ones run under the outer profile."""
+        profiler = profiling.StageProfiler("cprofile", dump_dir=tmp_path)
+
+        with profiler.stage("render"):
+            with profiler.stage("encode"):
+                sorted(range(1000))
+
+        report = {s["name"]: s for s in profiler.report()["stages"]}
+        assert "profile_path" not in report["render/encode"]
+        assert report["render"]["profile_path"] == str(tmp_path / "render.prof")
+        assert pstats.Stats(report["render"]["profile_path"]).total_calls > 0
+
+    def test_selected_stages(self, tmp_path):
+        """`stages` limits dumps to the named stages."""
+        profiler = profiling.StageProfiler("cprofile", dump_dir=tmp_path, stages=["encode"])
+
+        with profiler.stage("render"):
+            with profiler.stage("encode"):
+                pass
+
+        assert [p.name for p in tmp_path.iterdir()] == ["render__encode.prof"]
+
+    def test_settings_from_config(self, tmp_path):
+        """`profiling` config section is read; the CLI flag overrides the profiler."""
+        config = {"profiling": {"profiler": "pyinstrument", "dump_dir": str(tmp_path), "stages": ["render"]}}
+
+        profiler = profiling.reset_profiler(config, "cprofile")
+
+        assert profiler.profiler == "cprofile"
+        assert profiler.dump_dir == tmp_path
+        assert profiler.profiled_stages == {"render"}
+
+    def test_invalid_or_mock_config_disables_dumps(self):
+        """Unknown profilers and non-string settings are ignored."""
+        assert profiling.reset_profiler({"profiling": {"profiler": "perf"}}).profiler is None
+        assert profiling.reset_profiler(MagicMock()).profiler is None
+        with pytest.raises(ValueError, match="Unknown profiler"):
+            profiling.StageProfiler("perf")
@@ -0,0 +1,231 @@
+"""Tests for the cross-process token-bucket rate limiter."""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core.generators import tts_generator
+from core.utils import rate_limiter
+from core.utils.config_loader import ProjectConfig
+from core.utils.model_router import ModelRouter
+from core.utils.rate_limiter import RateLimit, RateLimiter
+
+
+def _reserve_due_times(db_path, count, queue):
+    """Worker process: reserve `count` tokens and report when each one is due."""
+    limiter = RateLimiter(db_path, default=RateLimit(requests_per_minute=600, burst=1))
+    queue.put([time.time() + limiter.reserve("shared-key", "m") for _ in range(count)])
+
+
+class TestTokenBucket:
+    """Test burst, pacing and Retry-After handling."""
+
+    def test_burst_then_paced(self, tmp_path):
+        """`burst` requests go at once, the rest are spaced by the refill rate."""
+        limiter = RateLimiter(tmp_path / "rl.sqlite", default=RateLimit(requests_per_minute=60, burst=2))
+
+        waits = [limiter.reserve("key", "m") for _ in range(4)]
+
+        assert waits[:2] == [0.0, 0.0]
+        assert waits[2] == pytest.approx(1.0, abs=0.05)
+        assert waits[3] == pytest.approx(2.0, abs=0.05)
+
+    def test_buckets_per_key_and_model(self, tmp_path):
+        """Another key or model has its own bucket and per-model limits apply."""
+        limiter = RateLimiter(
+            tmp_path / "rl.sqlite",
+            default=RateLimit(requests_per_minute=60, burst=1),
+            models={"fast": RateLimit(requests_per_minute=60, burst=3)},
+        )
+
+        assert limiter.reserve("a", "m") == 0.0
+        assert limiter.reserve("b", "m") == 0.0
+        assert limiter.reserve("a", "other") == 0.0
+        assert [limiter.reserve("a", "fast") for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert limiter.reserve("a", "m") > 0
+
+    def test_penalize_honors_retry_after(self, tmp_path):
+        """After a 429 the next slot is due at Retry-After, later ones are paced, not burst."""
+        limiter = RateLimiter(tmp_path / "rl.sqlite", default=RateLimit(requests_per_minute=60, burst=5))
+        limiter.reserve("key", "m")
+
+        assert limiter.penalize("key", "m", 10.0) == 10.0
+
+        assert limiter.reserve("key", "m") == pytest.approx(10.0, abs=0.05)
+        assert limiter.reserve("key", "m") == pytest.approx(11.0, abs=0.05)
+        stats = limiter.get_stats()
+        assert (stats["throttled"], stats["retry_after_hints"]) == (1, 1)
+
+    def test_fallback_without_hint(self, tmp_path):
+        """Without a server hint the caller's backoff applies and no hint is counted."""
+        limiter = RateLimiter(tmp_path / "rl.sqlite", default=RateLimit(requests_per_minute=60, burst=5))
+
+        assert limiter.penalize("key", "m", None, fallback_sec=4.0) == 4.0
+
+        assert limiter.reserve("key", "m") == pytest.approx(4.0, abs=0.05)
+        stats = limiter.get_stats()
+        assert (stats["throttled"], stats["retry_after_hints"]) == (1, 0)
+
+    def test_retry_after_is_capped(self, tmp_path):
+        """Daily-quota hints do not park the pipeline for hours."""
+        limiter = RateLimiter(tmp_path / "rl.sqlite", max_retry_after_sec=30)
+
+        assert limiter.penalize("key", "m", 3600) == 30
+        assert limiter.reserve("key", "m") == pytest.approx(30.0, abs=0.05)
+
+    def test_acquire_waits_and_records_stats(self, tmp_path):
+        """Queue wait time is slept and reported per model."""
+        limiter = RateLimiter(tmp_path / "rl.sqlite", default=RateLimit(requests_per_minute=60, burst=1))
+
+        with patch("time.sleep") as mock_sleep:
+            assert limiter.acquire("key", "m") == 0.0
+            wait = limiter.acquire("key", "m")
+
+        mock_sleep.assert_called_once_with(wait)
+        stats = limiter.get_stats()
+        assert (stats["acquires"], stats["waited"]) == (2, 1)
+        assert stats["max_wait_sec"] == pytest.approx(1.0, abs=0.05)
+        assert stats["models"]["m"]["wait_sec"] == stats["wait_sec"]
+        assert "key" not in str(stats)
+
+    def test_acquire_async_does_not_block_loop(self, tmp_path):
+        """The async variant waits with asyncio.sleep."""
+        limiter = RateLimiter(tmp_path / "rl.sqlite", default=RateLimit(requests_per_minute=60, burst=1))
+
+        async def run():
+            await limiter.acquire_async("key", "m")
+            return await limiter.acquire_async("key", "m")
+
+        with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            wait = asyncio.run(run())
+
+        mock_sleep.assert_awaited_once_with(wait)
+        assert wait == pytest.approx(1.0, abs=0.05)
+
+    def test_disabled(self, tmp_path):
+        """A disabled limiter never waits and never touches the store."""
+        limiter = RateLimiter(tmp_path / "rl.sqlite", default=RateLimit(burst=1), enabled=False)
+
+        assert [limiter.reserve("key", "m") for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert limiter.penalize("key", "m", 10) == 10
+        assert not (tmp_path / "rl.sqlite").exists()
+
+    def test_processes_share_the_bucket(self, tmp_path):
+        """Parallel processes draw from one bucket: every slot is taken once."""
+        db_path = tmp_path / "rl.sqlite"
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        workers = [context.Process(target=_reserve_due_times, args=(db_path, 5, queue)) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        due = sorted(queue.get(timeout=30) + queue.get(timeout=30))
+        for worker in workers:
+            worker.join(timeout=30)
+
+        # 10 req/s, burst 1: the ten slots are ~0.1s apart, no two processes share one
+        gaps = [b - a for a, b in zip(due, due[1:])]
+        assert min(gaps) > 0.05
+        assert due[-1] - due[0] == pytest.approx(0.9, abs=0.1)
+
+
+class TestErrorHints:
+    """Test 429 detection and Retry-After parsing."""
+
+    @pytest.mark.parametrize("message, expected", [
+        ("429 RESOURCE_EXHAUSTED. {'details': [{'@type': 'RetryInfo', 'retryDelay': '17s'}]}", 17.0),
+        ("429 Quota exceeded. Please retry in 5.5s.", 5.5),
+        ("429 Quota exceeded [retry_delay {\n  seconds: 31\n}\n]", 31.0),
+        ("429 Resource Exhausted", None),
+    ])
+    def test_retry_after_from_message(self, message, expected):
+        assert rate_limiter.retry_after_from_error(Exception(message)) == expected
+
+    def test_retry_after_header(self):
+        error = Exception("Too Many Requests")
+        error.response = MagicMock(headers={"retry-after": "12"})
+
+        assert rate_limiter.retry_after_from_error(error) == 12.0
+
+    def test_is_rate_limit_error(self):
+        coded = Exception("Too Many Requests")
+        coded.code = 429
+
+        assert rate_limiter.is_rate_limit_error(coded)
+        assert rate_limiter.is_rate_limit_error(Exception("RESOURCE_EXHAUSTED"))
+        assert not rate_limiter.is_rate_limit_error(Exception("500 Internal"))
+
+
+class TestSettings:
+    """Test configuration from `rate_limits` and `caching`."""
+
+    def test_from_config(self):
+        config = ProjectConfig({
+            "caching": {"dir": "/tmp/cf-cache"},
+            "rate_limits": {
+                "requests_per_minute": 20,
+                "burst": True,
+                "max_retry_after_sec": 45,
+                "models": {"gemini-2.5-flash": {"requests_per_minute": 10, "burst": 3}},
+            },
+        })
+
+        limiter = rate_limiter.reset_rate_limiter(config)
+
+        assert str(limiter.db_path) == "/tmp/cf-cache/rate_limits.sqlite"
+        assert limiter.default == RateLimit(requests_per_minute=20, burst=rate_limiter.DEFAULT_BURST)
+        assert limiter.limit_for("gemini-2.5-flash") == RateLimit(requests_per_minute=10, burst=3)
+        assert limiter.max_retry_after_sec == 45
+        assert limiter is rate_limiter.get_rate_limiter()
+
+
+class TestCallersUseLimiter:
+    """ModelRouter and TTS pace requests and share 429 back-off through the limiter."""
+
+    @patch("core.utils.model_router.ModelRouter._call_gemini_api")
+    @patch("time.sleep")
+    def test_router_honors_retry_after(self, mock_sleep, mock_gemini):
+        """A 429 hint replaces the fixed backoff; the next acquire waits for it."""
+        mock_gemini.side_effect = [Exception("429 Quota exceeded. Please retry in 7s."), "Success"]
+
+        response = ModelRouter("key")._try_model("gemini-2.5-flash", "prompt", True)
+
+        assert response == "Success"
+        mock_sleep.assert_called_once()
+        assert mock_sleep.call_args.args[0] == pytest.approx(7.0, abs=0.05)
+        stats = rate_limiter.get_rate_limit_stats()
+        assert (stats["acquires"], stats["throttled"], stats["retry_after_hints"]) == (2, 1, 1)
+
+    @patch("core.utils.model_router.ModelRouter._call_gemini_api")
+    @patch("time.sleep")
+    def test_router_blind_backoff_is_not_a_hint(self, mock_sleep, mock_gemini):
+        """A 429 without Retry-After falls back to 2s and is not counted as a hint."""
+        mock_gemini.side_effect = [Exception("429 Resource Exhausted"), "Success"]
+
+        ModelRouter("key")._try_model("gemini-2.5-flash", "prompt", True)
+
+        assert mock_sleep.call_args.args[0] == pytest.approx(2.0, abs=0.05)
+        stats = rate_limiter.get_rate_limit_stats()
+        assert (stats["throttled"], stats["retry_after_hints"]) == (1, 0)
+
+    @patch("core.generators.tts_generator._convert_mp3_to_wav", return_value=2.0)
+    @patch("core.generators.tts_generator.genai.Client")
+    def test_tts_honors_retry_after(self, mock_client_class, mock_convert, tmp_path):
+        """TTS waits for the server's hint instead of a blind 20s."""
+        mock_response = MagicMock(audio=b"mp3")
+        mock_client_class.return_value.models.generate_content.side_effect = [
+            Exception("429 RESOURCE_EXHAUSTED {'retryDelay': '3s'}"),
+            mock_response,
+        ]
+
+        with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            duration = asyncio.run(tts_generator._synthesize_gemini_tts_async("key", "текст", tmp_path / "a.wav"))
+
+        assert duration == 2.0
+        mock_sleep.assert_awaited_once()
+        assert mock_sleep.call_args.args[0] == pytest.approx(3.0, abs=0.05)
+        assert tts_generator.get_tts_stats()["rate_limits"]["retry_after_hints"] == 1
+        assert tts_generator.get_tts_stats()["rate_limits"]["models"][tts_generator.TTS_MODEL]["acquires"] == 2
@@ -0,0 +1,68 @@
+"""Tests for the offline render benchmark suite helpers."""
+from __future__ import annotations
+
+import importlib.util
+import wave
+from pathlib import Path
+
+import pytest
+
+_SPEC = importlib.util.spec_from_file_location(
+    "render_suite", Path(__file__).resolve().parent.parent / "benchmarks" / "render_suite.py"
+)
+render_suite = importlib.util.module_from_spec(_SPEC)
+_SPEC.loader.exec_module(render_suite)
+
+
+def _result(case="shorts", wall=10.0, rss=200.0, children=150.0, size=1_000_000):
+    return {
+        "case": case, "length_sec": 30.0, "preview": False, "wall_sec": wall,
+        "peak_rss_mb": rss, "peak_rss_children_mb": children, "output_bytes": size,
+    }
+
+
+class TestSyntheticInputs:
+    """Test generated audio and scripts."""
+
+    def test_tone_wav_length(self, tmp_path):
+        """WAVs have the requested length at the TTS sample rate."""
+        path = render_suite.write_tone_wav(tmp_path / "a.wav", 12.5)
+
+        with wave.open(str(path)) as wav_file:
+            assert wav_file.getframerate() == render_suite.SAMPLE_RATE
+            assert wav_file.getnframes() == round(12.5 * render_suite.SAMPLE_RATE)
+
+    def test_scripts_per_mode(self):
+        """Scripts have the fields each renderer reads."""
+        assert set(render_suite.synthetic_script("long_form", 30)["blocks"]) == {"love", "money", "health"}
+        assert render_suite.synthetic_script("ad", 30)["product_id"]
+        assert len(render_suite.synthetic_script("shorts", 60)["script"]) >= 60 * 14
+
+
+class TestCompare:
+    """Test regression detection against a baseline."""
+
+    def test_within_threshold(self):
+        """Small changes and improvements pass."""
+        rows = render_suite.compare(
+            {"results": [_result(wall=10.5, rss=150.0)]}, {"results": [_result()]}, 0.2, 0.2
+        )
+
+        assert rows[0]["regressions"] == []
+        assert rows[0]["wall_sec"]["change"] == pytest.approx(0.05)
+
+    def test_regressions_flagged(self):
+        """Slower renders and RSS growth over the threshold are regressions; size is informational."""
+        rows = render_suite.compare(
+            {"results": [_result(wall=13.0, children=200.0, size=3_000_000)]}, {"results": [_result()]}, 0.2, 0.2
+        )
+
+        assert rows[0]["regressions"] == ["wall_sec", "peak_rss_children_mb"]
+
+    def test_unmatched_results_skipped(self):
+        """Benchmarks missing from the baseline are not compared."""
+        rows = render_suite.compare(
+            {"results": [_result("ad"), _result("shorts")]}, {"results": [_result("shorts")]}, 0.2, 0.2
+        )
+
+        assert [row["key"] for row in rows] == ["shorts@30s"]
@@ -5,6 +5,7 @@ import asyncio
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
 import tempfile
+from PIL import Image
 
 from core.content_modes.registry import ContentModeRegistry
 from core.content_modes.base import GenerationResult
@@ -94,6 +95,21 @@ class TestSlideRenderer:
             assert result.exists()
             assert result.suffix == ".png"
     
+    def test_render_gradient_slide(self):
+        """Gradient backgrounds run from the primary to the secondary color."""
+        renderer = SlideRenderer(
+            width=64, height=128, background_color="#FF0000",
+            background_type="gradient", background_secondary="#0000FF",
+        )
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_path = renderer.render_slide("", Path(tmpdir) / "slide.png")
+            image = Image.open(output_path).convert("RGB")
+            top, bottom = image.getpixel((0, 0)), image.getpixel((0, 127))
+        
+        assert top == (255, 0, 0)
+        assert bottom == (0, 0, 255)
+    
     def test_color_parsing_hex(self):
         """Test hex color parsing."""
         renderer = SlideRenderer()
@@ -0,0 +1,95 @@
+"""Tests for the local stock footage catalog."""
+from __future__ import annotations
+
+import pytest
+
+from core.utils.stock_catalog import StockCatalog, US_PER_SEC
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    """Empty catalog in a temp directory."""
+    return StockCatalog(tmp_path / "catalog.sqlite")
+
+
+def _hit(hit_id, tags, duration=20, rendition="medium"):
+    return {
+        "hit_id": hit_id,
+        "rendition": rendition,
+        "url": f"https://example.com/{hit_id}.mp4",
+        "tags": tags,
+        "duration": duration,
+        "width": 1280,
+        "height": 720,
+    }
+
+
+class TestStockCatalog:
+    """Test catalog queries and usage balancing."""
+
+    def test_pick_on_missing_db(self, catalog):
+        """Querying before anything was ingested does not create the database."""
+        assert catalog.pick(["stars"]) is None
+        assert not catalog.db_path.exists()
+        assert catalog.stats["misses"] == 1
+
+    def test_pick_matches_whole_tags(self, catalog):
+        """Keywords match whole tags, case-insensitively."""
+        catalog.add(_hit(1, "Stars, night sky"))
+        catalog.add(_hit(2, "starship, rocket"))
+
+        hit = catalog.pick(["stars"])
+
+        assert hit["hit_id"] == 1
+        assert hit["url"] == "https://example.com/1.mp4"
+        assert hit["tags"] == "stars, night sky"
+        assert hit["duration"] == 20
+        assert catalog.pick(["ocean"]) is None
+
+    def test_pick_respects_min_duration(self, catalog):
+        """Clips shorter than the minimum are skipped."""
+        catalog.add(_hit(1, "stars", duration=5))
+        catalog.add(_hit(2, "stars", duration=30))
+
+        assert catalog.pick(["stars"], min_duration_us=10 * US_PER_SEC)["hit_id"] == 2
+        assert catalog.pick(["stars"], min_duration_us=60 * US_PER_SEC) is None
+
+    def test_pick_spreads_usage(self, catalog):
+        """Repeated picks rotate through all matching clips."""
+        for hit_id in (1, 2, 3):
+            catalog.add(_hit(hit_id, "zodiac, stars"))
+
+        picked = []
+        for _ in range(6):
+            hit = catalog.pick(["zodiac"])
+            catalog.record_use(hit["hit_id"], hit["rendition"])
+            picked.append(hit["hit_id"])
+
+        assert sorted(picked[:3]) == [1, 2, 3]
+        assert sorted(picked[3:]) == [1, 2, 3]
+
+    def test_readd_keeps_usage(self, catalog):
+        """Refreshing a clip keeps its usage counter."""
+        catalog.add(_hit(1, "stars"))
+        catalog.record_use(1, "medium")
+        catalog.add(_hit(1, "stars, cosmos"))
+
+        hit = catalog.pick(["cosmos"])
+        assert hit["usage_count"] == 1
+
+    def test_pick_is_not_a_use(self, catalog):
+        """Only record_use counts: a pick whose clip is never used leaves no trace."""
+        catalog.add(_hit(1, "stars"))
+
+        assert catalog.pick(["stars"])["usage_count"] == 0
+        assert catalog.pick(["stars"])["usage_count"] == 0
+        catalog.record_use(1, "medium")
+        assert catalog.pick(["stars"])["usage_count"] == 1
+
+    def test_remove(self, catalog):
+        """Removed clips are no longer picked."""
+        catalog.add(_hit(1, "stars"))
+        catalog.remove(1, "medium")
+
+        assert catalog.count() == 0
+        assert catalog.pick(["stars"]) is None
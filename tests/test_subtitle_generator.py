@@ -0,0 +1,112 @@
+"""Tests for subtitle cue generation."""
+from __future__ import annotations
+
+import pytest
+
+from core.generators import subtitle_generator
+from core.utils.config_loader import ProjectConfig
+
+
+class TestCueTiming:
+    """Test phrase splitting and timing."""
+
+    def test_split_phrases(self):
+        """Sentences become phrases; long sentences are split between words."""
+        text = "Первое. Второе предложение подлиннее!"
+        assert subtitle_generator.split_phrases(text, 80) == ["Первое.", "Второе предложение подлиннее!"]
+        assert subtitle_generator.split_phrases(text, 12) == ["Первое.", "Второе", "предложение", "подлиннее!"]
+
+    def test_timed_cues_proportional(self):
+        """Each phrase gets a share of the duration proportional to its length."""
+        cues = subtitle_generator.timed_cues("Aaaa. Bbbbbbbbbbbb.", 4.0, 80, offset=1.0)
+
+        assert [c.text for c in cues] == ["Aaaa.", "Bbbbbbbbbbbb."]
+        assert cues[0].start == 1.0
+        assert cues[0].end == cues[1].start == pytest.approx(1.0 + 4.0 * 5 / 18, abs=0.001)
+        assert cues[1].end == 5.0
+
+    def test_timeline_offsets(self):
+        """Long-form blocks follow each other after the intro."""
+        script = {"blocks": {"love": "Любовь.", "money": "Деньги."}}
+        durations = {"love": 2.0, "money": 3.0}
+
+        block_cues = subtitle_generator.build_cues(script, "long_form", durations)
+        cues = subtitle_generator.timeline_cues(block_cues, durations, lead_in=3.0)
+
+        assert [(c.start, c.end, c.text) for c in cues] == [(3.0, 5.0, "Любовь."), (5.0, 8.0, "Деньги.")]
+
+    def test_block_texts_strip_markup(self):
+        """Captions use the same cleaned text as TTS."""
+        assert subtitle_generator.block_texts({"script": "**Важно**  <b>сегодня</b>"}, "shorts") == {
+            "main": "Важно сегодня"
+        }
+
+
+class TestSubtitleFormats:
+    """Test SRT/ASS output and config parsing."""
+
+    def test_to_srt(self):
+        """SRT uses 1-based indices and comma milliseconds."""
+        cues = [subtitle_generator.Cue(0.0, 1.5, "Раз"), subtitle_generator.Cue(61.25, 3725.0, "Два")]
+
+        assert subtitle_generator.to_srt(cues) == (
+            "1\n00:00:00,000 --> 00:00:01,500\nРаз\n\n"
+            "2\n00:01:01,250 --> 01:02:05,000\nДва\n"
+        )
+
+    def test_parse_srt_round_trip(self):
+        """SRT read back gives the same cues, multi-line text included."""
+        cues = [subtitle_generator.Cue(0.0, 1.5, "Раз\nи два"), subtitle_generator.Cue(61.25, 3725.0, "Три")]
+
+        assert subtitle_generator.parse_srt(subtitle_generator.to_srt(cues)) == cues
+        assert subtitle_generator.parse_srt("\ufeff1\r\n00:00:01,000 --> 00:00:02,000\r\nЧетыре\r\n") == [
+            subtitle_generator.Cue(1.0, 2.0, "Четыре")
+        ]
+
+    def test_to_ass_applies_settings(self):
+        """Font, size, color and position end up in the ASS style."""
+        settings = subtitle_generator.SubtitleSettings(font="DejaVu Sans", font_size=64, color="#FF8000", position="top")
+        cues = [subtitle_generator.Cue(0.0, 1.0, "a {b}")]
+
+        ass = subtitle_generator.to_ass(cues, settings, 1080, 1920)
+
+        assert "PlayResX: 1080" in ass and "PlayResY: 1920" in ass
+        style = next(line for line in ass.splitlines() if line.startswith("Style:")).split(",")
+        assert style[1:4] == ["DejaVu Sans", "64", "&H000080FF"]
+        assert style[18] == "8"
+        assert ass.rstrip().endswith("Dialogue: 0,0:00:00.00,0:00:01.00,Default,,0,0,0,,a \\{b\\}")
+
+    def test_settings_from_config(self):
+        """Subtitles are off unless explicitly enabled; bad values are rejected."""
+        assert subtitle_generator.settings_from_config(ProjectConfig({})) is None
+        assert subtitle_generator.settings_from_config(ProjectConfig({"subtitles": {"enabled": False}})) is None
+
+        settings = subtitle_generator.settings_from_config(
+            ProjectConfig({"subtitles": {"enabled": True, "font_size": 30, "mode": "sidecar"}})
+        )
+        assert settings.font_size == 30
+        assert settings.mode == "sidecar"
+        # Прожиг перекодирует видео, поэтому только по явному запросу
+        default = subtitle_generator.settings_from_config(ProjectConfig({"subtitles": {"enabled": True}}))
+        assert default.mode == "sidecar"
+
+        with pytest.raises(ValueError, match="subtitles.position"):
+            subtitle_generator.settings_from_config(
+                ProjectConfig({"subtitles": {"enabled": True, "position": "left"}})
+            )
+
+    def test_write_subtitles_long_form(self, tmp_path):
+        """Long-form gets timeline sidecars plus block-relative ASS files for segments."""
+        script = {"blocks": {"love": "Любовь.", "money": "Деньги."}}
+        output_path = tmp_path / "long_form.mp4"
+
+        files = subtitle_generator.write_subtitles(
+            script, "long_form", {"love": 2.0, "money": 3.0}, output_path,
+            subtitle_generator.SubtitleSettings(mode="burn"), 1920, 1080, lead_in=3.0,
+        )
+
+        assert files.srt == tmp_path / "long_form.srt"
+        assert "00:00:05,000 --> 00:00:08,000" in files.srt.read_text(encoding="utf-8")
+        assert sorted(files.blocks) == ["love", "money"]
+        assert "0:00:00.00,0:00:03.00,Default,,0,0,0,,Деньги." in files.blocks["money"].read_text(encoding="utf-8")
+        assert files.burn
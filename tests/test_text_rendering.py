@@ -0,0 +1,116 @@
+"""Tests for the shared text rasterization module."""
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from core.utils import text_rendering
+
+
+@pytest.fixture(autouse=True)
+def _clear_text_caches():
+    text_rendering.clear_caches()
+    yield
+    text_rendering.clear_caches()
+
+
+class TestFontCache:
+    """Test font resolution and caching."""
+
+    def test_font_loaded_once_per_size(self):
+        """Same (path, size) returns the same font object."""
+        first = text_rendering.get_font(None, 40)
+        second = text_rendering.get_font(None, 40)
+        other = text_rendering.get_font(None, 50)
+
+        assert first is second
+        assert other is not first
+        assert text_rendering.get_cache_stats()["fonts"]["hits"] == 1
+
+    def test_missing_font_falls_back(self, tmp_path):
+        """Unreadable font files fall back to the PIL default font."""
+        font = text_rendering.get_font(str(tmp_path / "missing.ttf"), 30)
+        assert font is not None
+
+
+class TestRenderText:
+    """Test text layout and the rendered-text cache."""
+
+    def test_wrap_text(self):
+        """Words are wrapped greedily; long words get their own line."""
+        assert text_rendering.wrap_text("one two three four", 9) == ["one two", "three", "four"]
+        assert text_rendering.wrap_text("supercalifragilistic", 5) == ["supercalifragilistic"]
+        assert text_rendering.wrap_text("", 10) == [""]
+
+    def test_render_text_centered(self):
+        """Text block is centered on a transparent canvas."""
+        image = text_rendering.render_text("Тест", 400, 300, 40)
+
+        assert image.size == (400, 300)
+        assert image.mode == "RGBA"
+        left, top, right, bottom = image.getbbox()
+        assert abs((left + right) / 2 - 200) < 5
+        assert abs((top + bottom) / 2 - 150) < 25
+        assert image.getpixel((0, 0))[3] == 0
+
+    def test_render_text_memoized(self):
+        """Repeated text is rasterized once; callers get independent images."""
+        first = text_rendering.render_text("Повтор", 400, 300, 40)
+        first.paste((255, 0, 0, 255), (0, 0, 400, 300))
+        second = text_rendering.render_text("Повтор", 400, 300, 40)
+
+        stats = text_rendering.get_cache_stats()["text"]
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+        assert second.getpixel((0, 0))[3] == 0
+
+    def test_scaled_render_matches_full_layout(self):
+        """Scaled renders keep the full-resolution line breaks."""
+        text = "Сегодня звезды обещают вам удачный день"
+        full = text_rendering.render_text(text, 1080, 1920, 60)
+        half = text_rendering.render_text(text, 540, 960, 60, scale=0.5)
+
+        expected = np.asarray(full.resize((540, 960), Image.LANCZOS), dtype=np.int16)
+        diff = np.abs(np.asarray(half, dtype=np.int16) - expected)
+        assert diff.mean() < 1.0
+
+    def test_draw_text_on_rgb(self):
+        """draw_text composites onto RGB images in place."""
+        image = Image.new("RGB", (300, 200), (10, 20, 30))
+
+        text_rendering.draw_text(image, "Hi", font_size=40, color=(255, 255, 255), shadow=(3, (0, 0, 0)))
+
+        pixels = np.asarray(image)
+        assert image.mode == "RGB"
+        assert pixels.max() == 255
+        assert tuple(pixels[0, 0]) == (10, 20, 30)
+
+
+class TestTextEngines:
+    """Test engine selection and the one-time ImageMagick probe."""
+
+    def test_imagemagick_probe_runs_once(self):
+        """A failing ImageMagick probe is not retried."""
+        with patch("moviepy.editor.TextClip", side_effect=OSError("no convert")) as mock_text_clip:
+            assert not text_rendering.imagemagick_available()
+            assert not text_rendering.imagemagick_available()
+        assert mock_text_clip.call_count == 1
+
+    def test_pil_engine_skips_imagemagick(self):
+        """The default engine never spawns ImageMagick."""
+        with patch("moviepy.editor.TextClip") as mock_text_clip:
+            clip = text_rendering.make_text_clip("Hi", 320, 240, 30, duration=2.0)
+
+        mock_text_clip.assert_not_called()
+        assert clip.size == (320, 240)
+        assert clip.duration == 2.0
+
+    def test_auto_engine_falls_back_to_pil(self):
+        """auto uses PIL when the probe failed."""
+        with patch.object(text_rendering, "imagemagick_available", return_value=False):
+            clip = text_rendering.make_text_clip("Hi", 320, 240, 30, duration=1.0, engine="auto")
+
+        assert clip.size == (320, 240)
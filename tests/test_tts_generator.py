@@ -5,6 +5,7 @@ import os
 from pathlib import Path
 from unittest.mock import MagicMock, patch, AsyncMock
 import asyncio
+import wave
 
 import pytest
 
@@ -216,6 +217,283 @@ class TestSynthesizeModes:
                 api_key="test-key"
             )
 
+
+class TestConcurrentLongForm:
+    """Test parallel synthesis of long_form blocks."""
+    
+    def _run(self, config, delays):
+        """Run long_form synthesis with a fake TTS; returns (result, peak concurrency, start order)."""
+        active, peak, started = [0], [0], []
+        
+        async def fake_tts(api_key, text, output_path, speed=1.0):
+            block = output_path.stem.split("_")[-1]
+            started.append(block)
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(delays[block])
+            active[0] -= 1
+            return delays[block] * 100
+        
+        with patch.object(tts_generator, "_synthesize_gemini_tts_async", side_effect=fake_tts):
+            result = asyncio.run(tts_generator._synthesize_long_form_async(config, {"blocks": {}}, "key"))
+        return result, peak[0], started
+    
+    def test_blocks_run_concurrently_in_order(self, mock_config):
+        """All blocks are in flight at once; results keep the block order."""
+        (paths, total), peak, _ = self._run(mock_config, {"love": 0.05, "money": 0.01, "health": 0.03})
+        
+        assert peak == 3
+        assert list(paths) == ["love", "money", "health"]
+        assert paths["money"].endswith("long_form_money.wav")
+        assert total == pytest.approx(9.0)
+    
+    def test_concurrency_limit(self):
+        """`audio.tts_concurrency` bounds the requests in flight."""
+        config = ProjectConfig(ConfigNode({"project": {"name": "p"}, "audio": {"tts_concurrency": 1}}))
+        
+        _, peak, started = self._run(config, {"love": 0.01, "money": 0.01, "health": 0.01})
+        
+        assert peak == 1
+        assert started == ["love", "money", "health"]
+    
+    def test_invalid_concurrency_falls_back(self):
+        """Non-integer values use the default; values below 1 are clamped."""
+        def config(value):
+            return ProjectConfig(ConfigNode({"audio": {"tts_concurrency": value}}))
+        
+        assert tts_generator._tts_concurrency(config("4")) == tts_generator.DEFAULT_TTS_CONCURRENCY
+        assert tts_generator._tts_concurrency(config(True)) == tts_generator.DEFAULT_TTS_CONCURRENCY
+        assert tts_generator._tts_concurrency(config(0)) == 1
+    
+    def test_sdk_call_does_not_block_event_loop(self, tmp_path):
+        """The blocking generate_content call runs in a worker thread."""
+        import threading
+        
+        calls = []
+        client = MagicMock()
+        client.models.generate_content.side_effect = lambda **kwargs: calls.append(threading.current_thread())
+        
+        with patch.object(tts_generator.genai, "Client", return_value=client):
+            asyncio.run(tts_generator._synthesize_gemini_tts_async("key", "текст", tmp_path / "a.wav"))
+        
+        assert calls and all(thread is not threading.main_thread() for thread in calls)
+
+
+class TestTTSCache:
+    """Test the persistent narration cache."""
+    
+    @pytest.fixture(autouse=True)
+    def _fresh_cache(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        tts_generator.reset_tts_cache()
+        yield
+        tts_generator.reset_tts_cache()
+    
+    def _config(self, tmp_path, voice="Kore", **caching):
+        return ProjectConfig(ConfigNode({
+            "project": {"name": "cache_test"},
+            "audio": {"tts_voice": voice},
+            "caching": {"dir": str(tmp_path / "cache"), **caching},
+        }))
+    
+    def _fake_tts(self, calls, silent=False):
+        async def fake_tts(api_key, text, output_path, speed=1.0):
+            calls.append(text)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with wave.open(str(output_path), "wb") as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(tts_generator.OUTPUT_SAMPLE_RATE)
+                f.writeframes((b"\x00\x00" if silent else b"\x10\x00") * 2205)
+            return 2.5
+        return fake_tts
+    
+    def test_repeat_synthesis_is_served_from_cache(self, tmp_path):
+        """The second identical request does not call TTS and is reported as a hit."""
+        calls = []
+        config = self._config(tmp_path)
+        
+        with patch.object(tts_generator, "_synthesize_gemini_tts_async", side_effect=self._fake_tts(calls)):
+            first = tts_generator.synthesize(config, {"script": "Текст"}, "shorts", api_key="key")
+            Path(first["blocks"]["main"]).unlink()
+            second = tts_generator.synthesize(config, {"script": "Текст"}, "shorts", api_key="key")
+        
+        assert calls == ["Текст"]
+        assert first["cache_hits"] == []
+        assert second["cache_hits"] == ["main"]
+        assert second["total_duration_sec"] == 2.5
+        assert Path(second["blocks"]["main"]).stat().st_size > 4000
+        assert tts_generator.get_tts_stats()["cache"]["hits"] == 1
+    
+    def test_reset_with_config_follows_new_run(self, tmp_path):
+        """A per-run reset rebuilds the cache from the new config instead of keeping the first one."""
+        first = tts_generator.get_tts_cache(self._config(tmp_path))
+        assert first.enabled
+        
+        rebuilt = tts_generator.reset_tts_cache(self._config(tmp_path, tts_cache=False))
+        assert rebuilt is not first
+        assert not rebuilt.enabled
+        assert tts_generator.get_tts_cache(self._config(tmp_path)) is rebuilt
+    
+    def test_cache_io_runs_off_the_event_loop(self, tmp_path):
+        """Silence check, copies and cache.put are handed to worker threads."""
+        calls, offloaded = [], []
+        config = self._config(tmp_path)
+        real_to_thread = asyncio.to_thread
+        
+        async def tracking_to_thread(func, *args, **kwargs):
+            offloaded.append(func.__name__)
+            return await real_to_thread(func, *args, **kwargs)
+        
+        with patch.object(tts_generator, "_synthesize_gemini_tts_async", side_effect=self._fake_tts(calls)), \
+                patch.object(tts_generator.asyncio, "to_thread", side_effect=tracking_to_thread):
+            tts_generator.synthesize(config, {"script": "Текст"}, "shorts", api_key="key")
+        
+        assert {"_copy_from_tts_cache", "_is_silent", "_store_in_tts_cache"} <= set(offloaded)
+    
+    def test_key_includes_voice_and_speed(self, tmp_path):
+        """Another voice or speed is a different narration."""
+        key = tts_generator._tts_cache_key
+        
+        assert key("Текст", "m", "Kore", 1.0) == key("Текст", "m", "Kore", 1)
+        assert key("Текст", "m", "Kore", 1.0) != key("Текст", "m", "Puck", 1.0)
+        assert key("Текст", "m", "Kore", 1.0) != key("Текст", "m", "Kore", 1.1)
+        assert key("Текст", "m", "Kore", 1.0) != key("Текст ", "m", "Kore", 1.0)
+    
+    def test_long_form_hits_in_block_order(self, tmp_path):
+        """Only blocks with cached text are hits; the list follows block order."""
+        calls = []
+        config = self._config(tmp_path)
+        script = {"blocks": {"love": "Любовь", "money": "Деньги", "health": "Здоровье"}}
+        
+        with patch.object(tts_generator, "_synthesize_gemini_tts_async", side_effect=self._fake_tts(calls)):
+            tts_generator.synthesize(config, script, "long_form", api_key="key")
+            script["blocks"]["money"] = "Новые деньги"
+            result = tts_generator.synthesize(config, script, "long_form", api_key="key")
+        
+        assert result["cache_hits"] == ["love", "health"]
+        assert calls.count("Новые деньги") == 1 and len(calls) == 4
+    
+    def test_silent_placeholder_not_cached(self, tmp_path):
+        """Failed syntheses (silent fallbacks) are retried next time."""
+        calls = []
+        config = self._config(tmp_path)
+        
+        with patch.object(tts_generator, "_synthesize_gemini_tts_async", side_effect=self._fake_tts(calls, silent=True)):
+            tts_generator.synthesize(config, {"script": "Текст"}, "shorts", api_key="key")
+            result = tts_generator.synthesize(config, {"script": "Текст"}, "shorts", api_key="key")
+        
+        assert len(calls) == 2
+        assert result["cache_hits"] == []
+    
+    def test_cache_disabled(self, tmp_path):
+        """`caching.tts_cache: false` always calls TTS and stores nothing."""
+        calls = []
+        config = self._config(tmp_path, tts_cache=False)
+        
+        with patch.object(tts_generator, "_synthesize_gemini_tts_async", side_effect=self._fake_tts(calls)):
+            tts_generator.synthesize(config, {"script": "Текст"}, "shorts", api_key="key")
+            tts_generator.synthesize(config, {"script": "Текст"}, "shorts", api_key="key")
+        
+        assert len(calls) == 2
+        assert not (tmp_path / "cache" / "tts").exists()
+
+
+class TestChunkedSynthesis:
+    """Test sentence chunking and PCM stitching of long narration."""
+    
+    TEXT = " ".join(f"Предложение номер {i} про звезды и судьбу." for i in range(40))
+    
+    def _write_wav(self, path, frames, value=1):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with wave.open(str(path), "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(tts_generator.OUTPUT_SAMPLE_RATE)
+            f.writeframes(int(value).to_bytes(2, "little", signed=True) * frames)
+        return path
+    
+    def test_split_at_sentence_boundaries(self):
+        """Chunks stay under the limit, end on sentences and keep every word."""
+        chunks = tts_generator._split_text_chunks(self.TEXT, 200)
+        
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 200 for chunk in chunks)
+        assert all(chunk.endswith(".") for chunk in chunks)
+        assert " ".join(chunks) == self.TEXT
+        assert tts_generator._split_text_chunks("Коротко.", 200) == ["Коротко."]
+    
+    def test_split_long_sentence(self):
+        """A sentence over the limit is cut at commas, then spaces."""
+        sentence = ", ".join(["слово " * 20] * 3).strip() + "."
+        
+        chunks = tts_generator._split_text_chunks(sentence, 100)
+        
+        assert all(len(chunk) <= 100 for chunk in chunks)
+        assert " ".join(chunks).split() == sentence.split()
+    
+    def test_stitch_copies_pcm(self, tmp_path):
+        """Frames are concatenated byte for byte; offsets are returned per chunk."""
+        first = self._write_wav(tmp_path / "a.wav", 2205, 7)
+        second = self._write_wav(tmp_path / "b.wav", 4410, -3)
+        output_path = tmp_path / "out.wav"
+        
+        offsets = tts_generator._stitch_wavs([first, second], output_path)
+        
+        assert offsets == [(0.0, 0.1), (0.1, 0.2)]
+        with wave.open(str(output_path), "rb") as f:
+            assert f.getnframes() == 6615
+            data = f.readframes(6615)
+        assert data == (7).to_bytes(2, "little") * 2205 + (-3).to_bytes(2, "little", signed=True) * 4410
+    
+    def test_stitch_rejects_mismatched_format(self, tmp_path):
+        """Chunks with different formats cannot be stitched without decoding."""
+        first = self._write_wav(tmp_path / "a.wav", 100)
+        with wave.open(str(tmp_path / "b.wav"), "wb") as f:
+            f.setnchannels(2)
+            f.setsampwidth(2)
+            f.setframerate(44100)
+            f.writeframes(b"\x00" * 400)
+        
+        with pytest.raises(ValueError, match="format mismatch"):
+            tts_generator._stitch_wavs([first, tmp_path / "b.wav"], tmp_path / "out.wav")
+    
+    def test_long_text_synthesized_in_parallel_chunks(self, tmp_path, monkeypatch):
+        """Long narration is split, synthesized concurrently and stitched in order."""
+        monkeypatch.chdir(tmp_path)
+        tts_generator.reset_tts_cache()
+        config = ProjectConfig(ConfigNode({
+            "project": {"name": "chunks"},
+            "audio": {"tts_chunk_chars": 300, "tts_concurrency": 2},
+            "caching": {"tts_cache": False},
+        }))
+        active, peak, texts = [0], [0], []
+        
+        async def fake_tts(api_key, text, output_path, speed=1.0):
+            texts.append(text)
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.01)
+            active[0] -= 1
+            self._write_wav(output_path, len(text) * 10, len(texts))
+            return len(text) * 10 / tts_generator.OUTPUT_SAMPLE_RATE
+        
+        with patch.object(tts_generator, "_synthesize_gemini_tts_async", side_effect=fake_tts):
+            result = tts_generator.synthesize(config, {"script": self.TEXT}, "shorts", api_key="key")
+        tts_generator.reset_tts_cache()
+        
+        chunks = result["chunks"]["main"]
+        assert len(chunks) == len(texts) > 1
+        assert peak[0] == 2
+        assert [c["chars"] for c in chunks] == [len(t) for t in tts_generator._split_text_chunks(self.TEXT, 300)]
+        assert chunks[0]["start_sec"] == 0.0
+        for previous, chunk in zip(chunks, chunks[1:]):
+            assert chunk["start_sec"] == pytest.approx(previous["start_sec"] + previous["duration_sec"], abs=2e-3)
+        assert result["total_duration_sec"] == pytest.approx(sum(len(t) for t in texts) * 10 / 22050)
+        audio_dir = Path(result["blocks"]["main"]).parent
+        assert [p.name for p in audio_dir.iterdir()] == ["shorts_main.wav"]
+
+
 class TestTextSanitization:
     """Test text sanitization for TTS."""
     
@@ -250,3 +528,71 @@ class TestTextSanitization:
         result = tts_generator._sanitize_text_for_tts(text)
         assert "  " not in result
         assert result == "Много пробелов здесь"
+
+
+class TestBackgroundMix:
+    """Test background music and sound effects in synthesize()."""
+    
+    def _config(self, tmp_path, music_path=None, effects=None):
+        return ProjectConfig(ConfigNode({
+            "project": {"name": "mix_test"},
+            "audio": {
+                "background_music_enabled": music_path is not None,
+                "background_music": {"path": str(music_path) if music_path else None, "fade_out_sec": 0.0},
+                "sound_effects": {"enabled": effects is not None, "items": effects or []},
+            },
+        }))
+    
+    def _blocks(self, tmp_path, names):
+        blocks = {}
+        for name in names:
+            path = tmp_path / f"{name}.wav"
+            tts_generator._create_silent_wav(path, 1.0)
+            blocks[name] = str(path)
+        return blocks
+    
+    def test_disabled_keeps_narration(self, tmp_path):
+        """Without music or effects the narration files are used as is."""
+        blocks = self._blocks(tmp_path, ["main"])
+        
+        mixed, music, effects = tts_generator._mix_background_audio(self._config(tmp_path), blocks)
+        
+        assert (mixed, music, effects) == (blocks, None, {})
+    
+    def test_music_continues_across_blocks(self, tmp_path):
+        """Blocks get one continuous music bed, faded in on the first block only."""
+        from core.utils import audio_mixer
+        
+        music_path = tmp_path / "music.wav"
+        tts_generator._create_silent_wav(music_path, 5.0)
+        blocks = self._blocks(tmp_path, ["love", "money"])
+        
+        with patch.object(audio_mixer, "mix_to_wav", wraps=audio_mixer.mix_to_wav) as mock_mix:
+            mixed, music, _ = tts_generator._mix_background_audio(self._config(tmp_path, music_path), blocks)
+        
+        assert music == str(music_path)
+        assert mixed == {name: str(tmp_path / f"{name}_mix.wav") for name in blocks}
+        assert all(Path(path).exists() for path in mixed.values())
+        offsets = [c.kwargs["music_offset_sec"] for c in mock_mix.call_args_list]
+        fade_ins = [c.kwargs["fade_in"] for c in mock_mix.call_args_list]
+        assert offsets == [0.0, pytest.approx(1.0)]
+        assert fade_ins == [True, False]
+    
+    @patch("core.generators.tts_generator._synthesize_gemini_tts_async")
+    def test_synthesize_reports_mix(self, mock_synth, tmp_path, monkeypatch):
+        """synthesize() returns mixed blocks, the narration and applied effects."""
+        monkeypatch.chdir(tmp_path)
+        chime_path = tmp_path / "chime.wav"
+        tts_generator._create_silent_wav(chime_path, 0.2)
+        
+        async def fake_tts(api_key, text, output_path, speed=1.0):
+            return tts_generator._create_silent_wav(output_path, 1.0)
+        mock_synth.side_effect = fake_tts
+        
+        config = self._config(tmp_path, effects=[{"path": str(chime_path), "at_sec": 0.5}])
+        result = tts_generator.synthesize(config, {"script": "Текст"}, "shorts", api_key="test-key")
+        
+        assert result["blocks"]["main"].endswith("shorts_main_mix.wav")
+        assert result["narration_blocks"]["main"].endswith("shorts_main.wav")
+        assert result["background_music_path"] is None
+        assert result["sound_effects"] == {"main": [{"path": str(chime_path), "at_sec": 0.5, "gain_db": 0.0}]}
@@ -0,0 +1,133 @@
+"""Tests for pluggable video encoder backends."""
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from moviepy.editor import AudioClip, ColorClip, VideoFileClip
+
+from core.utils import video_encoder
+from core.utils.config_loader import ConfigNode
+
+
+class TestEncoderSettings:
+    """Test settings resolution from config."""
+
+    def test_settings_from_config(self):
+        """Config values override per-mode defaults."""
+        video_cfg = ConfigNode({
+            "encoder": "ffmpeg_pipe",
+            "preset": "fast",
+            "threads": 4,
+            "pix_fmt": "yuv420p",
+        })
+
+        settings = video_encoder.settings_from_config(video_cfg, fps=25, bitrate="3000k")
+
+        assert settings.encoder == "ffmpeg_pipe"
+        assert settings.preset == "fast"
+        assert settings.threads == 4
+        assert settings.fps == 25
+        assert settings.bitrate == "3000k"
+
+    def test_settings_threads_zero_means_auto(self):
+        """threads: 0 leaves thread count to ffmpeg."""
+        settings = video_encoder.settings_from_config(ConfigNode({"threads": 0}))
+        assert settings.threads is None
+
+    def test_settings_from_mock_config(self):
+        """Mock-like configs fall back to defaults."""
+        settings = video_encoder.settings_from_config(MagicMock(), fps=30)
+        assert settings.encoder == video_encoder.DEFAULT_ENCODER
+        assert settings.fps == 30
+
+
+class TestEncoderRegistry:
+    """Test backend registry."""
+
+    def test_builtin_encoders_registered(self):
+        """Both built-in backends are available."""
+        assert {"moviepy", "ffmpeg_pipe"} <= set(video_encoder.list_encoders())
+
+    def test_unknown_encoder_raises(self):
+        """Unknown backend name raises ValueError."""
+        with pytest.raises(ValueError, match="not found"):
+            video_encoder.get_encoder("nonexistent")
+
+    def test_moviepy_encoder_passes_settings(self, tmp_path):
+        """MoviePy backend forwards codec parameters to write_videofile."""
+        clip = MagicMock()
+        settings = video_encoder.EncoderSettings(fps=24, bitrate="1000k", preset="fast", threads=2)
+
+        video_encoder.write_clip(clip, tmp_path / "out.mp4", settings)
+
+        kwargs = clip.write_videofile.call_args.kwargs
+        assert kwargs["fps"] == 24
+        assert kwargs["bitrate"] == "1000k"
+        assert kwargs["preset"] == "fast"
+        assert kwargs["threads"] == 2
+        assert kwargs["ffmpeg_params"] == ["-pix_fmt", "yuv420p"]
+
+
+    def test_video_filter_forwarded(self, tmp_path):
+        """A video filter (burned-in subtitles) reaches both backends."""
+        clip = MagicMock()
+        settings = video_encoder.EncoderSettings(video_filter="subtitles=filename=x.ass")
+
+        video_encoder.write_clip(clip, tmp_path / "out.mp4", settings)
+        command = video_encoder.FFmpegPipeEncoder._build_command(160, 90, tmp_path / "out.mp4", settings, None)
+
+        assert clip.write_videofile.call_args.kwargs["ffmpeg_params"][-2:] == ["-vf", "subtitles=filename=x.ass"]
+        assert command[command.index("-vf") + 1] == "subtitles=filename=x.ass"
+
+
+class TestFFmpegPipeEncoder:
+    """Test the ffmpeg stdin pipe backend."""
+
+    def test_pipe_encoder_writes_video_with_audio(self, tmp_path):
+        """Frames and audio end up in a playable MP4 of the right length."""
+        tone = AudioClip(
+            lambda t: np.sin(2 * np.pi * 440 * np.asarray(t)).reshape(-1, 1).repeat(2, axis=1) * 0.1,
+            duration=1.0,
+            fps=44100,
+        )
+        clip = ColorClip((160, 90), color=(200, 50, 50)).set_duration(1.0).set_audio(tone)
+        output_path = tmp_path / "pipe.mp4"
+        settings = video_encoder.EncoderSettings(fps=30, preset="ultrafast", encoder="ffmpeg_pipe")
+
+        video_encoder.write_clip(clip, output_path, settings)
+
+        result = VideoFileClip(str(output_path))
+        try:
+            assert result.size == [160, 90]
+            assert result.reader.nframes >= 30
+            assert result.audio is not None
+            red, green, _ = result.get_frame(0.5)[45, 80]
+            assert red > 150 and green < 100
+        finally:
+            result.close()
+        assert [p.name for p in tmp_path.iterdir()] == ["pipe.mp4"]
+
+    def test_pipe_encoder_ffmpeg_error(self, tmp_path):
+        """ffmpeg failures surface as RuntimeError."""
+        clip = ColorClip((160, 90), color=(0, 0, 0)).set_duration(0.2)
+        settings = video_encoder.EncoderSettings(codec="no_such_codec", encoder="ffmpeg_pipe")
+
+        with pytest.raises(RuntimeError, match="ffmpeg failed"):
+            video_encoder.write_clip(clip, tmp_path / "bad.mp4", settings)
+
+    def test_extra_outputs_from_the_same_frames(self, tmp_path):
+        """Extra framings are split from the piped frames, even when moviepy is configured."""
+        clip = ColorClip((160, 90), color=(200, 50, 50)).set_duration(0.5)
+        settings = video_encoder.EncoderSettings(fps=30, preset="ultrafast", encoder="moviepy")
+        square = {"path": tmp_path / "square.mp4", "width": 90, "height": 90, "bitrate": "300k"}
+
+        video_encoder.write_clip(clip, tmp_path / "wide.mp4", settings, [square])
+
+        for name, size in (("wide", [160, 90]), ("square", [90, 90])):
+            result = VideoFileClip(str(tmp_path / f"{name}.mp4"))
+            try:
+                assert result.size == size
+            finally:
+                result.close()
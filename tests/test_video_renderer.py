@@ -1,14 +1,19 @@
 """Tests for Video Renderer module."""
 from __future__ import annotations
 
+import json
 import os
+from dataclasses import replace
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pytest
+from PIL import Image
 
 from core.generators import video_renderer, tts_generator
 from core.utils.config_loader import load
+from core.utils import ffmpeg_utils, profiling
 
 # Mock google.genai to prevent import errors
 import sys
@@ -55,6 +60,38 @@ class TestBackgroundGeneration:
             assert clip is not None
             assert clip.duration == duration
 
+    
+    def test_design_background(self):
+        """`design.background_type` turns the style colors into gradients."""
+        from core.utils.config_loader import ProjectConfig
+        
+        config = ProjectConfig({"design": {
+            "background_type": "gradient", "background_color": "#2B1B3D", "background_secondary": "#1a0f2e",
+        }})
+        
+        main = video_renderer._background_spec(config, "mystical")
+        love = video_renderer._background_spec(config, "love")
+        flat = video_renderer._background_spec(ProjectConfig({}), "love")
+        
+        assert (main.kind, main.primary, main.secondary) == ("linear", (43, 27, 61), (26, 15, 46))
+        assert love.kind == "linear" and love.primary == video_renderer.BACKGROUND_COLORS["love"]
+        assert flat.kind == "solid"
+        
+        frame = np.asarray(video_renderer._compose_still_frame(32, 64, "mystical", "", 20, background=main))
+        assert tuple(frame[0, 0]) == (43, 27, 61)
+        assert tuple(frame[-1, 0]) == (26, 15, 46)
+    
+    def test_animated_background_disables_still_path(self):
+        """Animated backgrounds need real frames, so the still fast path is skipped."""
+        from core.utils.config_loader import ProjectConfig
+        
+        config = ProjectConfig({"design": {"background_type": "animated"}})
+        
+        assert not video_renderer._still_fast_path_enabled(config)
+        clip = video_renderer._create_background_clip(
+            32, 64, 1.0, 10, "mystical", video_renderer._background_spec(config, "mystical")
+        )
+        assert not (clip.get_frame(0.0) == clip.get_frame(0.5)).all()
 
 class TestTextOverlay:
     """Test text overlay generation."""
@@ -92,6 +129,314 @@ class TestTextOverlay:
         assert img.size == (width, height)
 
 
+class TestStillFastPath:
+    """Test still-frame rendering of static segments."""
+    
+    def test_compose_still_frame(self):
+        """Background and text are flattened into one RGB frame."""
+        frame = video_renderer._compose_still_frame(
+            width=1080,
+            height=1920,
+            style="ad",
+            text="Тест",
+            font_size=70,
+            color=(255, 255, 0),
+        )
+        
+        assert frame.size == (1080, 1920)
+        assert frame.mode == "RGB"
+        assert frame.getpixel((0, 0)) == video_renderer.BACKGROUND_COLORS["ad"]
+    
+    def test_still_fast_path_toggle(self):
+        """Fast path is on by default and can be disabled via config.video."""
+        from core.utils.config_loader import ProjectConfig
+        
+        assert video_renderer._still_fast_path_enabled(ProjectConfig({"video": {}}))
+        assert not video_renderer._still_fast_path_enabled(
+            ProjectConfig({"video": {"still_fast_path": False}})
+        )
+    
+    def test_block_title_fallback(self):
+        """Long or empty block text falls back to the block name."""
+        script = {"blocks": {"love": "Любовь\nподробности", "money": "x" * 60}}
+        
+        assert video_renderer._block_title(script, "love") == "Любовь"
+        assert video_renderer._block_title(script, "money") == "Money"
+        assert video_renderer._block_title(script, "health") == "Health"
+    
+    def test_render_still_segment_with_audio(self, tmp_path):
+        """Still segment matches the audio duration and cleans up temp files."""
+        from moviepy.editor import VideoFileClip
+        
+        audio_path = tmp_path / "voice.wav"
+        tts_generator._create_silent_wav(audio_path, 4.0)
+        frame = video_renderer._compose_still_frame(320, 240, "love", "Любовь", 20)
+        output_path = tmp_path / "segment.mp4"
+        
+        video_renderer._render_still_segment(
+            frame, output_path, duration=4.0, fps=30, bitrate="1000k", audio_path=str(audio_path)
+        )
+        
+        clip = VideoFileClip(str(output_path))
+        try:
+            assert clip.size == [320, 240]
+            assert clip.fps == 30
+            assert abs(clip.duration - 4.0) < 0.1
+            assert clip.audio is not None
+        finally:
+            clip.close()
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["segment.mp4", "voice.wav"]
+
+
+class TestParallelSegments:
+    """Test parallel long-form segment rendering."""
+    
+    def _job(self, tmp_path, name):
+        return video_renderer._SegmentJob(
+            name=name,
+            style=name,
+            text=name.capitalize(),
+            font_size=20,
+            duration=1.0,
+            audio_path=None,
+            output_path=tmp_path / f"{name}.mp4",
+            width=320,
+            height=180,
+            fps=30,
+            bitrate="500k",
+        )
+    
+    def test_segment_workers_from_config(self):
+        """Worker count is capped by the number of segments."""
+        from core.utils.config_loader import ProjectConfig
+        
+        config = ProjectConfig({"video": {"segment_workers": 16}})
+        assert video_renderer._segment_workers(config, 5) == 5
+        config = ProjectConfig({"video": {"segment_workers": 2}})
+        assert video_renderer._segment_workers(config, 5) == 2
+        assert video_renderer._segment_workers(ProjectConfig({}), 1) == 1
+    
+    def test_render_segments_in_process_pool(self, tmp_path):
+        """Segments rendered in worker processes come back in job order."""
+        jobs = [self._job(tmp_path, "intro"), self._job(tmp_path, "love"), self._job(tmp_path, "outro")]
+        
+        paths = video_renderer._render_segments(jobs, workers=2, retries=0)
+        
+        assert paths == [job.output_path for job in jobs]
+        assert all(path.exists() for path in paths)
+    
+    def test_failed_segment_is_retried(self, tmp_path):
+        """Only the failing segment is rendered again."""
+        jobs = [self._job(tmp_path, "intro"), self._job(tmp_path, "love")]
+        calls = []
+        
+        def flaky(job):
+            calls.append(job.name)
+            if job.name == "love" and calls.count("love") == 1:
+                raise RuntimeError("encoder crashed")
+            return job.output_path
+        
+        with patch.object(video_renderer, "_render_segment_job", side_effect=flaky):
+            paths = video_renderer._render_segments(jobs, workers=1, retries=2)
+        
+        assert paths == [jobs[0].output_path, jobs[1].output_path]
+        assert calls == ["intro", "love", "love"]
+    
+    def test_segment_retries_exhausted(self, tmp_path):
+        """A segment that keeps failing aborts the render."""
+        jobs = [self._job(tmp_path, "love")]
+        
+        with patch.object(video_renderer, "_render_segment_job", side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError, match="Segment 'love' failed after 2 attempts"):
+                video_renderer._render_segments(jobs, workers=1, retries=1)
+
+
+class TestIncrementalRender:
+    """Test manifest-driven re-rendering of long-form segments."""
+    
+    PROFILE = video_renderer.RenderProfile(width=320, height=180, fps=30, bitrate="500k")
+    
+    @pytest.fixture(autouse=True)
+    def _reset_library(self):
+        video_renderer.reset_segment_library()
+        yield
+        video_renderer.reset_segment_library()
+    
+    def _setup(self, tmp_path, caching=None, **video):
+        from core.utils.config_loader import ProjectConfig
+        
+        config = ProjectConfig({
+            "video": {"segment_workers": 1, **video},
+            "caching": {"dir": str(tmp_path / "cache"), **(caching or {})},
+        })
+        blocks = {}
+        for name, seconds in (("love", 1.0), ("money", 1.5), ("health", 1.0)):
+            path = tmp_path / f"{name}.wav"
+            tts_generator._create_silent_wav(path, seconds)
+            blocks[name] = str(path)
+        script = {"video_title": "Гороскоп", "blocks": {"love": "Любовь", "money": "Деньги", "health": "Здоровье"}}
+        return config, script, blocks, tmp_path / "out" / "long_form.mp4"
+    
+    def _render(self, config, script, blocks, output_path):
+        with patch.object(
+            video_renderer, "_render_segment_job", wraps=video_renderer._render_segment_job
+        ) as spy:
+            video_renderer._render_long_form_still(config, script, blocks, output_path, self.PROFILE)
+        return sorted(call.args[0].name for call in spy.call_args_list)
+    
+    def test_unchanged_segments_are_reused(self, tmp_path):
+        """Only segments whose inputs changed are encoded again."""
+        config, script, blocks, output_path = self._setup(tmp_path)
+        
+        profiler = profiling.reset_profiler()
+        assert self._render(config, script, blocks, output_path) == ["health", "intro", "love", "money", "outro"]
+        stages = {s["name"]: s for s in profiler.report()["stages"]}
+        assert stages["segments"]["frames"] == round((3.0 + 1.0 + 1.5 + 1.0 + 2.0) * 30)
+        assert stages["concat"]["wall_sec"] > 0
+        assert self._render(config, script, blocks, output_path) == []
+        assert video_renderer.get_render_stats()["segments"]["rebuilt"] == []
+        
+        tts_generator._create_silent_wav(Path(blocks["love"]), 2.0)
+        script["blocks"]["health"] = "Бодрость"
+        assert self._render(config, script, blocks, output_path) == ["health", "love"]
+        
+        stats = video_renderer.get_render_stats()["segments"]
+        assert sorted(stats["reused"]) == ["intro", "money", "outro"]
+        assert stats["from_library"] == ["intro", "outro"]
+        
+        segments_dir = output_path.parent / ".long_form_segments"
+        manifest = json.loads((segments_dir / "manifest.json").read_text(encoding="utf-8"))
+        files = sorted(p.name for p in segments_dir.glob("*.mp4"))
+        assert files == sorted(entry["file"] for entry in manifest.values())
+        
+        from moviepy.editor import VideoFileClip
+        clip = VideoFileClip(str(output_path))
+        try:
+            assert abs(clip.duration - (3.0 + 2.0 + 1.5 + 1.0 + 2.0)) < 0.5
+        finally:
+            clip.close()
+    
+    def test_renderer_version_invalidates_segments(self, tmp_path):
+        """Bumping RENDERER_VERSION changes every segment hash."""
+        config, script, blocks, output_path = self._setup(tmp_path)
+        job = video_renderer._SegmentJob(
+            name="love", style="love", text="Любовь", font_size=60, duration=1.0,
+            audio_path=blocks["love"], output_path=tmp_path / "x.mp4",
+            width=320, height=180, fps=30, bitrate="500k",
+        )
+        
+        before = video_renderer._segment_hash(job)
+        with patch.object(video_renderer, "RENDERER_VERSION", "test-bump"):
+            assert video_renderer._segment_hash(job) != before
+        assert video_renderer._segment_hash(replace(job, output_path=tmp_path / "y.mp4")) == before
+    
+    def test_incremental_render_disabled(self, tmp_path):
+        """Without incremental rendering no segments are kept."""
+        config, script, blocks, output_path = self._setup(
+            tmp_path, caching={"enabled": False}, incremental_render=False
+        )
+        
+        assert len(self._render(config, script, blocks, output_path)) == 5
+        assert len(self._render(config, script, blocks, output_path)) == 5
+        assert output_path.exists()
+        assert not (output_path.parent / ".long_form_segments").exists()
+    
+    def test_subtitles_burned_per_segment(self, tmp_path):
+        """Block segments burn their own captions; caption changes rebuild only that block."""
+        from core.utils.config_loader import ProjectConfig
+        
+        _, script, blocks, output_path = self._setup(tmp_path)
+        config = ProjectConfig({
+            "video": {"segment_workers": 1},
+            "caching": {"dir": str(tmp_path / "cache")},
+            "subtitles": {"enabled": True, "mode": "burn", "font_size": 40},
+        })
+        
+        with patch.object(
+            video_renderer.ffmpeg_utils, "subtitles_filter", wraps=video_renderer.ffmpeg_utils.subtitles_filter
+        ) as spy:
+            assert len(self._render(config, script, blocks, output_path)) == 5
+        assert sorted(call.args[0].rsplit("/", 1)[-1] for call in spy.call_args_list) == [
+            "health.ass", "love.ass", "money.ass"
+        ]
+        assert output_path.with_suffix(".srt").exists()
+        
+        script["blocks"]["money"] = "Деньги придут."
+        assert self._render(config, script, blocks, output_path) == ["money"]
+    
+    def test_subtitles_sidecar_only(self, tmp_path):
+        """Sidecar mode writes caption files and never burns them in."""
+        from core.utils.config_loader import ProjectConfig
+        
+        _, script, blocks, output_path = self._setup(tmp_path)
+        config = ProjectConfig({
+            "video": {"segment_workers": 1},
+            "caching": {"dir": str(tmp_path / "cache")},
+            "subtitles": {"enabled": True, "mode": "sidecar"},
+        })
+        
+        with patch.object(video_renderer.ffmpeg_utils, "subtitles_filter") as mock_filter:
+            self._render(config, script, blocks, output_path)
+        
+        mock_filter.assert_not_called()
+        srt = output_path.with_suffix(".srt").read_text(encoding="utf-8")
+        assert "00:00:03,000 --> 00:00:04,000\nЛюбовь" in srt
+        assert video_renderer.get_render_stats()["subtitles"]["burned"] is False
+    
+    def test_bumpers_shared_across_outputs(self, tmp_path):
+        """Intro/outro are encoded once and reused by renders of other outputs."""
+        config, script, blocks, output_path = self._setup(tmp_path, incremental_render=False)
+        
+        assert len(self._render(config, script, blocks, output_path)) == 5
+        other_output = tmp_path / "other" / "long_form.mp4"
+        assert self._render(config, script, blocks, other_output) == ["health", "love", "money"]
+        assert other_output.exists()
+        
+        script["video_title"] = "Новый заголовок"
+        assert self._render(config, script, blocks, other_output) == ["health", "intro", "love", "money"]
+        assert video_renderer.get_render_stats()["segment_library"]["stores"] == 3
+    
+    def test_still_unit_reused_for_ads(self, tmp_path):
+        """The ad background frame is encoded once; later ads only mux audio."""
+        config, _, blocks, _ = self._setup(tmp_path)
+        make_frame = MagicMock(return_value=Image.new("RGB", (320, 180), (200, 0, 0)))
+        
+        with patch.object(
+            video_renderer.ffmpeg_utils, "encode_still_unit", wraps=video_renderer.ffmpeg_utils.encode_still_unit
+        ) as spy:
+            for name in ("money", "love"):
+                output_path = tmp_path / f"ad_{name}.mp4"
+                video_renderer._render_library_still(
+                    config, ("ad", "Товар", 70), make_frame, output_path, 1.5, self.PROFILE, blocks[name]
+                )
+                assert output_path.exists()
+        
+        assert spy.call_count == 1
+        assert make_frame.call_count == 1
+        
+        from moviepy.editor import VideoFileClip
+        clip = VideoFileClip(str(tmp_path / "ad_love.mp4"))
+        try:
+            assert abs(clip.duration - 1.5) < 0.1
+            assert clip.size == [320, 180]
+        finally:
+            clip.close()
+    
+    def test_segment_stats_reset_per_render(self, mock_config, tmp_path, monkeypatch):
+        """A shorts render after a still long-form one reports no segment stats."""
+        monkeypatch.chdir(tmp_path)
+        audio_path = tmp_path / "love.wav"
+        tts_generator._create_silent_wav(audio_path, 1.0)
+        video_renderer.render(mock_config, {}, {"blocks": {"love": str(audio_path)}}, "long_form", preview=True)
+        assert video_renderer.get_render_stats()["segments"] is not None
+        
+        with patch.object(video_renderer, "_render_shorts", return_value=Path("shorts.mp4")):
+            video_renderer.render(mock_config, {}, {}, "shorts")
+        
+        assert video_renderer.get_render_stats()["segments"] is None
+    
+
+
 class TestPixabayIntegration:
     """Test Pixabay API integration."""
     
@@ -152,6 +497,503 @@ class TestPixabayIntegration:
         assert url is None
 
 
+class TestStockCache:
+    """Test stock footage caching."""
+    
+    @pytest.fixture(autouse=True)
+    def _fresh_cache(self):
+        video_renderer.reset_stock_cache()
+        yield
+        video_renderer.reset_stock_cache()
+    
+    def _config(self, tmp_path, **caching):
+        from core.utils.config_loader import ProjectConfig
+        
+        return ProjectConfig({"caching": {"dir": str(tmp_path / "cache"), **caching}})
+    
+    @patch('requests.get')
+    def test_search_pixabay_video_returns_hit_identity(self, mock_get):
+        """Search result carries hit id and rendition for cache keys."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "hits": [{
+                "id": 42,
+                "tags": "stars, night",
+                "duration": 20,
+                "videos": {
+                    "large": {"url": "https://example.com/large.mp4", "width": 1920, "height": 1080},
+                    "medium": {"url": "https://example.com/medium.mp4", "width": 1280, "height": 720},
+                },
+            }]
+        }
+        mock_get.return_value = mock_response
+        
+        hit = video_renderer._search_pixabay_video("key", "stars", 10.0)
+        
+        assert hit["hit_id"] == 42
+        assert hit["rendition"] == "medium"
+        assert hit["url"] == "https://example.com/medium.mp4"
+    
+    def test_acquire_stock_proxy_reuses_download(self, tmp_path):
+        """Proxies of another geometry are built from the cached original download."""
+        config = self._config(tmp_path)
+        hit = {"hit_id": 7, "rendition": "medium", "url": "https://example.com/v.mp4"}
+        
+        def fake_download(url, output_path):
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_bytes(b"video")
+            return True
+        
+        def fake_transcode(src_path, output_path, width, height, fps):
+            assert src_path.read_bytes() == b"video"
+            output_path.write_bytes(b"proxy")
+            return output_path
+        
+        with patch.object(video_renderer, "_search_pixabay_video", return_value=hit), \
+                patch.object(video_renderer, "_download_video", side_effect=fake_download) as mock_download, \
+                patch.object(video_renderer.ffmpeg_utils, "transcode_proxy", side_effect=fake_transcode) as mock_transcode:
+            full, full_temp = video_renderer._acquire_stock_proxy(config, "key", "stars", 10.0, 1080, 1920, 30)
+            preview, preview_temp = video_renderer._acquire_stock_proxy(config, "key", "stars", 10.0, 540, 960, 15)
+        
+        assert mock_download.call_count == 1
+        assert mock_transcode.call_count == 2
+        assert full != preview and full_temp == preview_temp == []
+        stats = video_renderer.get_render_stats()["stock_cache"]
+        assert stats["hits"] == 1  # оригинал для второго прокси
+        assert stats["misses"] == 3
+    
+    def test_acquire_stock_proxy_cache_disabled(self, tmp_path):
+        """With caching disabled the download and the proxy are per-render temp files."""
+        config = self._config(tmp_path, enabled=False)
+        hit = {"hit_id": 7, "rendition": "medium", "url": "https://example.com/v.mp4"}
+        
+        def fake_transcode(src_path, output_path, width, height, fps):
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_bytes(b"proxy")
+            return output_path
+        
+        with patch.object(video_renderer, "_search_pixabay_video", return_value=hit), \
+                patch.object(video_renderer, "_download_video", return_value=True), \
+                patch.object(video_renderer.ffmpeg_utils, "transcode_proxy", side_effect=fake_transcode):
+            proxy, temp_files = video_renderer._acquire_stock_proxy(config, "key", "stars", 10.0, 1080, 1920, 30)
+        
+        source, temp_proxy = temp_files
+        assert temp_proxy == proxy
+        # Без кэша у каждого рендера свой временный файл
+        assert source.name.startswith("stock_7_medium_") and source.name != "stock_7_medium.mp4"
+        assert proxy.name.startswith("stock_7_medium_proxy_1080x1920_30_")
+    
+    def test_stock_cache_follows_config(self, tmp_path):
+        """A run with other caching settings does not reuse the first run's cache."""
+        first = video_renderer.get_stock_cache(self._config(tmp_path))
+        
+        assert video_renderer.get_stock_cache(self._config(tmp_path)) is first
+        disabled = video_renderer.get_stock_cache(self._config(tmp_path, enabled=False))
+        assert disabled is not first and not disabled.enabled
+        assert video_renderer.get_stock_catalog(self._config(tmp_path, enabled=False)) is None
+        moved = video_renderer.get_stock_cache(self._config(tmp_path / "other"))
+        assert moved.root == tmp_path / "other" / "cache" / "stock"
+    
+    def test_acquire_stock_proxy_transcodes_once(self, tmp_path):
+        """Proxy is built on first use and served from cache afterwards."""
+        config = self._config(tmp_path)
+        hit = {"hit_id": 7, "rendition": "medium", "url": "https://example.com/v.mp4"}
+        
+        def fake_download(url, output_path):
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_bytes(b"video")
+            return True
+        
+        def fake_transcode(src_path, output_path, width, height, fps):
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_bytes(b"proxy")
+            return output_path
+        
+        with patch.object(video_renderer, "_search_pixabay_video", return_value=hit), \
+                patch.object(video_renderer, "_download_video", side_effect=fake_download) as mock_download, \
+                patch.object(video_renderer.ffmpeg_utils, "transcode_proxy", side_effect=fake_transcode) as mock_transcode:
+            first, first_temp = video_renderer._acquire_stock_proxy(config, "key", "stars", 10.0, 1080, 1920, 30)
+            second, second_temp = video_renderer._acquire_stock_proxy(config, "key", "stars", 10.0, 1080, 1920, 30)
+        
+        assert mock_download.call_count == 1
+        assert mock_transcode.call_count == 1
+        assert first == second
+        assert first.read_bytes() == b"proxy"
+        assert first_temp == [] and second_temp == []
+    
+    def test_stock_catalog_serves_repeat_requests(self, tmp_path):
+        """Ingested clips are picked from the catalog without a new API search."""
+        config = self._config(tmp_path)
+        hit = {"hit_id": 7, "rendition": "medium", "url": "https://example.com/v.mp4",
+               "tags": "stars, night", "duration": 20}
+        
+        def fake_download(url, output_path):
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_bytes(b"video")
+            return True
+        
+        def fake_transcode(src_path, output_path, width, height, fps):
+            output_path.write_bytes(b"proxy")
+            return output_path
+        
+        with patch.object(video_renderer, "_search_pixabay_video", return_value=hit) as mock_search, \
+                patch.object(video_renderer, "_download_video", side_effect=fake_download), \
+                patch.object(video_renderer.ffmpeg_utils, "transcode_proxy", side_effect=fake_transcode):
+            first, _ = video_renderer._acquire_stock_proxy(config, "key", "stars galaxy", 10.0, 1080, 1920, 30)
+            second, _ = video_renderer._acquire_stock_proxy(config, None, "stars galaxy", 10.0, 1080, 1920, 30)
+        
+        assert mock_search.call_count == 1
+        assert first == second
+        stats = video_renderer.get_render_stats()["stock_catalog"]
+        assert stats["clips"] == 1
+        assert stats["hits"] == 1
+        assert video_renderer.get_stock_catalog(config).pick(["stars"])["usage_count"] == 1
+    
+    def test_stock_catalog_use_recorded_after_proxy(self, tmp_path):
+        """A catalog clip whose proxy cannot be built is not counted as used."""
+        config = self._config(tmp_path)
+        catalog = video_renderer.get_stock_catalog(config)
+        catalog.add({"hit_id": 1, "rendition": "medium", "url": "https://example.com/v.mp4",
+                     "tags": "stars", "duration": 20})
+        
+        def fake_download(url, output_path):
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_bytes(b"video")
+            return True
+        
+        with patch.object(video_renderer, "_download_video", side_effect=fake_download), \
+                patch.object(video_renderer.ffmpeg_utils, "transcode_proxy", side_effect=RuntimeError("bad input")):
+            proxy, _ = video_renderer._acquire_stock_proxy(
+                config, None, "stars", 10.0, 1080, 1920, 30, catalog_keywords=["stars"]
+            )
+        
+        assert proxy is None
+        assert catalog.pick(["stars"])["usage_count"] == 0
+    
+    def test_stock_catalog_drops_unfetchable_clip(self, tmp_path):
+        """A catalog clip that can no longer be fetched is forgotten and the API is used."""
+        config = self._config(tmp_path)
+        catalog = video_renderer.get_stock_catalog(config)
+        catalog.add({"hit_id": 1, "rendition": "medium", "url": "https://example.com/gone.mp4",
+                     "tags": "stars", "duration": 20})
+        fresh = {"hit_id": 2, "rendition": "medium", "url": "https://example.com/v.mp4",
+                 "tags": "cosmos", "duration": 20}
+        
+        def fake_download(url, output_path):
+            if "gone" in url:
+                return False
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_bytes(b"video")
+            return True
+        
+        def fake_transcode(src_path, output_path, width, height, fps):
+            output_path.write_bytes(b"proxy")
+            return output_path
+        
+        with patch.object(video_renderer, "_search_pixabay_video", return_value=fresh) as mock_search, \
+                patch.object(video_renderer, "_download_video", side_effect=fake_download), \
+                patch.object(video_renderer.ffmpeg_utils, "transcode_proxy", side_effect=fake_transcode):
+            proxy, _ = video_renderer._acquire_stock_proxy(
+                config, "key", "stars", 10.0, 1080, 1920, 30, catalog_keywords=["stars"]
+            )
+        
+        assert proxy.read_bytes() == b"proxy"
+        assert mock_search.call_count == 1
+        assert catalog.pick(["stars"]) is None
+        assert catalog.pick(["cosmos"])["hit_id"] == 2
+    
+    def test_acquire_stock_proxy_transcode_failure(self, tmp_path):
+        """A failed transcode yields no proxy instead of raising."""
+        config = self._config(tmp_path)
+        hit = {"hit_id": 7, "rendition": "medium", "url": "https://example.com/v.mp4"}
+        
+        def fake_download(url, output_path):
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_bytes(b"video")
+            return True
+        
+        with patch.object(video_renderer, "_search_pixabay_video", return_value=hit), \
+                patch.object(video_renderer, "_download_video", side_effect=fake_download), \
+                patch.object(video_renderer.ffmpeg_utils, "transcode_proxy", side_effect=RuntimeError("bad input")):
+            proxy, temp_files = video_renderer._acquire_stock_proxy(config, "key", "stars", 10.0, 1080, 1920, 30)
+        
+        assert proxy is None
+        assert temp_files == []
+    
+    def test_prefetch_stock_handed_to_render(self, tmp_path, monkeypatch):
+        """Prefetch runs with the estimated duration; the render takes its result."""
+        monkeypatch.setenv("PIXABAY_API_KEY", "key")
+        config = self._config(tmp_path)
+        proxy = tmp_path / "proxy.mp4"
+        script = {"script": "а" * 140, "visual_hints": ["moon"]}
+        
+        with patch.object(video_renderer, "_acquire_stock_proxy", return_value=(proxy, [])) as mock_acquire:
+            assert video_renderer.prefetch_stock(config, script, "shorts")
+            result = video_renderer._take_stock_prefetch("shorts", video_renderer._render_profile("shorts"))
+        
+        assert result == (proxy, [])
+        args = mock_acquire.call_args.args
+        assert args[3] == pytest.approx(10.0)
+        assert args[4:7] == (1080, 1920, 30)
+        assert args[7][0] == "moon"
+        assert video_renderer._take_stock_prefetch("shorts", video_renderer._render_profile("shorts")) is None
+    
+    def test_prefetch_for_other_profile_is_discarded(self, tmp_path, monkeypatch):
+        """A prefetch for another geometry is not used and its temp files are removed."""
+        monkeypatch.setenv("PIXABAY_API_KEY", "key")
+        config = self._config(tmp_path)
+        temp_file = tmp_path / "download.mp4"
+        temp_file.write_bytes(b"video")
+        
+        with patch.object(video_renderer, "_acquire_stock_proxy", return_value=(None, [temp_file])):
+            video_renderer.prefetch_stock(config, {"script": "текст"}, "shorts")
+            assert video_renderer._take_stock_prefetch("shorts", video_renderer._render_profile("shorts", True)) is None
+            video_renderer._prefetch_executor.submit(lambda: None).result()
+        
+        assert not temp_file.exists()
+    
+    def test_prefetch_failure_falls_back(self, tmp_path, monkeypatch):
+        """A failed prefetch makes the render fetch on its own."""
+        monkeypatch.setenv("PIXABAY_API_KEY", "key")
+        config = self._config(tmp_path)
+        
+        with patch.object(video_renderer, "_acquire_stock_proxy", side_effect=RuntimeError("offline")):
+            video_renderer.prefetch_stock(config, {"script": "текст"}, "shorts")
+            assert video_renderer._take_stock_prefetch("shorts", video_renderer._render_profile("shorts")) is None
+    
+    def test_prefetch_skipped(self, tmp_path, monkeypatch):
+        """No prefetch without a stock source, for other modes or when disabled."""
+        from core.utils.config_loader import ProjectConfig
+        
+        monkeypatch.delenv("PIXABAY_API_KEY", raising=False)
+        assert not video_renderer.prefetch_stock(self._config(tmp_path), {}, "shorts")
+        
+        monkeypatch.setenv("PIXABAY_API_KEY", "key")
+        disabled = ProjectConfig({"video": {"stock_prefetch": False}, "caching": {"dir": str(tmp_path)}})
+        assert not video_renderer.prefetch_stock(disabled, {}, "shorts")
+        assert not video_renderer.prefetch_stock(self._config(tmp_path), {}, "long_form")
+    
+    def test_prefetch_enabled_by_any_truthy_flag(self, tmp_path, monkeypatch):
+        """Only `stock_prefetch: false` turns prefetch off, not e.g. `1`."""
+        from core.utils.config_loader import ProjectConfig
+        
+        monkeypatch.setenv("PIXABAY_API_KEY", "key")
+        config = ProjectConfig({"video": {"stock_prefetch": 1}, "caching": {"dir": str(tmp_path)}})
+        
+        with patch.object(video_renderer, "_acquire_stock_proxy", return_value=(None, [])):
+            assert video_renderer.prefetch_stock(config, {"script": "текст"}, "shorts")
+            video_renderer.discard_stock_prefetch()
+
+    def test_render_shorts_stock_in_one_ffmpeg_pass(self, mock_config, tmp_path, monkeypatch):
+        """Stock background is looped by ffmpeg and never decoded through MoviePy."""
+        from moviepy.editor import VideoFileClip
+        
+        monkeypatch.chdir(tmp_path)
+        profile = video_renderer.RenderProfile(width=90, height=160, fps=15, bitrate="200k", preset="ultrafast")
+        frame_path = tmp_path / "frame.png"
+        Image.new("RGB", (90, 160), (0, 0, 200)).save(frame_path)
+        source = ffmpeg_utils.encode_still(frame_path, tmp_path / "src.mp4", duration=1.0, fps=15, bitrate="200k")
+        proxy = ffmpeg_utils.transcode_proxy(source, tmp_path / "proxy.mp4", 90, 160, 15)
+        audio_path = tmp_path / "main.wav"
+        tts_generator._create_silent_wav(audio_path, 2.5)
+        audio_map = {"blocks": {"main": str(audio_path)}, "total_duration_sec": 2.5}
+        
+        with patch.object(video_renderer, "_render_profile", return_value=profile), \
+             patch.object(video_renderer, "_take_stock_prefetch", return_value=(proxy, [])), \
+             patch.object(video_renderer, "VideoFileClip") as mock_video_clip:
+            output_path = video_renderer.render(mock_config, {"hook": "Тест"}, audio_map, "shorts")
+        
+        mock_video_clip.assert_not_called()
+        assert not list((tmp_path / "temp").glob("*"))
+        clip = VideoFileClip(str(output_path))
+        try:
+            assert abs(clip.duration - 2.5) < 0.15
+            frame = clip.get_frame(2.0)
+        finally:
+            clip.close()
+        assert frame[:20, :, 2].mean() > 150  # looped stock background
+
+
+class TestPreviewRender:
+    """Test draft renders at reduced resolution and fps."""
+    
+    def test_preview_profile(self):
+        """Preview halves width and height, caps fps and uses the ultrafast preset."""
+        full = video_renderer._render_profile("shorts")
+        preview = video_renderer._render_profile("shorts", preview=True)
+        
+        assert (full.width, full.height, full.fps, full.preset) == (1080, 1920, 30, None)
+        assert (preview.width, preview.height) == (540, 960)
+        assert preview.fps == video_renderer.PREVIEW_FPS
+        assert preview.preset == "ultrafast"
+        assert preview.bitrate == "1250k"
+        assert preview.font_size(60) == 30
+    
+    def test_preview_encoder_settings(self):
+        """Preview forces the fast preset over the configured one."""
+        from core.utils.config_loader import ProjectConfig
+        
+        config = ProjectConfig({"video": {"preset": "slow"}})
+        preview = video_renderer._render_profile("ad", preview=True)
+        
+        assert video_renderer._encoder_settings(config, "ad").preset == "slow"
+        settings = video_renderer._encoder_settings(config, "ad", preview)
+        assert settings.preset == "ultrafast"
+        assert settings.fps == preview.fps
+    
+    def test_preview_frame_matches_full_frame(self):
+        """Preview text layout is the full layout scaled down."""
+        text = "Сегодня звезды обещают вам удачный день и новые знакомства"
+        full = video_renderer._compose_still_frame(1080, 1920, "mystical", text, 60)
+        preview = video_renderer._compose_still_frame(540, 960, "mystical", text, 60, scale=0.5)
+        
+        expected = np.asarray(full.resize((540, 960), Image.LANCZOS), dtype=np.int16)
+        diff = np.abs(np.asarray(preview, dtype=np.int16) - expected)
+        assert diff.mean() < 1.0
+    
+    def test_render_shorts_preview(self, mock_config, tmp_path, monkeypatch):
+        """Preview render writes a separate, smaller file."""
+        from moviepy.editor import VideoFileClip
+        
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("PIXABAY_API_KEY", raising=False)
+        video_renderer.reset_stock_cache()
+        audio_path = tmp_path / "main.wav"
+        tts_generator._create_silent_wav(audio_path, 3.0)
+        audio_map = {"blocks": {"main": str(audio_path)}, "total_duration_sec": 3.0}
+        
+        output_path = video_renderer.render(mock_config, {"hook": "Тест"}, audio_map, "shorts", preview=True)
+        video_renderer.reset_stock_cache()
+        
+        assert output_path.name == "shorts_preview.mp4"
+        clip = VideoFileClip(str(output_path))
+        try:
+            assert clip.size == [540, 960]
+            assert clip.fps == video_renderer.PREVIEW_FPS
+            assert abs(clip.duration - 3.0) < 0.1
+        finally:
+            clip.close()
+
+
+class TestMultiFormatRender:
+    """Test publishing one render in several aspect ratios."""
+    
+    @staticmethod
+    def _run_ffmpeg_spy(monkeypatch):
+        calls = []
+        run_ffmpeg = ffmpeg_utils.run_ffmpeg
+        
+        def run(args):
+            calls.append(args)
+            return run_ffmpeg(args)
+        
+        monkeypatch.setattr(ffmpeg_utils, "run_ffmpeg", run)
+        return calls
+    
+    @staticmethod
+    def _sizes(outputs):
+        from moviepy.editor import VideoFileClip
+        
+        sizes = {}
+        for fmt, path in outputs.items():
+            clip = VideoFileClip(str(path))
+            try:
+                sizes[fmt] = (clip.size, clip.duration)
+            finally:
+                clip.close()
+        return sizes
+    
+    def test_render_formats_single_pass(self, mock_config, tmp_path, monkeypatch):
+        """Every format, native included, is written by the same ffmpeg process."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("PIXABAY_API_KEY", raising=False)
+        audio_path = tmp_path / "main.wav"
+        tts_generator._create_silent_wav(audio_path, 1.0)
+        audio_map = {"blocks": {"main": str(audio_path)}, "total_duration_sec": 1.0}
+        calls = self._run_ffmpeg_spy(monkeypatch)
+        
+        outputs = video_renderer.render_formats(
+            mock_config, {"hook": "Тест"}, audio_map, "shorts", ["1:1", "9:16", "16:9"], preview=True
+        )
+        
+        assert list(outputs) == ["1:1", "9:16", "16:9"]
+        assert outputs["9:16"].name == "shorts_preview.mp4"
+        assert outputs["1:1"].name == "shorts_preview_1x1.mp4"
+        writers = [args for args in calls if all(str(path) in args for path in outputs.values())]
+        assert len(writers) == 1
+        # Готовые видео повторно не декодируются
+        assert not any(str(path) in args[:args.index(str(path))] for args in calls for path in outputs.values()
+                       if str(path) in args)
+        second = pytest.approx(1.0, abs=0.15)
+        assert self._sizes(outputs) == {
+            "1:1": ([540, 540], second), "9:16": ([540, 960], second), "16:9": ([960, 540], second),
+        }
+    
+    def test_stock_overlay_formats(self, mock_config, tmp_path, monkeypatch):
+        """Stock shorts split the composited frames into every format in one ffmpeg run."""
+        monkeypatch.chdir(tmp_path)
+        profile = video_renderer.RenderProfile(width=90, height=160, fps=15, bitrate="200k", preset="ultrafast")
+        frame_path = tmp_path / "frame.png"
+        Image.new("RGB", (90, 160), (0, 0, 200)).save(frame_path)
+        source = ffmpeg_utils.encode_still(frame_path, tmp_path / "src.mp4", duration=1.0, fps=15, bitrate="200k")
+        proxy = ffmpeg_utils.transcode_proxy(source, tmp_path / "proxy.mp4", 90, 160, 15)
+        audio_path = tmp_path / "main.wav"
+        tts_generator._create_silent_wav(audio_path, 1.0)
+        audio_map = {"blocks": {"main": str(audio_path)}, "total_duration_sec": 1.0}
+        calls = self._run_ffmpeg_spy(monkeypatch)
+        
+        with patch.object(video_renderer, "_render_profile", return_value=profile), \
+             patch.object(video_renderer, "_take_stock_prefetch", return_value=(proxy, [])):
+            outputs = video_renderer.render_formats(mock_config, {"hook": "Тест"}, audio_map, "shorts", ["9:16", "1:1"])
+        
+        assert len(calls) == 1
+        assert "split=2" in " ".join(calls[0])
+        second = pytest.approx(1.0, abs=0.15)
+        assert self._sizes(outputs) == {"9:16": ([90, 160], second), "1:1": ([1080, 1080], second)}
+    
+    def test_long_form_segments_per_format(self, mock_config, tmp_path, monkeypatch):
+        """Still long-form encodes each segment once for all formats and joins every format."""
+        monkeypatch.chdir(tmp_path)
+        audio_path = tmp_path / "love.wav"
+        tts_generator._create_silent_wav(audio_path, 1.0)
+        audio_map = {"blocks": {"love": str(audio_path)}}
+        
+        outputs = video_renderer.render_formats(
+            mock_config, {"video_title": "Тест"}, audio_map, "long_form", ["16:9", "9:16"], preview=True
+        )
+        
+        duration = pytest.approx(video_renderer.LONG_FORM_INTRO_SEC + 1.0 + video_renderer.LONG_FORM_OUTRO_SEC, abs=0.15)
+        assert self._sizes(outputs) == {"16:9": ([960, 540], duration), "9:16": ([540, 960], duration)}
+        assert video_renderer.get_render_stats()["segments"]["rebuilt"] == ["intro", "love", "outro"]
+    
+    def test_native_only(self, mock_config):
+        """Asking only for the mode's own aspect is a plain render."""
+        with patch.object(video_renderer, "_render_long_form", return_value=Path("long_form.mp4")) as mock_render:
+            outputs = video_renderer.render_formats(mock_config, {}, {}, "long_form", ["16:9"])
+        
+        assert mock_render.call_args.kwargs == {"preview": False, "formats": ()}
+        assert outputs == {"16:9": Path("long_form.mp4")}
+    
+    def test_format_outputs_fit(self):
+        """Extra formats are cropped unless `video.output_fit: pad`; unknown fits fail."""
+        from core.utils.config_loader import ProjectConfig
+        
+        (square,) = video_renderer._format_outputs(ProjectConfig({}), "shorts", ["9:16", "1:1"])
+        padded = video_renderer._format_outputs(ProjectConfig({"video": {"output_fit": "pad"}}), "shorts", ["1:1"])
+        
+        assert (square.width, square.height, square.fit) == (1080, 1080, "crop")
+        assert padded[0].fit == "pad"
+        with pytest.raises(RuntimeError, match="output_fit"):
+            video_renderer._format_outputs(ProjectConfig({"video": {"output_fit": "zoom"}}), "shorts", ["1:1"])
+    
+    def test_unknown_format(self, mock_config):
+        """Unknown aspect ratios fail before rendering."""
+        with patch.object(video_renderer, "_render") as mock_render:
+            with pytest.raises(RuntimeError, match="Unknown output format"):
+                video_renderer.render_formats(mock_config, {}, {}, "shorts", ["4:3"])
+        mock_render.assert_not_called()
+
+
 class TestVideoRendering:
     """Test video rendering for different modes."""
     